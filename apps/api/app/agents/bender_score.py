@@ -3,10 +3,12 @@ from pydantic import BaseModel
 from typing import Any, Dict
 import os
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.tools import tool
 from langchain.agents import create_agent
 
+from app.core.metrics import llm_stage
+from app.services.chat_models import chat_model
+
 # --- Output schema ---
 class BenderScoreOut(BaseModel):
     ats_alignment: float
@@ -50,11 +52,7 @@ def compute_bender_score(
 # Very simple wiring; reuse your GEMINI_API_KEY / model envs
 _provider_model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 
-_llm = ChatGoogleGenerativeAI(
-    model=_provider_model,
-    temperature=0,
-    api_key=os.environ["GEMINI_API_KEY"],
-)
+_llm = chat_model(_provider_model)
 
 _bender_agent = create_agent(
     model=_llm,
@@ -103,9 +101,10 @@ Please:
 - Return a concise explanation of what is driving the final score.
 """
 
-    result: Dict[str, Any] = _bender_agent.invoke(
-        {
-            "messages": [{"role": "user", "content": prompt}],
-        }
-    )
+    with llm_stage("bender_score"):
+        result: Dict[str, Any] = _bender_agent.invoke(
+            {
+                "messages": [{"role": "user", "content": prompt}],
+            }
+        )
     return result["structured_response"]
@@ -1,79 +1,133 @@
 # domain/ats_match.py
-import re
-from typing import Set, Iterable
+from typing import Dict, Iterable, List, Set
 
 from app.agents.schemas.resume_scan_schema import JobScanResult, ResumeScanResult
 from app.agents.schemas.ats_schema import AtsMatchInput, AtsMatchResult
+from app.agents.domain.skill_aliases import _norm, _tokens, get_alias_store
 
 
-ALIASES = {
-  "bachelor's degree": {"bachelor", "bachelors", "bachelor’s", "bs", "b.s", "b.s.", "bsc", "undergraduate degree"},
-  "master's degree": {"master", "masters", "master’s", "ms", "m.s", "m.s.", "msc", "graduate degree"},
-  "amazon web services": {"aws", "amazon web services"},
-  "javascript": {"javascript", "js", "ecmascript"},
-  "typescript": {"typescript", "ts"},
-  "machine learning": {"ml", "machine learning"},
-  # add more as needed
-}
-
-def _norm(s: str) -> str:
-    s = s.strip().lower()
-    s = re.sub(r"[\(\)\[\]\{\},:;]", " ", s)
-    s = s.replace("&", " and ")
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
-
-def _tokens(s: str) -> Set[str]:
-    return {t for t in re.split(r"[\s\/\-\+]+", _norm(s)) if t}
-
-ALT_TOKENS = {canon: [set(_tokens(a)) for a in alts] for canon, alts in ALIASES.items()}
+_DEGREE_KEYS = ("bachelor", "bs", "b.s", "bsc", "master", "ms", "m.s", "msc", "phd", "doctorate")
+_BACHELOR_RESUME_TOKENS = frozenset({"bs", "b.s", "b.s.", "bsc", "bachelor", "bachelors", "bachelor’s"})
+_BACHELOR_JOB_TOKENS = frozenset({"bachelor", "bs", "b.s", "bsc"})
 
 def _canonical(s: str) -> str:
-    n = _norm(s)
-    nt = _tokens(n)
-    for canon, alt_token_sets in ALT_TOKENS.items():
-        if n == canon:
-            return canon
-        # if ALL tokens of an alias appear in the string tokens
-        if any(at.issubset(nt) for at in alt_token_sets):
-            return canon
-    return n
+    # Aliases come from agents/data/skill_aliases.txt (hot-reloaded); see skill_aliases.py
+    return get_alias_store().canonical(s)
 
 def _is_degree_req(s: str) -> bool:
     n = _norm(s)
-    return any(k in n for k in ["bachelor", "bs", "b.s", "bsc", "master", "ms", "m.s", "msc", "phd", "doctorate"])
+    return any(k in n for k in _DEGREE_KEYS)
 
-def _match_one(job_item: str, resume_items: Iterable[str]) -> bool:
-    j = _canonical(job_item)
-
-    # Degree requirement special handling: allow “B.S.” to satisfy “bachelor’s”
-    if _is_degree_req(j):
-        jt = _tokens(j)
-        for r in resume_items:
-            rt = _tokens(_canonical(r))
-            # if resume contains bs/bachelor tokens, match
-            if ({"bs", "b.s", "b.s.", "bsc", "bachelor", "bachelors", "bachelor’s"} & rt) and \
-               ({"bachelor", "bs", "b.s", "bsc"} & jt or "bachelor" in jt):
+
+class SkillMatchIndex:
+    """
+    Precompiled view of a resume's skills for repeated _match_one-style lookups.
+
+    Built once per resume; each `matches()` call is roughly linear in the length
+    of the job item instead of scanning every resume item:
+      - exact:     set of canonical resume forms
+      - substring: trie over resume forms (resume form inside job item) plus a
+                   joined blob searched with `in` (job item inside resume form)
+      - jaccard:   token -> resume form inverted index, so only resume forms
+                   sharing a token with the job item are scored
+    """
+
+    _SEP = "\x00"
+    _END = ""  # trie terminal key
+
+    def __init__(self, resume_items: Iterable[str]):
+        forms = [_canonical(r) for r in resume_items]
+        self._empty = not forms
+        self._forms = set(forms)
+        self._has_bachelor = any(_BACHELOR_RESUME_TOKENS & _tokens(f) for f in self._forms)
+
+        self._blob = self._SEP.join(self._forms)
+        self._trie: dict = {}
+        self._has_empty_form = "" in self._forms
+        for f in self._forms:
+            node = self._trie
+            for ch in f:
+                node = node.setdefault(ch, {})
+            node[self._END] = True
+
+        self._form_tokens: List[Set[str]] = []
+        self._by_token: Dict[str, List[int]] = {}
+        for f in self._forms:
+            ft = _tokens(f)
+            if not ft:
+                continue
+            idx = len(self._form_tokens)
+            self._form_tokens.append(ft)
+            for t in ft:
+                self._by_token.setdefault(t, []).append(idx)
+
+    def _contains_resume_form(self, j: str) -> bool:
+        # Is any resume form a substring of j?
+        if self._has_empty_form:
+            return True
+        trie, end = self._trie, self._END
+        for i in range(len(j)):
+            node = trie
+            for ch in j[i:]:
+                node = node.get(ch)
+                if node is None:
+                    break
+                if end in node:
+                    return True
+        return False
+
+    def _in_resume_form(self, j: str) -> bool:
+        # Is j a substring of any resume form?
+        if self._SEP in j:
+            return any(j in f for f in self._forms)
+        return j in self._blob
+
+    def matches(self, job_item: str) -> bool:
+        if self._empty:
+            return False
+
+        j = _canonical(job_item)
+
+        # Degree requirement special handling: allow “B.S.” to satisfy “bachelor’s”
+        if self._has_bachelor and _is_degree_req(j):
+            jt = _tokens(j)
+            if (_BACHELOR_JOB_TOKENS & jt) or "bachelor" in jt:
                 return True
 
-    j_tokens = _tokens(j)
-    for r in resume_items:
-        rr = _canonical(r)
+        if self._matches_form(j):
+            return True
+        # A compound item ("Python or Java", "React/Node.js") canonicalizes to
+        # its first alias hit, so also try it as written: aliases only add matches
+        raw = _norm(job_item)
+        return raw != j and self._matches_form(raw)
+
+    def _matches_form(self, j: str) -> bool:
         # exact canonical match
-        if j == rr:
+        if j in self._forms:
             return True
         # substring match
-        if j in rr or rr in j:
+        if self._in_resume_form(j) or self._contains_resume_form(j):
             return True
         # token overlap match (tune threshold)
-        r_tokens = _tokens(rr)
-        if not j_tokens or not r_tokens:
-            continue
-        inter = len(j_tokens & r_tokens)
-        union = len(j_tokens | r_tokens)
-        if union and (inter / union) >= 0.5:
-            return True
-    return False
+        j_tokens = _tokens(j)
+        if not j_tokens:
+            return False
+        seen: Set[int] = set()
+        for t in j_tokens:
+            for idx in self._by_token.get(t, ()):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                r_tokens = self._form_tokens[idx]
+                inter = len(j_tokens & r_tokens)
+                union = len(j_tokens | r_tokens)
+                if union and (inter / union) >= 0.5:
+                    return True
+        return False
+
+
+def _match_one(job_item: str, resume_items: Iterable[str]) -> bool:
+    return SkillMatchIndex(resume_items).matches(job_item)
 
 
 
@@ -100,10 +154,10 @@ def ats_match_domain(input: AtsMatchInput) -> AtsMatchResult:
 
     # --- 2) Compute overlaps ---
 
-    resume_list = list(resume_all)
+    resume_index = SkillMatchIndex(resume_all)
 
-    matched_must = {j for j in job_must if _match_one(j, resume_list)}
-    matched_nice = {j for j in job_nice if _match_one(j, resume_list)}
+    matched_must = {j for j in job_must if resume_index.matches(j)}
+    matched_nice = {j for j in job_nice if resume_index.matches(j)}
 
     missing_must = job_must - matched_must
     missing_nice = job_nice - matched_nice
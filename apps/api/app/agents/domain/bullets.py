@@ -1,10 +1,11 @@
-import os
+import logging
 import re
 from typing import List, Optional, Dict, Any
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 
+from app.core.metrics import llm_stage
+from app.services.chat_models import chat_model
 from app.agents.schemas.bullets_schema import BulletsInput, BulletsResult, BulletsDraftResult
 from app.agents.schemas.resume_scan_schema import ScanJobInput, ScanResumeInput, ResumeScanResult
 from app.agents.schemas.ats_schema import AtsMatchInput
@@ -14,11 +15,9 @@ from app.agents.domain.scan_resume import scan_resume as scan_resume_domain
 from app.agents.domain.ats_match import ats_match_domain
 
 
-bullets_llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0,
-    api_key=os.environ.get("GEMINI_API_KEY"),
-)
+logger = logging.getLogger(__name__)
+
+bullets_llm = chat_model("gemini-2.5-flash")
 
 # Keep scan payloads lean so the model doesn't get distracted + you don't burn tokens.
 # Adjust keys if your scan schemas differ.
@@ -230,36 +229,38 @@ def bullets_domain(input: BulletsInput) -> BulletsResult:
 
     def _generate() -> BulletsDraftResult:
         chain = _bullets_prompt | bullets_llm.with_structured_output(BulletsDraftResult)
-        return chain.invoke(
-            {
-                "job_title": input.job_title,
-                "job_text": input.job_text,
-                "resume_text": input.resume_text,
-                "job_scan": compact_job,
-                "resume_scan": compact_resume,
-            }
-        )
+        with llm_stage("generate"):
+            return chain.invoke(
+                {
+                    "job_title": input.job_title,
+                    "job_text": input.job_text,
+                    "resume_text": input.resume_text,
+                    "job_scan": compact_job,
+                    "resume_scan": compact_resume,
+                }
+            )
 
     def _repair(draft: BulletsDraftResult, errors: List[str]) -> BulletsDraftResult:
         repair_chain = _repair_prompt | bullets_llm.with_structured_output(BulletsDraftResult)
-        return repair_chain.invoke(
-            {
-                "errors": errors,
-                "current_json": draft.model_dump(),
-                "job_text": input.job_text,
-                "resume_text": input.resume_text,
-                "job_scan": compact_job,
-                "resume_scan": compact_resume,
-            }
-        )
+        with llm_stage("repair"):
+            return repair_chain.invoke(
+                {
+                    "errors": errors,
+                    "current_json": draft.model_dump(),
+                    "job_text": input.job_text,
+                    "resume_text": input.resume_text,
+                    "job_scan": compact_job,
+                    "resume_scan": compact_resume,
+                }
+            )
 
     # 2) Generate + repair loop
     draft = _generate()
     draft = _force_one_transferable(draft)
     errors = _soft_validate_bullets(draft, resume_scan=resume_scan)
 
-    print("Generated draft:", draft.model_dump())
-    print("Validation errors:", errors)
+    # the draft itself is resume-derived text: log the validation outcome only
+    logger.debug("bullets draft generated", extra={"validation_errors": errors})
 
     errors = _soft_validate_bullets(draft, resume_scan=resume_scan)
     attempts = 0
@@ -281,8 +282,7 @@ def bullets_domain(input: BulletsInput) -> BulletsResult:
 
     # 4) Fail loudly in strict mode (don't ship junk)
     if errors and input.strict_mode:
-        print("Final draft before error:", draft.model_dump())
-        print("Final validation errors:", errors)
+        logger.warning("bullets draft still invalid after repairs", extra={"validation_errors": errors})
         # Try to repair one last time before raising
         repaired = repair_bullets_output(draft)
         try:
@@ -1,20 +1,16 @@
 # domain/car_evaluate.py
 
-import os
 from typing import List
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 
+from app.core.metrics import llm_stage
+from app.services.chat_models import chat_model
 from app.agents.schemas.car_schema import CarEvaluateInput, CarEvaluateResult, CarBulletAnalysis
 
 
 # Gemini model (tweak model name if needed)
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0,
-    api_key=os.environ.get("GEMINI_API_KEY"),
-)
+llm = chat_model("gemini-2.5-flash")
 
 _car_prompt = ChatPromptTemplate.from_messages(
     [
@@ -78,12 +74,13 @@ def car_evaluate_domain(input: CarEvaluateInput) -> CarEvaluateResult:
 
     chain = _car_prompt | llm.with_structured_output(CarEvaluateResult)
 
-    result: CarEvaluateResult = chain.invoke(
-        {
-            "bullets": bullets_as_text,
-            "job_context_note": job_context_note,
-        }
-    )
+    with llm_stage("car_evaluate"):
+        result: CarEvaluateResult = chain.invoke(
+            {
+                "bullets": bullets_as_text,
+                "job_context_note": job_context_note,
+            }
+        )
 
     # Optional: clamp and sanity-check scores (LLM might slightly overshoot)
     for b in result.bullets:
@@ -1,15 +1,11 @@
-import os
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 
+from app.core.metrics import llm_stage
+from app.services.chat_models import chat_model
 from app.agents.schemas.company_competitiveness_schema import CompanyFitInput, CompanyCompetitivenessResult
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0,
-    api_key=os.environ.get("GEMINI_API_KEY"),
-)
+llm = chat_model("gemini-2.5-flash")
 
 _company_prompt = ChatPromptTemplate.from_messages(
     [
@@ -54,8 +50,9 @@ def calculate_company_competitiveness_domain(input: CompanyFitInput) -> CompanyC
     """
     chain = _company_prompt | llm.with_structured_output(CompanyCompetitivenessResult)
     
-    return chain.invoke({
-        "resume_summary": input.resume.work_experience_summary or input.resume.summary_for_matching or "",
-        "job_company": input.job.company_name or "Unknown Company",
-        "job_summary": input.job.summary_for_candidate
-    })
+    with llm_stage("company_competitiveness"):
+        return chain.invoke({
+            "resume_summary": input.resume.work_experience_summary or input.resume.summary_for_matching or "",
+            "job_company": input.job.company_name or "Unknown Company",
+            "job_summary": input.job.summary_for_candidate
+        })
@@ -1,15 +1,11 @@
-import os
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 
+from app.core.metrics import llm_stage
+from app.services.chat_models import chat_model
 from app.agents.schemas.experience_fit_schema import ExperienceFitInput, ExperienceFitResult
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0,
-    api_key=os.environ.get("GEMINI_API_KEY"),
-)
+llm = chat_model("gemini-2.5-flash")
 
 _experience_prompt = ChatPromptTemplate.from_messages(
     [
@@ -56,11 +52,12 @@ def calculate_experience_fit_domain(input: ExperienceFitInput) -> ExperienceFitR
     """
     chain = _experience_prompt | llm.with_structured_output(ExperienceFitResult)
     
-    return chain.invoke({
-        "resume_years": input.resume.total_years_experience or "Unknown",
-        "resume_skills": ", ".join(input.resume.global_skills),
-        "resume_summary": input.resume.work_experience_summary or "",
-        "job_must_have": ", ".join(input.job.must_have_skills),
-        "job_nice_to_have": ", ".join(input.job.nice_to_have_skills),
-        "job_summary": input.job.summary_for_candidate
-    })
+    with llm_stage("experience_fit"):
+        return chain.invoke({
+            "resume_years": input.resume.total_years_experience or "Unknown",
+            "resume_skills": ", ".join(input.resume.global_skills),
+            "resume_summary": input.resume.work_experience_summary or "",
+            "job_must_have": ", ".join(input.job.must_have_skills),
+            "job_nice_to_have": ", ".join(input.job.nice_to_have_skills),
+            "job_summary": input.job.summary_for_candidate
+        })
@@ -1,11 +1,11 @@
 # domain/first_impression.py
 
-import os
 from typing import Optional, Dict, Any
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 
+from app.core.metrics import llm_stage
+from app.services.chat_models import chat_model
 from app.agents.schemas.first_impression_schema import (
     FirstImpressionInput,
     FirstImpressionResult,
@@ -22,11 +22,7 @@ from app.agents.domain.car_evaluate import car_evaluate_domain
 
 
 # Final summarizing LLM (Gemini)
-summary_llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0,
-    api_key=os.environ.get("GEMINI_API_KEY"),
-)
+summary_llm = chat_model("gemini-2.5-flash")
 
 _first_impression_prompt = ChatPromptTemplate.from_messages(
     [
@@ -117,15 +113,16 @@ def first_impression_domain(
         FirstImpressionResult
     )
 
-    result: FirstImpressionResult = chain.invoke(
-        {
-            "job_scan": job_scan.model_dump(),
-            "resume_scan": resume_scan.model_dump(),
-            "ats_result": ats_result.model_dump(),
-            "risk_result": risk_result.model_dump(),
-            "car_result": car_result,
-        }
-    )
+    with llm_stage("first_impression"):
+        result: FirstImpressionResult = chain.invoke(
+            {
+                "job_scan": job_scan.model_dump(),
+                "resume_scan": resume_scan.model_dump(),
+                "ats_result": ats_result.model_dump(),
+                "risk_result": risk_result.model_dump(),
+                "car_result": car_result,
+            }
+        )
 
     # Ensure scores match underlying tools (in case LLM nudges them)
     result.ats_score = float(ats_result.ats_score)
@@ -1,15 +1,11 @@
-import os
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 
+from app.core.metrics import llm_stage
+from app.services.chat_models import chat_model
 from app.agents.schemas.location_fit_schema import LocationFitInput, LocationFitResult
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0,
-    api_key=os.environ.get("GEMINI_API_KEY"),
-)
+llm = chat_model("gemini-2.5-flash")
 
 _location_prompt = ChatPromptTemplate.from_messages(
     [
@@ -48,9 +44,10 @@ def calculate_location_fit_domain(input: LocationFitInput) -> LocationFitResult:
     """
     chain = _location_prompt | llm.with_structured_output(LocationFitResult)
     
-    return chain.invoke({
-        # ResumeScanResult doesn't have a top-level location field, so usage summary
-        "resume_summary": input.resume.summary_for_matching or input.resume.work_experience_summary or "",
-        "job_location": input.job.location or "Not specified",
-        "job_summary": input.job.summary_for_candidate or ""
-    })
+    with llm_stage("location_fit"):
+        return chain.invoke({
+            # ResumeScanResult doesn't have a top-level location field, so usage summary
+            "resume_summary": input.resume.summary_for_matching or input.resume.work_experience_summary or "",
+            "job_location": input.job.location or "Not specified",
+            "job_summary": input.job.summary_for_candidate or ""
+        })
@@ -0,0 +1,326 @@
+# domain/prescan.py
+"""
+Deterministic pre-scan for job postings and resumes.
+
+Well-structured inputs (a JD with a "Requirements" section, a resume with a
+"Skills" section and dated experience) can be scanned locally with section
+detection + the skill alias dictionary. scan_job / scan_resume call
+prescan_job / prescan_resume first and only fall back to the LLM when these
+return None (low confidence).
+"""
+import os
+import re
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from app.agents.schemas.resume_scan_schema import JobScanResult, ResumeScanResult
+from app.agents.domain.skill_aliases import get_alias_store
+from app.core.metrics import CACHE_REQUESTS, incr, counters
+
+PRESCAN_ENABLED = os.getenv("PRESCAN_ENABLED", "1") == "1"
+# Minimum distinct dictionary skills needed before we trust the local result
+PRESCAN_MIN_JOB_SKILLS = int(os.getenv("PRESCAN_MIN_JOB_SKILLS", "4"))
+PRESCAN_MIN_RESUME_SKILLS = int(os.getenv("PRESCAN_MIN_RESUME_SKILLS", "6"))
+
+# Alias-file categories that go into tools_and_tech (everything goes into keywords)
+_TOOL_CATEGORIES = {"framework", "database", "cloud", "devops", "tool", "testing"}
+
+_JOB_HEADINGS: Dict[str, List[str]] = {
+    "must": [
+        "requirements", "required qualifications", "minimum qualifications", "basic qualifications",
+        "qualifications", "must have", "must-haves", "what you'll need", "what you will need",
+        "what we're looking for", "what we’re looking for", "what you bring", "you have", "skills required",
+    ],
+    "nice": [
+        "nice to have", "nice-to-have", "nice to haves", "preferred qualifications", "preferred skills",
+        "preferred", "bonus points", "bonus", "pluses", "extra credit",
+    ],
+    "about": ["about the role", "about the job", "about this role", "the role", "role overview", "job summary", "overview"],
+    "other": [
+        "responsibilities", "what you'll do", "what you will do", "key responsibilities", "benefits", "perks",
+        "about us", "about the company", "compensation", "why join us", "equal opportunity", "how to apply",
+    ],
+}
+
+_RESUME_HEADINGS: Dict[str, List[str]] = {
+    "skills": ["technical skills", "skills", "core competencies", "technologies", "tech stack", "tools"],
+    "experience": [
+        "professional experience", "work experience", "experience", "employment history", "work history", "employment",
+    ],
+    "education": ["education"],
+    "summary": ["summary", "professional summary", "profile", "objective"],
+    "other": ["projects", "certifications", "awards", "publications", "volunteer", "interests", "languages"],
+}
+
+
+def _heading_regex(headings: Dict[str, List[str]]) -> Tuple[re.Pattern, Dict[str, str]]:
+    label_of = {p: label for label, phrases in headings.items() for p in phrases}
+    alts = "|".join(re.escape(p) for p in sorted(label_of, key=len, reverse=True))
+    return re.compile(rf"(?<![\w'’])({alts})(?![\w'’])\s*(:)?", re.IGNORECASE), label_of
+
+_JOB_HEADING_RE, _JOB_LABEL_OF = _heading_regex(_JOB_HEADINGS)
+_RESUME_HEADING_RE, _RESUME_LABEL_OF = _heading_regex(_RESUME_HEADINGS)
+
+
+# "...meets our Requirements", "years of Experience" are prose, not headings
+_NOT_BEFORE_HEADING = {
+    "the", "our", "your", "their", "these", "this", "a", "an", "of", "and", "or", "with", "to", "for", "in", "on",
+    "relevant", "related", "prior", "previous", "professional", "industry", "hands-on",
+}
+
+
+def _sections(text: str, heading_re: re.Pattern, label_of: Dict[str, str]) -> List[Tuple[str, str]]:
+    """
+    Split text into [(label, body)] at recognized headings. Works on both
+    multi-line and whitespace-collapsed text: a heading counts if it starts a
+    line, is followed by ':', or is capitalized and not used mid-phrase
+    ("meets our Requirements").
+    """
+    marks: List[Tuple[int, int, str]] = []
+    for m in heading_re.finditer(text):
+        head, colon = m.group(1), m.group(2)
+        before = text[:m.start()].rstrip(" \t•*-#>")
+        at_line_start = not before or before.endswith("\n")
+        prev_word = before.rsplit(None, 1)[-1].lower() if before.strip() else ""
+        capitalized = head[0].isupper() and prev_word not in _NOT_BEFORE_HEADING
+        if colon or at_line_start or capitalized:
+            marks.append((m.start(), m.end(), label_of[head.lower()]))
+
+    out: List[Tuple[str, str]] = []
+    if not marks or marks[0][0] > 0:
+        out.append(("intro", text[: marks[0][0] if marks else len(text)]))
+    for i, (_, end, label) in enumerate(marks):
+        nxt = marks[i + 1][0] if i + 1 < len(marks) else len(text)
+        out.append((label, text[end:nxt]))
+    return out
+
+
+_WORD_RE = re.compile(r"[^\s,;|•·()\[\]{}]+")
+_EDGE_PUNCT = ".:!?\"'“”‘’*"
+_MAX_NGRAM = 4
+
+
+def _find_skills(text: str) -> Dict[str, str]:
+    """canonical skill -> first surface form found in text (longest phrase wins)."""
+    store = get_alias_store()
+    words: List[str] = []
+    raw = [w.strip(_EDGE_PUNCT) for w in _WORD_RE.findall(text)]
+    raw = [w for w in raw if w]
+    for i, w in enumerate(raw):
+        # "python/django" -> python, django; keep real slash skills like ci/cd, a/b testing
+        if "/" in w and not store.lookup(w) and not (i + 1 < len(raw) and store.lookup(f"{w} {raw[i + 1]}")):
+            words.extend(p for p in w.split("/") if p)
+        else:
+            words.append(w)
+
+    found: Dict[str, str] = {}
+    i = 0
+    while i < len(words):
+        for n in range(min(_MAX_NGRAM, len(words) - i), 0, -1):
+            phrase = " ".join(words[i:i + n])
+            canon = store.lookup(phrase)
+            if canon:
+                found.setdefault(canon, phrase)
+                i += n
+                break
+        else:
+            i += 1
+    return found
+
+
+def _split_skills(found: Dict[str, str]) -> Tuple[List[str], List[str]]:
+    store = get_alias_store()
+    surfaces = list(found.values())
+    tools = [s for c, s in found.items() if store.category(c) in _TOOL_CATEGORIES]
+    return surfaces, tools
+
+
+def _first_sentences(text: str, n: int = 2, max_chars: int = 400) -> str:
+    text = " ".join((text or "").split())
+    parts = re.split(r"(?<=[.!?])\s+", text)
+    out = " ".join(p for p in parts[:n] if p).strip()
+    return out[:max_chars].rstrip()
+
+
+def _labelled(text: str, label: str, max_chars: int = 80) -> Optional[str]:
+    m = re.search(rf"\b{label}\s*:\s*([^\n|•]{{2,{max_chars}}})", text, re.IGNORECASE)
+    if not m:
+        return None
+    val = re.split(r"\s{2,}|(?<=[a-z])\.\s", m.group(1))[0].strip(" .,-")
+    return val or None
+
+
+def prescan_job(job_text: str) -> Optional[JobScanResult]:
+    """Local JobScanResult, or None when the posting isn't structured enough to trust."""
+    if not PRESCAN_ENABLED or not job_text or not job_text.strip():
+        return None
+
+    sections = _sections(job_text, _JOB_HEADING_RE, _JOB_LABEL_OF)
+    must_text = "\n".join(body for label, body in sections if label == "must")
+    if not must_text:
+        return None
+
+    must = _find_skills(must_text)
+    if len(must) < PRESCAN_MIN_JOB_SKILLS:
+        return None
+
+    nice_text = "\n".join(body for label, body in sections if label == "nice")
+    nice = {c: s for c, s in _find_skills(nice_text).items() if c not in must}
+    everything = _find_skills(job_text)
+    keywords, tools = _split_skills(everything)
+
+    title = _labelled(job_text, r"(?:job title|position|role)")
+    if not title and "\n" in job_text.strip():
+        first = job_text.strip().split("\n", 1)[0].strip(" #*")
+        if 3 <= len(first) <= 80 and not _JOB_HEADING_RE.match(first):
+            title = first
+
+    about = next((body for label, body in sections if label == "about"), "")
+    intro = next((body for label, body in sections if label == "intro"), "")
+    summary = _first_sentences(about) or _first_sentences(intro)
+    if not summary:
+        summary = f"{title or 'Role'} requiring {', '.join(list(must.values())[:5])}."
+
+    return JobScanResult(
+        raw_title=title,
+        company_name=_labelled(job_text, "company", 60),
+        location=_labelled(job_text, "location", 60),
+        must_have_skills=list(must.values()),
+        nice_to_have_skills=list(nice.values()),
+        tools_and_tech=tools,
+        keywords=keywords,
+        summary_for_candidate=summary,
+    )
+
+
+_MONTHS = {m: i for i, m in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+_POINT = r"(?:(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?,?\s*)|(?:\d{1,2}\s*/\s*))?(?:19|20)\d{2}"
+_RANGE_RE = re.compile(
+    rf"({_POINT})\s*(?:-|–|—|to|until)\s*({_POINT}|present|current|now|today)",
+    re.IGNORECASE,
+)
+
+
+def _month_index(point: str, *, is_end: bool) -> Optional[int]:
+    p = point.strip().lower()
+    if p in ("present", "current", "now", "today"):
+        t = date.today()
+        return t.year * 12 + t.month
+    ym = re.search(r"(?:19|20)\d{2}", p)
+    if not ym:
+        return None
+    year = int(ym.group(0))
+    month = None
+    mm = re.match(r"(\d{1,2})\s*/", p)
+    if mm and 1 <= int(mm.group(1)) <= 12:
+        month = int(mm.group(1))
+    elif p[:3] in _MONTHS:
+        month = _MONTHS[p[:3]]
+    if month is None:
+        month = 12 if is_end else 1  # bare years: count the whole year
+    return year * 12 + month
+
+
+def _years_from_ranges(text: str) -> Optional[float]:
+    intervals: List[Tuple[int, int]] = []
+    for m in _RANGE_RE.finditer(text):
+        start = _month_index(m.group(1), is_end=False)
+        end = _month_index(m.group(2), is_end=True)
+        if start is None or end is None or end < start or end - start > 600:
+            continue
+        intervals.append((start, end))
+    if not intervals:
+        return None
+
+    # merge overlaps so concurrent roles aren't double-counted
+    intervals.sort()
+    total = 0
+    cur_s, cur_e = intervals[0]
+    for s, e in intervals[1:]:
+        if s <= cur_e:
+            cur_e = max(cur_e, e)
+        else:
+            total += cur_e - cur_s + 1
+            cur_s, cur_e = s, e
+    total += cur_e - cur_s + 1
+    return round(total / 12, 1)
+
+
+_NAME_RE = re.compile(r"^\s*([A-Z][a-zA-Z'’\-]+(?:\s+[A-Z][a-zA-Z'’\-\.]*){1,3})(?=\s|$)")
+
+
+def prescan_resume(resume_text: str) -> Optional[ResumeScanResult]:
+    """Local ResumeScanResult, or None when skills/experience can't be read confidently."""
+    if not PRESCAN_ENABLED or not resume_text or not resume_text.strip():
+        return None
+
+    sections = _sections(resume_text, _RESUME_HEADING_RE, _RESUME_LABEL_OF)
+    skills_text = "\n".join(body for label, body in sections if label == "skills")
+    exp_text = "\n".join(body for label, body in sections if label == "experience")
+    if not skills_text or not exp_text:
+        return None
+
+    if len(_find_skills(skills_text)) < PRESCAN_MIN_RESUME_SKILLS:
+        return None
+
+    years = _years_from_ranges(exp_text)
+    if years is None:
+        return None
+
+    everything = _find_skills(resume_text)
+    skills, tools = _split_skills(everything)
+
+    name = None
+    m = _NAME_RE.match(resume_text)
+    if m and not _RESUME_HEADING_RE.fullmatch(m.group(1)):
+        name = m.group(1).strip()
+
+    summary = next((body for label, body in sections if label == "summary"), "")
+    # experience_fit reads only this field, so a hit without one falls back to the LLM scan
+    experience = _first_sentences(re.sub(r"(?m)^\s*[-•*▪◦]\s*", "", exp_text), n=4, max_chars=600)
+    if not experience:
+        return None
+
+    return ResumeScanResult(
+        candidate_name=name,
+        total_years_experience=years,
+        work_experience_summary=experience,
+        global_skills=sorted(set(skills)),
+        tools_and_tech=sorted(set(tools)),
+        keywords=sorted(set(skills)),
+        summary_for_matching=_first_sentences(summary) or None,
+    )
+
+
+def record_prescan(kind: str, *, hit: bool, local_ms: float, llm_ms: Optional[float] = None) -> None:
+    """Count a pre-scan decision for `kind` ("job" | "resume")."""
+    incr(f"prescan_{kind}_{'hits' if hit else 'misses'}")
+    CACHE_REQUESTS.inc(cache=f"prescan_{kind}", result="hit" if hit else "miss")
+    incr(f"prescan_{kind}_local_ms", local_ms)
+    if llm_ms is not None:
+        incr(f"prescan_{kind}_llm_calls")
+        incr(f"prescan_{kind}_llm_ms", llm_ms)
+
+
+def prescan_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Hit rate and estimated latency saved per scan kind. Savings are estimated as
+    hits * (average observed LLM scan latency) - time spent in local extraction.
+    """
+    c = counters()
+    out: Dict[str, Dict[str, float]] = {}
+    for kind in ("job", "resume"):
+        hits = c.get(f"prescan_{kind}_hits", 0.0)
+        misses = c.get(f"prescan_{kind}_misses", 0.0)
+        llm_calls = c.get(f"prescan_{kind}_llm_calls", 0.0)
+        avg_llm_ms = c.get(f"prescan_{kind}_llm_ms", 0.0) / llm_calls if llm_calls else 0.0
+        total = hits + misses
+        out[kind] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "avg_llm_ms": round(avg_llm_ms, 1),
+            "est_saved_ms": round(max(0.0, hits * avg_llm_ms - c.get(f"prescan_{kind}_local_ms", 0.0)), 1),
+        }
+    return out
@@ -1,17 +1,13 @@
-import os
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 
+from app.core.metrics import llm_stage
+from app.services.chat_models import chat_model
 from app.agents.schemas.resume_scan_schema import ScanResumeInput
 from app.agents.schemas.resume_clarity_schema import ResumeClarityResult
 
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0,
-    api_key=os.environ.get("GEMINI_API_KEY"),
-)
+llm = chat_model("gemini-2.5-flash")
 
 _clarity_prompt = ChatPromptTemplate.from_messages(
     [
@@ -47,4 +43,5 @@ def calculate_resume_clarity_domain(input: ScanResumeInput) -> ResumeClarityResu
     Evaluates the clarity, structure, and readability of the resume using LLM.
     """
     chain = _clarity_prompt | llm.with_structured_output(ResumeClarityResult)
-    return chain.invoke({"resume_text": input.resume_text})
+    with llm_stage("resume_clarity"):
+        return chain.invoke({"resume_text": input.resume_text})
@@ -1,17 +1,15 @@
 # app/agents/domain/scan_job.py
-import os
+import time
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 
+from app.core.metrics import llm_stage
+from app.services.chat_models import chat_model
+from app.agents.domain.prescan import prescan_job, record_prescan
 from app.agents.schemas.resume_scan_schema import ScanJobInput, JobScanResult
 
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0,
-    api_key=os.environ["GEMINI_API_KEY"],
-)
+llm = chat_model("gemini-2.5-flash")
 
 # Use from_messages for multi-message prompts
 _job_scan_prompt = ChatPromptTemplate.from_messages(
@@ -45,8 +43,19 @@ def scan_job(input: ScanJobInput) -> JobScanResult:
     Core logic to scan and analyze a job posting. Calls LLM with structured output,
     and performs postprocessing to ensure clean output.
     """
+    # Well-structured inputs are scanned locally; only fall back to the LLM otherwise
+    t0 = time.perf_counter()
+    local = prescan_job(input.job_text)
+    local_ms = (time.perf_counter() - t0) * 1000
+    if local is not None:
+        record_prescan("job", hit=True, local_ms=local_ms)
+        return local
+
     chain = _job_scan_prompt | llm.with_structured_output(JobScanResult)
-    res: JobScanResult = chain.invoke({"job_text": input.job_text})
+    t1 = time.perf_counter()
+    with llm_stage("scan_job"):
+        res: JobScanResult = chain.invoke({"job_text": input.job_text})
+    record_prescan("job", hit=False, local_ms=local_ms, llm_ms=(time.perf_counter() - t1) * 1000)
 
     # Cleanup / normalization
     res.must_have_skills = [s.strip() for s in res.must_have_skills if s.strip()]
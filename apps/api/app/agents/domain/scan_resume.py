@@ -1,18 +1,16 @@
 # app/agents/domain/scan_resume.py
 
-import os
+import time
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 
+from app.core.metrics import llm_stage
+from app.services.chat_models import chat_model
+from app.agents.domain.prescan import prescan_resume, record_prescan
 from app.agents.schemas.resume_scan_schema import ScanResumeInput, ResumeScanResult
 
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0,
-    api_key=os.environ["GEMINI_API_KEY"],
-)
+llm = chat_model("gemini-2.5-flash")
 
 _resume_scan_prompt = ChatPromptTemplate.from_messages(
     [
@@ -44,8 +42,19 @@ def scan_resume(input: ScanResumeInput) -> ResumeScanResult:
     Core logic to scan and analyze a resume. Calls LLM with structured output,
     and performs postprocessing for clean, deduplicated lists.
     """
+    # Well-structured inputs are scanned locally; only fall back to the LLM otherwise
+    t0 = time.perf_counter()
+    local = prescan_resume(input.resume_text)
+    local_ms = (time.perf_counter() - t0) * 1000
+    if local is not None:
+        record_prescan("resume", hit=True, local_ms=local_ms)
+        return local
+
     chain = _resume_scan_prompt | llm.with_structured_output(ResumeScanResult)
-    res: ResumeScanResult = chain.invoke({"resume_text": input.resume_text})
+    t1 = time.perf_counter()
+    with llm_stage("scan_resume"):
+        res: ResumeScanResult = chain.invoke({"resume_text": input.resume_text})
+    record_prescan("resume", hit=False, local_ms=local_ms, llm_ms=(time.perf_counter() - t1) * 1000)
 
     # Cleanup / normalization
     res.global_skills = sorted(
@@ -0,0 +1,196 @@
+# domain/skill_aliases.py
+"""
+Data-driven skill alias / taxonomy store.
+
+Aliases live in agents/data/skill_aliases.txt (see the header of that file for
+the format) and are compiled into an AliasStore:
+  - phrase hash:   normalized alias/canonical phrase -> canonical, O(len(s)) lookup
+  - token index:   token -> line order for single-token aliases, and
+                   token -> [(line order, alias token set)] for multi-token ones,
+                   for the "all alias tokens appear in the string" rule used by ATS matching
+  - categories:    canonical -> category (language, cloud, degree, ...)
+
+The store is swapped atomically when the file changes on disk, so edits are
+picked up without a restart.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_ALIAS_PATH = Path(__file__).resolve().parents[1] / "data" / "skill_aliases.txt"
+ALIAS_PATH = Path(os.getenv("SKILL_ALIASES_PATH") or DEFAULT_ALIAS_PATH)
+# How often (seconds) to stat the alias file for changes; 0 disables auto-reload.
+RELOAD_SEC = float(os.getenv("SKILL_ALIASES_RELOAD_SEC", "30"))
+
+_PUNCT_RE = re.compile(r"[\(\)\[\]\{\},:;]")
+_WS_RE = re.compile(r"\s+")
+# "+" only separates between word characters ("java+python"), so symbol skills
+# like "c++" stay one token instead of collapsing to "c"
+_TOKEN_SPLIT_RE = re.compile(r"[\s\/\-]+|(?<=\w)\+(?=\w)")
+
+AliasEntry = Tuple[str, Optional[str], List[str]]  # (canonical, category, aliases)
+
+
+def _norm(s: str) -> str:
+    s = s.strip().lower()
+    s = _PUNCT_RE.sub(" ", s)
+    s = s.replace("&", " and ")
+    s = _WS_RE.sub(" ", s).strip()
+    return s
+
+def _tokens(s: str) -> Set[str]:
+    return {t for t in _TOKEN_SPLIT_RE.split(_norm(s)) if t}
+
+
+class AliasStore:
+    """
+    Compiled, read-only alias table. Build a new one to change aliases; never mutate.
+    """
+
+    def __init__(self, entries: Iterable[AliasEntry], *, source: Optional[str] = None, mtime: Optional[float] = None):
+        self.source = source
+        self.mtime = mtime
+
+        self._canons: List[str] = []
+        self._order: Dict[str, int] = {}
+        self._categories: Dict[str, str] = {}
+        self._phrases: Dict[str, int] = {}
+        self._aliases: List[Tuple[str, ...]] = []  # normalized alias phrases per canonical
+        # single-token aliases are the common case: token -> first line order
+        self._single: Dict[str, int] = {}
+        # multi-token aliases indexed by one of their tokens
+        self._by_token: Dict[str, List[Tuple[int, FrozenSet[str]]]] = {}
+        self._always: Optional[int] = None  # an alias with no tokens matches every string
+
+        intern = sys.intern
+        for canon, category, aliases in entries:
+            canon = intern(_norm(canon))
+            if canon in self._order:
+                continue  # first definition wins, same as dict order would
+            order = len(self._canons)
+            self._canons.append(canon)
+            self._order[canon] = order
+            if category:
+                self._categories[canon] = intern(category)
+            self._phrases.setdefault(canon, order)
+
+            phrases = []
+            for alias in aliases:
+                n = intern(_norm(alias))
+                phrases.append(n)
+                self._phrases.setdefault(n, order)
+                toks = {t for t in _TOKEN_SPLIT_RE.split(n) if t}
+                if not toks:
+                    if self._always is None:
+                        self._always = order
+                elif len(toks) == 1:
+                    self._single.setdefault(intern(toks.pop()), order)
+                else:
+                    at = frozenset(intern(t) for t in toks)
+                    self._by_token.setdefault(min(at), []).append((order, at))
+            self._aliases.append(tuple(phrases))
+
+        self.canonical = lru_cache(maxsize=8192)(self._canonical)
+
+    def __len__(self) -> int:
+        return len(self._canons)
+
+    @property
+    def alt_tokens(self) -> Dict[str, List[Set[str]]]:
+        """canonical -> alias token sets, in file order (built on demand)."""
+        return {canon: [_tokens(a) for a in aliases] for canon, aliases in zip(self._canons, self._aliases)}
+
+    def _canonical(self, s: str) -> str:
+        n = _norm(s)
+        nt = _tokens(n)
+        # first entry (in file order) that is either equal to n or has an
+        # alias whose tokens ALL appear in the string tokens
+        best = self._order.get(n)
+        if self._always is not None and (best is None or self._always < best):
+            best = self._always
+        single = self._single
+        for t in nt:
+            order = single.get(t)
+            if order is not None and (best is None or order < best):
+                best = order
+            for order, at in self._by_token.get(t, ()):
+                if (best is None or order < best) and at <= nt:
+                    best = order
+        return self._canons[best] if best is not None else n
+
+    def lookup(self, s: str) -> Optional[str]:
+        """Canonical skill if `s` is exactly a known alias or canonical phrase, else None."""
+        n = _norm(s)
+        if n not in self._phrases:
+            return None
+        return self.canonical(n)
+
+    def category(self, canon: str) -> Optional[str]:
+        return self._categories.get(canon)
+
+
+def parse_alias_lines(lines: Iterable[str]) -> List[AliasEntry]:
+    """Parse `canonical | category | alias, alias, ...` lines; '#' starts a comment."""
+    entries: List[AliasEntry] = []
+    for lineno, raw in enumerate(lines, start=1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) != 3 or not parts[0]:
+            raise ValueError(f"skill aliases line {lineno}: expected 'canonical | category | aliases', got {raw!r}")
+        canon, category, aliases = parts
+        entries.append((canon, category or None, [a.strip() for a in aliases.split(",") if a.strip()]))
+    return entries
+
+
+def load_alias_file(path: Path) -> AliasStore:
+    path = Path(path)
+    mtime = path.stat().st_mtime
+    with path.open(encoding="utf-8") as f:
+        entries = parse_alias_lines(f)
+    return AliasStore(entries, source=str(path), mtime=mtime)
+
+
+_store: Optional[AliasStore] = None
+_store_lock = threading.Lock()
+_next_check = 0.0
+
+
+def reload_alias_store(path: Optional[Path] = None) -> AliasStore:
+    """Load the alias file and swap it in. Raises if the file is missing or malformed."""
+    global _store, _next_check
+    store = load_alias_file(path or ALIAS_PATH)
+    with _store_lock:
+        _store = store
+        _next_check = time.monotonic() + RELOAD_SEC
+    return store
+
+
+def get_alias_store() -> AliasStore:
+    """
+    Current alias store. Re-stats the alias file at most every RELOAD_SEC seconds
+    and reloads it if it changed; a broken edit keeps serving the previous store.
+    """
+    global _next_check
+    store = _store
+    if store is None:
+        return reload_alias_store()
+    if RELOAD_SEC <= 0 or store.source is None or time.monotonic() < _next_check:
+        return store
+
+    with _store_lock:
+        if time.monotonic() < _next_check:
+            return _store
+        _next_check = time.monotonic() + RELOAD_SEC
+    try:
+        if Path(store.source).stat().st_mtime != store.mtime:
+            return reload_alias_store(Path(store.source))
+    except (OSError, ValueError) as e:
+        print(f"[skill_aliases] WARNING: reload of {store.source} failed, keeping previous aliases: {e}")
+    return store
@@ -5,9 +5,11 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi import HTTPException
 from pydantic import ValidationError
-import traceback
+import logging
 from typing import Any, Dict, Optional
 
+logger = logging.getLogger(__name__)
+
 
 def _get_request_id(request: Request) -> Optional[str]:
     # Will work once we add request-id middleware later.
@@ -56,9 +58,8 @@ def install_error_handlers(app: FastAPI):
         body = await request.body()
         errors = exc.errors()
 
-        # Keep logging for YOU
-        print("✅ RequestValidationError errors():", errors)
-        print("✅ RequestValidationError body:", body.decode("utf-8", errors="ignore"))
+        # the body holds resume/JD text: log its size, not its content
+        logger.info("request validation failed", extra={"issues": errors, "body_bytes": len(body)})
 
         return _json_error(
             request=request,
@@ -135,9 +136,8 @@ def install_error_handlers(app: FastAPI):
         """
         Catch-all so 500s are consistent.
         """
-        rid = _get_request_id(request)
-        print("💥 Unhandled exception. request_id=", rid)
-        traceback.print_exc()
+        # runs outside RequestMiddleware, so pass the request id explicitly
+        logger.error("unhandled exception", exc_info=exc, extra={"request_id": _get_request_id(request)})
 
         return _json_error(
             request=request,
@@ -0,0 +1,161 @@
+# app/core/log.py
+"""
+Structured, non-blocking logging.
+
+setup_logging() routes the root logger through a bounded queue: on the event
+loop a log call only builds the LogRecord and enqueues it; a listener thread
+formats it as one JSON line (orjson) and writes it to stdout. When the queue
+is full, records are dropped and counted (core.metrics log_dropped) instead
+of blocking requests.
+
+- Every line carries the request id of the request that logged it
+  (request_id_var, set by core/middleware.py).
+- Fields passed with extra={...} become JSON keys. Values under keys in
+  REDACT_KEYS (resume/JD text) are replaced by their length, at any depth.
+- DEBUG records are sampled at LOG_DEBUG_SAMPLE, so LOG_LEVEL=DEBUG can be
+  turned on in production without flooding.
+"""
+import contextvars
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from typing import Any, Optional
+
+import orjson
+
+from app.core.metrics import gauge, incr
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "10000"))
+LOG_DEBUG_SAMPLE = float(os.getenv("LOG_DEBUG_SAMPLE", "0.05"))
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# resume/JD text under the names the request models and agent schemas use for it
+REDACT_KEYS = frozenset({
+    "resume_text", "job_description_text", "job_description", "jd_text", "resume", "text", "body", "cover_letter",
+    "job_text", "full_text", "context", "prompt", "notes",
+})
+
+# LogRecord attributes; anything else on a record came from extra={...}
+_RESERVED = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+def redact(value: Any, depth: int = 0) -> Any:
+    if depth > 4:
+        return value
+    if isinstance(value, dict):
+        loc = value.get("loc")
+        if isinstance(loc, (list, tuple)) and "input" in value and REDACT_KEYS.intersection(map(str, loc)):
+            # a pydantic validation issue whose input is (part of) a resume/JD field's value
+            v = value["input"]
+            value = {**value, "input": f"<redacted {len(v)} chars>" if isinstance(v, str) else "<redacted>"}
+        return {
+            k: (f"<redacted {len(v)} chars>" if k in REDACT_KEYS and isinstance(v, str) else redact(v, depth + 1))
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(v, depth + 1) for v in value]
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        rid = getattr(record, "request_id", None)
+        if rid:
+            out["request_id"] = rid
+        for k, v in record.__dict__.items():
+            if k not in _RESERVED:
+                out[k] = f"<redacted {len(v)} chars>" if k in REDACT_KEYS and isinstance(v, str) else redact(v)
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return orjson.dumps(out, default=str).decode()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Enqueue the record as-is (formatting happens on the listener thread); drop when full."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            incr("log_dropped")
+
+
+class _ContextFilter(logging.Filter):
+    """Runs on the caller's thread: samples DEBUG and stamps the current request id."""
+
+    def __init__(self, debug_sample: float):
+        super().__init__()
+        self.debug_sample = debug_sample
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.INFO and random.random() >= self.debug_sample:
+            return False
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        return True
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_swap: dict[str, logging.Handler] = {}
+
+
+gauge(
+    "rb_log_queue_size", "Log records waiting for the writer thread.",
+    fn=lambda: _swap["queue"].queue.qsize() if _listener is not None else 0,
+)
+
+
+def setup_logging(
+    level: str = LOG_LEVEL,
+    *,
+    stream=None,
+    queue_max: int = LOG_QUEUE_MAX,
+    debug_sample: float = LOG_DEBUG_SAMPLE,
+) -> logging.handlers.QueueListener:
+    """Install the queue handler on the root logger and start the writer thread (idempotent)."""
+    global _listener
+    stop_logging()
+
+    out = logging.StreamHandler(stream or sys.stdout)
+    out.setFormatter(JsonFormatter())
+    q: queue.Queue = queue.Queue(maxsize=queue_max)
+    handler = _QueueHandler(q)
+    handler.addFilter(_ContextFilter(debug_sample))
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(handler)
+    root.setLevel(level)
+    _swap["queue"], _swap["direct"] = handler, out
+
+    _listener = logging.handlers.QueueListener(q, out, respect_handler_level=False)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Write out queued records and stop the writer thread; later records are written directly."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    root = logging.getLogger()
+    root.removeHandler(_swap["queue"])
+    _swap["direct"].addFilter(_swap["queue"].filters[0])
+    root.addHandler(_swap["direct"])
@@ -1,12 +1,276 @@
-import time, logging
+# app/core/metrics.py
+"""
+Process-local metrics.
+
+- incr()/counters(): flat named counters behind the /health/* stats endpoints.
+- counter()/gauge()/histogram(): labelled metrics, registered once at import
+  by the module that owns them. Updates are a lock + dict lookup (+ a bisect
+  for histograms).
+- timed(step): context manager that observes a step's duration.
+- render_prometheus(): everything above in the Prometheus text format, served
+  at /metrics. Flat counters are exported as rb_<name>_total.
+"""
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
 from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from app.core import tracing
+
 log = logging.getLogger("rb")
 
+_lock = threading.Lock()
+_counters: dict[str, float] = defaultdict(float)
+
+def incr(name: str, value: float = 1.0) -> None:
+    """Add `value` to a process-local counter."""
+    with _lock:
+        _counters[name] += value
+
+def counters() -> dict[str, float]:
+    """Snapshot of all process-local counters."""
+    with _lock:
+        return dict(_counters)
+
+
+# ---- labelled metrics ------------------------------------------------------
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+LabelKey = Tuple[str, ...]
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelKey:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _label_str(self, key: LabelKey, extra: str = "") -> str:
+        parts = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, value: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, v in items:
+            yield f"{self.name}{self._label_str(key)} {_num(v)}"
+
+
+class Gauge(_Metric):
+    """set()/inc() it, or pass fn= to read the value at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, *a, fn: Optional[Callable[[], float]] = None, **kw):
+        super().__init__(*a, **kw)
+        self._values: Dict[LabelKey, float] = {}
+        self._fn = fn
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, value: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def samples(self) -> Iterable[str]:
+        if self._fn is not None:
+            try:
+                yield f"{self.name} {_num(float(self._fn()))}"
+            except Exception as e:
+                log.warning("gauge %s failed: %r", self.name, e)
+            return
+        with self._lock:
+            items = list(self._values.items())
+        for key, v in items:
+            yield f"{self.name}{self._label_str(key)} {_num(v)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *a, buckets: Sequence[float] = LATENCY_BUCKETS, **kw):
+        super().__init__(*a, **kw)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket..., count above the last bucket], sum
+        self._values: Dict[LabelKey, Tuple[list, list]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][i] += 1
+            entry[1][0] += value
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = [(k, list(c), s[0]) for k, (c, s) in self._values.items()]
+        for key, counts, total in items:
+            running = 0
+            for le, c in zip(self.buckets, counts):
+                running += c
+                labels = self._label_str(key, 'le="%s"' % _num(le))
+                yield f"{self.name}_bucket{labels} {running}"
+            running += counts[-1]
+            labels = self._label_str(key, 'le="+Inf"')
+            yield f"{self.name}_bucket{labels} {running}"
+            yield f"{self.name}_sum{self._label_str(key)} {_num(total)}"
+            yield f"{self.name}_count{self._label_str(key)} {running}"
+
+
+_REGISTRY: Dict[str, _Metric] = {}
+
+
+def _register(cls, name: str, help: str, labels: Sequence[str], **kw):
+    with _lock:
+        m = _REGISTRY.get(name)
+        if m is None:
+            m = _REGISTRY[name] = cls(name, help, labels, **kw)
+        return m
+
+
+def counter(name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+    return _register(Counter, name, help, labels)
+
+
+def gauge(name: str, help: str, labels: Sequence[str] = (), *, fn: Optional[Callable[[], float]] = None) -> Gauge:
+    return _register(Gauge, name, help, labels, fn=fn)
+
+
+def histogram(name: str, help: str, labels: Sequence[str] = (), *, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    return _register(Histogram, name, help, labels, buckets=buckets)
+
+
+# ---- shared metrics ----------------------------------------------------------
+
+STEP_SECONDS = histogram("rb_step_seconds", "Duration of timed() steps.", ("step",))
+LLM_STAGE_SECONDS = histogram("rb_llm_stage_seconds", "Duration of LLM pipeline stages.", ("stage",))
+
+CACHE_REQUESTS = counter("rb_cache_requests_total", "Cache lookups by cache and result (hit/miss).", ("cache", "result"))
+
+HTTP_SECONDS = histogram("rb_http_request_seconds", "Request latency by route template.", ("route", "method"))
+HTTP_REQUESTS = counter("rb_http_requests_total", "Requests by route template and status.", ("route", "method", "status"))
+LLM_CALLS_PER_REQUEST = histogram(
+    "rb_llm_calls_per_request", "LLM calls made while handling one request.", ("route",), buckets=COUNT_BUCKETS
+)
+SUPABASE_CALLS_PER_REQUEST = histogram(
+    "rb_supabase_calls_per_request", "Supabase round-trips made while handling one request.", ("route",),
+    buckets=COUNT_BUCKETS,
+)
+
+# per-request tallies (LLM calls, Supabase round-trips), set up by core/middleware.py
+request_tally: ContextVar[Optional[Dict[str, int]]] = ContextVar("request_tally", default=None)
+
+
+def observe_request(route: str, method: str, status: int, seconds: float, counts: Dict[str, int]) -> None:
+    HTTP_SECONDS.observe(seconds, route=route, method=method)
+    HTTP_REQUESTS.inc(route=route, method=method, status=status)
+    LLM_CALLS_PER_REQUEST.observe(counts.get("llm_calls", 0), route=route)
+    SUPABASE_CALLS_PER_REQUEST.observe(counts.get("supabase_calls", 0), route=route)
+
+
+def tally(name: str, n: int = 1) -> None:
+    """Count `n` toward the current request's `name` tally (no-op outside a request)."""
+    t = request_tally.get()
+    if t is not None:
+        t[name] = t.get(name, 0) + n
+
+
 @contextmanager
-def timed(step: str, extra: dict | None = None):
+def timed(step: str, extra: dict | None = None, *, metric: Histogram = STEP_SECONDS):
+    """Observe the block's duration in `metric` (labelled with `step`) and log it at debug."""
     t0 = time.perf_counter()
     try:
         yield
     finally:
-        ms = int((time.perf_counter() - t0) * 1000)
-        log.info("step_done", extra={"step": step, "duration_ms": ms, **(extra or {})})
\ No newline at end of file
+        sec = time.perf_counter() - t0
+        metric.observe(sec, **{metric.labelnames[0]: step})
+        log.debug("step_done", extra={"step": step, "duration_ms": int(sec * 1000), **(extra or {})})
+
+
+# the LLM stage currently running (LLM calls are attributed to it, see utils/llm_usage.py)
+current_llm_stage: ContextVar[Optional[str]] = ContextVar("current_llm_stage", default=None)
+
+
+@contextmanager
+def llm_stage(stage: str, extra: dict | None = None):
+    """timed() for an LLM pipeline stage (scan_job, scan_resume, generate, repair, ...)."""
+    token = current_llm_stage.set(stage)
+    try:
+        with timed(stage, extra, metric=LLM_STAGE_SECONDS), tracing.span(f"llm_stage {stage}", **{"rb.llm.stage": stage}):
+            yield
+    finally:
+        current_llm_stage.reset(token)
+
+
+# ---- exposition --------------------------------------------------------------
+
+_NAME_RE = re.compile(r"[^a-zA-Z0-9_:]")
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+def render_prometheus() -> str:
+    lines = []
+    with _lock:
+        metrics = list(_REGISTRY.values())
+    for m in metrics:
+        lines.append(f"# HELP {m.name} {m.help}")
+        lines.append(f"# TYPE {m.name} {m.kind}")
+        lines.extend(m.samples())
+    for name, v in sorted(counters().items()):
+        flat = "rb_" + _NAME_RE.sub("_", name)
+        if not flat.endswith("_total"):
+            flat += "_total"
+        lines.append(f"# TYPE {flat} counter")
+        lines.append(f"{flat} {_num(v)}")
+    return "\n".join(lines) + "\n"
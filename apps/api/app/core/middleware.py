@@ -0,0 +1,199 @@
+# app/core/middleware.py
+"""
+One pure-ASGI middleware for what every request needs: request id, access log,
+upload size limit and security headers.
+
+Replaces three @app.middleware("http") functions and a BaseHTTPMiddleware,
+each of which wrapped the request/response in Starlette's call_next machinery.
+This one passes `receive`/`send` through, touching only:
+
+- scope["state"]["request_id"] (request.state.request_id): the caller's
+  x-request-id, or a new uuid4; echoed in the response headers.
+- the http.response.start message: x-request-id + the pre-encoded security
+  headers (utils/security_headers.py), appended to the raw header list.
+- on GUARDED_PATHS, the request body: a Content-Length over MAX_UPLOAD_BYTES
+  gets 413 before the app runs; a streamed (chunked) body is counted as it is
+  read, and once over the limit reading stops and the app's response is
+  replaced by the 413.
+
+One structured access-log record per request (logger "rb.access"; see
+core/log.py), tagged with the request id like everything logged while
+handling the request. When tracing is on (core/tracing.py), the request's
+root span, with the trace id derived from the request id.
+"""
+import logging
+import os
+import time
+import uuid
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.log import request_id_var
+from app.core import tracing
+from app.core.metrics import observe_request, request_tally
+from app.utils.security_headers import security_header_names, security_headers
+
+try:
+    MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", "5242880"))
+except ValueError:
+    MAX_UPLOAD_BYTES = 5_242_880
+GUARDED_PATHS = ("/resume/extract",)
+
+_TOO_LARGE_BODY = b'{"detail":"File too large"}'
+
+access_log = logging.getLogger("rb.access")
+
+
+class BodyTooLarge(Exception):
+    """Raised from receive() once a guarded request body passes the limit."""
+
+
+def _header(scope: Scope, name: bytes) -> str | None:
+    for k, v in scope["headers"]:
+        if k == name:
+            return v.decode("latin-1")
+    return None
+
+
+async def _send_too_large(send: Send, rid: str, extra_headers: list) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(_TOO_LARGE_BODY)).encode()),
+            (b"x-request-id", rid.encode("latin-1")),
+            *extra_headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": _TOO_LARGE_BODY})
+
+
+class RequestMiddleware:
+    def __init__(self, app: ASGIApp, *, max_body: int = MAX_UPLOAD_BYTES, guarded_paths=GUARDED_PATHS):
+        self.app = app
+        self.max_body = max_body
+        self.guarded_paths = tuple(guarded_paths)
+        self.security_headers = security_headers()
+        # headers we add; if the app already set one, replace instead of appending
+        self.added_names = security_header_names()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        rid = _header(scope, b"x-request-id") or str(uuid.uuid4())
+        scope.setdefault("state", {})["request_id"] = rid
+        rid_token = request_id_var.set(rid)
+        counts: dict = {}
+        tally_token = request_tally.set(counts)
+        root = tracing.start_span(
+            f"{scope['method']} {scope['path']}", parent=None, kind=tracing.KIND_SERVER,
+            trace_id=tracing.trace_id_for(rid),
+            attributes={"http.request.method": scope["method"], "url.path": scope["path"], "rb.request_id": rid},
+        )
+        span_token = tracing.use_span(root)
+        status = 500
+        too_large = False
+        response_started = False
+
+        if scope["path"].startswith(self.guarded_paths):
+            cl = _header(scope, b"content-length")
+            if cl and cl.isdigit() and int(cl) > self.max_body:
+                await _send_too_large(send, rid, self.security_headers)
+                self._finish(scope, rid, 413, start, counts, root)
+                request_id_var.reset(rid_token)
+                request_tally.reset(tally_token)
+                tracing.reset_span(span_token)
+                return
+
+            received = 0
+            inner_receive = receive
+
+            async def receive() -> Message:
+                nonlocal received, too_large
+                message = await inner_receive()
+                if message["type"] == "http.request":
+                    received += len(message.get("body", b""))
+                    if received > self.max_body:
+                        too_large = True
+                        raise BodyTooLarge(f"request body over {self.max_body} bytes")
+                return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, response_started
+            if too_large:
+                # the app saw the receive() error (typically as a 400): answer 413 instead
+                if message["type"] == "http.response.start" and not response_started:
+                    response_started = True
+                    status = 413
+                    await _send_too_large(send, rid, self.security_headers)
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+                status = message["status"]
+                self._add_headers(message, rid)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            if not too_large:
+                root.error(e)
+                raise
+            # BodyTooLarge, or whatever the app turned it into
+            if not response_started:
+                await _send_too_large(send, rid, self.security_headers)
+            status = 413
+        finally:
+            self._finish(scope, rid, status, start, counts, root)
+            request_id_var.reset(rid_token)
+            request_tally.reset(tally_token)
+            tracing.reset_span(span_token)
+
+    def _add_headers(self, message: Message, rid: str) -> None:
+        raw = message.get("headers")
+        if type(raw) is not list:
+            raw = message["headers"] = list(raw or ())
+        for k, _ in raw:
+            if k == b"x-request-id" or k in self.added_names:
+                break
+        else:
+            # common case: append the pre-encoded pairs; only the request id is encoded
+            raw.append((b"x-request-id", rid.encode("latin-1")))
+            raw.extend(self.security_headers)
+            return
+        headers = MutableHeaders(raw=raw)
+        headers["x-request-id"] = rid
+        for k, v in self.security_headers:
+            headers[k.decode("latin-1")] = v.decode("latin-1")
+
+    @staticmethod
+    def _finish(scope: Scope, rid: str, status: int, start: float, counts: dict, root) -> None:
+        seconds = time.perf_counter() - start
+        route = scope.get("route")
+        # the route template ("/history/{draft_id}"), not the path, keeps label cardinality bounded
+        template = getattr(route, "path", "unmatched")
+        observe_request(template, scope["method"], status, seconds, counts)
+        if root is not tracing.NOOP:
+            root.name = f"{scope['method']} {template}"
+            root.set(**{"http.route": template, "http.response.status_code": status})
+            if status >= 500:
+                root.status = tracing.STATUS_ERROR
+            root.end()
+
+        client = scope.get("client")
+        access_log.info("request", extra={
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status,
+            "latency_ms": round(seconds * 1000, 1),
+            "llm_calls": counts.get("llm_calls", 0),
+            "supabase_calls": counts.get("supabase_calls", 0),
+            "ip": client[0] if client else None,
+            "ua": _header(scope, b"user-agent"),
+            "origin": _header(scope, b"origin"),
+        })
@@ -0,0 +1,235 @@
+# app/core/profiling.py
+"""
+Opt-in sampling profiler for slow requests.
+
+With PROFILE_SLOW_MS and/or PROFILE_EVERY_N set, ProfileMiddleware profiles
+requests to PROFILE_PATHS (default /draft/run-form): while one is in flight,
+a sampler thread records the event-loop thread's Python stack every
+PROFILE_INTERVAL_MS. When the request ends, its profile is kept if it took
+at least PROFILE_SLOW_MS, or if it was every Nth profiled request, and
+written to PROFILE_DIR as
+
+    <UTC time>-<request id>.folded   "frame;frame;frame <samples>" lines
+    <UTC time>-<request id>.json     request id, path, duration, sample count
+
+.folded is the collapsed-stack format flamegraph.pl, speedscope and inferno
+read. Only the newest PROFILE_KEEP profiles are kept; profiler.recent()
+backs GET /admin/profiles.
+
+The loop thread is shared: samples taken while this request was awaiting
+include other requests' work (and the loop's own select() when idle).
+Blocking work — HTML parsing, PDF extraction, synchronous LLM chains — runs
+on the loop thread and is what shows up.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.metrics import incr
+
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_EVERY_N = int(os.getenv("PROFILE_EVERY_N", "0"))
+PROFILE_PATHS = tuple(p.strip() for p in os.getenv("PROFILE_PATHS", "/draft/run-form").split(",") if p.strip())
+PROFILE_DIR = os.getenv("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "rb_profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))
+PROFILE_MAX_DEPTH = 128
+
+log = logging.getLogger(__name__)
+
+
+def _folded(frame) -> str:
+    parts = []
+    while frame is not None and len(parts) < PROFILE_MAX_DEPTH:
+        co = frame.f_code
+        parts.append(f"{co.co_name} ({os.path.basename(co.co_filename)}:{co.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class _Session:
+    __slots__ = ("request_id", "path", "thread_id", "started", "forced", "stacks")
+
+    def __init__(self, request_id: str, path: str, thread_id: int, forced: bool):
+        self.request_id = request_id
+        self.path = path
+        self.thread_id = thread_id
+        self.started = time.perf_counter()
+        self.forced = forced
+        self.stacks: Counter = Counter()
+
+
+class SlowRequestProfiler:
+    def __init__(
+        self,
+        *,
+        slow_ms: float = PROFILE_SLOW_MS,
+        every_n: int = PROFILE_EVERY_N,
+        out_dir: str = PROFILE_DIR,
+        interval_ms: float = PROFILE_INTERVAL_MS,
+        keep: int = PROFILE_KEEP,
+    ):
+        self.slow_ms = slow_ms
+        self.every_n = every_n
+        self.out_dir = out_dir
+        self.interval = max(0.001, interval_ms / 1000)
+        self.keep = max(1, keep)
+        self._sessions: List[_Session] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._seq = itertools.count(1)
+
+    @property
+    def enabled(self) -> bool:
+        return self.slow_ms > 0 or self.every_n > 0
+
+    def begin(self, request_id: str, path: str) -> _Session:
+        forced = self.every_n > 0 and next(self._seq) % self.every_n == 0
+        s = _Session(request_id, path, threading.get_ident(), forced)
+        with self._lock:
+            self._sessions.append(s)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return s
+
+    def end(self, s: _Session) -> Optional[str]:
+        """Stop sampling `s`; returns the reason it's kept ("slow" / "every_n") or None."""
+        duration_ms = (time.perf_counter() - s.started) * 1000
+        with self._lock:
+            self._sessions.remove(s)
+        reason = "slow" if self.slow_ms > 0 and duration_ms >= self.slow_ms else ("every_n" if s.forced else None)
+        if reason is None or not s.stacks:
+            return None
+        meta = {
+            "request_id": s.request_id,
+            "path": s.path,
+            "duration_ms": round(duration_ms, 1),
+            "samples": sum(s.stacks.values()),
+            "interval_ms": self.interval * 1000,
+            "reason": reason,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        stacks = dict(s.stacks)
+        try:
+            asyncio.get_running_loop().run_in_executor(None, self._write, meta, stacks)
+        except RuntimeError:
+            self._write(meta, stacks)
+        return reason
+
+    def _sample_loop(self) -> None:
+        while True:
+            self._wake.clear()  # before the snapshot, so a begin() after it wakes the wait below
+            with self._lock:
+                sessions = list(self._sessions)
+            if not sessions:
+                # park until the next begin(); exit after a quiet minute
+                if not self._wake.wait(60):
+                    with self._lock:
+                        if not self._sessions:
+                            self._thread = None
+                            return
+                continue
+            frames = sys._current_frames()
+            by_thread: Dict[int, str] = {}
+            for tid in {s.thread_id for s in sessions}:
+                frame = frames.get(tid)
+                if frame is not None:
+                    by_thread[tid] = _folded(frame)
+            frame = frames = None  # don't keep other threads' frames alive while sleeping
+            with self._lock:
+                # only sessions still open: end() reads a session's stacks once it's removed
+                for s in self._sessions:
+                    stack = by_thread.get(s.thread_id)
+                    if stack is not None:
+                        s.stacks[stack] += 1
+            time.sleep(self.interval)
+
+    def _write(self, meta: dict, stacks: Dict[str, int]) -> None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        rid = "".join(c for c in meta["request_id"] if c.isalnum() or c in "-_")[:64]
+        base = os.path.join(self.out_dir, f"{stamp}-{rid}")
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            with open(base + ".folded", "w") as f:
+                for stack, n in sorted(stacks.items(), key=lambda kv: -kv[1]):
+                    f.write(f"{stack} {n}\n")
+            with open(base + ".json", "w") as f:
+                json.dump({**meta, "file": os.path.basename(base) + ".folded"}, f)
+            incr("profiles_written")
+            self._prune()
+        except OSError as e:
+            incr("profile_write_errors")
+            log.warning("profile write failed: %r", e)
+
+    def _entries(self) -> List[Tuple[str, str]]:
+        try:
+            names = sorted((n for n in os.listdir(self.out_dir) if n.endswith(".json")), reverse=True)
+        except FileNotFoundError:
+            return []
+        return [(n, os.path.join(self.out_dir, n)) for n in names]
+
+    def _prune(self) -> None:
+        for name, path in self._entries()[self.keep:]:
+            for p in (path, path[: -len(".json")] + ".folded"):
+                try:
+                    os.remove(p)
+                except FileNotFoundError:
+                    pass
+
+    def recent(self, limit: int = 50) -> List[dict]:
+        """Newest first: each profile's metadata, including its .folded file name."""
+        out = []
+        for _, path in self._entries()[:limit]:
+            try:
+                with open(path) as f:
+                    out.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return out
+
+    def read(self, name: str) -> Optional[str]:
+        """Contents of one .folded file from recent(); None for unknown names."""
+        if os.path.basename(name) != name or not name.endswith(".folded"):
+            return None
+        try:
+            with open(os.path.join(self.out_dir, name)) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+profiler = SlowRequestProfiler()
+
+
+class ProfileMiddleware:
+    """Profiles requests whose path starts with one of `paths`; add it inside RequestMiddleware (request id)."""
+
+    def __init__(self, app: ASGIApp, *, profiler: SlowRequestProfiler = profiler, paths=PROFILE_PATHS):
+        self.app = app
+        self.profiler = profiler
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+        rid = (scope.get("state") or {}).get("request_id") or "-"
+        session = self.profiler.begin(rid, scope["path"])
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.end(session)
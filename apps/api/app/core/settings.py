@@ -3,6 +3,7 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     RB_AGENTIC: int = 0
     RB_MODEL: str = "gemini-2.5-flash"
+    LLM_PROVIDER: str = "gemini"     # "fake": app/services/fake_llm.py
     LLM_TIMEOUT_MS: int = 30000
     GEMINI_API_KEY: str | None = None
 
@@ -0,0 +1,312 @@
+# app/core/tracing.py
+"""
+Request-scoped tracing spans in the OpenTelemetry data model.
+
+Off unless TRACE_EXPORT is set (setup_tracing() at startup):
+
+- TRACE_EXPORT=file: finished spans are appended to TRACE_FILE as OTLP/JSON,
+  one ExportTraceServiceRequest per line (what the OTel Collector's file
+  exporter writes and its otlpjsonfile receiver reads).
+- TRACE_EXPORT=otlp: the same payloads are POSTed to TRACE_OTLP_ENDPOINT
+  (an OTLP/HTTP collector, e.g. http://localhost:4318/v1/traces).
+
+core/middleware.py opens the root span of every request; its trace id is
+derived from x-request-id (the uuid's hex), so a trace can be looked up by
+the id in the access log. Spans below it come from span() / start_span():
+ingest steps, LLM stages and calls, Supabase round-trips, and persist-queue
+jobs (which carry their submitting span as their parent).
+
+Like logging, exporting never blocks a request: finished spans go into a
+bounded queue drained by a writer thread, and are dropped (trace_dropped)
+when it's full. When tracing is off, span() yields a shared no-op span.
+"""
+import hashlib
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import httpx
+import orjson
+
+from app.core import metrics
+
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "").strip().lower()  # "", "file", "otlp"
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_SAMPLE = float(os.getenv("TRACE_SAMPLE", "1.0"))
+TRACE_QUEUE_MAX = int(os.getenv("TRACE_QUEUE_MAX", "20000"))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "resumebender-api")
+
+log = logging.getLogger(__name__)
+
+# OTLP enums
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+_BATCH_MAX = 512
+_FLUSH_SEC = 2.0
+
+
+class Span:
+    __slots__ = (
+        "trace_id", "span_id", "parent_id", "name", "kind",
+        "start_ns", "end_ns", "attributes", "status", "status_message",
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int, attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.status = STATUS_UNSET
+        self.status_message = ""
+
+    @property
+    def context(self) -> Tuple[str, str]:
+        """(trace_id, span_id): enough to parent a span elsewhere (e.g. a queued job)."""
+        return self.trace_id, self.span_id
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def error(self, exc: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"[:300]
+
+    def end(self) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        _export(self)
+
+
+class _NoopSpan:
+    """Returned when tracing is off or the trace isn't sampled; children of it are no-ops too."""
+
+    context = None
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def error(self, exc: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+NOOP = _NoopSpan()
+
+AnySpan = Union[Span, _NoopSpan]
+_current: ContextVar[Optional[AnySpan]] = ContextVar("current_span", default=None)
+_UNSET: Any = object()
+
+
+def enabled() -> bool:
+    return _writer is not None
+
+
+def current_span() -> Optional[AnySpan]:
+    return _current.get()
+
+
+def trace_id_for(request_id: str) -> str:
+    """32-hex trace id for a request id: the uuid's own hex, else a hash of it."""
+    try:
+        return uuid.UUID(request_id).hex
+    except (ValueError, AttributeError, TypeError):
+        return hashlib.sha256(str(request_id).encode()).hexdigest()[:32]
+
+
+def start_span(
+    name: str,
+    *,
+    parent: Any = _UNSET,
+    kind: int = KIND_INTERNAL,
+    trace_id: Optional[str] = None,
+    attributes: Optional[Dict[str, Any]] = None,
+) -> AnySpan:
+    """
+    Start a span without making it current (callers end() it). `parent` is a
+    span, a (trace_id, span_id) pair, or None for a root; by default the
+    current span. Roots are sampled at TRACE_SAMPLE.
+    """
+    if _writer is None:
+        return NOOP
+    if parent is _UNSET:
+        parent = _current.get()
+    if isinstance(parent, _NoopSpan):
+        return NOOP
+    if isinstance(parent, Span):
+        parent = parent.context
+    if parent:
+        trace_id, parent_id = parent
+    else:
+        if TRACE_SAMPLE < 1.0 and random.random() >= TRACE_SAMPLE:
+            return NOOP
+        trace_id, parent_id = trace_id or os.urandom(16).hex(), None
+    return Span(name, trace_id, parent_id, kind, dict(attributes or {}))
+
+
+@contextmanager
+def span(name: str, *, parent: Any = _UNSET, kind: int = KIND_INTERNAL, **attributes: Any) -> Iterator[AnySpan]:
+    """Run the block in a new current span; an exception marks it as an error."""
+    if _writer is None:
+        yield NOOP
+        return
+    s = start_span(name, parent=parent, kind=kind, attributes=attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error(e)
+        raise
+    finally:
+        _current.reset(token)
+        s.end()
+
+
+def use_span(s: AnySpan):
+    """Make `s` current (returns the token for reset_span())."""
+    return _current.set(s)
+
+
+def reset_span(token) -> None:
+    _current.reset(token)
+
+
+# ---- export -------------------------------------------------------------------
+
+def _value(v: Any) -> Dict[str, Any]:
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+
+def to_otlp(s: Span) -> Dict[str, Any]:
+    out = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": s.kind,
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": [{"key": k, "value": _value(v)} for k, v in s.attributes.items() if v is not None],
+        "status": {"code": s.status, **({"message": s.status_message} if s.status_message else {})},
+    }
+    if s.parent_id:
+        out["parentSpanId"] = s.parent_id
+    return out
+
+
+def otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+    """An OTLP/JSON ExportTraceServiceRequest."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "rb"}, "spans": [to_otlp(s) for s in spans]}],
+        }]
+    }
+
+
+class _Writer:
+    """Drains finished spans to a file or an OTLP/HTTP endpoint on a daemon thread."""
+
+    def __init__(self, export: str, *, path: str, endpoint: str, queue_max: int):
+        self.export, self.path, self.endpoint = export, path, endpoint
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_max)
+        self._client = httpx.Client(timeout=5) if export == "otlp" else None
+        self._thread = threading.Thread(target=self._loop, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, s: Span) -> None:
+        try:
+            self.queue.put_nowait(s)
+        except queue.Full:
+            metrics.incr("trace_dropped")
+
+    def _loop(self) -> None:
+        stop = False
+        while not stop:
+            batch: List[Span] = []
+            deadline = time.monotonic() + _FLUSH_SEC
+            while len(batch) < _BATCH_MAX:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: List[Span]) -> None:
+        body = orjson.dumps(otlp_payload(batch))
+        try:
+            if self._client is not None:
+                self._client.post(self.endpoint, content=body, headers={"Content-Type": "application/json"}).raise_for_status()
+            else:
+                with open(self.path, "ab") as f:
+                    f.write(body + b"\n")
+            metrics.incr("trace_spans_exported", len(batch))
+        except Exception as e:
+            metrics.incr("trace_export_errors")
+            log.warning("trace export failed: %r", e)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.queue.put(None)
+        self._thread.join(timeout)
+        if self._client is not None:
+            self._client.close()
+
+
+_writer: Optional[_Writer] = None
+
+
+def _export(s: Span) -> None:
+    w = _writer
+    if w is not None:
+        w.put(s)
+
+
+def setup_tracing(
+    export: str = TRACE_EXPORT,
+    *,
+    path: str = TRACE_FILE,
+    endpoint: str = TRACE_OTLP_ENDPOINT,
+    queue_max: int = TRACE_QUEUE_MAX,
+) -> bool:
+    """Start exporting spans ("file" or "otlp"); anything else leaves tracing off. Returns whether it's on."""
+    global _writer
+    stop_tracing()
+    if export not in ("file", "otlp"):
+        if export:
+            log.warning("unknown TRACE_EXPORT=%r; tracing stays off", export)
+        return False
+    _writer = _Writer(export, path=path, endpoint=endpoint, queue_max=queue_max)
+    return True
+
+
+def stop_tracing() -> None:
+    """Write out queued spans and turn tracing off."""
+    global _writer
+    w, _writer = _writer, None
+    if w is not None:
+        w.stop()
@@ -1,11 +1,19 @@
 # api/app/main.py
 from fastapi import FastAPI, Depends, HTTPException, Request, Response, Header
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-import os, stripe, json, sys, logging, uuid, time
+import os, stripe, json, sys, logging, asyncio, signal, hmac
+from pathlib import Path
+from dotenv import load_dotenv
 from datetime import datetime, timezone
+from cachetools import TTLCache
 from .core.errors import install_error_handlers
+from .core.middleware import RequestMiddleware
+from .core.profiling import ProfileMiddleware, profiler
+from .core.log import setup_logging, stop_logging
+from .core.tracing import setup_tracing, stop_tracing
+from .core.metrics import incr, render_prometheus
 from .routers import ingest
 from .routers import draft
 from .routers import resume
@@ -13,29 +21,38 @@ from .routers import analytics
 from .routers import history
 from .routers import agentic_v3
 from .routers import applications
-from .utils.pricing import PRICE_CATALOG, resolve_subscription_by_price_id
-from .utils.credits import ensure_daily_free_topup
-from .utils.security_headers import SecurityHeadersMiddleware
+from .routers import admin
+from .utils.pricing import PRICE_CATALOG
+from .utils.subscriptions import get_subscription_summary
+from .utils.credits import ensure_daily_free_topup, spend_credit
+from .utils.user_context import UserContext, user_context
+from .utils.user_cache import user_cache_stats
+from .agents.domain.prescan import prescan_stats
+from .utils.persist_queue import persist_queue, persist_queue_stats
+from .utils.webhook_queue import webhook_queue, webhook_queue_stats
+from .utils.text_store import text_blob_stats
+from .utils.security_headers import reload_security_headers
+from .utils.analytics_buffer import analytics_buffer
+from .utils.llm_metrics import install_langchain_metrics
+from .utils.llm_usage import usage_rollup
+from .utils.llm import router as llm_router
 from .auth import verify_supabase_session as verify_user
 from .routers import referral
 from .supabase_db import (upsert_user,
                             get_user_summary,
-                            consume_free_use,
-                            set_plan_and_grant,
                             upsert_customer,
                             get_stripe_customer_id,
-                            get_user_id_by_customer,
-                            insert_webhook_event_once,
-                            insert_analytics_event,
-                            set_remaining_and_mark_refill,
-                            get_premium_override)
+                            enqueue_webhook_event,
+                            set_remaining_and_mark_refill)
 
 
 
 app = FastAPI(title="LLM Job Copilot API")
 install_error_handlers(app)
 
-logging.basicConfig(level=logging.INFO)
+setup_logging()  # JSON lines via a queue + writer thread (core/log.py)
+setup_tracing()  # spans to TRACE_FILE / an OTLP collector when TRACE_EXPORT is set (core/tracing.py)
+logger = logging.getLogger(__name__)
 
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 STARTER_PRICE = os.getenv("STRIPE_PRICE_STARTER_MONTHLY")
@@ -53,49 +70,54 @@ DAILY_FREE_CREDITS = int(os.getenv("DAILY_FREE_CREDITS", "6"))
 
 FREE_MODE = os.getenv("FREE_MODE", "true").lower() == "true"
 
+# Stripe I/O uses the SDK's *_async methods (httpx under the hood) so handlers
+# never block the event loop on Stripe latency.
+STRIPE_CUSTOMER_CHECK_TTL_SEC = int(os.getenv("STRIPE_CUSTOMER_CHECK_TTL_SEC", "86400"))
+# customer ids confirmed to exist under the current key (mode is fixed per process)
+_valid_customers: TTLCache = TTLCache(maxsize=10_000, ttl=STRIPE_CUSTOMER_CHECK_TTL_SEC)
+
 print("CORS allow_origins =", ALLOWED_ORIGINS)
 
 # helpers
-async def _grant_credits(user_id: str, delta: int) -> int:
-    snap = await get_user_summary(user_id) or {}
-    current = int(snap.get("free_uses_remaining") or 0)
-    plan = snap.get("plan") or "free"
-    new_total = current + int(delta)
-    await set_plan_and_grant(user_id, plan, new_total)
-    return new_total
-
-async def _ae_safe(name: str, *, user_id: str | None, props: dict):
-    """Log analytics; never throw."""
-    try:
-        await insert_analytics_event(
-            name=name,
-            user_id=user_id,
-            props=props,
-            path="/stripe/webhook",
-        )
-    except Exception:
-        pass
-
 async def _ensure_current_mode_customer(user_id: str, email: str | None) -> str:
     """
     Returns a Stripe customer ID valid for the CURRENT Stripe mode (test or live).
     If the stored customer_id is from the wrong mode, creates a new one and saves it.
+    A customer that passed the check is trusted for STRIPE_CUSTOMER_CHECK_TTL_SEC.
     """
     cust_id = await get_stripe_customer_id(user_id)
     if cust_id:
+        if cust_id in _valid_customers:
+            return cust_id
         try:
-            stripe.Customer.retrieve(cust_id)  # will fail if wrong mode
+            await stripe.Customer.retrieve_async(cust_id)  # will fail if wrong mode
+            _valid_customers[cust_id] = True
             return cust_id
         except stripe.error.InvalidRequestError as e:
             if "No such customer" not in str(e):
                 raise
             # fall through to create a new customer in this mode
 
-    customer = stripe.Customer.create(email=email, metadata={"user_id": user_id})
+    customer = await stripe.Customer.create_async(email=email, metadata={"user_id": user_id})
     cust_id = customer["id"]
     await upsert_customer(user_id, cust_id)
+    _valid_customers[cust_id] = True
     return cust_id
 
+async def _with_customer(user_id: str, email: str | None, call):
+    """
+    await call(customer_id) with a current-mode customer. If Stripe no longer
+    knows a customer we had cached as valid, re-check it once and retry.
+    """
+    cust_id = await _ensure_current_mode_customer(user_id, email)
+    try:
+        return await call(cust_id)
+    except stripe.error.InvalidRequestError as e:
+        if "No such customer" not in str(e):
+            raise
+        _valid_customers.pop(cust_id, None)
+        return await call(await _ensure_current_mode_customer(user_id, email))
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -103,59 +125,52 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["x-request-id"],
+    expose_headers=["x-request-id", "x-next-cursor"],
     max_age=3600,
 )
 
-app.add_middleware(SecurityHeadersMiddleware)
-
-@app.middleware("http")
-async def add_request_id_and_log(request: Request, call_next):
-    rid = request.headers.get("x-request-id") or str(uuid.uuid4())
-    request.state.request_id = rid
-    start = time.time()
-
-    response: Response = await call_next(request)
-    response.headers["x-request-id"] = rid
-    log = {
-       "level": "info",
-        "msg": "request",
-        "request_id": rid,
-        "method": request.method,
-        "path": request.url.path,
-        "status": response.status_code,
-        "latency_ms": round((time.time() - start) * 1000, 1),
-        "ip": request.client.host if request.client else None,
-        "ua": request.headers.get("user-agent"),
-    }
-    print(json.dumps(log))
-    return response
-
-
-@app.middleware("http")
-async def _log_req_res(request, call_next):
-    print("REQ", request.method, request.url.path, "Origin:", request.headers.get("origin"))
-    resp = await call_next(request)
-    print("RES", request.method, request.url.path,
-          resp.status_code,
-          "ACAO:", resp.headers.get("access-control-allow-origin"))
-    return resp
-
-@app.middleware("http")
-async def _limit_body_size(request, call_next):
-    # Only guard the upload endpoints
-    guarded_paths = ("/resume/extract",)
-    if request.url.path.startswith(guarded_paths):
-        try:
-            max_bytes = int(os.getenv("MAX_UPLOAD_BYTES", "5242880"))
-        except ValueError:
-            max_bytes = 5_242_880
+# opt-in stack sampling of slow /draft/run-form requests (PROFILE_SLOW_MS / PROFILE_EVERY_N)
+if profiler.enabled:
+    app.add_middleware(ProfileMiddleware)
+
+# request id, access log, upload size limit, security headers (outermost)
+app.add_middleware(RequestMiddleware)
+
 
-        cl = request.headers.get("content-length")
-        if cl and cl.isdigit() and int(cl) > max_bytes:
-            return JSONResponse({"detail": "File too large"}, status_code=413)
+# count calls/tokens of every LangChain LLM call (see utils/llm_metrics.py)
+install_langchain_metrics()
 
-    return await call_next(request)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+@app.on_event("startup")
+async def _start_persist_queue():
+    # replays draft/analytics writes left in the spool by a previous process
+    await persist_queue.start()
+    # stored Stripe events (including any left unfinished by a previous process)
+    await webhook_queue.start()
+
+def _reload_config():
+    # SIGHUP: re-read .env and rebuild the precomputed security headers / CSP
+    load_dotenv(dotenv_path=Path(__file__).resolve().parents[1] / ".env", override=True)
+    reload_security_headers()
+    print("[config] reloaded security headers")
+
+@app.on_event("startup")
+async def _install_reload_hook():
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, _reload_config)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        pass  # no SIGHUP (Windows) or not the main thread
+
+@app.on_event("shutdown")
+async def _stop_persist_queue():
+    analytics_buffer.flush()
+    usage_rollup.flush()
+    await webhook_queue.stop()
+    await persist_queue.stop(timeout=float(os.getenv("PERSIST_DRAIN_SEC", "5")))
+    stop_tracing()
+    stop_logging()
 
 
 @app.get("/health")
@@ -167,6 +182,38 @@ def health_head():
     # No body needed for HEAD; 200 is enough
     return Response(status_code=200)
 
+@app.get("/health/cache")
+def health_cache():
+    # user summary / entitlement cache hit rate (see utils/user_cache.py),
+    # resume/JD blob reuse (utils/text_store.py) and LLM scans skipped by the
+    # deterministic pre-scan (agents/domain/prescan.py)
+    return {**user_cache_stats(), "text_blobs": text_blob_stats(), "prescan": prescan_stats()}
+
+@app.get("/health/queue")
+def health_queue():
+    # background persistence queue depth / lag / drops (see utils/persist_queue.py)
+    return {
+        **persist_queue_stats(),
+        "analytics": analytics_buffer.stats(),
+        "webhooks": webhook_queue_stats(),
+        "llm_usage": usage_rollup.stats(),
+    }
+
+@app.get("/health/llm")
+def health_llm():
+    # per-provider rolling latency / error rate / cooldown (see utils/llm_router.py)
+    return llm_router.stats()
+
+@app.get("/metrics", include_in_schema=False)
+def metrics(authorization: str | None = Header(default=None)):
+    # Prometheus scrape target: scrapes send "Authorization: Bearer <METRICS_TOKEN>";
+    # hidden (404) while METRICS_TOKEN is unset, like the /admin routes
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
 
 class SyncProfileBody(BaseModel):
     full_name: str | None = None
@@ -204,60 +251,45 @@ async def bootstrap(user = Depends(verify_user)):
     return {"user": profile}
 
 @app.get("/account/credits")
-async def account_credits(user = Depends(verify_user)):
-    uid = user["user_id"]
-
-    snap = await get_user_summary(uid) or {}
-    db_unlimited = bool(snap.get("unlimited"))
-    plan = (snap.get("plan") or "free").lower()
-    premium = await get_premium_override(uid)   # async, no supabase arg
-    unlimited = bool(db_unlimited or premium["active"])
+async def account_credits(ctx: UserContext = Depends(user_context)):
+    plan = ctx.plan
+    unlimited = ctx.unlimited
 
     # Only do daily free top-up for non-unlimited Free users
     if not unlimited and plan == "free":
-        await ensure_daily_free_topup(uid)
-        snap = await get_user_summary(uid) or {}  # refresh after possible update
+        ctx.set_remaining(await ensure_daily_free_topup(ctx.user_id, snap=ctx.user))
 
     return {
-        "remaining_credits": int(snap.get("free_uses_remaining") or 0),
+        "remaining_credits": ctx.remaining,
         "plan": plan,
         "unlimited": unlimited,
-        "premium": premium,
+        "premium": ctx.premium,
     }
 
 @app.post("/spend")
-async def spend(user = Depends(verify_user)):
-    uid = user["user_id"]
-
+async def spend(ctx: UserContext = Depends(user_context)):
     # FREE MODE: skip all credit checks + decrements
     if FREE_MODE:
         # return a harmless structure to match original shape
-        snap = await get_user_summary(uid) or {}
         return {
             "ok": True,
-            "free_uses_remaining": snap.get("free_uses_remaining", 9999)
+            "free_uses_remaining": ctx.user.get("free_uses_remaining", 9999)
         }
 
     # NORMAL MODE (original behavior)
-    snap = await get_user_summary(uid) or {}
-
-    premium = await get_premium_override(uid)
-    if premium["active"]:
-        return {"ok": True, "free_uses_remaining": int(snap.get("free_uses_remaining") or 0)}
-
-    # 1) Primary: honor DB boolean
-    if bool(snap.get("unlimited")):
-        return {"ok": True, "free_uses_remaining": int(snap.get("free_uses_remaining") or 0)}
+    # 1) Premium entitlement or DB boolean → no decrement
+    if ctx.unlimited:
+        return {"ok": True, "free_uses_remaining": ctx.remaining}
 
     # 2) Optional: still treat paid non-free plans as unlimited usage
-    plan = (snap.get("plan") or "free").lower()
-    if plan != "free":
-        return {"ok": True, "free_uses_remaining": int(snap.get("free_uses_remaining") or 0)}
+    if ctx.plan != "free":
+        return {"ok": True, "free_uses_remaining": ctx.remaining}
 
     # 3) Free plan: consume a credit
-    remaining = await consume_free_use(user["user_id"])
+    remaining = await spend_credit(ctx.user_id, snap=ctx.user)
     if remaining < 0:
         raise HTTPException(status_code=402, detail="Out of free uses")
+    ctx.set_remaining(remaining)
 
     return {"ok": True, "free_uses_remaining": remaining}
 
@@ -273,13 +305,10 @@ async def billing_checkout(payload: dict | None, req: Request, user = Depends(ve
 
     uid, email = user["user_id"], user.get("email")
 
-    # ensure Stripe customer exists
-    customer_id = await _ensure_current_mode_customer(uid, email)
-
     origin = req.headers.get("origin") or FRONTEND_BASE_URL
 
     if item["kind"] == "pack":
-        session = stripe.checkout.Session.create(
+        session = await _with_customer(uid, email, lambda customer_id: stripe.checkout.Session.create_async(
             mode="payment",
             customer=customer_id,
             line_items=[{"price": item["stripe_price"], "quantity": 1}],
@@ -287,11 +316,11 @@ async def billing_checkout(payload: dict | None, req: Request, user = Depends(ve
             cancel_url=f"{origin}/account/billing?checkout=cancel",
             allow_promotion_codes=True,
             metadata={"user_id": uid, "price_key": key},
-        )
+        ))
         return {"url": session.url}
 
     elif item["kind"] == "subscription":
-        session = stripe.checkout.Session.create(
+        session = await _with_customer(uid, email, lambda customer_id: stripe.checkout.Session.create_async(
             mode="subscription",
             customer=customer_id,
             line_items=[{"price": item["stripe_price"], "quantity": 1}],
@@ -300,7 +329,7 @@ async def billing_checkout(payload: dict | None, req: Request, user = Depends(ve
             cancel_url=f"{origin}/account/billing?checkout=cancel",
             allow_promotion_codes=True,
             metadata={"user_id": uid, "price_key": key},
-        )
+        ))
         return {"url": session.url}
 
     else:
@@ -314,7 +343,7 @@ async def billing_checkout_status(body: dict, user = Depends(verify_user)):
         raise HTTPException(400, "Missing session_id")
 
     # Fetch session from Stripe
-    session = stripe.checkout.Session.retrieve(sid)
+    session = await stripe.checkout.Session.retrieve_async(sid)
 
     # Basic checks
     paid = session.get("payment_status") == "paid"
@@ -337,7 +366,7 @@ async def billing_complete_subscription(body: dict, user = Depends(verify_user))
     if not sid:
         raise HTTPException(400, "Missing session_id")
 
-    session = stripe.checkout.Session.retrieve(sid)
+    session = await stripe.checkout.Session.retrieve_async(sid)
     if session.get("status") != "complete" or session.get("payment_status") != "paid":
         raise HTTPException(400, "Checkout not completed/paid")
 
@@ -351,59 +380,21 @@ async def billing_complete_subscription(body: dict, user = Depends(verify_user))
 @app.get("/billing/portal")
 async def billing_portal(user = Depends(verify_user)):
     # Create/link a customer for the current Stripe mode if needed
-    cust_id = await _ensure_current_mode_customer(user["user_id"], user.get("email"))
-
-    session = stripe.billing_portal.Session.create(
-        customer=cust_id,
-        return_url=f"{FRONTEND_BASE_URL}/account/billing"
+    session = await _with_customer(
+        user["user_id"],
+        user.get("email"),
+        lambda cust_id: stripe.billing_portal.Session.create_async(
+            customer=cust_id,
+            return_url=f"{FRONTEND_BASE_URL}/account/billing",
+        ),
     )
     return {"url": session.url}
 
 @app.get("/billing/subscription-summary")
 async def billing_subscription_summary(user = Depends(verify_user)):
+    # materialized from Stripe webhooks (see utils/subscriptions.py)
     try:
-        cust_id = await get_stripe_customer_id(user["user_id"])
-        if not cust_id:
-            return {"has_subscription": False}
-
-        try:
-            subs = stripe.Subscription.list(
-                customer=cust_id,
-                status="all",  # active, trialing, past_due etc.
-                limit=1,
-                expand=["data.items.data.price"]
-            )
-        except stripe.error.InvalidRequestError as e:
-            # Happens if a Test customer ID is used while the API runs with Live keys
-            if "No such customer" in str(e):
-                return {"has_subscription": False}
-            logger.exception("subscription-summary invalid request: %s", e)
-            return {"has_subscription": False, "error": "stripe_invalid_request"}
-
-        if not subs.data:
-            return {"has_subscription": False}
-
-        sub = subs.data[0]
-        price_id = sub["items"]["data"][0]["price"]["id"] if sub["items"]["data"] else None
-
-        # Map price_id -> your catalog key
-        plan_key = next(
-            (k for k, v in PRICE_CATALOG.items()
-             if v.get("stripe_price") == price_id and v.get("kind") == "subscription"),
-            None
-        )
-        plan_name = PRICE_CATALOG.get(plan_key, {}).get("plan") if plan_key else None
-
-        return {
-            "has_subscription": True,
-            "status": sub["status"],
-            "plan_key": plan_key,
-            "plan": plan_name,
-            "price_id": price_id,
-            "cancel_at_period_end": sub.get("cancel_at_period_end", False),
-            "current_period_end": sub.get("current_period_end"),
-        }
-
+        return await get_subscription_summary(user["user_id"])
     except Exception as e:
         logger.exception("subscription-summary failed for %s: %s", user["user_id"], e)
         # Keep the shape simple so the UI doesn’t crash, and CORS headers still apply
@@ -423,171 +414,19 @@ async def stripe_webhook(request: Request):
     except (ValueError, stripe.error.SignatureVerificationError) as e:
         raise HTTPException(status_code=400, detail=f"Webhook error: {e}")
 
-    event_type = event["type"]
-    event_id   = event["id"]
-
-    # Idempotency guard
-    first_time = await insert_webhook_event_once(event_id, event_type)
-    if not first_time:
+    # Persist, then ack: utils/webhook_queue.py workers apply it (with retries).
+    # If storing fails Stripe gets a 5xx and redelivers.
+    try:
+        queued = await enqueue_webhook_event(json.loads(payload))
+    except Exception as e:
+        logger.exception("storing Stripe event %s failed: %s", event["id"], e)
+        raise HTTPException(status_code=503, detail="Webhook not stored; retry")
+    if not queued:
+        incr("webhook_queue_duplicates")
         return {"received": True, "duplicate": True}
-
-    print("🔔 Stripe webhook:", event_type)
-
-    # 1) Checkout completed
-    if event_type == "checkout.session.completed":
-        sess = event["data"]["object"]
-        mode = sess.get("mode")
-        md = sess.get("metadata") or {}
-        user_id = md.get("user_id")
-        cust_id = sess.get("customer")
-
-        # a) One-time payment → grant pack credits
-        if mode == "payment" and sess.get("payment_status") == "paid":
-            price_key = md.get("price_key")
-            item = PRICE_CATALOG.get(price_key) if price_key else None
-            if user_id and item and item.get("kind") == "pack":
-                grant = int(item.get("grant") or 0)
-                if grant > 0:
-                    new_total = await _grant_credits(user_id, grant)  # your existing helper
-                    print(f"granted {grant} credits to {user_id} → total {new_total}")
-
-                    await _ae_safe(
-                    "purchase_succeeded",
-                    user_id=user_id,
-                    props={
-                        "kind": "pack",
-                        "sku": price_key,
-                        "grant": grant,
-                    },
-                )
-
-        # b) Subscription checkout → link Stripe customer to user
-        if mode == "subscription" and user_id and cust_id:
-            await upsert_customer(user_id, cust_id)
-            print(f"linked Stripe customer {cust_id} to user {user_id}")
-
-            await _ae_safe(
-                "purchase_succeeded",
-                user_id=user_id,
-                props={
-                    "kind": "subscription",
-                    "sku": price_key,
-                },
-            )
-
-        return {"received": True}
-
-    # 2) Invoice paid → reset monthly allowance for that tier
-    if event_type == "invoice.payment_succeeded":
-        inv = event["data"]["object"]
-        cust_id = inv.get("customer")
-        user_id = await get_user_id_by_customer(cust_id) if cust_id else None
-        if not user_id:
-            return {"received": True}
-
-        price_id = None
-        # Try to read price from invoice lines
-        try:
-            lines = inv.get("lines", {}).get("data", [])
-            if lines:
-                price = (lines[0].get("price") or {})
-                price_id = price.get("id")
-        except Exception:
-            price_id = None
-
-        # Fallback: pull subscription item if needed
-        if not price_id and inv.get("subscription"):
-            sub = stripe.Subscription.retrieve(inv["subscription"], expand=["items.data.price"])
-            items = sub.get("items", {}).get("data", [])
-            if items:
-                price_id = items[0]["price"]["id"]
-
-        chosen = resolve_subscription_by_price_id(price_id)
-        if chosen:
-            if chosen.get("unlimited"):
-                # Preserve remaining credits, only flip plan/unlimited.
-                snap = await get_user_summary(user_id) or {}
-                remaining = int(snap.get("free_uses_remaining") or 0)
-
-                # If your set_plan_and_grant now accepts an `unlimited` boolean:
-                # await set_plan_and_grant(user_id, "unlimited", remaining, unlimited=True)
-
-                # If your set_plan_and_grant infers unlimited from plan:
-                await set_plan_and_grant(user_id, "unlimited", remaining)
-
-                print(f"set unlimited plan (credits preserved) → user={user_id} remaining={remaining}")
-            else:
-                monthly = int(chosen.get("monthly_allowance") or 0)
-                await set_plan_and_grant(user_id, chosen["plan"], monthly)
-                print(f"reset credits for {user_id} → plan={chosen['plan']} allowance={monthly}")
-        else:
-            # safe fallback
-            monthly = int(PRICE_CATALOG["sub_starter"]["monthly_allowance"])
-            await set_plan_and_grant(user_id, "starter", monthly)
-            print("fallback: starter plan applied")
-        
-        await _ae_safe(
-            "subscription_payment_succeeded",
-            user_id=user_id,
-            props={
-                "sku": price_id,
-                "plan": (chosen or {}).get("plan"),
-            },
-        )
-
-        return {"received": True}
-
-    # 3) Subscription updated → only update plan label, keep credits unchanged
-    if event_type == "customer.subscription.updated":
-        sub = event["data"]["object"]
-        cust_id = sub.get("customer")
-        user_id = await get_user_id_by_customer(cust_id) if cust_id else None
-        if not user_id:
-            return {"received": True}
-
-        items = sub.get("items", {}).get("data", [])
-        price_id = items[0]["price"]["id"] if items else None
-
-        chosen = resolve_subscription_by_price_id(price_id)
-        if chosen:
-            snap = await get_user_summary(user_id) or {}
-            remaining = int(snap.get("free_uses_remaining") or 0)
-            await set_plan_and_grant(user_id, chosen["plan"], remaining)
-            print(f"plan updated (no credit change) → user={user_id} plan={chosen['plan']}")
-
-            await _ae_safe(
-                "subscription_updated",
-                user_id=user_id,
-                props={"plan": chosen["plan"], "price_id": price_id},
-            )
-
-        return {"received": True}
-
-    # 4) Subscription canceled → set plan free, PRESERVE credits
-    if event_type == "customer.subscription.deleted":
-        sub = event["data"]["object"]
-        cust_id = sub.get("customer")
-        user_id = await get_user_id_by_customer(cust_id) if cust_id else None
-        if not user_id:
-            return {"received": True}
-
-        # Preserve remaining credits; change to 0 if you prefer to wipe.
-        snap = await get_user_summary(user_id) or {}
-        remaining = int(snap.get("free_uses_remaining") or 0)
-        await set_plan_and_grant(user_id, "free", remaining)
-        print(f"plan set to free (credits preserved) for user {user_id}")
-
-        await _ae_safe(
-            "subscription_canceled",
-            user_id=user_id,
-            props={"reason": sub.get("cancellation_details", {}).get("reason")},
-        )
-
-        return {"received": True}
-
-    # Default
-    return {"received": True}
-    
+    incr("webhook_queue_enqueued")
+    webhook_queue.notify()
+    return {"received": True, "queued": True}
 
 app.include_router(ingest.router)
 
@@ -603,4 +442,6 @@ app.include_router(agentic_v3.router)
 
 app.include_router(history.router)
 
-app.include_router(applications.router)
\ No newline at end of file
+app.include_router(applications.router)
+
+app.include_router(admin.router)
\ No newline at end of file
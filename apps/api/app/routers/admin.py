@@ -0,0 +1,43 @@
+# app/routers/admin.py
+"""
+Operator endpoints, behind ADMIN_TOKEN ("Authorization: Bearer <token>").
+Without ADMIN_TOKEN they answer 404.
+"""
+import hmac
+import os
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core.profiling import profiler
+
+router = APIRouter(prefix="/admin", tags=["admin"], include_in_schema=False)
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def require_admin(authorization: str | None = Header(default=None)) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(authorization or "", f"Bearer {ADMIN_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+def list_profiles(limit: int = 50):
+    # slow-request profiles written by core/profiling.py, newest first
+    return {
+        "enabled": profiler.enabled,
+        "slow_ms": profiler.slow_ms,
+        "every_n": profiler.every_n,
+        "profiles": profiler.recent(max(1, min(limit, 500))),
+    }
+
+
+@router.get("/profiles/{name}", dependencies=[Depends(require_admin)])
+def get_profile(name: str):
+    # collapsed stacks: pipe into flamegraph.pl, or open in speedscope
+    folded = profiler.read(name)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(folded)
@@ -2,10 +2,10 @@ from fastapi import APIRouter, Request, Depends, Security, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
 from uuid import UUID, uuid4
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 from app.auth import verify_supabase_session
-from app import supabase_db  # import the helper we just made
+from app.utils.analytics_buffer import analytics_buffer, analytics_row, QUEUED, DUPLICATE, DROPPED
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
@@ -26,36 +26,60 @@ class CaptureBody(BaseModel):
     anon_id: Optional[str] = None
     client_event_id: Optional[UUID] = None
 
-@router.post("/capture")
-async def capture_event(body: CaptureBody, request: Request, user = Depends(optional_supabase_session)):
-    client_event_id = str(body.client_event_id or uuid4())
-    user_id = (user or {}).get("user_id")
+MAX_BATCH_EVENTS = 100
+
+class CaptureBatchBody(BaseModel):
+    events: List[CaptureBody]
+
+def _client_ip_ua(request: Request) -> tuple[Optional[str], Optional[str]]:
     raw_ip = request.headers.get("x-forwarded-for") or (request.client.host if request.client else None)
     ip = None
     if raw_ip:
         ip = raw_ip.split(",")[0].strip()
-    ua = request.headers.get("user-agent")
+    return ip, request.headers.get("user-agent")
 
-    anon_id = body.anon_id or f"server-{uuid4()}"
+def _row(body: CaptureBody, *, user_id: Optional[str], ip: Optional[str], ua: Optional[str]) -> Dict[str, Any]:
+    return analytics_row(
+        body.name,
+        body.props,
+        user_id=user_id,
+        anon_id=body.anon_id or f"server-{uuid4()}",
+        path=body.path,
+        ip=ip,
+        ua=ua,
+        client_event_id=str(body.client_event_id or uuid4()),
+    )
 
-    # print("[analytics.capture] incoming body:", body.dict())
-    # print("[analytics.capture] user_id:", user_id, "ip:", ip)
+def _too_busy() -> HTTPException:
+    # backpressure: the writer's buffer (or the persistence queue behind it) is full; retry later
+    return HTTPException(status_code=429, detail="Analytics buffer full", headers={"Retry-After": "1"})
 
-    try:
-        ok = await supabase_db.insert_analytics_event(
-            name=body.name,
-            props=body.props,
-            user_id=user_id,
-            anon_id=anon_id,
-            path=body.path,
-            ip=ip,
-            ua=ua,
-            client_event_id=client_event_id,
-        )
-        # print("[analytics.capture] insert returned:", ok)
-    except Exception as e:
-        # This will show in your server logs and in the HTTP response during debugging
-        print("[analytics.capture] insert ERROR:", repr(e))
-        raise HTTPException(status_code=500, detail=f"insert_analytics_event error: {e!r}")
-
-    return {"ok": ok}
+@router.post("/capture")
+async def capture_event(body: CaptureBody, request: Request, user = Depends(optional_supabase_session)):
+    user_id = (user or {}).get("user_id")
+    ip, ua = _client_ip_ua(request)
+
+    status = analytics_buffer.add(_row(body, user_id=user_id, ip=ip, ua=ua))
+    if status == DROPPED:
+        raise _too_busy()
+
+    # ok=False for a client_event_id we've already accepted (same as the old insert's duplicate result)
+    return {"ok": status == QUEUED}
+
+@router.post("/capture-batch")
+async def capture_batch(body: CaptureBatchBody, request: Request, user = Depends(optional_supabase_session)):
+    if len(body.events) > MAX_BATCH_EVENTS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_EVENTS} events per batch")
+    if not analytics_buffer.has_room(len(body.events)):
+        raise _too_busy()
+
+    user_id = (user or {}).get("user_id")
+    ip, ua = _client_ip_ua(request)
+
+    results = [analytics_buffer.add(_row(ev, user_id=user_id, ip=ip, ua=ua)) for ev in body.events]
+    return {
+        "ok": True,
+        "accepted": results.count(QUEUED),
+        "duplicates": results.count(DUPLICATE),
+        "dropped": results.count(DROPPED),
+    }
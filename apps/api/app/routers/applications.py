@@ -3,10 +3,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from typing import Dict, Any, Optional, List, Literal
 from pydantic import BaseModel, Field
 from datetime import datetime, timezone
-import httpx
 
 from app.auth import verify_supabase_session as verify_user
-from app.supabase_db import REST, HEADERS
+from app.supabase_db import REST, HEADERS, rest_client
 
 ApplicationStatus = Literal["drafting", "applied", "interviewing", "offer", "rejected", "archived"]
 
@@ -76,7 +75,7 @@ async def create_application(
     # Remove None keys so Supabase doesn’t overwrite defaults
     body = {k: v for k, v in body.items() if v is not None}
 
-    async with httpx.AsyncClient(timeout=10) as client:
+    async with rest_client(timeout=10) as client:
         r = await client.post(
             f"{REST}/job_applications",
             params={"select": "*"},
@@ -108,7 +107,7 @@ async def list_applications(
     if status:
         params["status"] = f"eq.{status}"
 
-    async with httpx.AsyncClient(timeout=10) as client:
+    async with rest_client(timeout=10) as client:
         r = await client.get(f"{REST}/job_applications", params=params, headers=HEADERS)
         if r.status_code >= 400:
             raise HTTPException(status_code=500, detail=f"Failed to list applications: {r.text}")
@@ -144,7 +143,7 @@ async def update_application(
         "select": "*",
     }
 
-    async with httpx.AsyncClient(timeout=10) as client:
+    async with rest_client(timeout=10) as client:
         r = await client.patch(
             f"{REST}/job_applications",
             params=params,
@@ -174,7 +173,7 @@ async def delete_application(
         "select": "id",
     }
 
-    async with httpx.AsyncClient(timeout=10) as client:
+    async with rest_client(timeout=10) as client:
         r = await client.delete(
             f"{REST}/job_applications",
             params=params,
@@ -198,7 +197,7 @@ async def create_application_from_draft(
 ):
     user_id = user["user_id"]
 
-    async with httpx.AsyncClient(timeout=10) as client:
+    async with rest_client(timeout=10) as client:
         # 1) Fetch the draft (owned by user)
         r = await client.get(
             f"{REST}/drafts",
@@ -3,11 +3,17 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, HttpUrl, ValidationError
 from typing import Optional, Literal
 
-from app.utils.llm import generate_text
+from app.core import tracing
+from app.core.metrics import llm_stage
+from app.utils.llm import generate_text, llm_served_by
 from app.utils.rate_limit import throttle, throttle_multi
-from app.utils.credits import ensure_daily_free_topup
+from app.utils.credits import credits_after_refill, spend_credit
+from app.utils.user_context import load_user_context
 from app.utils.jd_fetch import fetch_jd_text
-from app.supabase_db import continue_draft, create_draft
+from app.utils.persist_queue import persist_queue
+from app.utils.draft_outputs import normalize_draft_outputs
+from app.utils.analytics_buffer import capture_event
+from app.utils import llm_usage
 
 from app.routers.ingest import ingest as ingest_route
 from app.routers.ingest import IngestRequest
@@ -19,7 +25,7 @@ from app.agents.domain.bullets import bullets_domain
 from app.agents.schemas.bullets_schema import BulletsInput
 
 from app.auth import verify_supabase_session as verify_user
-from app.supabase_db import get_user_summary, consume_free_use, insert_analytics_event, create_draft, get_drafts, Draft
+from app.supabase_db import get_drafts, Draft
 
 import os
 import uuid
@@ -27,10 +33,11 @@ from pathlib import Path
 from string import Template
 import time
 import re
-import traceback
+import logging
 
 bearer = HTTPBearer()
 router = APIRouter(prefix="/draft", tags=["draft"])
+logger = logging.getLogger(__name__)
 Task = Literal["bullets", "talking_points", "cover_letter", "alignment", "bender_score", "first_impression"]
 PROMPT_DIR = Path(__file__).resolve().parents[4] / "ml" / "prompts"
 RL_RUN_FORM_PER_MIN = int(os.getenv("RL_RUN_FORM_PER_MIN", "10"))
@@ -118,16 +125,16 @@ async def _log_event_safe(
     name: str,
     props: dict
 ):
-    """Fire-and-forget analytics; never raises."""
+    """Fire-and-forget analytics (buffered, written in batches); never raises or waits on Supabase."""
     try:
         ip = None
         ua = None
         if request is not None:
             ip = request.headers.get("x-forwarded-for") or (request.client.host if request.client else None)
             ua = request.headers.get("user-agent")
-        await insert_analytics_event(
-            name=name,
-            props=props,
+        capture_event(
+            name,
+            props,
             user_id=user_id,
             anon_id=None,          # we have a logged-in user here
             path="/draft/run-form",
@@ -311,11 +318,17 @@ async def _run_generation(req: DraftReq) -> dict:
         jd_keywords=jd_keywords,
     )
 
-    bullets = await generate_text(prompt)
+    with llm_stage("generate"):
+        bullets = await generate_text(prompt)
 
-    provider = (os.getenv("LLM_PROVIDER") or "gemini").strip().lower()
-    model_env = {"gemini":"GEMINI_MODEL","openai":"OPENAI_MODEL","groq":"GROQ_MODEL","ollama":"OLLAMA_MODEL"}.get(provider)
-    model = (os.getenv(model_env) or "").strip() if model_env else ""
+    served = llm_served_by()  # the router may have hedged or failed over
+    if served:
+        provider, model = served
+    else:
+        provider = (os.getenv("LLM_PROVIDER") or "gemini").strip().lower()
+        model_env = {"gemini":"GEMINI_MODEL","openai":"OPENAI_MODEL","groq":"GROQ_MODEL","ollama":"OLLAMA_MODEL",
+                     "fake":"FAKE_LLM_MODEL"}.get(provider)
+        model = (os.getenv(model_env) or "").strip() if model_env else ""
 
     return {
         "bullets": bullets,
@@ -334,6 +347,13 @@ async def _run_generation(req: DraftReq) -> dict:
         "job_title": job_title,
     }
 
+async def _run_tracked(req: DraftReq, *, user_id: Optional[str]) -> dict:
+    """_run_generation with its LLM token/cost usage returned as meta.usage (and rolled up daily)."""
+    with llm_usage.track(user_id=user_id, task=req.task) as usage:
+        data = await _run_generation(req)
+    data.setdefault("meta", {})["usage"] = usage.summary()
+    return data
+
 def _is_readable(s: str) -> bool:
     s = (s or "").strip()
     if len(s) < 200:               # too short to be a resume
@@ -368,10 +388,10 @@ def load_task_template(task: str) -> str:
 
     p_v2 = PROMPT_DIR / f"{task}_v2.md"
     if p_v2.exists():
-        print(f'found v2. using v2 mode for {task}')
+        logger.debug("using v2 prompt for %s", task)
         return p_v2.read_text(encoding="utf-8")
     if p.exists():
-        print(f"no v2 found, using v1 fallback for {task}")
+        logger.debug("no v2 prompt for %s, using v1", task)
         return p.read_text(encoding="utf-8")
     # fallback
     if task == "bullets":
@@ -439,6 +459,7 @@ async def draft(req: DraftReq):
 @router.post("/run")
 async def draft_run(
     req: DraftReq,
+    request: Request,
     _creds: HTTPAuthorizationCredentials = Security(bearer),
     user = Depends(verify_user),
 ):
@@ -447,8 +468,8 @@ async def draft_run(
     # If we're NOT in free mode, enforce credits like before
     credits = None
     if not FREE_MODE:
-        profile: UserSummary = await get_user_summary(user_id)
-        credits = int(profile.get("free_uses_remaining") or 0)
+        ctx = await load_user_context(request, user_id)
+        credits = credits_after_refill(ctx.user)
 
         if credits <= 0:
             raise HTTPException(
@@ -462,7 +483,7 @@ async def draft_run(
 
     # call model via provider-agnostic helper
     try:
-        data = await _run_generation(req=req)
+        data = await _run_tracked(req, user_id=user_id)
     except Exception as e:
         # generate_text raises RuntimeError with helpful details; surface them
        raise HTTPException(
@@ -478,7 +499,7 @@ async def draft_run(
 
     # After generation, either spend a credit (normal) or skip (free mode)
     if not FREE_MODE:
-        remaining = await consume_free_use(user_id)
+        remaining = await spend_credit(user_id, snap=ctx.user)
         if remaining < 0:
             # race: someone else spent the last credit in parallel
             raise HTTPException(
@@ -584,7 +605,7 @@ async def draft_run_form_guest(
         )
 
     try:
-        data = await _run_generation(req=req)
+        data = await _run_tracked(req, user_id=None)
     except Exception as e:
         # generate_text raises RuntimeError with helpful details; surface them
         raise HTTPException(status_code=502, detail=f"LLM call failed: {e}")
@@ -630,9 +651,6 @@ async def draft_run_form(
 ):
     user_id = user["user_id"]
 
-    # Track whether the caller provided a ref; if not, we create the draft on first call.
-    caller_provided_ref = client_ref_id is not None
-
     # If client_ref_id is not provided, generate one.
     # Frontend is expected to reuse the returned client_ref_id for
     # all subsequent tasks (bullets, alignment, cover_letter, etc.)
@@ -664,13 +682,14 @@ async def draft_run_form(
     credits = 0                   
 
     if not FREE_MODE:             # skip all this in free mode
-        profile: UserSummary = await get_user_summary(user_id)
-        is_unlimited = bool(profile.get("unlimited"))
-        credits = int(profile.get("free_uses_remaining") or 0)
+        ctx = await load_user_context(request, user_id)
+        is_unlimited = ctx.unlimited
+        credits = ctx.remaining
 
-        # 2) If not unlimited, apply lazy daily top-up and recheck credits
+        # 2) If not unlimited, count the lazy daily top-up (applied atomically
+        #    with the spend after generation) and recheck credits
         if not is_unlimited:
-            credits = await ensure_daily_free_topup(user_id)
+            credits = credits_after_refill(ctx.user)
             if credits <= 0:
                 await _log_event_safe(
                     request,
@@ -691,7 +710,8 @@ async def draft_run_form(
     text_from_form = (resume or "").strip()
     text_from_file = ""
     if resume_file:
-        extracted = await extract_route(resume_file)
+        with tracing.span("resume.extract"):
+            extracted = await extract_route(resume_file)
         text_from_file = (extracted.get("text") or "").strip()
 
     resume_text = text_from_form or text_from_file
@@ -754,7 +774,7 @@ async def draft_run_form(
     # 6) Run generation (optional: add a 2-slot concurrency cap)
     # with ConcurrencyGuard(key=f"user:{user_id}", max_in_flight=2):
     try:
-        data = await _run_generation(req)
+        data = await _run_tracked(req, user_id=user_id)
     except HTTPException as e:
         if e.status_code not in (402, 429):
             await _log_event_safe(
@@ -804,7 +824,7 @@ async def draft_run_form(
         data["meta"]["unlimited"] = True
 
     else:
-        remaining = await consume_free_use(user_id)
+        remaining = await spend_credit(user_id, snap=ctx.user)
         if remaining < 0:
             # race: someone else spent last credit in parallel
             raise HTTPException(
@@ -855,28 +875,9 @@ async def draft_run_form(
              draft_payload["resume_bullets"] = bullets_data
              
         elif task == "cover_letter":
-             # Extract cover letter text
              cl_data = data
              if isinstance(data, dict) and "cover_letter" in data:
                   cl_data = data["cover_letter"]
-             
-             # Attempt to parse JSON string to dict for jsonb compatibility
-             if isinstance(cl_data, str):
-                 try:
-                     # Simple strip of markdown code blocks if present
-                     clean_text = cl_data.strip()
-                     if clean_text.startswith("```"):
-                         # Remove first line
-                         clean_text = clean_text.split("\n", 1)[1]
-                         # Remove last line if it is backticks
-                         if clean_text.rstrip().endswith("```"):
-                              clean_text = clean_text.rsplit("\n", 1)[0]
-                     
-                     cl_data = json.loads(clean_text)
-                 except Exception:
-                     # If parsing fails, store as-is (Postgres jsonb accepts strings too)
-                     pass
-
              new_output = {"cover_letter": cl_data}
              draft_payload["cover_letter"] = cl_data
              
@@ -911,19 +912,18 @@ async def draft_run_form(
              new_output = {task: data}
 
         draft_payload["outputs_json"] = new_output
+        with tracing.span("draft.save", **{"rb.task": task}):
+            # parse markdown/wrapped JSON into the typed columns once, here, so reads don't have to
+            draft_payload.update(normalize_draft_outputs(draft_payload, from_outputs=False))
 
-        if caller_provided_ref:
-            try:
-                await continue_draft(draft_payload)
-            except ValueError:
-                # First task with a caller-provided ref that does not yet exist -> create the row once
-                await create_draft(draft_payload)
-        else:
-            await create_draft(draft_payload)
+            # Inserts on the first task for this ref, merges outputs on later ones.
+            # Journaled + written in the background so the response doesn't wait on Supabase
+            # (its "persist draft" span is parented to this one).
+            persist_queue.submit("draft", draft_payload)
+        data["meta"]["save_status"] = "queued"
 
     except Exception as e:
-        print(f"CRITICAL: Failed to save draft. Error: {e}")
-        traceback.print_exc()
+        logger.exception("failed to save draft: %s", e)
         # Ensure meta exists
         data.setdefault("meta", {})
         data["meta"]["save_error"] = str(e)
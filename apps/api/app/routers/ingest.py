@@ -5,12 +5,15 @@ from bs4 import BeautifulSoup
 from app.utils.chunk import chunk_text
 from app.utils.context import build_context
 from app.utils.retrieve import rank_chunks_by_keywords
+from app.core import tracing
 from urllib.parse import urlparse, parse_qs
 from typing import Optional
 import json
+import logging
 import os
 
 router = APIRouter(prefix="/ingest", tags=["ingest"])
+logger = logging.getLogger(__name__)
 
 BROWSER_HEADERS = {
     "User-Agent": (
@@ -183,10 +186,10 @@ def _looks_blocked(html: str, text: str, debug_url: str = "") -> bool:
     signals = ["access denied", "forbidden", "join to view"]
     hits = sum(1 for s in signals if s in t or s in h)
 
-    try:
-        print(f"INGEST_HEUR len_text={len(t)} hits={hits} pw={has_password} cap={has_captcha} ch={shows_challenge} url={debug_url}")
-    except Exception:
-        pass
+    logger.debug("ingest heuristics", extra={
+        "len_text": len(t), "hits": hits, "password": has_password, "captcha": has_captcha,
+        "challenge": shows_challenge, "url": debug_url,
+    })
 
     # Only block when we’re confident:
     if has_password:
@@ -215,23 +218,28 @@ async def ingest(req: IngestRequest):
     """
     Ingest content from a URL or raw pasted text.
     """
+    with tracing.span("ingest", **{"rb.source": "text" if (req.text or "").strip() else "url"}):
+        return await _ingest(req)
+
+async def _ingest(req: IngestRequest):
     # --- pasted text path (unchanged) ---
     pasted = (req.text or "").strip()
     if pasted:
         title = "Pasted job description"
         text = " ".join(pasted.split())
 
-        chunks = chunk_text(text, size=800, overlap=120)
-        if req.q:
-            idxs = rank_chunks_by_keywords(req.q, chunks, top_k=3)
-            selected = [chunks[i] for i in idxs]
-        else:
-            idxs = list(range(min(len(chunks), 3)))
-            selected = [chunks[i] for i in idxs]
-
-        first_tail_prev  = chunks[0][-20:] if len(chunks) > 0 else ""
-        second_head_prev = chunks[1][:20]  if len(chunks) > 1 else ""
-        context, citations = build_context(selected, max_chars=3000, max_chunks=5)
+        with tracing.span("ingest.chunk", **{"rb.text_chars": len(text)}):
+            chunks = chunk_text(text, size=800, overlap=120)
+            if req.q:
+                idxs = rank_chunks_by_keywords(req.q, chunks, top_k=3)
+                selected = [chunks[i] for i in idxs]
+            else:
+                idxs = list(range(min(len(chunks), 3)))
+                selected = [chunks[i] for i in idxs]
+
+            first_tail_prev  = chunks[0][-20:] if len(chunks) > 0 else ""
+            second_head_prev = chunks[1][:20]  if len(chunks) > 1 else ""
+            context, citations = build_context(selected, max_chars=3000, max_chunks=5)
         preview = text[:500]
 
         final_url = normalize_url(req.url) if req.url else ""
@@ -269,14 +277,16 @@ async def ingest(req: IngestRequest):
             follow_redirects=True,
             headers=BROWSER_HEADERS,
         ) as client:
-            resp = await client.get(target)
+            with tracing.span("ingest.fetch", kind=tracing.KIND_CLIENT, **{"url.full": target}) as fetch_span:
+                resp = await client.get(target)
 
-            if resp.status_code == 403 and is_indeed:
-                alt = _indeed_mobile_fallback(target)
-                if alt:
-                    alt_headers = dict(BROWSER_HEADERS)
-                    alt_headers["Referer"] = f"https://{urlparse(target).netloc}/"
-                    resp = await client.get(alt, headers=alt_headers)
+                if resp.status_code == 403 and is_indeed:
+                    alt = _indeed_mobile_fallback(target)
+                    if alt:
+                        alt_headers = dict(BROWSER_HEADERS)
+                        alt_headers["Referer"] = f"https://{urlparse(target).netloc}/"
+                        resp = await client.get(alt, headers=alt_headers)
+                fetch_span.set(**{"http.response.status_code": resp.status_code, "rb.html_chars": len(resp.text)})
 
             ctype = (resp.headers.get("content-type") or "").lower()
             raw_html = resp.text
@@ -297,30 +307,28 @@ async def ingest(req: IngestRequest):
             if not is_html:
                 raise HTTPException(status_code=400, detail=f"Expected HTML, got {resp.status_code} {ctype}")
 
-            print("INGEST", resp.status_code, ctype, "len=", len(raw_html), "url=", final_url)
+            logger.info("ingest fetched", extra={
+                "status": resp.status_code, "content_type": ctype, "html_len": len(raw_html), "url": final_url,
+            })
 
             # Extract once (this already falls back to JSON-LD / __NEXT_DATA__)
-            title, text = _extract_text_robust(raw_html)
+            with tracing.span("ingest.extract", **{"rb.html_chars": len(raw_html)}):
+                title, text = _extract_text_robust(raw_html)
 
             ENABLE_RENDER = (os.getenv("ENABLE_RENDERED_FETCH") == "1")
             needs_render = (len(text) < 500) or _looks_js_shell(raw_html) or _looks_js_shell(text)
 
             if ENABLE_RENDER and needs_render:
                 try:
-                    rendered_html = await _fetch_rendered_html(final_url)
-                    title_r, text_r = _extract_text_robust(rendered_html)
+                    with tracing.span("ingest.render"):
+                        rendered_html = await _fetch_rendered_html(final_url)
+                        title_r, text_r = _extract_text_robust(rendered_html)
                     if len(text_r) > len(text):  # keep the better extraction
                         title, text = title_r, text_r
-                    try:
-                        print(f"INGEST_RENDER used len={len(text)} url={final_url}")
-                    except Exception:
-                        pass
+                    logger.info("ingest rendered", extra={"text_len": len(text), "url": final_url})
                 except Exception as _e:
                     # soft-fail: keep static extraction
-                    try:
-                        print(f"INGEST_RENDER error={_e}")
-                    except Exception:
-                        pass
+                    logger.warning("ingest render failed: %r", _e, extra={"url": final_url})
 
             # Gentle blocker check (now final_url is defined)
             if _looks_blocked(raw_html, text, final_url):
@@ -330,17 +338,18 @@ async def ingest(req: IngestRequest):
                 )
 
             # Continue with your pipeline
-            chunks = chunk_text(text, size=800, overlap=120)
-            if req.q:
-                idxs = rank_chunks_by_keywords(req.q, chunks, top_k=3)
-                selected = [chunks[i] for i in idxs]
-            else:
-                idxs = list(range(min(len(chunks), 3)))
-                selected = [chunks[i] for i in idxs]
-
-            first_tail_prev = chunks[0][-20:] if len(chunks) > 0 else ""
-            second_head_prev = chunks[1][:20] if len(chunks) > 1 else ""
-            context, citations = build_context(selected, max_chars=3000, max_chunks=5)
+            with tracing.span("ingest.chunk", **{"rb.text_chars": len(text)}):
+                chunks = chunk_text(text, size=800, overlap=120)
+                if req.q:
+                    idxs = rank_chunks_by_keywords(req.q, chunks, top_k=3)
+                    selected = [chunks[i] for i in idxs]
+                else:
+                    idxs = list(range(min(len(chunks), 3)))
+                    selected = [chunks[i] for i in idxs]
+
+                first_tail_prev = chunks[0][-20:] if len(chunks) > 0 else ""
+                second_head_prev = chunks[1][:20] if len(chunks) > 1 else ""
+                context, citations = build_context(selected, max_chars=3000, max_chunks=5)
             preview = text[:500]
 
     except httpx.RequestError as e:
@@ -5,6 +5,7 @@ from pypdf import PdfReader
 from io import BytesIO
 import mammoth
 from bs4 import BeautifulSoup
+import logging
 
 
 # constants
@@ -12,6 +13,7 @@ MAX_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(5 * 1024 * 1024)))
 MAX_PAGES = 20
 
 router = APIRouter(prefix="/resume", tags=["resume"])
+logger = logging.getLogger(__name__)
 
 def _is_pdf_header(chunk: bytes) -> bool:
     # PDFs almost always start with %PDF-
@@ -46,13 +48,12 @@ async def extract_resume(file: UploadFile=File(...), request: Request = None):
     filename = file.filename or ""
     filename_lower = filename.lower()
 
-    print(f'Results:\nbyte_size: {byte_size}\ncontent_type: {content_type}\nname: {filename}')
+    logger.debug("resume upload", extra={"byte_size": byte_size, "content_type": content_type, "filename": filename})
 
     # get preview string:
     first_n_bytes = blob[:80]
     first_4_bytes = blob[:4]
     head_preview_text = first_n_bytes.decode('utf-8', errors='ignore')
-    print(f'Decoded text: {head_preview_text}')
 
     is_txt = ("text/plain" in content_type) or filename_lower.endswith(".txt")
     is_pdf = ("pdf" in content_type) or filename_lower.endswith(".pdf") or (first_4_bytes == b"%PDF")
@@ -0,0 +1,22 @@
+# app/services/chat_models.py
+import os
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from app.core.settings import settings
+from app.services.fake_llm import FAKE_LLM_MODEL, FakeChatModel
+
+
+def chat_model(model: str | None = None, *, temperature: float = 0.0) -> BaseChatModel:
+    """
+    The LangChain chat model for LLM_PROVIDER: Gemini (default), or the
+    deterministic fake for offline load tests (LLM_PROVIDER=fake).
+    """
+    if settings.LLM_PROVIDER.strip().lower() == "fake":
+        return FakeChatModel(model=FAKE_LLM_MODEL, temperature=temperature)
+    return ChatGoogleGenerativeAI(
+        model=model or settings.RB_MODEL,
+        temperature=temperature,
+        api_key=settings.GEMINI_API_KEY or os.getenv("GEMINI_API_KEY"),
+    )
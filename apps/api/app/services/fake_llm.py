@@ -0,0 +1,339 @@
+# app/services/fake_llm.py
+"""
+Deterministic fake LLM for offline load tests (LLM_PROVIDER=fake).
+
+FakeChatModel stands in for ChatGoogleGenerativeAI everywhere chat_model()
+builds one: structured output is answered as a tool call, so the existing
+`prompt | llm.with_structured_output(Schema)` chains and the BenderScore
+agent run unchanged. Answers are schema-valid (JobScanResult,
+ResumeScanResult, BulletsDraftResult, FirstImpressionResult, BenderScoreOut
+have dedicated builders; other schemas are filled from their JSON schema)
+and depend only on the prompt, so the same input always gets the same
+answer. generate_text() covers the plain-text REST path.
+
+Timing and failures are drawn from one seeded sequence (FAKE_LLM_SEED):
+
+- FAKE_LLM_LATENCY_MS: median latency per call; FAKE_LLM_LATENCY_SIGMA > 0
+  makes it log-normal around that median (0 = fixed)
+- FAKE_LLM_ERROR_RATE: fraction of calls that fail, as FAKE_LLM_ERRORS
+  weights, e.g. "429=0.7,500=0.2,timeout=0.1"; "timeout" waits
+  FAKE_LLM_TIMEOUT_MS first
+
+Like the real chains, LangChain calls block the calling (event-loop) thread
+for their latency; generate_text() awaits it.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from app.core.settings import settings
+from app.utils.llm_metrics import record_llm_call
+
+FAKE_LLM_MODEL = os.getenv("FAKE_LLM_MODEL", "fake-llm")
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "800"))
+FAKE_LLM_LATENCY_SIGMA = float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.4"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_ERRORS = os.getenv("FAKE_LLM_ERRORS", "429=0.7,500=0.2,timeout=0.1")
+FAKE_LLM_TIMEOUT_MS = float(os.getenv("FAKE_LLM_TIMEOUT_MS", str(settings.LLM_TIMEOUT_MS)))
+
+
+class FakeLLMError(RuntimeError):
+    """An injected provider failure; status_code is the HTTP status a real provider would have sent."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _parse_errors(raw: str) -> List[tuple]:
+    out = []
+    for part in raw.split(","):
+        kind, _, weight = part.strip().partition("=")
+        if kind:
+            out.append((kind.strip(), float(weight or 1)))
+    return out
+
+
+class Behavior:
+    """Seeded latency/error draws, shared by every fake call in the process."""
+
+    def __init__(
+        self,
+        *,
+        seed: int = FAKE_LLM_SEED,
+        latency_ms: float = FAKE_LLM_LATENCY_MS,
+        sigma: float = FAKE_LLM_LATENCY_SIGMA,
+        error_rate: float = FAKE_LLM_ERROR_RATE,
+        errors: str = FAKE_LLM_ERRORS,
+        timeout_ms: float = FAKE_LLM_TIMEOUT_MS,
+    ):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.errors = _parse_errors(errors)
+        self.timeout_ms = timeout_ms
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self) -> tuple:
+        """(seconds to wait, error kind or None) for the next call."""
+        with self._lock:
+            ms = self.latency_ms * (self._rng.lognormvariate(0, self.sigma) if self.sigma > 0 else 1.0)
+            kind = None
+            if self.error_rate > 0 and self.errors and self._rng.random() < self.error_rate:
+                kind = self._rng.choices([k for k, _ in self.errors], [w for _, w in self.errors])[0]
+        if kind == "timeout":
+            ms = self.timeout_ms
+        return ms / 1000, kind
+
+    @staticmethod
+    def fail(kind: str) -> None:
+        if kind == "timeout":
+            raise TimeoutError("fake LLM timed out")
+        status = int(kind) if kind.isdigit() else 500
+        raise FakeLLMError(status, f"fake LLM HTTP {status}")
+
+
+behavior = Behavior()
+
+
+# ---- content ----------------------------------------------------------------------
+
+_SKILLS = (
+    "Python", "SQL", "PostgreSQL", "FastAPI", "Django", "Flask", "Docker", "Kubernetes", "AWS", "GCP", "Azure",
+    "Terraform", "Kafka", "Redis", "React", "TypeScript", "JavaScript", "Go", "Java", "Spark", "Airflow",
+    "BigQuery", "Snowflake", "CI/CD", "GraphQL", "REST APIs", "Linux", "Git", "Pandas", "Machine Learning",
+)
+_VERBS = ("Built", "Led", "Designed", "Shipped", "Reduced", "Automated", "Migrated", "Scaled", "Improved", "Launched")
+_FILLER = ("services", "pipelines", "reliability", "latency", "customers", "teams", "releases", "costs",
+           "dashboards", "workflows", "deployments", "tests", "outages", "features", "data", "quality")
+
+
+def _rng_for(*parts: str) -> random.Random:
+    h = hashlib.sha256("\x00".join((str(FAKE_LLM_SEED), *parts)).encode()).digest()
+    return random.Random(int.from_bytes(h[:8], "big"))
+
+
+def _skills_in(text: str, rng: random.Random, n: int) -> List[str]:
+    low = text.lower()
+    found = [s for s in _SKILLS if re.search(r"(?<!\w)" + re.escape(s.lower()) + r"(?!\w)", low)]
+    rest = [s for s in _SKILLS if s not in found]
+    rng.shuffle(rest)
+    return (found + rest)[:n]
+
+
+def _sentence(rng: random.Random, n_words: int, start: Optional[str] = None) -> str:
+    words = [start or rng.choice(_VERBS)] + [rng.choice(_FILLER) for _ in range(n_words - 1)]
+    return " ".join(words)
+
+
+def _job_scan(text: str, rng: random.Random) -> Dict[str, Any]:
+    skills = _skills_in(text, rng, 12)
+    return {
+        "raw_title": "Software Engineer",
+        "company_name": "Example Co",
+        "location": rng.choice(["Remote", "New York, NY", "San Francisco, CA", "Austin, TX"]),
+        "must_have_skills": skills[:5],
+        "nice_to_have_skills": skills[5:8],
+        "tools_and_tech": skills[8:12],
+        "keywords": skills[:6],
+        "summary_for_candidate": _sentence(rng, 18, "Own") + ". " + _sentence(rng, 14, "Work") + ".",
+    }
+
+
+def _resume_scan(text: str, rng: random.Random) -> Dict[str, Any]:
+    skills = _skills_in(text, rng, 14)
+    return {
+        "candidate_name": "Alex Candidate",
+        "total_years_experience": float(rng.randint(1, 15)),
+        "work_experience_summary": _sentence(rng, 20, "Engineer") + ".",
+        "global_skills": skills[:8],
+        "tools_and_tech": skills[8:14],
+        "keywords": skills[:6],
+        "summary_for_matching": _sentence(rng, 16, "Engineer") + ".",
+    }
+
+
+def _bullets(text: str, rng: random.Random) -> Dict[str, Any]:
+    skills = _skills_in(text, rng, 12)
+    bullets = []
+    for i in range(6):
+        kws = skills[2 * i: 2 * i + rng.randint(1, 2)] or [skills[0]]
+        gap = i == 5 and rng.random() < 0.5
+        body = f"{rng.choice(_VERBS)} {' and '.join(kws)} " + " ".join(rng.choice(_FILLER) for _ in range(rng.randint(12, 16)))
+        bullets.append({
+            "text": ("GAP: " + body) if gap else body,
+            "evidence": f"JD: requires {kws[0]}" if gap else f"Resume: {kws[0]} experience",
+            "keywords": kws,
+            "rationale": _sentence(rng, 10, "Maps"),
+            "transferable": i == 0,
+        })
+    return {"bullets": bullets}
+
+
+def _first_impression(text: str, rng: random.Random) -> Dict[str, Any]:
+    ats, risk = round(rng.uniform(0.3, 0.95), 2), round(rng.uniform(0.3, 0.95), 2)
+    label = "GREEN" if ats >= 0.7 else ("YELLOW" if ats >= 0.45 else "RED")
+    highlights = []
+    for kind, area, importance in (("strength", "skills", "high"), ("concern", "experience", "medium"),
+                                   ("neutral", "clarity", "low")):
+        highlights.append({"kind": kind, "area": area, "title": _sentence(rng, 4, "Solid"),
+                           "detail": _sentence(rng, 16, "The") + ".", "suggested_action": None,
+                           "importance": importance})
+    return {"ats_score": ats, "risk_score": risk, "car_score": None, "label": label,
+            "headline": _sentence(rng, 10, "Candidate") + ".", "quick_summary": _sentence(rng, 30, "Resume") + ".",
+            "highlights": highlights}
+
+
+def _bender_score(text: str, rng: random.Random) -> Dict[str, Any]:
+    subs = {k: round(rng.uniform(40, 95), 1) for k in (
+        "ats_alignment", "experience_fit", "car_quality", "resume_clarity", "company_competitiveness", "risk_adjustment")}
+    weights = (0.30, 0.20, 0.20, 0.10, 0.10, 0.10)
+    final = round(sum(w * v for w, v in zip(weights, subs.values())), 1)
+    return {**subs, "final_bender_score": final, "explanation": _sentence(rng, 30, "Score") + "."}
+
+
+BUILDERS: Dict[str, Callable[[str, random.Random], Dict[str, Any]]] = {
+    "JobScanResult": _job_scan,
+    "ResumeScanResult": _resume_scan,
+    "BulletsDraftResult": _bullets,
+    "FirstImpressionResult": _first_impression,
+    "BenderScoreOut": _bender_score,
+}
+
+
+def _from_json_schema(schema: Dict[str, Any], rng: random.Random, defs: Dict[str, Any]) -> Any:
+    """A value satisfying a (pydantic-generated) JSON schema: required fields, bounds and enums only."""
+    if "$ref" in schema:
+        return _from_json_schema(defs[schema["$ref"].rsplit("/", 1)[-1]], rng, defs)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+            return _from_json_schema(options[0], rng, defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+    t = schema.get("type")
+    if t == "object":
+        props = schema.get("properties") or {}
+        return {k: _from_json_schema(v, rng, defs) for k, v in props.items() if k in schema.get("required", props)}
+    if t == "array":
+        n = max(schema.get("minItems", 2), 1)
+        return [_from_json_schema(schema.get("items") or {"type": "string"}, rng, defs) for _ in range(n)]
+    if t in ("number", "integer"):
+        lo = schema.get("minimum", schema.get("exclusiveMinimum", 0))
+        hi = schema.get("maximum", schema.get("exclusiveMaximum", 1 if "maximum" in schema else 100))
+        v = rng.uniform(lo, hi) if lo < hi else lo
+        return int(v) if t == "integer" else round(v, 2)
+    if t == "boolean":
+        return False
+    return _sentence(rng, 8, "Fake") + "."
+
+
+def tool_args(tool: Dict[str, Any], prompt: str) -> Dict[str, Any]:
+    """Arguments for an OpenAI-format tool, deterministic in (tool name, prompt)."""
+    fn = tool["function"]
+    rng = _rng_for(fn["name"], prompt)
+    builder = BUILDERS.get(fn["name"])
+    if builder is not None:
+        return builder(prompt, rng)
+    params = fn.get("parameters") or {}
+    return _from_json_schema(params, rng, params.get("$defs") or params.get("definitions") or {})
+
+
+def fake_text(prompt: str) -> str:
+    """Plain-text answer: six bullet-style lines."""
+    rng = _rng_for("text", prompt)
+    skills = _skills_in(prompt, rng, 6)
+    return "\n".join(f"- {rng.choice(_VERBS)} {s} " + " ".join(rng.choice(_FILLER) for _ in range(14)) for s in skills)
+
+
+def _tokens(s: str) -> int:
+    return max(1, len(s) // 4)
+
+
+# ---- providers --------------------------------------------------------------------
+
+def _prompt_of(messages: Sequence[BaseMessage]) -> str:
+    return "\n".join(m.content if isinstance(m.content, str) else json.dumps(m.content) for m in messages)
+
+
+class FakeChatModel(BaseChatModel):
+    """LangChain chat model answering from BUILDERS; see the module docstring for knobs."""
+
+    model: str = FAKE_LLM_MODEL
+    temperature: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def bind_tools(self, tools: Sequence[Any], *, tool_choice: Optional[Any] = None, **kwargs: Any):
+        return super().bind(tools=[convert_to_openai_tool(t) for t in tools], tool_choice=tool_choice, **kwargs)
+
+    def _pick_tool(self, tools: List[Dict[str, Any]], messages: Sequence[BaseMessage]) -> Dict[str, Any]:
+        # an agent's tool first (like the real model does), then its structured response
+        answered = any(isinstance(m, ToolMessage) for m in messages)
+        own = [t for t in tools if t["function"]["name"] not in BUILDERS]
+        final = [t for t in tools if t["function"]["name"] in BUILDERS]
+        if own and not answered:
+            return own[0]
+        return (final or tools)[0]
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        *,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        seconds, failure = behavior.draw()
+        time.sleep(seconds)
+        if failure:
+            Behavior.fail(failure)
+        prompt = _prompt_of(messages)
+        if tools:
+            tool = self._pick_tool(tools, messages)
+            args = tool_args(tool, prompt)
+            msg = AIMessage(content="", tool_calls=[{
+                "name": tool["function"]["name"], "args": args, "id": f"call_{uuid.uuid4().hex[:12]}",
+            }])
+            out_len = len(json.dumps(args))
+        else:
+            content = fake_text(prompt)
+            msg = AIMessage(content=content)
+            out_len = len(content)
+        msg.usage_metadata = {"input_tokens": _tokens(prompt), "output_tokens": _tokens("x" * out_len),
+                              "total_tokens": _tokens(prompt) + _tokens("x" * out_len)}
+        msg.response_metadata = {"model_name": self.model}
+        return ChatResult(generations=[ChatGeneration(message=msg)])
+
+
+async def generate_text(prompt: str) -> str:
+    """The fake's generate_text(): same draws, awaited instead of blocking."""
+    seconds, failure = behavior.draw()
+    t0 = time.perf_counter()
+    await asyncio.sleep(seconds)
+    if failure:
+        record_llm_call(FAKE_LLM_MODEL, time.perf_counter() - t0, ok=False)
+        Behavior.fail(failure)
+    text = fake_text(prompt)
+    record_llm_call(FAKE_LLM_MODEL, time.perf_counter() - t0, input_tokens=_tokens(prompt), output_tokens=_tokens(text))
+    return text
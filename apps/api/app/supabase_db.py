@@ -1,9 +1,13 @@
 from __future__ import annotations
-import os, httpx
+import os, httpx, asyncio, time
 from pathlib import Path
 from dotenv import load_dotenv
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional, TypedDict
+from app.utils.user_cache import cached, invalidate_user
+from app.utils import text_store
+from app.core import tracing
+from app.core.metrics import counter, histogram, tally
 
 ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
 load_dotenv(dotenv_path=ENV_PATH)
@@ -17,6 +21,46 @@ HEADERS = {
     "Content-Type": "application/json",
 }
 
+SUPABASE_SECONDS = histogram("rb_supabase_seconds", "Supabase PostgREST round-trip (to response headers).", ("op", "method"))
+SUPABASE_REQUESTS = counter("rb_supabase_requests_total", "Supabase PostgREST requests.", ("op", "method", "status"))
+
+
+def _op(url: httpx.URL) -> str:
+    # "/rest/v1/drafts" -> "drafts", "/rest/v1/rpc/upsert_draft" -> "rpc/upsert_draft"
+    path = url.path.split("/rest/v1/", 1)[-1].strip("/")
+    return "/".join(path.split("/")[:2]) if path.startswith("rpc/") else path.split("/")[0]
+
+
+async def _on_request(request: httpx.Request) -> None:
+    request.extensions["rb_t0"] = time.perf_counter()
+    op = _op(request.url)
+    request.extensions["rb_span"] = tracing.start_span(
+        f"supabase {request.method} {op}", kind=tracing.KIND_CLIENT,
+        attributes={"db.system": "postgresql", "db.operation": op, "http.request.method": request.method},
+    )
+
+
+async def _on_response(response: httpx.Response) -> None:
+    request = response.request
+    op, method = _op(request.url), request.method
+    t0 = request.extensions.get("rb_t0")
+    if t0 is not None:
+        SUPABASE_SECONDS.observe(time.perf_counter() - t0, op=op, method=method)
+    SUPABASE_REQUESTS.inc(op=op, method=method, status=response.status_code)
+    tally("supabase_calls")
+    s = request.extensions.get("rb_span")
+    if s is not None:
+        s.set(**{"http.response.status_code": response.status_code})
+        if response.status_code >= 400:
+            s.status = tracing.STATUS_ERROR
+        s.end()
+
+
+def rest_client(**kw) -> httpx.AsyncClient:
+    """httpx client for PostgREST calls; counts and times every round-trip (rb_supabase_*)."""
+    return httpx.AsyncClient(event_hooks={"request": [_on_request], "response": [_on_response]}, **kw)
+
+
 class PremiumStatus(TypedDict):
     active: bool
     expires_at: Optional[str]
@@ -42,6 +86,7 @@ class Draft(TypedDict):
     cover_letter: NotRequired[str]
     ats_alignment: NotRequired[Dict]
     first_impression: NotRequired[Dict]
+    outputs_version: NotRequired[int]   # see utils/draft_outputs.py
 
 def now_utc() -> datetime:
     return datetime.now(timezone.utc)
@@ -49,7 +94,11 @@ def now_utc() -> datetime:
 async def _rest_get_latest_premium_entitlement(user_id: str) -> Optional[dict]:
     """
     GET /rest/v1/entitlements?user_id=eq.<uid>&kind=eq.premium&select=expires_at&order=expires_at.desc&limit=1
+    (cached briefly, see utils/user_cache.py; status is recomputed from expires_at on every call)
     """
+    return await cached("premium", user_id, lambda: _fetch_latest_premium_entitlement(user_id))
+
+async def _fetch_latest_premium_entitlement(user_id: str) -> Optional[dict]:
     params = {
         "user_id": f"eq.{user_id}",
         "kind": "eq.premium",
@@ -58,7 +107,7 @@ async def _rest_get_latest_premium_entitlement(user_id: str) -> Optional[dict]:
         "limit": "1",
     }
     headers = {**HEADERS, "Accept": "application/json"}
-    async with httpx.AsyncClient(timeout=5) as client:
+    async with rest_client(timeout=5) as client:
         r = await client.get(f"{REST}/entitlements", params=params, headers=headers)
         r.raise_for_status()
         rows = r.json() or []
@@ -66,9 +115,12 @@ async def _rest_get_latest_premium_entitlement(user_id: str) -> Optional[dict]:
 
 async def get_premium_override(user_id: str) -> PremiumStatus:
     row = await _rest_get_latest_premium_entitlement(user_id)
-    if not row or not row.get("expires_at"):
+    return premium_status_from_expiry((row or {}).get("expires_at"))
+
+def premium_status_from_expiry(expires_at: Optional[str]) -> PremiumStatus:
+    if not expires_at:
         return {"active": False, "expires_at": None, "days_left": None}
-    exp = datetime.fromisoformat(row["expires_at"].replace("Z", "+00:00"))
+    exp = datetime.fromisoformat(expires_at.replace("Z", "+00:00"))
     active = exp > now_utc()
     days_left = max(0, (exp - now_utc()).days)
     return {"active": bool(active), "expires_at": exp.isoformat(), "days_left": days_left}
@@ -80,26 +132,83 @@ async def upsert_user(user_id: str, email: str|None=None, name: str|None=None) -
     if name and name.strip():  payload["full_name"] = name.strip()
     params  = {"on_conflict": "id"}
     headers = {**HEADERS, "Prefer": "resolution=merge-duplicates"}
-    async with httpx.AsyncClient(timeout=5) as client:
+    async with rest_client(timeout=5) as client:
         r = await client.post(f"{REST}/users", params=params, headers=headers, json=payload)
         if r.status_code not in (200, 201, 204):
             raise RuntimeError(f"users upsert failed: {r.status_code} {r.text}")
+    await invalidate_user(user_id)
 
 async def get_user_summary(user_id: str) -> dict:
+    return await cached("summary", user_id, lambda: _fetch_user_summary(user_id))
+
+async def _fetch_user_summary(user_id: str) -> dict:
     params = {"id": f"eq.{user_id}", "select": "id,email,plan,free_uses_remaining,unlimited,full_name,created_at"}
     headers = {**HEADERS, "Accept": "application/vnd.pgrst.object+json"}
-    async with httpx.AsyncClient(timeout=5) as client:
+    async with rest_client(timeout=5) as client:
         r = await client.get(f"{REST}/users", params=params, headers=headers)
         if r.status_code == 406:
             return {}
         r.raise_for_status()
         return r.json()
 
+USER_CONTEXT_SELECT = (
+    "id,email,plan,free_uses_remaining,unlimited,full_name,created_at,last_free_refill_at,"
+    "entitlements(kind,expires_at)"
+)
+# flips to False if the users -> entitlements relationship isn't exposed to PostgREST
+_user_context_embed = True
+
+async def get_user_context_row(user_id: str) -> dict:
+    """
+    One round-trip for everything credits/entitlement checks need:
+    GET /rest/v1/users?id=eq.<uid>&select=...,entitlements(kind,expires_at)
+        &entitlements.kind=eq.premium&entitlements.order=expires_at.desc&entitlements.limit=1
+
+    Returns the users row with `premium_expires_at` in place of the embedded
+    entitlements ({} if the user has no row). Falls back to two concurrent
+    requests when the embed isn't available. Cached briefly like get_user_summary.
+    """
+    return await cached("context", user_id, lambda: _fetch_user_context_row(user_id))
+
+async def _fetch_user_context_row(user_id: str) -> dict:
+    global _user_context_embed
+    if _user_context_embed:
+        params = {
+            "id": f"eq.{user_id}",
+            "select": USER_CONTEXT_SELECT,
+            "entitlements.kind": "eq.premium",
+            "entitlements.order": "expires_at.desc",
+            "entitlements.limit": "1",
+        }
+        headers = {**HEADERS, "Accept": "application/vnd.pgrst.object+json"}
+        async with rest_client(timeout=5) as client:
+            r = await client.get(f"{REST}/users", params=params, headers=headers)
+        if r.status_code == 406:
+            return {}
+        if r.status_code == 400 and "PGRST200" in r.text:
+            print("[supabase_db] users->entitlements embed unavailable, falling back to two queries")
+            _user_context_embed = False
+        else:
+            r.raise_for_status()
+            row = r.json() or {}
+            ents = row.pop("entitlements", None) or []
+            row["premium_expires_at"] = ents[0].get("expires_at") if ents else None
+            return row
+
+    summary, ent = await asyncio.gather(
+        _fetch_user_summary(user_id),
+        _fetch_latest_premium_entitlement(user_id),
+    )
+    if not summary:
+        return {}
+    return {**summary, "premium_expires_at": (ent or {}).get("expires_at")}
+
 async def consume_free_use(user_id: str) -> int:
     """Decrement one credit atomically. Return remaining; return -1 if none left (no decrement)."""
     payload = {"uid": user_id}
-    async with httpx.AsyncClient(timeout=5) as client:
+    async with rest_client(timeout=5) as client:
         r = await client.post(f"{REST}/rpc/consume_free_use", headers=HEADERS, json=payload)
+    await invalidate_user(user_id)
 
     if r.status_code != 200:
         raise RuntimeError(f"consume_free_use failed: {r.status_code} {r.text}")
@@ -112,6 +221,42 @@ async def consume_free_use(user_id: str) -> int:
     # null or unexpected → treat as “no decrement”
     return -1
 
+class RefillResult(TypedDict):
+    remaining: int
+    consumed: bool
+    refilled: bool
+    unlimited: bool
+
+async def refill_and_consume(user_id: str, *, daily: int, cap: int, consume: bool = True) -> Optional[RefillResult]:
+    """
+    POST /rest/v1/rpc/refill_and_consume (supabase/migrations/*_refill_and_consume.sql)
+
+    Daily free top-up (if due) and, when `consume`, spend one credit, in one
+    locked transaction. Returns None if the user row doesn't exist.
+    Raises LookupError if the function isn't deployed yet.
+    """
+    payload = {"uid": user_id, "p_daily": int(daily), "p_cap": int(cap), "p_consume": bool(consume)}
+    async with rest_client(timeout=5) as client:
+        r = await client.post(f"{REST}/rpc/refill_and_consume", headers=HEADERS, json=payload)
+    await invalidate_user(user_id)
+
+    if r.status_code == 404:
+        raise LookupError(f"refill_and_consume RPC missing: {r.text[:200]}")
+    if r.status_code != 200:
+        raise RuntimeError(f"refill_and_consume failed: {r.status_code} {r.text}")
+
+    data = r.json()
+    if isinstance(data, dict) and "refill_and_consume" in data:
+        data = data["refill_and_consume"]
+    if not isinstance(data, dict):
+        return None
+    return {
+        "remaining": int(data.get("remaining") or 0),
+        "consumed": bool(data.get("consumed")),
+        "refilled": bool(data.get("refilled")),
+        "unlimited": bool(data.get("unlimited")),
+    }
+
 async def set_plan_and_grant(
     user_id: str,
     plan: str,
@@ -136,11 +281,12 @@ async def set_plan_and_grant(
     params  = {"id": f"eq.{user_id}"}
     headers = {**HEADERS, "Prefer": "return=representation"}
 
-    async with httpx.AsyncClient(timeout=5) as client:
+    async with rest_client(timeout=5) as client:
         r = await client.patch(f"{REST}/users", params=params, headers=headers, json=payload)
-        r.raise_for_status()
-        body = r.json()
-        return body[0] if isinstance(body, list) else body
+    await invalidate_user(user_id)
+    r.raise_for_status()
+    body = r.json()
+    return body[0] if isinstance(body, list) else body
     
 async def upsert_customer(user_id: str, stripe_customer_id: str) -> None:
     """
@@ -149,13 +295,13 @@ async def upsert_customer(user_id: str, stripe_customer_id: str) -> None:
     """
     payload = [{"id": user_id, "stripe_customer_id": stripe_customer_id}]
     headers = {**HEADERS, "Prefer": "resolution=merge-duplicates"}
-    async with httpx.AsyncClient(timeout=5) as client:
+    async with rest_client(timeout=5) as client:
         r = await client.post(f"{REST}/customers", headers=headers, json=payload)
         r.raise_for_status()
 
 async def get_stripe_customer_id(user_id: str) -> str | None:
     params = {"id": f"eq.{user_id}", "select": "stripe_customer_id"}
-    async with httpx.AsyncClient(timeout=5) as client:
+    async with rest_client(timeout=5) as client:
         r = await client.get(f"{REST}/customers", params=params, headers=HEADERS)
         r.raise_for_status()
         rows = r.json()
@@ -163,27 +309,100 @@ async def get_stripe_customer_id(user_id: str) -> str | None:
 
 async def get_user_id_by_customer(stripe_customer_id: str) -> str | None:
     params = {"stripe_customer_id": f"eq.{stripe_customer_id}", "select": "id"}
-    async with httpx.AsyncClient(timeout=5) as client:
+    async with rest_client(timeout=5) as client:
         r = await client.get(f"{REST}/customers", params=params, headers=HEADERS)
         r.raise_for_status()
         rows = r.json()
         return rows[0]["id"] if rows else None
 
-async def insert_webhook_event_once(eid: str, etype: str) -> bool:
+SUBSCRIPTION_SUMMARY_COLUMNS = (
+    "has_subscription,subscription_id,status,price_id,plan_key,plan,cancel_at_period_end,current_period_end,source_created"
+)
+# flips to False if the subscription_summaries migration isn't deployed
+_subscription_summaries_table = True
+
+async def get_subscription_summary_row(user_id: str) -> Optional[dict]:
+    """Materialized subscription summary (None if no row yet, or the table isn't deployed)."""
+    global _subscription_summaries_table
+    if not _subscription_summaries_table:
+        return None
+    params = {"user_id": f"eq.{user_id}", "select": SUBSCRIPTION_SUMMARY_COLUMNS, "limit": "1"}
+    async with rest_client(timeout=5) as client:
+        r = await client.get(f"{REST}/subscription_summaries", params=params, headers=HEADERS)
+        if r.status_code == 404:
+            print("[supabase_db] subscription_summaries missing; serving subscription summaries from Stripe")
+            _subscription_summaries_table = False
+            return None
+        r.raise_for_status()
+        rows = r.json()
+        return rows[0] if rows else None
+
+async def upsert_subscription_summary(row: dict) -> bool:
     """
-    Try to insert the event id once. Returns True if inserted (first time),
-    False if it already existed.
+    Store a summary unless a newer one (by source_created) is already there;
+    see supabase/migrations/*_subscription_summaries.sql. Returns True if written.
     """
-    headers = {**HEADERS, "Prefer": "resolution=ignore-duplicates"}
-    params  = {"on_conflict": "id"}
-    payload = [{"id": eid, "type": etype}]
-    async with httpx.AsyncClient(timeout=5) as client:
-        r = await client.post(f"{REST}/webhook_events", params=params, headers=headers, json=payload)
-        if r.status_code in (201, 204):
-            # 201 -> inserted; 204 -> ignored duplicate (depending on config)
-            return r.status_code == 201
-        r.raise_for_status()
+    if not _subscription_summaries_table:
         return False
+    async with rest_client(timeout=5) as client:
+        r = await client.post(f"{REST}/rpc/upsert_subscription_summary", headers=HEADERS, json={"p": row})
+        r.raise_for_status()
+        written = bool(r.json())
+    await invalidate_user(row.get("user_id"))
+    return written
+
+def _event_customer(event: dict) -> Optional[str]:
+    obj = (event.get("data") or {}).get("object") or {}
+    if obj.get("object") == "customer":
+        return obj.get("id")
+    cust = obj.get("customer")
+    return cust.get("id") if isinstance(cust, dict) else cust
+
+async def enqueue_webhook_event(event: dict) -> bool:
+    """
+    Store a verified Stripe event for the webhook workers (see
+    supabase/migrations/*_webhook_queue.sql). Returns False for a duplicate.
+    """
+    row = {
+        "id": event["id"],
+        "type": event.get("type"),
+        "payload": event,
+        "customer_id": _event_customer(event),
+        "event_created": event.get("created"),
+    }
+    headers = {**HEADERS, "Prefer": "resolution=ignore-duplicates,return=representation"}
+    async with rest_client(timeout=5) as client:
+        r = await client.post(
+            f"{REST}/webhook_events", params={"on_conflict": "id", "select": "id"}, headers=headers, json=[row]
+        )
+        r.raise_for_status()
+        return bool(r.json())
+
+async def claim_webhook_events(limit: int = 1, lease_sec: int = 60) -> list[dict]:
+    """Lease due events, oldest first, at most one open event per customer."""
+    async with rest_client(timeout=10) as client:
+        r = await client.post(
+            f"{REST}/rpc/claim_webhook_events", headers=HEADERS, json={"p_limit": limit, "p_lease_sec": lease_sec}
+        )
+        r.raise_for_status()
+        return r.json() or []
+
+async def finish_webhook_event(event_id: str, status: str, *, error: Optional[str] = None, retry_in: float = 0) -> None:
+    """status: "done", "dead", or "pending" to retry after `retry_in` seconds."""
+    body = {"p_id": event_id, "p_status": status, "p_error": error, "p_retry_in_sec": retry_in}
+    async with rest_client(timeout=10) as client:
+        r = await client.post(f"{REST}/rpc/finish_webhook_event", headers=HEADERS, json=body)
+        r.raise_for_status()
+
+async def grant_credits_once(event_id: str, user_id: str, delta: int) -> Optional[int]:
+    """Add `delta` credits for a payment event at most once. Returns the new balance, or None if already granted."""
+    body = {"p_event_id": event_id, "p_user_id": user_id, "p_delta": int(delta)}
+    async with rest_client(timeout=5) as client:
+        r = await client.post(f"{REST}/rpc/grant_credits_once", headers=HEADERS, json=body)
+    await invalidate_user(user_id)
+    r.raise_for_status()
+    total = r.json()
+    return None if total is None else int(total)
 
 async def set_remaining_and_mark_refill(user_id: str, remaining: int) -> dict:
     """
@@ -196,11 +415,12 @@ async def set_remaining_and_mark_refill(user_id: str, remaining: int) -> dict:
     }
     params  = {"id": f"eq.{user_id}"}
     headers = {**HEADERS, "Prefer": "return=representation"}
-    async with httpx.AsyncClient(timeout=5) as client:
+    async with rest_client(timeout=5) as client:
         r = await client.patch(f"{REST}/users", params=params, headers=headers, json=payload)
-        r.raise_for_status()
-        j = r.json()
-        return j[0] if isinstance(j, list) else j
+    await invalidate_user(user_id)
+    r.raise_for_status()
+    j = r.json()
+    return j[0] if isinstance(j, list) else j
 
 async def ensure_user_identity(user_id: str, email: str | None = None, name: str | None = None) -> None:
     """
@@ -209,7 +429,7 @@ async def ensure_user_identity(user_id: str, email: str | None = None, name: str
     - If row exists: PATCH only email/name if they changed
     Never touches plan/unlimited/credits.
     """
-    snap = await get_user_summary(user_id) or {}
+    snap = await _fetch_user_summary(user_id) or {}
 
     if not snap:
         # create minimal row
@@ -220,9 +440,10 @@ async def ensure_user_identity(user_id: str, email: str | None = None, name: str
             payload[0]["full_name"] = name
 
         headers = {**HEADERS, "Prefer": "resolution=merge-duplicates"}
-        async with httpx.AsyncClient(timeout=5) as client:
+        async with rest_client(timeout=5) as client:
             r = await client.post(f"{REST}/users", headers=headers, json=payload)
             r.raise_for_status()
+        await invalidate_user(user_id)
         return
 
     # already exists → update identity fields only if changed
@@ -235,9 +456,10 @@ async def ensure_user_identity(user_id: str, email: str | None = None, name: str
     if patch:
         params  = {"id": f"eq.{user_id}"}
         headers = {**HEADERS, "Prefer": "return=representation"}
-        async with httpx.AsyncClient(timeout=5) as client:
+        async with rest_client(timeout=5) as client:
             r = await client.patch(f"{REST}/users", params=params, headers=headers, json=patch)
             r.raise_for_status()
+        await invalidate_user(user_id)
 
 # at bottom of supabase_db.py
 
@@ -267,7 +489,7 @@ async def insert_analytics_event(
     }
 
     headers = {**HEADERS, "Prefer": "resolution=ignore-duplicates"}
-    async with httpx.AsyncClient(timeout=5) as client:
+    async with rest_client(timeout=5) as client:
         r = await client.post(f"{REST}/analytics_events", headers=headers, json=[row])
 
     if r.status_code in (201, 204):
@@ -277,9 +499,40 @@ async def insert_analytics_event(
         print("insert_analytics_event error:", r.status_code, r.text[:200])
         return False
 
+async def insert_analytics_events(rows: list[dict[str, Any]]) -> int:
+    """
+    Bulk insert into analytics_events in one POST. Rows must all have the same
+    keys (see utils/analytics_buffer.analytics_row). Duplicates on
+    client_event_id are ignored. Returns the number of rows actually inserted;
+    raises on HTTP errors so the caller can retry.
+    """
+    if not rows:
+        return 0
+    params = {"on_conflict": "client_event_id", "select": "id"}
+    headers = {**HEADERS, "Prefer": "resolution=ignore-duplicates,return=representation"}
+    async with rest_client(timeout=10) as client:
+        r = await client.post(f"{REST}/analytics_events", params=params, headers=headers, json=rows)
+    r.raise_for_status()
+    inserted = r.json() if r.content else []
+    return len(inserted) if isinstance(inserted, list) else 0
+
+async def add_llm_usage(batch_id: str, rows: list[dict[str, Any]]) -> int:
+    """
+    Add daily LLM usage sums (see utils/llm_usage.py) onto llm_usage_daily in
+    one RPC. A batch_id that was already applied is ignored. Returns rows applied.
+    """
+    if not rows:
+        return 0
+    async with rest_client(timeout=10) as client:
+        r = await client.post(
+            f"{REST}/rpc/add_llm_usage", headers=HEADERS, json={"p_batch_id": batch_id, "p_rows": rows}
+        )
+    r.raise_for_status()
+    return int(r.json() or 0)
+
 async def referrer_exists(code: str) -> bool:
     params = {"code": f"eq.{code}", "select": "code", "limit": "1"}
-    async with httpx.AsyncClient(timeout=5) as client:
+    async with rest_client(timeout=5) as client:
         r = await client.get(f"{REST}/referrers", params=params, headers=HEADERS)
         r.raise_for_status()
         rows = r.json() or []
@@ -293,53 +546,10 @@ async def insert_referral_click(*, code: str, click_id: str, ip: str, ua: str) -
         "ua": ua,
         "created_at": datetime.now(timezone.utc).isoformat()
     }]
-    async with httpx.AsyncClient(timeout=5) as client:
+    async with rest_client(timeout=5) as client:
         r = await client.post(f"{REST}/referrals", headers=HEADERS, json=payload)
         r.raise_for_status()
 
-async def create_draft(draft: Draft) -> Dict[str, Any]:
-    """
-    Insert a new draft into public.drafts.
-    Returns the created row representation.
-    """
-    headers = {**HEADERS, "Prefer": "return=representation"} 
-    # Ensure user_id is set
-    if not draft.get("user_id"):
-        raise ValueError("create_draft requires user_id")
-
-    payload = {
-        "user_id": draft["user_id"],
-        "resume_text": draft["resume_text"],
-        "job_description_text": draft["job_description_text"],
-        "job_description_context": draft.get("job_description_context") or "",
-        "outputs_json": draft["outputs_json"],
-        "model_version": draft["model_version"],
-        "company_name": draft.get("company_name"),
-        "job_title": draft.get("job_title"),
-        "job_link": draft.get("job_link"),
-        "resume_label": draft.get("resume_label"),
-        "bender_score": draft.get("bender_score"),
-        "resume_bullets": draft.get("resume_bullets"),
-        "interview_points": draft.get("interview_points"),
-        "cover_letter": draft.get("cover_letter"),
-        "ats_alignment": draft.get("ats_alignment"),
-        "first_impression": draft.get("first_impression"),
-        "bender_score_data": draft.get("bender_score_data"),
-    }
-    
-    if draft.get("client_ref_id"):
-        payload["client_ref_id"] = draft["client_ref_id"]
-    if draft.get("bender_score") is not None:
-        payload["bender_score"] = str(draft["bender_score"])
-
-
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.post(f"{REST}/drafts", headers=headers, json=payload)
-
-        r.raise_for_status()
-        rows = r.json()
-        return rows[0] if rows else {}
-
 async def get_drafts(user_id: str, limit: int = 50) -> list[Dict[str, Any]]:
     params = {
         "user_id": f"eq.{user_id}",
@@ -347,12 +557,53 @@ async def get_drafts(user_id: str, limit: int = 50) -> list[Dict[str, Any]]:
         "order": "created_at.desc",
         "limit": str(limit),
     }
-    async with httpx.AsyncClient(timeout=10) as client:
+    async with rest_client(timeout=10) as client:
         r = await client.get(f"{REST}/drafts", params=params, headers=HEADERS)
         r.raise_for_status()
         return r.json() or []
 
 
+DRAFT_SUMMARY_COLUMNS = "id,client_ref_id,created_at,job_title,company_name,job_link,resume_label,bender_score,model_version"
+# flips to False if the draft_summaries view (supabase/migrations) isn't deployed
+_draft_summaries_view = True
+
+def _pgrst_quote(v: str) -> str:
+    return '"' + str(v).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+async def get_draft_summaries(
+    user_id: str,
+    limit: int = 50,
+    after: Optional[tuple[str, str]] = None,
+) -> list[Dict[str, Any]]:
+    """
+    History list page: summary columns + `tasks` only, newest first, keyset
+    paginated on (created_at, id). `after` is the (created_at, id) of the last
+    row of the previous page.
+    """
+    global _draft_summaries_view
+    params = {
+        "user_id": f"eq.{user_id}",
+        "order": "created_at.desc,id.desc",
+        "limit": str(limit),
+    }
+    if after:
+        ts, last_id = (_pgrst_quote(v) for v in after)
+        params["or"] = f"(created_at.lt.{ts},and(created_at.eq.{ts},id.lt.{last_id}))"
+
+    async with rest_client(timeout=10) as client:
+        if _draft_summaries_view:
+            r = await client.get(
+                f"{REST}/draft_summaries", params={**params, "select": f"{DRAFT_SUMMARY_COLUMNS},tasks"}, headers=HEADERS
+            )
+            if r.status_code != 404:
+                r.raise_for_status()
+                return r.json() or []
+            print("[supabase_db] draft_summaries view missing; listing drafts without task flags")
+            _draft_summaries_view = False
+        r = await client.get(f"{REST}/drafts", params={**params, "select": DRAFT_SUMMARY_COLUMNS}, headers=HEADERS)
+        r.raise_for_status()
+        return r.json() or []
+
 async def get_draft_by_id(draft_id: str, user_id: str) -> Optional[Dict[str, Any]]:
     """
     Fetch a single draft by its primary key (UUID), enforcing user ownership.
@@ -363,74 +614,152 @@ async def get_draft_by_id(draft_id: str, user_id: str) -> Optional[Dict[str, Any
         "select": "*",
         "limit": "1",
     }
-    async with httpx.AsyncClient(timeout=10) as client:
+    async with rest_client(timeout=10) as client:
         r = await client.get(f"{REST}/drafts", params=params, headers=HEADERS)
         r.raise_for_status()
         rows = r.json()
         return rows[0] if rows else None
 
+# structured columns a later task may overwrite (only when it carries a value)
+_DRAFT_TASK_COLUMNS = (
+    "resume_bullets", "interview_points", "cover_letter", "ats_alignment", "first_impression", "bender_score_data",
+)
+
+# None until an upsert_draft response shows whether the text_blobs migration is deployed
+_text_blobs_deployed: Optional[bool] = None
+_TEXT_COLUMNS = (("resume_text", "resume_hash"), ("job_description_text", "jd_hash"))
+
+def _with_text_refs(payload: Dict[str, Any], *, resend: bool = False) -> tuple[Dict[str, Any], list[str]]:
+    """
+    Replace resume/JD text with content hashes (utils/text_store.py), adding a
+    compressed blob for texts this process hasn't stored yet. While it's unknown
+    whether the database has text_blobs, the text also stays inline.
+    Returns (payload, hashes of the blobs sent).
+    """
+    if _text_blobs_deployed is False or not text_store.enabled():
+        return payload, []
+    out, blobs = dict(payload), []
+    for col, hash_col in _TEXT_COLUMNS:
+        text = payload.get(col)
+        if not text:
+            continue
+        h, blob = text_store.prepare(text, resend=resend or not _text_blobs_deployed)
+        out[hash_col] = h
+        if blob:
+            blobs.append(blob)
+        if _text_blobs_deployed:
+            out[col] = None
+    if blobs:
+        out["blobs"] = blobs
+    return out, [b["hash"] for b in blobs]
+
 async def continue_draft(draft: Draft) -> Dict[str, Any]:
     """
-    Upsert logic:
-    1. Check for existing draft by PK (client_ref_id).
-    2. If found, merge outputs_json + update specific columns via PATCH.
-    3. If not found, CREATE.
+    Upsert by client_ref_id in one atomic call (POST /rest/v1/rpc/upsert_draft,
+    see supabase/migrations/*_upsert_draft.sql):
+    - first task for a ref inserts the row;
+    - later tasks merge outputs_json server-side (jsonb ||) and overwrite only
+      the structured columns they carry.
+    Resume/JD text is sent as a content hash once stored (*_text_blobs.sql).
+    Returns the stored row.
     """
+    global _text_blobs_deployed
     ref_id = draft.get("client_ref_id")
     user_id = draft.get("user_id")
-
     if not ref_id or not user_id:
-        return await create_draft(draft)
+        raise ValueError("continue_draft requires user_id and client_ref_id")
 
-    # 1. Search by PK
+    payload: Dict[str, Any] = {
+        "user_id": user_id,
+        "client_ref_id": ref_id,
+        "resume_text": draft.get("resume_text"),
+        "job_description_text": draft.get("job_description_text"),
+        "job_description_context": draft.get("job_description_context") or "",
+        "outputs_json": draft.get("outputs_json") or {},
+        "model_version": draft.get("model_version"),
+        "company_name": draft.get("company_name"),
+        "job_title": draft.get("job_title"),
+        "job_link": draft.get("job_link"),
+        "resume_label": draft.get("resume_label"),
+        "outputs_version": draft.get("outputs_version") or 0,
+    }
+    for col in _DRAFT_TASK_COLUMNS:
+        if draft.get(col):
+            payload[col] = draft[col]
+    if draft.get("bender_score") is not None:
+        payload["bender_score"] = str(draft["bender_score"])
 
+    body, sent = _with_text_refs(payload)
+    async with rest_client(timeout=10) as client:
+        r = await client.post(f"{REST}/rpc/upsert_draft", headers=HEADERS, json={"p": body})
+        if r.status_code == 409 and "23503" in r.text:
+            # a blob we thought was stored is gone (released after a delete): resend everything
+            text_store.forget_stored()
+            body, sent = _with_text_refs(payload, resend=True)
+            r = await client.post(f"{REST}/rpc/upsert_draft", headers=HEADERS, json={"p": body})
+        r.raise_for_status()
+        row = r.json()
+    row = (row[0] if row else {}) if isinstance(row, list) else (row or {})
+    if _text_blobs_deployed is None and text_store.enabled() and row:
+        _text_blobs_deployed = "resume_hash" in row
+    if _text_blobs_deployed:
+        text_store.mark_stored(sent)
+    return row
+
+async def get_texts(hashes: list[str]) -> Dict[str, str]:
+    """hash -> text for text_blobs rows (process-cached)."""
+    found = {h: t for h in hashes if (t := text_store.cached_text(h)) is not None}
+    missing = [h for h in hashes if h not in found]
+    if missing:
+        params = {"hash": f"in.({','.join(missing)})", "select": "hash,zstd"}
+        async with rest_client(timeout=10) as client:
+            r = await client.get(f"{REST}/text_blobs", params=params, headers=HEADERS)
+            r.raise_for_status()
+            rows = r.json() or []
+        for b in rows:
+            raw = b["zstd"]  # PostgREST renders bytea as "\x<hex>"
+            text = text_store.decompress(bytes.fromhex(raw[2:] if raw.startswith("\\x") else raw))
+            text_store.cache_text(b["hash"], text)
+            found[b["hash"]] = text
+    return found
+
+async def hydrate_draft_texts(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill resume_text / job_description_text from text_blobs for rows that only carry hashes."""
+    need = {hash_col: col for col, hash_col in _TEXT_COLUMNS if row.get(hash_col) and not row.get(col)}
+    if not need:
+        return row
+    if not text_store.enabled():
+        print("[supabase_db] draft text is stored compressed but `zstandard` is not installed")
+        return row
+    texts = await get_texts([row[h] for h in need])
+    return {**row, **{col: texts.get(row[hash_col]) for hash_col, col in need.items()}}
+
+async def release_text_blobs(hashes: list[str]) -> int:
+    """Delete these blobs if no draft references them any more. Returns how many were removed."""
+    hashes = [h for h in hashes if h]
+    if not hashes:
+        return 0
+    async with rest_client(timeout=10) as client:
+        r = await client.post(f"{REST}/rpc/release_text_blobs", headers=HEADERS, json={"p_hashes": hashes})
+        r.raise_for_status()
+        return int(r.json() or 0)
+
+async def get_unnormalized_drafts(version: int, limit: int = 200, after_id: Optional[str] = None) -> list[Dict[str, Any]]:
+    """Drafts with outputs_version below `version`, by id (for utils/draft_outputs migrate_drafts)."""
     params = {
-        "client_ref_id": f"eq.{ref_id}",
-        "select": "client_ref_id, outputs_json", # Limit columns for speed
-        "limit": "1"
+        "outputs_version": f"lt.{version}",
+        "select": f"id,outputs_version,outputs_json,{','.join(_DRAFT_TASK_COLUMNS)}",
+        "order": "id.asc",
+        "limit": str(limit),
     }
-    async with httpx.AsyncClient(timeout=10) as client:
+    if after_id:
+        params["id"] = f"gt.{after_id}"
+    async with rest_client(timeout=30) as client:
         r = await client.get(f"{REST}/drafts", params=params, headers=HEADERS)
-        if r.status_code != 200:
-            # surface an error so the caller can decide.
-            r.raise_for_status()
-        rows = r.json()
-    
-    if rows:
-
-        # 2. Update existing
-        existing_row = rows[0]
-        
-        old_json = existing_row.get("outputs_json") or {}
-        new_json = draft.get("outputs_json") or {}
-        
-        merged_json = {**old_json, **new_json}
-        
-        patch_payload = {
-            "outputs_json": merged_json
-        }
-        
-        # Add updated structured columns if present
-        if draft.get("resume_bullets"): patch_payload["resume_bullets"] = draft["resume_bullets"]
-        if draft.get("interview_points"): patch_payload["interview_points"] = draft["interview_points"]
-        if draft.get("cover_letter"): patch_payload["cover_letter"] = draft["cover_letter"]
-        if draft.get("ats_alignment"): patch_payload["ats_alignment"] = draft["ats_alignment"]
-        if draft.get("first_impression"): patch_payload["first_impression"] = draft["first_impression"]
-        if draft.get("bender_score_data"): patch_payload["bender_score_data"] = draft["bender_score_data"]
-        
-        if draft.get("bender_score") is not None:
-             patch_payload["bender_score"] = str(draft["bender_score"])
-
-        # Patch by PK
-        params = {"client_ref_id": f"eq.{ref_id}"}
-        headers = {**HEADERS, "Prefer": "return=representation"}
-        async with httpx.AsyncClient(timeout=10) as client:
-            r = await client.patch(f"{REST}/drafts", params=params, headers=headers, json=patch_payload)
+        r.raise_for_status()
+        return r.json() or []
 
-            r.raise_for_status()
-            updated_rows = r.json()
-            return updated_rows[0] if updated_rows else {}
-            
-    else:
-        # 3. No existing row found: do NOT create a new row implicitly; return an error
-        raise ValueError(f"No draft found for client_ref_id={ref_id}")
+async def patch_draft(draft_id: str, fields: Dict[str, Any]) -> None:
+    async with rest_client(timeout=10) as client:
+        r = await client.patch(f"{REST}/drafts", params={"id": f"eq.{draft_id}"}, headers=HEADERS, json=fields)
+        r.raise_for_status()
@@ -0,0 +1,170 @@
+# app/utils/analytics_buffer.py
+"""
+Buffered analytics writer.
+
+Events are collected in memory and written as one bulk insert every
+ANALYTICS_BATCH_SIZE events or ANALYTICS_FLUSH_MS milliseconds, whichever
+comes first. Batches go through the background persistence queue
+(utils/persist_queue.py) for retries.
+
+- Backpressure: at most ANALYTICS_BUFFER_MAX buffered events, and only while
+  the persistence queue has room for the batches they'll make; add() reports
+  "dropped" otherwise so HTTP callers can answer 429.
+- Dedupe: events whose client_event_id was seen recently are skipped here, and
+  the bulk insert ignores duplicates on analytics_events.client_event_id. A
+  batch the persistence queue drops anyway forgets its ids, so retries go in.
+"""
+import asyncio
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from cachetools import TTLCache
+
+from app import supabase_db
+from app.core.metrics import counters, incr
+from app.utils import persist_queue as pq
+
+ANALYTICS_BATCH_SIZE = int(os.getenv("ANALYTICS_BATCH_SIZE", "50"))
+ANALYTICS_FLUSH_MS = int(os.getenv("ANALYTICS_FLUSH_MS", "1000"))
+ANALYTICS_BUFFER_MAX = int(os.getenv("ANALYTICS_BUFFER_MAX", "5000"))
+ANALYTICS_DEDUPE_TTL_SEC = int(os.getenv("ANALYTICS_DEDUPE_TTL_SEC", "3600"))
+
+QUEUED, DUPLICATE, DROPPED = "queued", "duplicate", "dropped"
+
+_ROW_KEYS = ("name", "props", "path", "anon_id", "user_id", "ip", "ua", "client_event_id")
+
+
+def analytics_row(
+    name: str,
+    props: Optional[Dict[str, Any]] = None,
+    *,
+    user_id: Optional[str] = None,
+    anon_id: Optional[str] = None,
+    path: Optional[str] = None,
+    ip: Optional[str] = None,
+    ua: Optional[str] = None,
+    client_event_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Same arguments as supabase_db.insert_analytics_event; every row has every column (bulk insert needs that)."""
+    return {
+        "name": name,
+        "props": props or {},
+        "path": path,
+        "anon_id": anon_id,
+        "user_id": user_id,
+        "ip": ip,
+        "ua": ua,
+        "client_event_id": client_event_id,
+    }
+
+
+class AnalyticsBuffer:
+    def __init__(
+        self,
+        *,
+        batch_size: int = ANALYTICS_BATCH_SIZE,
+        flush_ms: int = ANALYTICS_FLUSH_MS,
+        max_buffered: int = ANALYTICS_BUFFER_MAX,
+        dedupe_ttl: int = ANALYTICS_DEDUPE_TTL_SEC,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_ms = max(1, flush_ms)
+        self.max_buffered = max(1, max_buffered)
+        self._rows: List[Dict[str, Any]] = []
+        self._seen: TTLCache = TTLCache(maxsize=100_000, ttl=dedupe_ttl)
+        self._lock = threading.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, row: Dict[str, Any]) -> str:
+        """Buffer one event row (see analytics_row). Returns QUEUED, DUPLICATE or DROPPED; never raises."""
+        cid = row.get("client_event_id")
+        with self._lock:
+            if cid and cid in self._seen:
+                incr("analytics_duplicates")
+                return DUPLICATE
+            if not self._has_room(1):
+                incr("analytics_dropped")
+                return DROPPED
+            if cid:
+                self._seen[cid] = True
+            self._rows.append({k: row.get(k) for k in _ROW_KEYS})
+            full = len(self._rows) >= self.batch_size
+        incr("analytics_buffered")
+        self._schedule(immediate=full)
+        return QUEUED
+
+    def _has_room(self, n: int) -> bool:
+        rows = len(self._rows) + n
+        batches = -(-rows // self.batch_size)
+        return rows <= self.max_buffered and pq.persist_queue.has_room(batches)
+
+    def has_room(self, n: int = 1) -> bool:
+        return self._has_room(n)
+
+    def _schedule(self, *, immediate: bool) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop (scripts/tests): flush() explicitly
+        if immediate:
+            self.flush()
+            return
+        if self._timer is None or self._timer.done() or self._loop is not loop:
+            self._loop = loop
+            self._timer = loop.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_ms / 1000)
+        self.flush()
+
+    def flush(self) -> int:
+        """Hand everything buffered to the persistence queue as bulk-insert batches. Returns events flushed."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+        for i in range(0, len(rows), self.batch_size):
+            batch = rows[i:i + self.batch_size]
+            if pq.persist_queue.submit("analytics_batch", {"rows": batch}, droppable=True):
+                incr("analytics_batches")
+            else:
+                incr("analytics_dropped", len(batch))
+                with self._lock:  # never written: let the client's retry through
+                    for row in batch:
+                        self._seen.pop(row.get("client_event_id"), None)
+        return len(rows)
+
+    def stats(self) -> dict:
+        c = counters()
+        return {
+            "buffered": len(self._rows),
+            "max_buffered": self.max_buffered,
+            "batch_size": self.batch_size,
+            "flush_ms": self.flush_ms,
+            "accepted": int(c.get("analytics_buffered", 0.0)),
+            "batches": int(c.get("analytics_batches", 0.0)),
+            "duplicates": int(c.get("analytics_duplicates", 0.0)),
+            "dropped": int(c.get("analytics_dropped", 0.0)),
+        }
+
+
+analytics_buffer = AnalyticsBuffer()
+
+
+def capture_event(name: str, props: Optional[Dict[str, Any]] = None, **kw: Any) -> str:
+    """Fire-and-forget: buffer one analytics event (same keywords as analytics_row)."""
+    try:
+        return analytics_buffer.add(analytics_row(name, props, **kw))
+    except Exception as e:
+        print(f"[analytics] capture failed: {e!r}")
+        return DROPPED
+
+
+async def _write_batch(payload: Dict[str, Any]) -> None:
+    await supabase_db.insert_analytics_events(payload["rows"])
+
+
+pq.register("analytics_batch", _write_batch)
@@ -1,20 +1,22 @@
 # app/utils/credits.py
 import os
-from datetime import datetime, timezone
-from app.supabase_db import get_user_summary, set_remaining_and_mark_refill
+from datetime import date, datetime, timezone
+from app.supabase_db import get_user_summary, set_remaining_and_mark_refill, consume_free_use, refill_and_consume
 
 DAILY_FREE_CREDITS = int(os.getenv("DAILY_FREE_CREDITS", "3"))
 FREE_ROLLOVER_CAP  = int(os.getenv("FREE_ROLLOVER_CAP", "20"))
 
-async def ensure_daily_free_topup(user_id: str) -> int:
+# False once we've seen the refill_and_consume RPC is missing (migration not applied yet)
+_rpc_available = True
+
+def _refill_target(snap: dict, today: date | None = None) -> int | None:
     """
     Free plan only (non-unlimited):
     - Once per UTC day, ADD DAILY_FREE_CREDITS, but CAP at FREE_ROLLOVER_CAP.
     - Never decrease the balance.
-    - Do NOT stamp last_free_refill_at unless we actually add credits.
-    Returns the (possibly updated) remaining credits.
+    Returns the new balance if a top-up is due, else None.
+    Mirrors public.refill_and_consume (supabase/migrations).
     """
-    snap = await get_user_summary(user_id) or {}
     plan = (snap.get("plan") or "free").lower()
     unlimited = bool(snap.get("unlimited"))
     remaining = int(snap.get("free_uses_remaining") or 0)
@@ -22,34 +24,101 @@ async def ensure_daily_free_topup(user_id: str) -> int:
 
     # Skip for unlimited plans or non-free plans
     if unlimited or plan != "free":
-        return remaining
+        return None
 
     # Already at/above cap → nothing to do, don't stamp
     if remaining >= FREE_ROLLOVER_CAP:
-        return remaining
+        return None
 
     # Parse last refill; if already refilled today, do nothing
     last_date = None
     if isinstance(last, str) and last:
         try:
             last_dt = datetime.fromisoformat(last.replace("Z", "+00:00"))
-            last_date = last_dt.date()
+            last_date = last_dt.astimezone(timezone.utc).date()
         except Exception:
             last_date = None
 
-    today = datetime.now(timezone.utc).date()
+    today = today or datetime.now(timezone.utc).date()
     if last_date == today:
-        return remaining
+        return None
 
     # Additive top-up, capped
     new_remaining = min(remaining + DAILY_FREE_CREDITS, FREE_ROLLOVER_CAP)
-    if new_remaining == remaining:
-        # No change (e.g., DAILY_FREE_CREDITS==0) → don't stamp
+    # No change (e.g., DAILY_FREE_CREDITS==0) → don't stamp
+    return new_remaining if new_remaining != remaining else None
+
+def credits_after_refill(snap: dict) -> int:
+    """Balance the user will have once any due top-up is applied (read-only preview for pre-checks)."""
+    target = _refill_target(snap)
+    return target if target is not None else int(snap.get("free_uses_remaining") or 0)
+
+async def _rpc(user_id: str, consume: bool):
+    global _rpc_available
+    if not _rpc_available:
+        return None
+    try:
+        return await refill_and_consume(user_id, daily=DAILY_FREE_CREDITS, cap=FREE_ROLLOVER_CAP, consume=consume)
+    except LookupError as e:
+        print(f"[credits] WARNING: {e}; using the non-atomic top-up path")
+        _rpc_available = False
+        return None
+
+def _sync_snap(snap: dict | None, res) -> None:
+    if snap is None or not res:
+        return
+    snap["free_uses_remaining"] = res["remaining"]
+    if res["refilled"]:
+        snap["last_free_refill_at"] = datetime.now(timezone.utc).isoformat()
+
+async def ensure_daily_free_topup(user_id: str, snap: dict | None = None) -> int:
+    """
+    Apply the daily free top-up if it's due (see _refill_target).
+    Do NOT stamp last_free_refill_at unless we actually add credits.
+    Returns the (possibly updated) remaining credits.
+
+    Pass `snap` (e.g. UserContext.user, which includes last_free_refill_at) to
+    skip the pre-read when nothing is due; it is updated in place.
+    """
+    if snap is not None and _refill_target(snap) is None:
+        return int(snap.get("free_uses_remaining") or 0)
+
+    res = await _rpc(user_id, consume=False)
+    if res is not None:
+        _sync_snap(snap, res)
+        return res["remaining"]
+
+    # Fallback: read -> compute -> PATCH (not atomic across concurrent requests)
+    if snap is None:
+        snap = await get_user_summary(user_id) or {}
+    remaining = int(snap.get("free_uses_remaining") or 0)
+    new_remaining = _refill_target(snap)
+    if new_remaining is None:
         return remaining
 
     # Persist balance and stamp last_free_refill_at
     updated = await set_remaining_and_mark_refill(user_id, new_remaining)
     try:
-        return int(updated.get("free_uses_remaining") or new_remaining)
+        new_remaining = int(updated.get("free_uses_remaining") or new_remaining)
     except Exception:
-        return new_remaining
+        pass
+    _sync_snap(snap, {"remaining": new_remaining, "refilled": True})
+    return new_remaining
+
+async def spend_credit(user_id: str, snap: dict | None = None) -> int:
+    """
+    Top up if due and consume one credit atomically.
+    Returns the remaining balance, or -1 if there was nothing to spend.
+    """
+    res = await _rpc(user_id, consume=True)
+    if res is not None:
+        _sync_snap(snap, res)
+        if res["unlimited"]:
+            return res["remaining"]
+        return res["remaining"] if res["consumed"] else -1
+
+    await ensure_daily_free_topup(user_id, snap=snap)
+    remaining = await consume_free_use(user_id)
+    if remaining >= 0:
+        _sync_snap(snap, {"remaining": remaining, "refilled": False})
+    return remaining
@@ -0,0 +1,183 @@
+# app/utils/draft_outputs.py
+"""
+Write-time normalization of draft task outputs.
+
+The typed columns on public.drafts (resume_bullets, interview_points,
+cover_letter, ats_alignment, bender_score_data, first_impression) used to hold
+whatever the task returned: markdown-fenced JSON strings, wrapper objects with
+the real JSON under "bullets", or parsed objects. /history/{id} then guessed
+the shape on every read.
+
+normalize_draft_outputs() does that parsing once, when the draft is written,
+and stamps the row with OUTPUTS_VERSION. Rows at that version are returned
+as-is by the history endpoints. outputs_json keeps the raw task outputs.
+
+Rows written before this existed have outputs_version 0; convert them with
+the one-off command:
+
+    python -m app.utils.draft_outputs [--dry-run] [--batch 200]
+"""
+import json
+import re
+from typing import Any, Callable, Dict, Optional
+
+from app import supabase_db
+
+# bump when the normalized shape of any typed column changes
+OUTPUTS_VERSION = 1
+
+_FENCE = re.compile(r"```[\w]*\s*\n(.*?)```", re.DOTALL)
+
+
+def extract_json_from_markdown(s: str) -> Any:
+    """Extract JSON from markdown code blocks like ```json\n{...}\n```, or a bare JSON string."""
+    if not isinstance(s, str):
+        return None
+    m = _FENCE.search(s)
+    if m:
+        try:
+            return json.loads(m.group(1).strip())
+        except ValueError:
+            pass
+    try:
+        return json.loads(s)
+    except ValueError:
+        return None
+
+
+def _as_json(val: Any) -> Any:
+    """Parsed JSON for strings that hold JSON; anything else unchanged."""
+    if isinstance(val, str):
+        parsed = extract_json_from_markdown(val)
+        if parsed is not None:
+            return parsed
+    return val
+
+
+def _has_any(*keys: str) -> Callable[[Any], bool]:
+    return lambda v: isinstance(v, dict) and any(k in v for k in keys)
+
+
+def _has_all(*keys: str) -> Callable[[Any], bool]:
+    return lambda v: isinstance(v, dict) and all(k in v for k in keys)
+
+
+_is_playbook = _has_any("strengths", "gaps", "interview_questions")
+_is_cover_letter = _has_all("subject", "body_paragraphs")
+_is_alignment = _has_all("summary", "coverage")
+
+
+def _match(val: Any, looks_like: Callable[[Any], bool]) -> Any:
+    """The payload in val (itself, or JSON under a "bullets" wrapper) if it passes looks_like, else None."""
+    val = _as_json(val)
+    if looks_like(val):
+        return val
+    if isinstance(val, dict) and isinstance(val.get("bullets"), str):
+        inner = _as_json(val["bullets"])
+        if looks_like(inner):
+            return inner
+    return None
+
+
+def _unwrapped(val: Any) -> Any:
+    """Parsed value, unwrapping a {"bullets": "<json>"} wrapper when its JSON parses."""
+    val = _as_json(val)
+    if isinstance(val, dict) and isinstance(val.get("bullets"), str):
+        inner = _as_json(val["bullets"])
+        if inner is not val["bullets"]:
+            return inner
+    return val
+
+
+# column -> (outputs_json keys to fall back on, shape check or None for "any parsed value")
+_COLUMNS: Dict[str, tuple[tuple[str, ...], Optional[Callable[[Any], bool]]]] = {
+    "interview_points": (("talking_points", "bullets"), _is_playbook),
+    "cover_letter": (("cover_letter", "bullets"), _is_cover_letter),
+    "ats_alignment": (("alignment", "ats_alignment"), _is_alignment),
+    "resume_bullets": (("bullets",), None),
+    "bender_score_data": (("bender_score_data",), None),
+    "first_impression": (("first_impression",), None),
+}
+
+
+def normalize_draft_outputs(draft: Dict[str, Any], *, from_outputs: bool = True) -> Dict[str, Any]:
+    """
+    Typed column values for a drafts row or write payload, plus outputs_version.
+
+    Each column is taken from the row itself, or else from its outputs_json
+    keys. Shaped columns (interview points, cover letter, alignment) only take
+    values that look like that output; a legacy outputs_json["bullets"] holding
+    a cover letter or playbook goes to that column, not to resume_bullets.
+    Columns with nothing to store are left out of the result.
+
+    from_outputs=False skips the outputs_json fallback; new writes already put
+    each task's output in its column.
+    """
+    outputs = (draft.get("outputs_json") or {}) if from_outputs else {}
+    if not isinstance(outputs, dict):
+        outputs = {}
+    claimed: set[str] = set()  # outputs_json keys already used by a shaped column
+    out: Dict[str, Any] = {}
+
+    for col, (keys, looks_like) in _COLUMNS.items():
+        current = draft.get(col)
+        if looks_like is None:
+            value = _unwrapped(current) if current else None
+            if not value:
+                value = next((_unwrapped(outputs[k]) for k in keys if outputs.get(k) and k not in claimed), None)
+        else:
+            value = _match(current, looks_like) if current else None
+            if value is None:
+                for k in keys:
+                    if outputs.get(k):
+                        value = _match(outputs[k], looks_like)
+                        if value is not None:
+                            claimed.add(k)
+                            break
+            if value is None and current:
+                value = current  # unrecognized shape: keep what was stored
+        if value:
+            out[col] = value
+
+    out["outputs_version"] = OUTPUTS_VERSION
+    return out
+
+
+def is_normalized(draft: Dict[str, Any]) -> bool:
+    return (draft.get("outputs_version") or 0) >= OUTPUTS_VERSION
+
+
+async def migrate_drafts(*, batch: int = 200, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Normalize every row below OUTPUTS_VERSION, one keyset page at a time. Only changed columns are patched.
+    "normalized" counts rows patched; a dry run patches nothing and reports "would_patch" instead.
+    """
+    stats = {"scanned": 0, "would_patch": 0} if dry_run else {"scanned": 0, "normalized": 0}
+    after = None
+    while True:
+        rows = await supabase_db.get_unnormalized_drafts(OUTPUTS_VERSION, limit=batch, after_id=after)
+        if not rows:
+            return stats
+        for row in rows:
+            stats["scanned"] += 1
+            changes = {k: v for k, v in normalize_draft_outputs(row).items() if row.get(k) != v}
+            if not changes:
+                continue
+            if dry_run:
+                stats["would_patch"] += 1
+                continue
+            await supabase_db.patch_draft(row["id"], changes)
+            stats["normalized"] += 1
+        after = rows[-1]["id"]
+        print(f"[draft_outputs] {stats['scanned']} scanned")
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    ap = argparse.ArgumentParser(description="Normalize stored draft outputs to OUTPUTS_VERSION.")
+    ap.add_argument("--batch", type=int, default=200)
+    ap.add_argument("--dry-run", action="store_true")
+    args = ap.parse_args()
+    print(asyncio.run(migrate_drafts(batch=args.batch, dry_run=args.dry_run)))
@@ -1,7 +1,21 @@
+import logging
 import os
+import time
+from typing import Optional, Tuple
+
 import httpx
 
-PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()
+from app.core import tracing
+from app.core.settings import settings
+from app.services import fake_llm
+from app.utils.llm_metrics import record_llm_call
+from app.utils.llm_router import Generate, LLMRouter, Provider, ProviderError, retry_after, served_by
+
+log = logging.getLogger(__name__)
+
+PROVIDER = settings.LLM_PROVIDER.strip().lower()
+# preference order for generate_text(); see utils/llm_router.py
+LLM_PROVIDERS = [p.strip().lower() for p in os.getenv("LLM_PROVIDERS", PROVIDER).split(",") if p.strip()]
 
 def _extract_text(data: dict) -> str:
     try:
@@ -10,6 +24,45 @@ def _extract_text(data: dict) -> str:
     except Exception:
         return ""
 
+def _http_client(timeout: float) -> httpx.AsyncClient:
+    return httpx.AsyncClient(timeout=timeout)
+
+async def _post_json(
+    label: str, model: str, url: str, payload: dict, headers: dict, *,
+    key_env: str, usage_keys: Tuple[str, str, str], timeout: float,
+) -> dict:
+    """POST one generation request; failures raise ProviderError (status, Retry-After) for the router.
+
+    usage_keys is (usage object, input tokens key, output tokens key); an empty
+    usage object means the counts sit at the top level of the response (ollama).
+    """
+    usage_field, in_key, out_key = usage_keys
+    with tracing.span(f"llm {model}", kind=tracing.KIND_CLIENT, **{"gen_ai.request.model": model}) as sp:
+        t0 = time.perf_counter()
+        async with _http_client(timeout) as client:
+            try:
+                r = await client.post(url, json=payload, headers=headers)
+                r.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                record_llm_call(model, time.perf_counter() - t0, ok=False)
+                status = e.response.status_code
+                body = e.response.text
+                if status in (401, 403):
+                    raise ProviderError(f"{label} auth error: check {key_env}", status_code=status) from e
+                if status == 429:
+                    raise ProviderError(f"{label} rate limit or quota exceeded", status_code=429,
+                                        retry_after=retry_after(e.response)) from e
+                raise ProviderError(f"{label.lower()} HTTP {status}: {body.strip()}", status_code=status) from e
+            except httpx.RequestError as e:
+                record_llm_call(model, time.perf_counter() - t0, ok=False)
+                raise ProviderError(f"{label.lower()} request error: {e}") from e
+
+        data = r.json()
+        usage = (data.get(usage_field) if usage_field else data) or {}
+        record_llm_call(model, time.perf_counter() - t0, input_tokens=usage.get(in_key), output_tokens=usage.get(out_key))
+        sp.set(**{"gen_ai.usage.input_tokens": usage.get(in_key), "gen_ai.usage.output_tokens": usage.get(out_key)})
+    return data
+
 async def _gen_gemini(prompt: str, timeout: float = 60.0) -> str:
     api_key = os.getenv("GEMINI_API_KEY")
     model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
@@ -31,24 +84,68 @@ async def _gen_gemini(prompt: str, timeout: float = 60.0) -> str:
     # (0 disables thinking; omit this block to use default-on) :contentReference[oaicite:1]{index=1}
     payload["generationConfig"] = {"thinkingConfig": {"thinkingBudget": thinking_budget}}
 
-    async with httpx.AsyncClient(timeout=timeout) as client:
+    data = await _post_json("Gemini", model, url, payload, headers, key_env="GEMINI_API_KEY",
+                            usage_keys=("usageMetadata", "promptTokenCount", "candidatesTokenCount"), timeout=timeout)
+    return _extract_text(data)
+
+# OpenAI-compatible chat completions (OpenAI, Groq): name -> (label, key env, base url, default model)
+_OPENAI_COMPAT = {
+    "openai": ("OpenAI", "OPENAI_API_KEY", "https://api.openai.com/v1", "gpt-4o-mini"),
+    "groq": ("Groq", "GROQ_API_KEY", "https://api.groq.com/openai/v1", "llama-3.1-8b-instant"),
+}
+
+def _openai_compat(name: str) -> Tuple[str, Generate]:
+    label, key_env, default_base, default_model = _OPENAI_COMPAT[name]
+    model = os.getenv(f"{name.upper()}_MODEL") or default_model
+    base = (os.getenv(f"{name.upper()}_BASE_URL") or default_base).rstrip("/")
+
+    async def gen(prompt: str, timeout: float = 60.0) -> str:
+        api_key = os.getenv(key_env)
+        if not api_key:
+            raise RuntimeError(f"{key_env} not set")
+        payload = {"model": model, "messages": [{"role": "user", "content": prompt}], "temperature": 0}
+        headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
+        data = await _post_json(label, model, f"{base}/chat/completions", payload, headers, key_env=key_env,
+                                usage_keys=("usage", "prompt_tokens", "completion_tokens"), timeout=timeout)
         try:
-            r = await client.post(url, json=payload, headers=headers)
-            r.raise_for_status()
-        except httpx.HTTPStatusError as e:
-            status = e.response.status_code if e.response else "?"
-            body = e.response.text if e.response is not None else ""
-            if status in (401, 403):
-                raise RuntimeError("Gemini auth error: check GEMINI_API_KEY") from e
-            if status == 429:
-                raise RuntimeError("Gemini rate limit or quota exceeded") from e
-            raise RuntimeError(f"gemini HTTP {status}: {body.strip()}") from e
-        except httpx.RequestError as e:
-            raise RuntimeError(f"gemini request error: {e}") from e
-
-    return _extract_text(r.json())
+            return (data["choices"][0]["message"]["content"] or "").strip()
+        except (KeyError, IndexError, TypeError):
+            return ""
+
+    return model, gen
+
+def _ollama() -> Tuple[str, Generate]:
+    model = os.getenv("OLLAMA_MODEL") or "llama3.1"
+    host = (os.getenv("OLLAMA_HOST") or "http://localhost:11434").rstrip("/")
+
+    async def gen(prompt: str, timeout: float = 120.0) -> str:
+        payload = {"model": model, "prompt": prompt, "stream": False, "options": {"temperature": 0}}
+        data = await _post_json("Ollama", model, f"{host}/api/generate", payload, {"Content-Type": "application/json"},
+                                key_env="OLLAMA_HOST", usage_keys=("", "prompt_eval_count", "eval_count"),
+                                timeout=timeout)
+        return (data.get("response") or "").strip()
+
+    return model, gen
+
+def _provider(name: str) -> Optional[Provider]:
+    if name == "gemini":
+        return Provider(name, os.getenv("GEMINI_MODEL", "gemini-2.5-flash"), _gen_gemini)
+    if name in _OPENAI_COMPAT:
+        return Provider(name, *_openai_compat(name))
+    if name == "ollama":
+        return Provider(name, *_ollama())
+    if name == "fake":
+        return Provider(name, fake_llm.FAKE_LLM_MODEL, fake_llm.generate_text)
+    log.warning("unknown LLM provider %r in LLM_PROVIDERS; skipped", name)
+    return None
+
+router = LLMRouter([p for p in map(_provider, LLM_PROVIDERS) if p is not None])
+
+def llm_served_by() -> Optional[Tuple[str, str]]:
+    """(provider, model) that answered the last generate_text() in this request, if any."""
+    return served_by.get()
 
 async def generate_text(prompt: str) -> str:
-    if PROVIDER != "gemini":
+    if not router.providers:
         raise RuntimeError(f"LLM_PROVIDER={PROVIDER} not implemented yet. Set LLM_PROVIDER=gemini.")
-    return await _gen_gemini(prompt)
+    return await router.generate(prompt)
@@ -0,0 +1,114 @@
+# app/utils/llm_metrics.py
+"""
+Per-call LLM metrics: calls, latency and tokens by model.
+
+LangChain calls (every `prompt | llm.with_structured_output(...)` chain) are
+observed by a callback handler installed process-wide through LangChain's
+configure hook, so no call site has to pass callbacks. Direct REST calls
+(utils/llm.generate_text) report through record_llm_call().
+
+Stage timing (scan_job, generate, repair, ...) is separate: call sites wrap
+their chain in core.metrics.llm_stage().
+
+Successful calls' token counts are also accounted per request, user, stage
+and model by utils/llm_usage.py.
+"""
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.tracers.context import register_configure_hook
+
+from app.core import tracing
+from app.core.metrics import counter, histogram, tally
+from app.utils import llm_usage
+
+LLM_CALLS = counter("rb_llm_calls_total", "LLM calls.", ("model", "status"))
+LLM_CALL_SECONDS = histogram("rb_llm_call_seconds", "LLM call latency.", ("model",))
+LLM_TOKENS = counter("rb_llm_tokens_total", "LLM tokens.", ("model", "kind"))
+
+
+def record_llm_call(
+    model: str,
+    seconds: float,
+    *,
+    input_tokens: Optional[int] = None,
+    output_tokens: Optional[int] = None,
+    ok: bool = True,
+) -> None:
+    model = model or "unknown"
+    LLM_CALLS.inc(model=model, status="ok" if ok else "error")
+    LLM_CALL_SECONDS.observe(seconds, model=model)
+    if input_tokens:
+        LLM_TOKENS.inc(input_tokens, model=model, kind="input")
+    if output_tokens:
+        LLM_TOKENS.inc(output_tokens, model=model, kind="output")
+    tally("llm_calls")
+    if ok:
+        llm_usage.record(model, input_tokens, output_tokens)
+
+
+def _usage(response: LLMResult) -> Dict[str, int]:
+    for gens in response.generations:
+        for g in gens:
+            usage = getattr(getattr(g, "message", None), "usage_metadata", None)
+            if usage:
+                return usage
+    return (response.llm_output or {}).get("usage_metadata") or {}
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Times LLM runs by run_id and records them on end/error."""
+
+    def __init__(self):
+        self._runs: Dict[UUID, tuple] = {}
+
+    def _start(self, run_id: UUID, serialized: Optional[dict], kwargs: Dict[str, Any]) -> None:
+        meta = kwargs.get("metadata") or {}
+        params = kwargs.get("invocation_params") or {}
+        model = meta.get("ls_model_name") or params.get("model") or params.get("model_name") \
+            or ((serialized or {}).get("kwargs") or {}).get("model") or "unknown"
+        model = str(model).removeprefix("models/")
+        s = tracing.start_span(f"llm {model}", kind=tracing.KIND_CLIENT, attributes={"gen_ai.request.model": model})
+        self._runs[run_id] = (model, time.perf_counter(), s)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, serialized, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, serialized, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        model, t0, s = self._runs.pop(run_id, ("unknown", time.perf_counter(), tracing.NOOP))
+        usage = _usage(response)
+        s.set(**{
+            "gen_ai.usage.input_tokens": usage.get("input_tokens"),
+            "gen_ai.usage.output_tokens": usage.get("output_tokens"),
+        })
+        s.end()
+        record_llm_call(
+            model, time.perf_counter() - t0,
+            input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens"),
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        model, t0, s = self._runs.pop(run_id, ("unknown", time.perf_counter(), tracing.NOOP))
+        s.error(error)
+        s.end()
+        record_llm_call(model, time.perf_counter() - t0, ok=False)
+
+
+_handler_var: Optional[ContextVar] = None
+
+
+def install_langchain_metrics() -> None:
+    """Observe every LangChain LLM call in this process (idempotent)."""
+    global _handler_var
+    if _handler_var is not None:
+        return
+    # the handler is the var's default, so it applies in every context/thread
+    _handler_var = ContextVar("rb_llm_metrics", default=LLMMetricsHandler())
+    register_configure_hook(_handler_var, inheritable=True)
@@ -0,0 +1,223 @@
+# app/utils/llm_router.py
+"""
+Latency-aware routing of generate_text() across LLM providers.
+
+LLMRouter holds one Provider per entry of LLM_PROVIDERS (in preference
+order; default: just LLM_PROVIDER) and keeps each one's rolling latency and
+error rate over its last LLM_ROUTER_WINDOW calls. A request goes to the
+first available provider, and:
+
+- hedges: with LLM_HEDGE=1, if it hasn't answered by that provider's p95
+  latency (at least LLM_HEDGE_MIN_MS), the next provider is asked too and
+  the first answer wins; the other call is cancelled
+- fails over: a 429, 5xx, timeout or connection error moves on to the next
+  provider; other errors (400, 401, ...) are raised as they are
+- cools down: after a 429 (for its Retry-After, else LLM_ROUTER_COOLDOWN_SEC),
+  or while its rolling error rate is at least LLM_ROUTER_MAX_ERROR_RATE, a
+  provider is skipped unless no other is available
+
+Rolling p95 and error rate only count once a provider has
+LLM_ROUTER_MIN_SAMPLES calls behind them.
+
+Providers are async callables `prompt -> text` raising ProviderError (or
+anything with a `status_code`) on HTTP failures, so tests and load runs can
+route between local stand-ins. GET /health/llm shows the router's view.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core.metrics import counter, gauge
+
+LLM_ROUTER_WINDOW = int(os.getenv("LLM_ROUTER_WINDOW", "200"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_MIN_MS = float(os.getenv("LLM_HEDGE_MIN_MS", "500"))
+LLM_ROUTER_MIN_SAMPLES = int(os.getenv("LLM_ROUTER_MIN_SAMPLES", "20"))
+LLM_ROUTER_COOLDOWN_SEC = float(os.getenv("LLM_ROUTER_COOLDOWN_SEC", "30"))
+LLM_ROUTER_MAX_ERROR_RATE = float(os.getenv("LLM_ROUTER_MAX_ERROR_RATE", "0.5"))
+
+ROUTER_EVENTS = counter(
+    "rb_llm_router_events_total", "LLM router outcomes: win, error, hedge, failover, cooldown.", ("provider", "event")
+)
+PROVIDER_P95 = gauge("rb_llm_provider_p95_seconds", "Rolling p95 latency of successful calls.", ("provider",))
+
+Generate = Callable[[str], Awaitable[str]]
+
+
+class ProviderError(RuntimeError):
+    """An LLM provider's HTTP failure; status_code is None for transport errors."""
+
+    def __init__(self, message: str, *, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def retryable(exc: BaseException) -> bool:
+    """Worth trying another provider: 429, 5xx, timeouts and connection errors."""
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    if isinstance(exc, ProviderError) and status is None:
+        return True
+    return status == 429 or (isinstance(status, int) and status >= 500)
+
+
+def retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers.get("retry-after", ""))
+    except ValueError:
+        return None
+
+
+class RollingStats:
+    """Latency of the last `window` successes and outcome of the last `window` calls."""
+
+    def __init__(self, window: int = LLM_ROUTER_WINDOW):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+
+    def ok(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+        self.outcomes.append(True)
+
+    def error(self) -> None:
+        self.outcomes.append(False)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        s = sorted(self.latencies)
+        return s[min(len(s) - 1, int(q * len(s)))]
+
+    @property
+    def error_rate(self) -> float:
+        return (self.outcomes.count(False) / len(self.outcomes)) if self.outcomes else 0.0
+
+
+class Provider:
+    def __init__(self, name: str, model: str, generate: Generate, *, window: int = LLM_ROUTER_WINDOW):
+        self.name = name
+        self.model = model
+        self.generate = generate
+        self.stats = RollingStats(window)
+        self.cooldown_until = 0.0
+
+    def available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def snapshot(self) -> dict:
+        p50, p95 = self.stats.quantile(0.5), self.stats.quantile(0.95)
+        return {
+            "model": self.model,
+            "samples": len(self.stats.outcomes),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "error_rate": round(self.stats.error_rate, 3),
+            "cooling_down_sec": round(max(0.0, self.cooldown_until - time.monotonic()), 1),
+        }
+
+
+# (provider name, model) that answered the last generate() in this context
+served_by: ContextVar[Optional[Tuple[str, str]]] = ContextVar("llm_served_by", default=None)
+
+
+class LLMRouter:
+    def __init__(
+        self,
+        providers: List[Provider],
+        *,
+        hedge: bool = LLM_HEDGE,
+        hedge_min_ms: float = LLM_HEDGE_MIN_MS,
+        min_samples: int = LLM_ROUTER_MIN_SAMPLES,
+        cooldown_sec: float = LLM_ROUTER_COOLDOWN_SEC,
+        max_error_rate: float = LLM_ROUTER_MAX_ERROR_RATE,
+    ):
+        self.providers = providers
+        self.hedge = hedge
+        self.hedge_min = hedge_min_ms / 1000
+        self.min_samples = min_samples
+        self.cooldown_sec = cooldown_sec
+        self.max_error_rate = max_error_rate
+
+    def _order(self) -> List[Provider]:
+        now = time.monotonic()
+        ready = [p for p in self.providers if p.available(now)]
+        return ready or list(self.providers)
+
+    def hedge_delay(self, p: Provider) -> Optional[float]:
+        if not self.hedge or len(p.stats.latencies) < self.min_samples:
+            return None
+        return max(self.hedge_min, p.stats.quantile(0.95))
+
+    async def _call(self, p: Provider, prompt: str) -> str:
+        t0 = time.perf_counter()
+        try:
+            text = await p.generate(prompt)
+        except asyncio.CancelledError:
+            raise  # the losing side of a hedge: not the provider's fault
+        except Exception as e:
+            p.stats.error()
+            ROUTER_EVENTS.inc(provider=p.name, event="error")
+            status = getattr(e, "status_code", None)
+            if status == 429 or (retryable(e) and len(p.stats.outcomes) >= self.min_samples
+                                 and p.stats.error_rate >= self.max_error_rate):
+                p.cooldown_until = time.monotonic() + (getattr(e, "retry_after", None) or self.cooldown_sec)
+                ROUTER_EVENTS.inc(provider=p.name, event="cooldown")
+            raise
+        p.stats.ok(time.perf_counter() - t0)
+        PROVIDER_P95.set(p.stats.quantile(0.95), provider=p.name)
+        return text
+
+    async def generate(self, prompt: str) -> str:
+        queue = self._order()
+        if not queue:
+            raise ProviderError("no LLM providers configured", status_code=503)
+        pending: Dict[asyncio.Task, Provider] = {}
+
+        def launch() -> Provider:
+            p = queue.pop(0)
+            pending[asyncio.ensure_future(self._call(p, prompt))] = p
+            return p
+
+        hedge_at = self.hedge_delay(launch())
+        hedged = False
+        started = time.perf_counter()
+        last_exc: Optional[BaseException] = None
+        try:
+            while pending:
+                timeout = None
+                if hedge_at is not None and not hedged and queue:
+                    timeout = max(0.0, hedge_at - (time.perf_counter() - started))
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    ROUTER_EVENTS.inc(provider=launch().name, event="hedge")
+                    continue
+                for t in done:
+                    p = pending.pop(t)
+                    exc = t.exception()
+                    if exc is None:
+                        ROUTER_EVENTS.inc(provider=p.name, event="win")
+                        served_by.set((p.name, p.model))
+                        return t.result()
+                    last_exc = exc
+                    if not retryable(exc):
+                        raise exc
+                if not pending and queue:
+                    ROUTER_EVENTS.inc(provider=launch().name, event="failover")
+            raise last_exc
+        finally:
+            for t in pending:
+                t.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "hedge": self.hedge,
+            "providers": {p.name: p.snapshot() for p in self.providers},
+        }
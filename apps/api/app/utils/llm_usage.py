@@ -0,0 +1,215 @@
+# app/utils/llm_usage.py
+"""
+LLM token and cost accounting.
+
+Every LLM response's token counts reach record() (from utils/llm_metrics.py,
+for LangChain chains and generate_text alike) and are attributed to:
+
+- the request: track() opens a RequestUsage around a draft run; its summary()
+  is returned as meta.usage
+- the LLM stage that made the call (core.metrics.llm_stage: scan_job,
+  generate, repair, bender_score, ...), the draft task and the user
+- the model, priced from LLM_PRICES (USD per million input/output tokens)
+
+Closed RequestUsages are summed in memory per (day, user, task, stage, model)
+and flushed every LLM_USAGE_FLUSH_SEC as one add_llm_usage() RPC through the
+persist queue, so the database sees one small upsert per flush rather than a
+write per LLM call.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app import supabase_db
+from app.core.metrics import counter, counters, current_llm_stage, incr
+from app.utils import persist_queue as pq
+
+log = logging.getLogger(__name__)
+
+# USD per 1M tokens (input, output); the longest matching model-name prefix wins
+DEFAULT_PRICES: Dict[str, Tuple[float, float]] = {
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+}
+LLM_USAGE_FLUSH_SEC = float(os.getenv("LLM_USAGE_FLUSH_SEC", "60"))
+
+
+def _load_prices() -> Dict[str, Tuple[float, float]]:
+    prices = dict(DEFAULT_PRICES)
+    raw = os.getenv("LLM_PRICES", "").strip()
+    if raw:
+        try:
+            prices.update({k: (float(v[0]), float(v[1])) for k, v in json.loads(raw).items()})
+        except (ValueError, TypeError, IndexError, AttributeError) as e:
+            log.warning("ignoring invalid LLM_PRICES: %r", e)
+    return prices
+
+
+PRICES = _load_prices()
+
+LLM_COST = counter("rb_llm_cost_usd_total", "Estimated LLM spend in USD.", ("model", "stage"))
+
+
+def cost_usd(model: str, input_tokens: int, output_tokens: int) -> float:
+    """Estimated cost of one call; 0.0 for models without a price."""
+    best = max((p for p in PRICES if model.startswith(p)), key=len, default=None)
+    if best is None:
+        return 0.0
+    p_in, p_out = PRICES[best]
+    return (input_tokens * p_in + output_tokens * p_out) / 1_000_000
+
+
+class RequestUsage:
+    """Token/cost totals of one request, by stage and model."""
+
+    def __init__(self, *, user_id: Optional[str] = None, task: str = "other"):
+        self.user_id = user_id
+        self.task = task
+        # (stage, model) -> [calls, input_tokens, output_tokens, cost_usd]
+        self.lines: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, model: str, input_tokens: int, output_tokens: int, cost: float) -> None:
+        with self._lock:
+            line = self.lines.setdefault((stage, model), [0, 0, 0, 0.0])
+            line[0] += 1
+            line[1] += input_tokens
+            line[2] += output_tokens
+            line[3] += cost
+
+    def summary(self) -> Dict[str, Any]:
+        total = [0, 0, 0, 0.0]
+        by_stage: Dict[str, Dict[str, Any]] = {}
+        by_model: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            lines = list(self.lines.items())
+        for (stage, model), line in lines:
+            for bucket in (by_stage.setdefault(stage, {}), by_model.setdefault(model, {})):
+                for k, v in zip(_FIELDS, line):
+                    bucket[k] = bucket.get(k, 0) + v
+            total = [a + b for a, b in zip(total, line)]
+        out = dict(zip(_FIELDS, total))
+        for part in (out, *by_stage.values(), *by_model.values()):
+            part["cost_usd"] = round(part["cost_usd"], 6)
+        return {**out, "by_stage": by_stage, "by_model": by_model}
+
+
+_FIELDS = ("calls", "input_tokens", "output_tokens", "cost_usd")
+
+_current: ContextVar[Optional[RequestUsage]] = ContextVar("llm_usage", default=None)
+
+
+def record(model: str, input_tokens: Optional[int], output_tokens: Optional[int]) -> None:
+    """Account one LLM response to the current request (if tracked) and the spend counter."""
+    tin, tout = int(input_tokens or 0), int(output_tokens or 0)
+    stage = current_llm_stage.get() or "other"
+    cost = cost_usd(model, tin, tout)
+    if cost:
+        LLM_COST.inc(cost, model=model, stage=stage)
+    usage = _current.get()
+    if usage is not None:
+        usage.add(stage, model, tin, tout, cost)
+
+
+@contextmanager
+def track(*, user_id: Optional[str] = None, task: str = "other") -> Iterator[RequestUsage]:
+    """Collect the LLM usage of the block; on exit (error or not) it is added to the daily rollup."""
+    usage = RequestUsage(user_id=user_id, task=task)
+    token = _current.set(usage)
+    try:
+        yield usage
+    finally:
+        _current.reset(token)
+        usage_rollup.add(usage)
+
+
+class UsageRollup:
+    """In-memory daily sums, flushed to llm_usage_daily every `flush_sec`."""
+
+    def __init__(self, *, flush_sec: float = LLM_USAGE_FLUSH_SEC):
+        self.flush_sec = max(0.01, flush_sec)
+        # (day, user_id, task, stage, model) -> [calls, input_tokens, output_tokens, cost_usd]
+        self._sums: Dict[Tuple[str, Optional[str], str, str, str], list] = {}
+        self._lock = threading.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __len__(self) -> int:
+        return len(self._sums)
+
+    def add(self, usage: RequestUsage) -> None:
+        if not usage.lines:
+            return
+        day = datetime.now(timezone.utc).date().isoformat()
+        with self._lock, usage._lock:
+            for (stage, model), line in usage.lines.items():
+                acc = self._sums.setdefault((day, usage.user_id, usage.task, stage, model), [0, 0, 0, 0.0])
+                for i, v in enumerate(line):
+                    acc[i] += v
+        self._schedule()
+
+    def _schedule(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop (scripts/tests): flush() explicitly
+        if self._timer is None or self._timer.done() or self._loop is not loop:
+            self._loop = loop
+            self._timer = loop.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_sec)
+        self.flush()
+
+    def rows(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [_row(k, v) for k, v in self._sums.items()]
+
+    def flush(self) -> int:
+        """Hand the sums to the persist queue as one batch. Returns rows flushed."""
+        with self._lock:
+            sums, self._sums = self._sums, {}
+        if not sums:
+            return 0
+        rows = [_row(k, v) for k, v in sums.items()]
+        pq.persist_queue.submit("llm_usage", {"batch_id": uuid.uuid4().hex, "rows": rows})
+        incr("llm_usage_flushes")
+        incr("llm_usage_rows", len(rows))
+        return len(rows)
+
+    def stats(self) -> dict:
+        c = counters()
+        return {
+            "pending_rows": len(self._sums),
+            "flush_sec": self.flush_sec,
+            "flushes": int(c.get("llm_usage_flushes", 0.0)),
+            "rows": int(c.get("llm_usage_rows", 0.0)),
+        }
+
+
+def _row(key: Tuple[str, Optional[str], str, str, str], v: list) -> Dict[str, Any]:
+    day, user_id, task, stage, model = key
+    return {
+        "day": day, "user_id": user_id, "task": task, "stage": stage, "model": model,
+        "calls": v[0], "input_tokens": v[1], "output_tokens": v[2], "cost_usd": round(v[3], 6),
+    }
+
+
+usage_rollup = UsageRollup()
+
+
+async def _write_usage(payload: Dict[str, Any]) -> None:
+    await supabase_db.add_llm_usage(payload["batch_id"], payload["rows"])
+
+
+pq.register("llm_usage", _write_usage)
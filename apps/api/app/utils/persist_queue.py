@@ -0,0 +1,410 @@
+# app/utils/persist_queue.py
+"""
+Background persistence queue: lets request handlers hand off Supabase writes
+(draft upserts, analytics batches from utils/analytics_buffer.py) and return
+immediately.
+
+- submit() appends the job to a local JSON-lines journal before acknowledging,
+  so a crash/redeploy doesn't lose it: pending jobs are replayed on start().
+- Each process keeps its own journal (PERSIST_SPOOL_PATH with the pid before
+  the extension), so gunicorn workers never run or compact each other's jobs.
+  It holds an flock on "<journal>.lock" while running; on start() journals
+  whose lock is free (their process is gone) are adopted and replayed here.
+- In-process async workers run the jobs with exponential-backoff retries;
+  permanent failures (4xx, bad payload) and jobs out of attempts are marked
+  dead in the journal and counted.
+- The in-memory buffer is bounded. When it's full, droppable jobs (analytics)
+  are dropped and counted; the rest stay journal-only ("spilled") and are
+  re-read once the buffer drains.
+
+Stats (depth, lag, drops, retries, dead) via persist_queue_stats() and the
+core.metrics counters persist_queue_*.
+"""
+import asyncio
+import glob
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: no cross-process locking, no orphan adoption
+    fcntl = None
+
+from app import supabase_db
+from app.core import tracing
+from app.core.metrics import counters, gauge, incr
+
+PERSIST_QUEUE_MAX = int(os.getenv("PERSIST_QUEUE_MAX", "1000"))
+PERSIST_QUEUE_WORKERS = int(os.getenv("PERSIST_QUEUE_WORKERS", "2"))
+PERSIST_MAX_ATTEMPTS = int(os.getenv("PERSIST_MAX_ATTEMPTS", "8"))
+PERSIST_RETRY_BASE_SEC = float(os.getenv("PERSIST_RETRY_BASE_SEC", "0.5"))
+PERSIST_RETRY_MAX_SEC = float(os.getenv("PERSIST_RETRY_MAX_SEC", "30"))
+# base path; the journal is per process: rb_persist_queue.<pid>.jsonl
+PERSIST_SPOOL_PATH = os.getenv("PERSIST_SPOOL_PATH") or os.path.join(tempfile.gettempdir(), "rb_persist_queue.jsonl")
+# fsync each journal append; off by default (flush only survives process crashes, not power loss)
+PERSIST_SPOOL_FSYNC = os.getenv("PERSIST_SPOOL_FSYNC", "0") == "1"
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+_HANDLERS: Dict[str, Handler] = {}
+
+
+def register(kind: str, handler: Handler) -> None:
+    """Register the coroutine that performs jobs of `kind` (payload dict -> awaitable)."""
+    _HANDLERS[kind] = handler
+
+
+class PermanentError(Exception):
+    """Raise from a handler to stop retrying a job."""
+
+
+def is_permanent(e: Exception) -> bool:
+    if isinstance(e, (PermanentError, ValueError, TypeError, KeyError)):
+        return True
+    if isinstance(e, httpx.HTTPStatusError):
+        code = e.response.status_code
+        return 400 <= code < 500 and code not in (408, 409, 425, 429)
+    return False
+
+
+def process_spool_path(base: str, pid: int) -> str:
+    root, ext = os.path.splitext(base)
+    return f"{root}.{pid}{ext}"
+
+
+def _try_lock(path: str):
+    """Open `path` and take an exclusive flock without blocking; the open file, or None if it's held."""
+    f = open(path, "a")
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+class PersistQueue:
+    def __init__(
+        self,
+        spool_path: str,
+        *,
+        per_process: bool = False,
+        max_pending: int = PERSIST_QUEUE_MAX,
+        workers: int = PERSIST_QUEUE_WORKERS,
+        max_attempts: int = PERSIST_MAX_ATTEMPTS,
+        retry_base: float = PERSIST_RETRY_BASE_SEC,
+        retry_max: float = PERSIST_RETRY_MAX_SEC,
+        fsync: bool = PERSIST_SPOOL_FSYNC,
+    ):
+        # per_process: spool_path is the base path shared by sibling processes
+        self.spool_base = spool_path if per_process else None
+        self.spool_path = process_spool_path(spool_path, os.getpid()) if per_process else spool_path
+        self.max_pending = max_pending
+        self.n_workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.fsync = fsync
+
+        self._pending: "OrderedDict[str, dict]" = OrderedDict()  # id -> job, in memory
+        self._ready: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self._inflight = 0
+        self._spilled = 0  # jobs only in the journal
+        self._file_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._owner_lock = None  # flock on "<journal>.lock", held until the process exits (per_process only)
+
+    # ---- journal -------------------------------------------------------
+
+    def _append(self, rec: dict) -> None:
+        line = json.dumps(rec, default=str, separators=(",", ":")) + "\n"
+        with self._file_lock:
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+
+    def _read_journal(self) -> "tuple[OrderedDict[str, dict], list[dict]]":
+        """Return (pending adds in order, dead records)."""
+        adds: "OrderedDict[str, dict]" = OrderedDict()
+        dead: list[dict] = []
+        try:
+            with open(self.spool_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    op = rec.get("op")
+                    if op == "add":
+                        adds[rec["id"]] = rec
+                    elif op == "done":
+                        adds.pop(rec.get("id"), None)
+                    elif op == "dead":
+                        job = adds.pop(rec.get("id"), None)
+                        dead.append({**(job or {}), **rec})
+        except FileNotFoundError:
+            pass
+        return adds, dead
+
+    def _compact(self) -> "OrderedDict[str, dict]":
+        """Rewrite the journal with only pending + dead records; return pending."""
+        with self._file_lock:
+            adds, dead = self._read_journal()
+            tmp = f"{self.spool_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for rec in adds.values():
+                    f.write(json.dumps(rec, default=str, separators=(",", ":")) + "\n")
+                for rec in dead:
+                    f.write(json.dumps({**rec, "op": "dead"}, default=str, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.spool_path)
+        return adds
+
+    # ---- sibling journals ----------------------------------------------
+
+    def _sibling_journals(self) -> list[str]:
+        root, ext = os.path.splitext(self.spool_base)
+        pattern = re.compile(re.escape(root) + r"\.\d+" + re.escape(ext) + "$")
+        found = [p for p in glob.glob(glob.escape(root) + ".*" + ext) if pattern.match(p)]
+        if os.path.exists(self.spool_base):
+            found.append(self.spool_base)  # a journal from before journals were per process
+        return [p for p in found if os.path.abspath(p) != os.path.abspath(self.spool_path)]
+
+    def _adopt_orphans(self) -> int:
+        """Move jobs from journals whose process is gone into ours. Returns jobs adopted."""
+        adopted = 0
+        for path in self._sibling_journals():
+            lock = _try_lock(f"{path}.lock")
+            if lock is None:
+                continue  # its process is alive and owns it
+            try:
+                adds, dead = PersistQueue(path)._read_journal()
+                with self._file_lock:
+                    with open(self.spool_path, "a", encoding="utf-8") as f:
+                        for rec in adds.values():
+                            f.write(json.dumps(rec, default=str, separators=(",", ":")) + "\n")
+                        for rec in dead:
+                            f.write(json.dumps({**rec, "op": "dead"}, default=str, separators=(",", ":")) + "\n")
+                        f.flush()
+                        os.fsync(f.fileno())
+                for stale in (path, f"{path}.tmp", f"{path}.lock"):
+                    try:
+                        os.remove(stale)
+                    except FileNotFoundError:
+                        pass
+                adopted += len(adds)
+                if adds:
+                    print(f"[persist_queue] adopted {len(adds)} unfinished job(s) from {path}")
+            finally:
+                lock.close()
+        if adopted:
+            incr("persist_queue_adopted", adopted)
+        return adopted
+
+    # ---- lifecycle -----------------------------------------------------
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._workers:
+            return
+        # (re)bind to this loop; anything left in memory is also in the journal
+        self._loop = loop
+        self._ready = asyncio.Queue()
+        for job_id in self._pending:
+            self._ready.put_nowait(job_id)
+        self._workers = [loop.create_task(self._worker(i)) for i in range(self.n_workers)]
+
+    async def start(self) -> int:
+        """Replay unfinished jobs from the journal and start workers. Returns jobs replayed."""
+        for t in self._workers:
+            t.cancel()
+        os.makedirs(os.path.dirname(os.path.abspath(self.spool_path)), exist_ok=True)
+        if self.spool_base is not None and fcntl is not None:
+            if self._owner_lock is None:
+                self._owner_lock = _try_lock(f"{self.spool_path}.lock")
+            self._adopt_orphans()
+        pending = self._compact()
+        self._pending.clear()
+        self._spilled = 0
+        for job_id, rec in pending.items():
+            if len(self._pending) < self.max_pending:
+                self._pending[job_id] = rec
+            else:
+                self._spilled += 1
+        self._workers = []
+        self._ensure_started()
+        if pending:
+            print(f"[persist_queue] replaying {len(pending)} unfinished job(s) from {self.spool_path}")
+            incr("persist_queue_replayed", len(pending))
+        return len(pending)
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Give in-flight/pending jobs `timeout` seconds, then cancel workers (the journal keeps the rest)."""
+        await self.drain(timeout)
+        for t in self._workers:
+            t.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def drain(self, timeout: float = 5.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while (self._pending or self._inflight or self._spilled) and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        return not (self._pending or self._inflight or self._spilled)
+
+    # ---- producer ------------------------------------------------------
+
+    def has_room(self, n: int = 1) -> bool:
+        """Whether `n` more droppable jobs would be buffered rather than dropped."""
+        return len(self._pending) + n <= self.max_pending
+
+    def submit(self, kind: str, payload: Dict[str, Any], *, droppable: bool = False) -> bool:
+        """
+        Enqueue a job. Returns False only if it was dropped (droppable and buffer full).
+        Non-droppable jobs are journaled before this returns.
+        """
+        if kind not in _HANDLERS:
+            raise ValueError(f"no persist handler registered for {kind!r}")
+        self._ensure_started()
+
+        full = len(self._pending) >= self.max_pending
+        if full and droppable:
+            incr("persist_queue_dropped")
+            incr(f"persist_queue_{kind}_dropped")
+            return False
+
+        rec = {"op": "add", "id": uuid.uuid4().hex, "kind": kind, "payload": payload, "ts": time.time()}
+        span = tracing.current_span()
+        if span is not None and span.context:
+            rec["trace"] = span.context  # the job's span is parented to the submitter's
+        if not droppable:
+            self._append(rec)
+        incr("persist_queue_submitted")
+        if full:
+            self._spilled += 1
+            incr("persist_queue_spilled")
+            return True
+        self._pending[rec["id"]] = {**rec, "droppable": droppable}
+        self._ready.put_nowait(rec["id"])
+        return True
+
+    # ---- consumer ------------------------------------------------------
+
+    def _refill_from_journal(self) -> None:
+        if not self._spilled or len(self._pending) >= self.max_pending:
+            return
+        adds, _ = self._read_journal()
+        for job_id, rec in adds.items():
+            if len(self._pending) >= self.max_pending:
+                break
+            if job_id not in self._pending:
+                self._pending[job_id] = rec
+                self._ready.put_nowait(job_id)
+        self._spilled = sum(1 for job_id in adds if job_id not in self._pending)
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.retry_max, self.retry_base * (2 ** (attempt - 1)))
+        return delay * (0.5 + random.random() / 2)
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            job_id = await self._ready.get()
+            job = self._pending.get(job_id)
+            if job is None:
+                continue
+            self._inflight += 1
+            try:
+                await self._run(job)
+            finally:
+                self._inflight -= 1
+                self._pending.pop(job_id, None)
+                if self._ready.empty():
+                    self._refill_from_journal()
+                    if not self._pending and not self._inflight and not self._spilled:
+                        try:
+                            self._compact()
+                        except OSError as e:
+                            print(f"[persist_queue] compaction failed: {e}")
+
+    async def _run(self, job: dict) -> None:
+        kind, job_id = job["kind"], job["id"]
+        handler = _HANDLERS.get(kind)
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                if handler is None:
+                    raise PermanentError(f"no handler for {kind!r}")
+                with tracing.span(f"persist {kind}", parent=job.get("trace"), **{"rb.attempt": attempt}):
+                    await handler(job["payload"])
+                if not job.get("droppable"):
+                    self._append({"op": "done", "id": job_id})
+                incr("persist_queue_done")
+                incr("persist_queue_lag_ms_total", (time.time() - job["ts"]) * 1000)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                permanent = is_permanent(e)
+                if permanent or attempt == self.max_attempts:
+                    print(f"[persist_queue] {kind} job {job_id} failed permanently after {attempt} attempt(s): {e!r}")
+                    if not job.get("droppable"):
+                        self._append({"op": "dead", "id": job_id, "error": repr(e)[:500]})
+                    incr("persist_queue_dead")
+                    incr(f"persist_queue_{kind}_dead")
+                    return
+                incr("persist_queue_retries")
+                await asyncio.sleep(self._backoff(attempt))
+
+    # ---- stats ---------------------------------------------------------
+
+    def stats(self) -> dict:
+        now = time.time()
+        oldest = min((j["ts"] for j in self._pending.values()), default=None)
+        c = counters()
+        done = c.get("persist_queue_done", 0.0)
+        return {
+            "pending": len(self._pending),
+            "inflight": self._inflight,
+            "spilled": self._spilled,
+            "max_pending": self.max_pending,
+            "lag_sec": round(now - oldest, 3) if oldest else 0.0,
+            "avg_lag_ms": round(c.get("persist_queue_lag_ms_total", 0.0) / done, 1) if done else None,
+            "submitted": int(c.get("persist_queue_submitted", 0.0)),
+            "done": int(done),
+            "retries": int(c.get("persist_queue_retries", 0.0)),
+            "dropped": int(c.get("persist_queue_dropped", 0.0)),
+            "dead": int(c.get("persist_queue_dead", 0.0)),
+            "adopted": int(c.get("persist_queue_adopted", 0.0)),
+            "spool_path": self.spool_path,
+        }
+
+
+persist_queue = PersistQueue(PERSIST_SPOOL_PATH, per_process=True)
+
+gauge("rb_persist_queue_pending", "Jobs waiting in the persist queue.", fn=lambda: len(persist_queue._pending))
+gauge("rb_persist_queue_inflight", "Persist jobs being written.", fn=lambda: persist_queue._inflight)
+
+
+def persist_queue_stats() -> dict:
+    return persist_queue.stats()
+
+
+# ---- default handlers ------------------------------------------------------
+
+async def _persist_draft(payload: Dict[str, Any]) -> None:
+    await supabase_db.continue_draft(payload)
+
+
+register("draft", _persist_draft)
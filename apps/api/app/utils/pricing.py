@@ -91,22 +91,40 @@ def is_subscription_key(key: str) -> bool:
 def is_unlimited_key(key: str) -> bool:
     return bool(PRICE_CATALOG.get(key, {}).get("unlimited"))
 
+def _build_price_index() -> dict[str, str]:
+    # stripe price id -> catalog key; the first key wins if a price is listed twice
+    index: dict[str, str] = {}
+    for key, item in PRICE_CATALOG.items():
+        price = item.get("stripe_price")
+        if price and price not in index:
+            index[price] = key
+    return index
+
+PRICE_INDEX: dict[str, str] = _build_price_index()
+
+def rebuild_price_index() -> None:
+    """Call after changing PRICE_CATALOG at runtime (tests)."""
+    global PRICE_INDEX
+    PRICE_INDEX = _build_price_index()
+
+def catalog_key_for_price(price_id: Optional[str]) -> Optional[str]:
+    return PRICE_INDEX.get(price_id) if price_id else None
+
 def is_unlimited_price_id(price_id: str) -> bool:
-    for item in PRICE_CATALOG.values():
-        if item.get("stripe_price") == price_id:
-            return bool(item.get("unlimited"))
-    return False
+    key = catalog_key_for_price(price_id)
+    return bool(key and PRICE_CATALOG[key].get("unlimited"))
 
 def resolve_subscription_by_price_id(price_id: str) -> Optional[dict]:
     """
     Given a Stripe price ID from an invoice/subscription, return the plan + allowance.
     """
-    for key, item in PRICE_CATALOG.items():
-        if item.get("kind") == "subscription" and item.get("stripe_price") == price_id:
-            return {
-                "key": key,
-                "plan": item["plan"],
-                "monthly_allowance": int(item["monthly_allowance"]),
-                "unlimited": bool(item.get("unlimited", False)), 
-            }
-    return None
+    key = catalog_key_for_price(price_id)
+    item = PRICE_CATALOG.get(key) if key else None
+    if not item or item.get("kind") != "subscription":
+        return None
+    return {
+        "key": key,
+        "plan": item["plan"],
+        "monthly_allowance": int(item["monthly_allowance"]),
+        "unlimited": bool(item.get("unlimited", False)),
+    }
@@ -3,6 +3,10 @@ from collections import deque
 import time
 from typing import Tuple
 
+from app.core.metrics import counter
+
+REJECTIONS = counter("rb_rate_limit_rejections_total", "Requests rejected by throttle(), by window.", ("window",))
+
 # key -> timestamps (seconds)
 _BUCKETS: dict[str, deque[float]] = {}
 
@@ -25,6 +29,7 @@ def throttle(key: str, *, limit: int, window_sec: int) -> Tuple[bool, int]:
     if len(q) >= limit:
         # when would the oldest fall out of window?
         retry_after = max(1, int(q[0] + window_sec - now))
+        REJECTIONS.inc(window=f"{window_sec}s")
         return (False, retry_after)
 
     q.append(now)
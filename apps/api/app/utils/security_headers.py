@@ -1,7 +1,5 @@
 # security_headers.py
 import os
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
 from urllib.parse import urlparse
 
 def _origin_host(url: str | None):
@@ -51,20 +49,40 @@ def build_csp() -> str:
     )
     return csp
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-        self.csp = build_csp()
-
-    async def dispatch(self, request, call_next):
-        response = await call_next(request)
-        # Core security headers
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Permissions-Policy"] = (
-            "camera=(), microphone=(), geolocation=(), payment=(), usb=(), xr-spatial-tracking=()"
-        )
-        response.headers["Content-Security-Policy"] = self.csp
-        return response
+def _build() -> list[tuple[bytes, bytes]]:
+    headers = {
+        "strict-transport-security": "max-age=31536000; includeSubDomains; preload",
+        "x-content-type-options": "nosniff",
+        "x-frame-options": "DENY",
+        "referrer-policy": "strict-origin-when-cross-origin",
+        "permissions-policy": "camera=(), microphone=(), geolocation=(), payment=(), usb=(), xr-spatial-tracking=()",
+        "content-security-policy": build_csp(),
+    }
+    return [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]
+
+
+# Built once; reload_security_headers() updates these objects in place, so
+# holders of security_headers()/security_header_names() see the new values.
+_HEADERS: list[tuple[bytes, bytes]] = []
+_NAMES: set[bytes] = set()
+
+
+def reload_security_headers() -> list[tuple[bytes, bytes]]:
+    """Rebuild from the environment (e.g. after API_BASE_URL/FRONTEND_ORIGIN/SUPABASE_URL changed)."""
+    headers = _build()
+    _HEADERS[:] = headers
+    _NAMES.clear()
+    _NAMES.update(k for k, _ in headers)
+    return _HEADERS
+
+
+def security_headers() -> list[tuple[bytes, bytes]]:
+    """Security headers for every response, as raw ASGI header pairs. Shared: don't mutate."""
+    return _HEADERS
+
+
+def security_header_names() -> set[bytes]:
+    return _NAMES
+
+
+reload_security_headers()
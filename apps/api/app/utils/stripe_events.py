@@ -0,0 +1,268 @@
+# app/utils/stripe_events.py
+"""
+Stripe webhook event handling, run by the webhook workers
+(utils/webhook_queue.py) after /stripe/webhook has stored the event.
+
+An event can be retried after a partial failure, so every step must be safe to
+repeat: plan/allowance updates and subscription summaries are absolute
+writes, and pack credits go through grant_credits_once (keyed by event id).
+
+Replay local event fixtures (JSON files holding Stripe events):
+
+    python -m app.utils.stripe_events tests/fixtures/stripe/*.json             # in-process
+    python -m app.utils.stripe_events --url http://localhost:8000 events.json  # POST to a running API
+"""
+import os
+
+import stripe
+
+from app.supabase_db import (
+    get_user_id_by_customer,
+    get_user_summary,
+    grant_credits_once,
+    set_plan_and_grant,
+    upsert_customer,
+)
+from app.utils.analytics_buffer import capture_event
+from app.utils.pricing import PRICE_CATALOG, resolve_subscription_by_price_id
+from app.utils.subscriptions import record_subscription
+from app.utils.user_cache import invalidate_user
+
+
+async def _ae_safe(name: str, *, user_id: str | None, props: dict):
+    """Log analytics (buffered); never throw."""
+    capture_event(name, props, user_id=user_id, path="/stripe/webhook")
+
+
+async def handle_stripe_event(event: dict) -> None:
+    """Apply one verified Stripe event (the stored JSON payload). Raise to retry."""
+    event_type = event["type"]
+    event_id   = event["id"]
+
+    print("🔔 Stripe webhook:", event_type)
+
+    # 1) Checkout completed
+    if event_type == "checkout.session.completed":
+        sess = event["data"]["object"]
+        mode = sess.get("mode")
+        md = sess.get("metadata") or {}
+        user_id = md.get("user_id")
+        cust_id = sess.get("customer")
+
+        # a) One-time payment → grant pack credits
+        if mode == "payment" and sess.get("payment_status") == "paid":
+            price_key = md.get("price_key")
+            item = PRICE_CATALOG.get(price_key) if price_key else None
+            if user_id and item and item.get("kind") == "pack":
+                grant = int(item.get("grant") or 0)
+                if grant > 0:
+                    # keyed by event id: a retried event can't grant twice
+                    new_total = await grant_credits_once(event_id, user_id, grant)
+                    if new_total is None:
+                        print(f"credits for {event_id} already granted")
+                        return
+                    print(f"granted {grant} credits to {user_id} → total {new_total}")
+
+                    await _ae_safe(
+                    "purchase_succeeded",
+                    user_id=user_id,
+                    props={
+                        "kind": "pack",
+                        "sku": price_key,
+                        "grant": grant,
+                    },
+                )
+
+        # b) Subscription checkout → link Stripe customer to user
+        if mode == "subscription" and user_id and cust_id:
+            await upsert_customer(user_id, cust_id)
+            print(f"linked Stripe customer {cust_id} to user {user_id}")
+
+            await _ae_safe(
+                "purchase_succeeded",
+                user_id=user_id,
+                props={
+                    "kind": "subscription",
+                    "sku": md.get("price_key"),
+                },
+            )
+
+        await invalidate_user(user_id)  # plan/credits changed; drop cached summaries
+        return
+
+    # 2) Invoice paid → reset monthly allowance for that tier
+    if event_type == "invoice.payment_succeeded":
+        inv = event["data"]["object"]
+        cust_id = inv.get("customer")
+        user_id = await get_user_id_by_customer(cust_id) if cust_id else None
+        if not user_id:
+            return
+
+        price_id = None
+        # Try to read price from invoice lines
+        try:
+            lines = inv.get("lines", {}).get("data", [])
+            if lines:
+                price = (lines[0].get("price") or {})
+                price_id = price.get("id")
+        except Exception:
+            price_id = None
+
+        # Subscription: fallback for the price, and refreshes the stored summary
+        sub = None
+        if inv.get("subscription"):
+            sub = await stripe.Subscription.retrieve_async(inv["subscription"], expand=["items.data.price"])
+            items = sub.get("items", {}).get("data", [])
+            if not price_id and items:
+                price_id = items[0]["price"]["id"]
+            await record_subscription(user_id, sub, created=event["created"])
+
+        chosen = resolve_subscription_by_price_id(price_id)
+        if chosen:
+            if chosen.get("unlimited"):
+                # Preserve remaining credits, only flip plan/unlimited.
+                snap = await get_user_summary(user_id) or {}
+                remaining = int(snap.get("free_uses_remaining") or 0)
+
+                # If your set_plan_and_grant now accepts an `unlimited` boolean:
+                # await set_plan_and_grant(user_id, "unlimited", remaining, unlimited=True)
+
+                # If your set_plan_and_grant infers unlimited from plan:
+                await set_plan_and_grant(user_id, "unlimited", remaining)
+
+                print(f"set unlimited plan (credits preserved) → user={user_id} remaining={remaining}")
+            else:
+                monthly = int(chosen.get("monthly_allowance") or 0)
+                await set_plan_and_grant(user_id, chosen["plan"], monthly)
+                print(f"reset credits for {user_id} → plan={chosen['plan']} allowance={monthly}")
+        else:
+            # safe fallback
+            monthly = int(PRICE_CATALOG["sub_starter"]["monthly_allowance"])
+            await set_plan_and_grant(user_id, "starter", monthly)
+            print("fallback: starter plan applied")
+        
+        await _ae_safe(
+            "subscription_payment_succeeded",
+            user_id=user_id,
+            props={
+                "sku": price_id,
+                "plan": (chosen or {}).get("plan"),
+            },
+        )
+
+        await invalidate_user(user_id)  # plan/credits changed; drop cached summaries
+        return
+
+    # 3) Subscription created → store the summary; plan/credits follow the first invoice
+    if event_type == "customer.subscription.created":
+        sub = event["data"]["object"]
+        cust_id = sub.get("customer")
+        user_id = await get_user_id_by_customer(cust_id) if cust_id else None
+        if user_id:
+            await record_subscription(user_id, sub, created=event["created"])
+        return
+
+    # 4) Subscription updated → only update plan label, keep credits unchanged
+    if event_type == "customer.subscription.updated":
+        sub = event["data"]["object"]
+        cust_id = sub.get("customer")
+        user_id = await get_user_id_by_customer(cust_id) if cust_id else None
+        if not user_id:
+            return
+        await record_subscription(user_id, sub, created=event["created"])
+
+        items = sub.get("items", {}).get("data", [])
+        price_id = items[0]["price"]["id"] if items else None
+
+        chosen = resolve_subscription_by_price_id(price_id)
+        if chosen:
+            snap = await get_user_summary(user_id) or {}
+            remaining = int(snap.get("free_uses_remaining") or 0)
+            await set_plan_and_grant(user_id, chosen["plan"], remaining)
+            print(f"plan updated (no credit change) → user={user_id} plan={chosen['plan']}")
+
+            await _ae_safe(
+                "subscription_updated",
+                user_id=user_id,
+                props={"plan": chosen["plan"], "price_id": price_id},
+            )
+
+        await invalidate_user(user_id)  # plan/credits changed; drop cached summaries
+        return
+
+    # 5) Subscription canceled → set plan free, PRESERVE credits
+    if event_type == "customer.subscription.deleted":
+        sub = event["data"]["object"]
+        cust_id = sub.get("customer")
+        user_id = await get_user_id_by_customer(cust_id) if cust_id else None
+        if not user_id:
+            return
+        await record_subscription(user_id, sub, created=event["created"])
+
+        # Preserve remaining credits; change to 0 if you prefer to wipe.
+        snap = await get_user_summary(user_id) or {}
+        remaining = int(snap.get("free_uses_remaining") or 0)
+        await set_plan_and_grant(user_id, "free", remaining)
+        print(f"plan set to free (credits preserved) for user {user_id}")
+
+        await _ae_safe(
+            "subscription_canceled",
+            user_id=user_id,
+            props={"reason": sub.get("cancellation_details", {}).get("reason")},
+        )
+
+        await invalidate_user(user_id)  # plan/credits changed; drop cached summaries
+        return
+
+
+def _signature(payload: bytes, secret: str) -> str:
+    """Stripe-Signature header value for a payload, as Stripe computes it."""
+    import hashlib
+    import hmac
+    import time
+
+    ts = int(time.time())
+    mac = hmac.new(secret.encode(), f"{ts}.".encode() + payload, hashlib.sha256).hexdigest()
+    return f"t={ts},v1={mac}"
+
+
+async def replay(paths: list[str], *, url: str | None = None) -> None:
+    """
+    Feed event fixtures through the handler (in-process), or POST them to a
+    running API's /stripe/webhook, signed with STRIPE_WEBHOOK_SECRET when set.
+    A file may hold one event or a list of events.
+    """
+    import json
+
+    import httpx
+
+    events = []
+    for path in paths:
+        with open(path) as f:
+            data = json.load(f)
+        events += data if isinstance(data, list) else [data]
+
+    secret = os.getenv("STRIPE_WEBHOOK_SECRET")
+    async with httpx.AsyncClient(timeout=30) as client:
+        for event in events:
+            if not url:
+                await handle_stripe_event(event)
+                print(f"[replay] {event['id']} {event['type']}: handled")
+                continue
+            payload = json.dumps(event).encode()
+            headers = {"Content-Type": "application/json"}
+            if secret:
+                headers["Stripe-Signature"] = _signature(payload, secret)
+            r = await client.post(f"{url.rstrip('/')}/stripe/webhook", content=payload, headers=headers)
+            print(f"[replay] {event['id']} {event['type']}: {r.status_code} {r.text}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    ap = argparse.ArgumentParser(description="Replay Stripe event fixtures.")
+    ap.add_argument("paths", nargs="+", help="JSON files with one event or a list of events")
+    ap.add_argument("--url", help="POST to this API base URL instead of handling in-process")
+    args = ap.parse_args()
+    asyncio.run(replay(args.paths, url=args.url))
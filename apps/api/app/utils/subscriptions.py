@@ -0,0 +1,91 @@
+# app/utils/subscriptions.py
+"""
+Subscription summary for /billing/subscription-summary, materialized from
+Stripe webhooks.
+
+customer.subscription.* and invoice.payment_succeeded call
+record_subscription(), which stores the summary in
+public.subscription_summaries (the newest Stripe event wins). The endpoint
+reads that row through the short-TTL user cache. A user with no row yet gets
+one live Stripe lookup, and its result is stored as well.
+"""
+from typing import Any, Dict, Optional
+
+import stripe
+
+from app.supabase_db import get_stripe_customer_id, get_subscription_summary_row, upsert_subscription_summary
+from app.utils.pricing import PRICE_CATALOG, catalog_key_for_price
+from app.utils.user_cache import cached
+
+_PUBLIC_FIELDS = ("status", "plan_key", "plan", "price_id", "cancel_at_period_end", "current_period_end")
+# lookup results rank below any webhook event, so a concurrent event always wins
+_LOOKUP_CREATED = 0
+
+
+def summary_from_subscription(sub: Dict[str, Any]) -> Dict[str, Any]:
+    items = (sub.get("items") or {}).get("data") or []
+    item = items[0] if items else {}
+    price_id = (item.get("price") or {}).get("id")
+    key = catalog_key_for_price(price_id)
+    catalog_item = PRICE_CATALOG.get(key) if key else None
+    if not catalog_item or catalog_item.get("kind") != "subscription":
+        key, catalog_item = None, None
+    return {
+        "has_subscription": True,
+        "subscription_id": sub.get("id"),
+        "status": sub.get("status"),
+        "plan_key": key,
+        "plan": catalog_item.get("plan") if catalog_item else None,
+        "price_id": price_id,
+        "cancel_at_period_end": bool(sub.get("cancel_at_period_end", False)),
+        # newer Stripe API versions only report the period on the item
+        "current_period_end": sub.get("current_period_end") or item.get("current_period_end"),
+    }
+
+
+def public_summary(row: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Response shape of /billing/subscription-summary."""
+    if not row or not row.get("has_subscription"):
+        return {"has_subscription": False}
+    return {"has_subscription": True, **{k: row.get(k) for k in _PUBLIC_FIELDS}}
+
+
+async def record_subscription(user_id: str, sub: Dict[str, Any], *, created: int) -> bool:
+    """Materialize a subscription object from a webhook; `created` is the event's timestamp."""
+    row = {"user_id": user_id, **summary_from_subscription(sub), "source_created": int(created)}
+    return await upsert_subscription_summary(row)
+
+
+async def _lookup(user_id: str) -> Dict[str, Any]:
+    """Latest subscription straight from Stripe (users without a stored summary)."""
+    cust_id = await get_stripe_customer_id(user_id)
+    if not cust_id:
+        return {"has_subscription": False}
+    try:
+        subs = await stripe.Subscription.list_async(
+            customer=cust_id,
+            status="all",  # active, trialing, past_due etc.
+            limit=1,
+            expand=["data.items.data.price"],
+        )
+    except stripe.error.InvalidRequestError as e:
+        # Happens if a Test customer ID is used while the API runs with Live keys
+        if "No such customer" in str(e):
+            return {"has_subscription": False}
+        raise
+    return summary_from_subscription(subs.data[0]) if subs.data else {"has_subscription": False}
+
+
+async def _load(user_id: str) -> Dict[str, Any]:
+    row = await get_subscription_summary_row(user_id)
+    if row is None:
+        row = await _lookup(user_id)
+        try:
+            await upsert_subscription_summary({"user_id": user_id, **row, "source_created": _LOOKUP_CREATED})
+        except Exception as e:
+            print(f"[subscriptions] storing looked-up summary failed for {user_id}: {e!r}")
+    return public_summary(row)
+
+
+async def get_subscription_summary(user_id: str) -> Dict[str, Any]:
+    return await cached("subscription", user_id, lambda: _load(user_id))
@@ -0,0 +1,111 @@
+# app/utils/text_store.py
+"""
+Content-addressed storage for resume / job description text.
+
+Drafts reference their resume and JD by sha256 (drafts.resume_hash,
+drafts.jd_hash); each distinct text is stored once, zstandard-compressed, in
+public.text_blobs. Running six tasks on the same resume and JD uploads the
+text with the first write only: hashes this process has already stored are
+sent without their blob.
+
+Without `zstandard` installed, or with TEXT_BLOBS=0, drafts keep the text
+inline as before.
+"""
+import base64
+import hashlib
+import os
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from cachetools import LRUCache
+
+from app.core.metrics import CACHE_REQUESTS, counters, incr
+
+TEXT_BLOBS = os.getenv("TEXT_BLOBS", "1") != "0"
+TEXT_BLOB_ZSTD_LEVEL = int(os.getenv("TEXT_BLOB_ZSTD_LEVEL", "10"))
+TEXT_BLOB_KNOWN_MAX = int(os.getenv("TEXT_BLOB_KNOWN_MAX", "50000"))
+TEXT_BLOB_CACHE_MAX = int(os.getenv("TEXT_BLOB_CACHE_MAX", "256"))
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+    if TEXT_BLOBS:
+        print("[text_store] WARNING: `zstandard` is not installed; storing draft text inline")
+
+# hashes this process knows are in text_blobs
+_known: LRUCache = LRUCache(maxsize=TEXT_BLOB_KNOWN_MAX)
+# hash -> text, for /history/{id} reads
+_texts: LRUCache = LRUCache(maxsize=TEXT_BLOB_CACHE_MAX)
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return TEXT_BLOBS and zstandard is not None
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def compress(text: str) -> bytes:
+    # compressor objects aren't thread-safe; they're cheap to create
+    return zstandard.ZstdCompressor(level=TEXT_BLOB_ZSTD_LEVEL).compress(text.encode("utf-8"))
+
+
+def decompress(blob: bytes) -> str:
+    return zstandard.ZstdDecompressor().decompress(blob).decode("utf-8")
+
+
+def prepare(text: str, *, resend: bool = False) -> Tuple[str, Optional[dict]]:
+    """
+    (hash, blob row) for one text. The blob row is None when this process has
+    already stored the hash, unless resend=True.
+    """
+    h = text_hash(text)
+    with _lock:
+        _texts[h] = text
+        if h in _known and not resend:
+            incr("text_blobs_reused")
+            CACHE_REQUESTS.inc(cache="text_blob", result="hit")
+            return h, None
+    raw = compress(text)
+    incr("text_blobs_sent")
+    CACHE_REQUESTS.inc(cache="text_blob", result="miss")
+    incr("text_blob_bytes_in", len(text.encode("utf-8")))
+    incr("text_blob_bytes_out", len(raw))
+    return h, {"hash": h, "zstd": base64.b64encode(raw).decode("ascii"), "size": len(text)}
+
+
+def mark_stored(hashes: Iterable[str]) -> None:
+    with _lock:
+        for h in hashes:
+            _known[h] = True
+
+
+def forget_stored() -> None:
+    """Drop what we believe is stored (e.g. blobs were released elsewhere); the next writes resend."""
+    with _lock:
+        _known.clear()
+
+
+def cached_text(h: str) -> Optional[str]:
+    with _lock:
+        return _texts.get(h)
+
+
+def cache_text(h: str, text: str) -> None:
+    with _lock:
+        _texts[h] = text
+
+
+def text_blob_stats() -> Dict[str, object]:
+    c = counters()
+    bytes_in = c.get("text_blob_bytes_in", 0.0)
+    return {
+        "enabled": enabled(),
+        "known": len(_known),
+        "sent": int(c.get("text_blobs_sent", 0.0)),
+        "reused": int(c.get("text_blobs_reused", 0.0)),
+        "compression_ratio": round(bytes_in / c["text_blob_bytes_out"], 2) if c.get("text_blob_bytes_out") else None,
+    }
@@ -0,0 +1,162 @@
+# app/utils/user_cache.py
+"""
+Short-TTL cache for per-user reads (user summary, premium entitlement, user
+context row, subscription summary). Plan and credits only change through our own writes in
+supabase_db and the Stripe webhooks, which call invalidate_user(); premium
+entitlements granted out-of-band show up within USER_CACHE_TTL_SEC.
+
+Process-local by default; set USER_CACHE_URL=redis://... (and install
+`redis`) to share entries and invalidations across workers. invalidate_user()
+only reaches the local cache of the worker that wrote, so with several
+workers (WEB_CONCURRENCY > 1) and no Redis the kinds that carry the credit
+balance (BALANCE_KINDS) are not cached at all: another worker could pass the
+credit check on a stale balance and only fail with 402 after generating.
+Entitlement and subscription reads are still cached locally.
+"""
+import json
+import os
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+from cachetools import TTLCache
+
+from app.core.metrics import CACHE_REQUESTS, counters, incr
+
+USER_CACHE_TTL_SEC = float(os.getenv("USER_CACHE_TTL_SEC", "15"))
+USER_CACHE_MAXSIZE = int(os.getenv("USER_CACHE_MAXSIZE", "10000"))
+USER_CACHE_URL = (os.getenv("USER_CACHE_URL") or "").strip()
+# worker processes per host (gunicorn/uvicorn read the same variable)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY") or "1")
+
+KINDS = ("summary", "premium", "context", "subscription")
+BALANCE_KINDS = frozenset({"summary", "context"})  # rows with free_uses_remaining
+
+
+class _LocalBackend:
+    def __init__(self, ttl: float, maxsize: int):
+        self._data: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._data.get(key)
+
+    async def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = value
+
+    async def delete(self, *keys: str) -> None:
+        with self._lock:
+            for k in keys:
+                self._data.pop(k, None)
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class _RedisBackend:
+    def __init__(self, url: str, ttl: float, prefix: str = "rb:user:"):
+        import redis.asyncio as redis  # optional dependency
+
+        self._r = redis.from_url(url)
+        self._ttl_ms = max(1, int(ttl * 1000))
+        self._prefix = prefix
+
+    async def get(self, key: str) -> Optional[str]:
+        v = await self._r.get(self._prefix + key)
+        return v.decode() if isinstance(v, bytes) else v
+
+    async def set(self, key: str, value: str) -> None:
+        await self._r.set(self._prefix + key, value, px=self._ttl_ms)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._r.delete(*(self._prefix + k for k in keys))
+
+    async def clear(self) -> None:
+        async for k in self._r.scan_iter(match=self._prefix + "*"):
+            await self._r.delete(k)
+
+
+def _make_backend():
+    if USER_CACHE_URL:
+        try:
+            return _RedisBackend(USER_CACHE_URL, USER_CACHE_TTL_SEC)
+        except ImportError:
+            print("[user_cache] WARNING: USER_CACHE_URL set but `redis` is not installed; using a process-local cache")
+    return _LocalBackend(USER_CACHE_TTL_SEC, USER_CACHE_MAXSIZE)
+
+
+_backend = _make_backend()
+
+
+def _cacheable(kind: str) -> bool:
+    shared = isinstance(_backend, _RedisBackend)
+    return shared or WEB_CONCURRENCY <= 1 or kind not in BALANCE_KINDS
+
+
+def _key(kind: str, user_id: str) -> str:
+    return f"{kind}:{user_id}"
+
+
+async def cached(kind: str, user_id: str, load: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Return the cached value for (kind, user_id) or call `load()` and cache it.
+    Values are stored as JSON, so callers always get their own copy to mutate.
+    Backend errors fall through to `load()`; the cache never fails a request.
+    """
+    if USER_CACHE_TTL_SEC <= 0 or not _cacheable(kind):
+        return await load()
+
+    key = _key(kind, user_id)
+    try:
+        raw = await _backend.get(key)
+    except Exception as e:
+        print(f"[user_cache] get failed: {e}")
+        raw = None
+    if raw is not None:
+        incr("user_cache_hits")
+        incr(f"user_cache_{kind}_hits")
+        CACHE_REQUESTS.inc(cache=f"user_{kind}", result="hit")
+        return json.loads(raw)
+
+    incr("user_cache_misses")
+    incr(f"user_cache_{kind}_misses")
+    CACHE_REQUESTS.inc(cache=f"user_{kind}", result="miss")
+    value = await load()
+    try:
+        await _backend.set(key, json.dumps(value, default=str))
+    except Exception as e:
+        print(f"[user_cache] set failed: {e}")
+    return value
+
+
+async def invalidate_user(user_id: Optional[str]) -> None:
+    """Drop every cached entry for this user (call after any plan/credits/entitlement write)."""
+    if not user_id:
+        return
+    incr("user_cache_invalidations")
+    try:
+        await _backend.delete(*(_key(kind, user_id) for kind in KINDS))
+    except Exception as e:
+        print(f"[user_cache] invalidate failed for {user_id}: {e}")
+
+
+async def clear_user_cache() -> None:
+    await _backend.clear()
+
+
+def user_cache_stats() -> dict:
+    c = counters()
+    hits, misses = c.get("user_cache_hits", 0.0), c.get("user_cache_misses", 0.0)
+    total = hits + misses
+    return {
+        "backend": "redis" if isinstance(_backend, _RedisBackend) else "local",
+        "uncached_kinds": sorted(k for k in KINDS if not _cacheable(k)),
+        "ttl_sec": USER_CACHE_TTL_SEC,
+        "hits": int(hits),
+        "misses": int(misses),
+        "invalidations": int(c.get("user_cache_invalidations", 0.0)),
+        "hit_rate": round(hits / total, 4) if total else None,
+    }
@@ -0,0 +1,76 @@
+# app/utils/user_context.py
+"""
+Per-request user context: user row + premium entitlement + refill state,
+loaded with one Supabase round-trip and memoized on request.state so every
+credits/entitlement check in the same request reuses it.
+"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+from fastapi import Depends, Request
+
+from app.auth import verify_supabase_session as verify_user
+from app.supabase_db import PremiumStatus, get_user_context_row, premium_status_from_expiry
+
+
+@dataclass
+class UserContext:
+    user_id: str
+    user: Dict[str, Any] = field(default_factory=dict)  # users row (includes last_free_refill_at)
+    premium: PremiumStatus = field(default_factory=lambda: premium_status_from_expiry(None))
+
+    @property
+    def plan(self) -> str:
+        return (self.user.get("plan") or "free").lower()
+
+    @property
+    def db_unlimited(self) -> bool:
+        return bool(self.user.get("unlimited"))
+
+    @property
+    def unlimited(self) -> bool:
+        """DB flag or an active premium entitlement."""
+        return self.db_unlimited or bool(self.premium["active"])
+
+    @property
+    def remaining(self) -> int:
+        return int(self.user.get("free_uses_remaining") or 0)
+
+    def set_remaining(self, remaining: int) -> None:
+        """Keep the memoized snapshot in sync after a top-up / spend in this request."""
+        self.user["free_uses_remaining"] = int(remaining)
+
+
+async def fetch_user_context(user_id: str) -> UserContext:
+    row = await get_user_context_row(user_id) or {}
+    expires_at = row.pop("premium_expires_at", None)
+    return UserContext(user_id=user_id, user=row, premium=premium_status_from_expiry(expires_at))
+
+
+async def load_user_context(request: Request, user_id: str) -> UserContext:
+    """
+    Memoized for the lifetime of `request`: the first caller does the fetch,
+    concurrent/later callers await the same result.
+    """
+    cache: Dict[str, asyncio.Future] = getattr(request.state, "user_context", None)
+    if cache is None:
+        cache = {}
+        request.state.user_context = cache
+
+    fut = cache.get(user_id)
+    if fut is None:
+        fut = asyncio.ensure_future(fetch_user_context(user_id))
+        cache[user_id] = fut
+    try:
+        return await asyncio.shield(fut)
+    except Exception:
+        # don't memoize failures; the next caller retries
+        if cache.get(user_id) is fut:
+            del cache[user_id]
+        raise
+
+
+async def user_context(request: Request, user=Depends(verify_user)) -> UserContext:
+    """FastAPI dependency form of load_user_context for the authenticated user."""
+    return await load_user_context(request, user["user_id"])
@@ -0,0 +1,182 @@
+# app/utils/webhook_queue.py
+"""
+Workers for stored Stripe webhook events.
+
+/stripe/webhook verifies the signature, stores the event (enqueue_webhook_event)
+and acks. These in-process workers then claim stored events from the database
+(claim_webhook_events), run them through utils/stripe_events.handle_stripe_event
+and mark them done, or pending again with exponential backoff.
+
+- Events are leased, not deleted, so an event whose worker died is claimed
+  again once its lease expires; handle_stripe_event is safe to repeat.
+- The claim never hands out an event while an older event of the same Stripe
+  customer is still open, so one customer's events apply in order across all
+  workers and API instances.
+- Permanent failures (4xx, bad payload) and events out of attempts are marked
+  dead; they stay in webhook_events with last_error for inspection and can
+  be replayed with `python -m app.utils.stripe_events`.
+
+Workers poll every WEBHOOK_POLL_SEC and are woken early by notify() when this
+process stores an event. Stats via webhook_queue_stats() and the core.metrics
+counters webhook_queue_*.
+"""
+import asyncio
+import os
+import random
+import time
+from typing import Optional
+
+import stripe
+
+from app import supabase_db
+from app.core.metrics import counters, gauge, incr
+from app.utils.persist_queue import is_permanent
+from app.utils.stripe_events import handle_stripe_event
+
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "2"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "10"))
+WEBHOOK_RETRY_BASE_SEC = float(os.getenv("WEBHOOK_RETRY_BASE_SEC", "2"))
+WEBHOOK_RETRY_MAX_SEC = float(os.getenv("WEBHOOK_RETRY_MAX_SEC", "900"))
+WEBHOOK_POLL_SEC = float(os.getenv("WEBHOOK_POLL_SEC", "5"))
+WEBHOOK_LEASE_SEC = int(os.getenv("WEBHOOK_LEASE_SEC", "120"))
+
+
+def _is_permanent(e: Exception) -> bool:
+    # a Stripe 4xx (bad id, wrong mode/key) won't succeed on retry either
+    return is_permanent(e) or isinstance(e, (stripe.error.InvalidRequestError, stripe.error.AuthenticationError))
+
+
+class WebhookQueue:
+    def __init__(
+        self,
+        *,
+        workers: int = WEBHOOK_WORKERS,
+        max_attempts: int = WEBHOOK_MAX_ATTEMPTS,
+        retry_base: float = WEBHOOK_RETRY_BASE_SEC,
+        retry_max: float = WEBHOOK_RETRY_MAX_SEC,
+        poll_sec: float = WEBHOOK_POLL_SEC,
+        lease_sec: int = WEBHOOK_LEASE_SEC,
+    ):
+        self.n_workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.poll_sec = poll_sec
+        self.lease_sec = lease_sec
+
+        self._wake: Optional[asyncio.Event] = None
+        self._workers: list[asyncio.Task] = []
+        self._inflight = 0
+        self._last_event_at: Optional[float] = None
+
+    # ---- lifecycle -----------------------------------------------------
+
+    async def start(self) -> None:
+        await self.stop(timeout=0)
+        loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._workers = [loop.create_task(self._worker(i)) for i in range(self.n_workers)]
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Let in-flight events finish for `timeout` seconds, then cancel (their leases expire and they're retried)."""
+        deadline = time.monotonic() + timeout
+        while self._inflight and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        for t in self._workers:
+            t.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def notify(self) -> None:
+        """Wake idle workers (an event was just stored)."""
+        if self._wake is not None:
+            self._wake.set()
+
+    # ---- consumer ------------------------------------------------------
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.retry_max, self.retry_base * (2 ** (attempt - 1)))
+        return delay * (0.5 + random.random() / 2)
+
+    async def _idle(self) -> None:
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=self.poll_sec)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            try:
+                rows = await supabase_db.claim_webhook_events(1, self.lease_sec)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[webhook_queue] claim failed: {e!r}")
+                incr("webhook_queue_claim_errors")
+                rows = []
+            if not rows:
+                await self._idle()
+                continue
+            self._inflight += 1
+            try:
+                await self._run(rows[0])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # couldn't record the outcome; the lease expires and the event is claimed again
+                print(f"[webhook_queue] finishing {rows[0]['id']} failed: {e!r}")
+                incr("webhook_queue_finish_errors")
+            finally:
+                self._inflight -= 1
+
+    async def _run(self, row: dict) -> None:
+        event_id, attempt = row["id"], int(row.get("attempts") or 1)
+        try:
+            await handle_stripe_event(row["payload"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = repr(e)[:500]
+            if _is_permanent(e) or attempt >= self.max_attempts:
+                print(f"[webhook_queue] {row.get('type')} {event_id} failed permanently after {attempt} attempt(s): {error}")
+                await supabase_db.finish_webhook_event(event_id, "dead", error=error)
+                incr("webhook_queue_dead")
+                return
+            await supabase_db.finish_webhook_event(event_id, "pending", error=error, retry_in=self._backoff(attempt))
+            incr("webhook_queue_retries")
+            return
+        await supabase_db.finish_webhook_event(event_id, "done")
+        incr("webhook_queue_done")
+        if row.get("event_created"):
+            incr("webhook_queue_lag_ms_total", (time.time() - int(row["event_created"])) * 1000)
+        self._last_event_at = time.time()
+
+    # ---- stats ---------------------------------------------------------
+
+    def stats(self) -> dict:
+        c = counters()
+        done = c.get("webhook_queue_done", 0.0)
+        return {
+            "workers": len(self._workers),
+            "inflight": self._inflight,
+            "enqueued": int(c.get("webhook_queue_enqueued", 0.0)),
+            "duplicates": int(c.get("webhook_queue_duplicates", 0.0)),
+            "done": int(done),
+            "retries": int(c.get("webhook_queue_retries", 0.0)),
+            "dead": int(c.get("webhook_queue_dead", 0.0)),
+            "claim_errors": int(c.get("webhook_queue_claim_errors", 0.0)),
+            "finish_errors": int(c.get("webhook_queue_finish_errors", 0.0)),
+            # Stripe event creation → processed, including retries
+            "avg_lag_ms": round(c.get("webhook_queue_lag_ms_total", 0.0) / done, 1) if done else None,
+            "last_event_at": self._last_event_at,
+        }
+
+
+webhook_queue = WebhookQueue()
+
+gauge("rb_webhook_queue_inflight", "Stripe events being processed.", fn=lambda: webhook_queue._inflight)
+
+
+def webhook_queue_stats() -> dict:
+    return webhook_queue.stats()
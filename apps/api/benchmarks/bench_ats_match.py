@@ -0,0 +1,55 @@
+# benchmarks/bench_ats_match.py
+"""
+Compare the original per-pair skill matcher with SkillMatchIndex on large skill lists.
+
+Run from apps/api:
+    python -m benchmarks.bench_ats_match
+"""
+import random
+import time
+
+from app.agents.domain.ats_match import SkillMatchIndex
+from app.agents.domain.skill_aliases import get_alias_store
+from tests.test_ats_match import _ref_match_one, _VOCAB
+
+
+def _skills(rng: random.Random, n: int) -> list[str]:
+    out = []
+    for i in range(n):
+        words = rng.sample(_VOCAB, rng.randint(1, 3))
+        out.append(" ".join(words) + f" {i}")  # unique-ish items, realistic token overlap
+    return out
+
+
+def _bench(n_job: int, n_resume: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    job = _skills(rng, n_job)
+    resume = _skills(rng, n_resume)
+
+    t0 = time.perf_counter()
+    ref = [_ref_match_one(j, resume) for j in job]
+    ref_s = time.perf_counter() - t0
+
+    get_alias_store().canonical.cache_clear()
+    t0 = time.perf_counter()
+    index = SkillMatchIndex(resume)
+    got = [index.matches(j) for j in job]
+    idx_s = time.perf_counter() - t0
+
+    assert got == ref, "indexed matcher diverged from reference"
+    return {
+        "job_items": n_job,
+        "resume_items": n_resume,
+        "reference_ms": round(ref_s * 1000, 2),
+        "indexed_ms": round(idx_s * 1000, 2),
+        "speedup": round(ref_s / idx_s, 1) if idx_s else None,
+    }
+
+
+def main() -> None:
+    for n_job, n_resume in [(20, 40), (100, 200), (300, 1000)]:
+        print(_bench(n_job, n_resume))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# benchmarks/bench_history.py
+"""
+/history list: full rows (select=* + parse_draft_data per row) vs the slim
+summary projection.
+
+Always measures, for one 50-row page of realistic drafts:
+  - response payload size (bytes of JSON the API downloads from PostgREST)
+  - API-side CPU: decode the PostgREST body + per-row processing + encode ours
+
+With TEST_DATABASE_URL (throwaway DB, psycopg installed, supabase migrations
+for upsert_draft/draft_summaries applicable) it also seeds drafts and times
+the two queries in Postgres, including a deep keyset page.
+
+Run from apps/api:
+    python -m benchmarks.bench_history
+"""
+import json
+import os
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from app.routers.history import parse_draft_data
+
+PAGE = 50
+SUMMARY_KEYS = ("id", "client_ref_id", "created_at", "job_title", "company_name", "job_link",
+                "resume_label", "bender_score", "model_version", "tasks")
+
+
+def _fake_draft(rng: random.Random, i: int, user_id: str) -> dict:
+    words = lambda n: " ".join(rng.choice(["python", "led", "built", "scaled", "api", "team", "data", "cloud",
+                                           "reduced", "latency", "by", "30%", "customers", "pipeline"])
+                               for _ in range(n))
+    bullets = {"bullets": [{"text": words(25), "keywords": ["python", "aws"]} for _ in range(8)]}
+    cover = {"subject": "Application", "greeting": "Hi", "body_paragraphs": [words(80) for _ in range(4)],
+             "valediction": "Best", "signature": "Jane"}
+    alignment = {"summary": words(40), "coverage": [{"keyword": f"k{j}", "present": j % 2 == 0} for j in range(30)]}
+    return {
+        "id": str(uuid.uuid4()),
+        "client_ref_id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "created_at": (datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i)).isoformat(),
+        "resume_text": words(1200),
+        "job_description_text": words(900),
+        "job_description_context": words(600),
+        "outputs_json": {"bullets": "```json\n" + json.dumps(bullets) + "\n```", "cover_letter": cover,
+                         "alignment": alignment},
+        "model_version": "gemini-2.5-flash",
+        "company_name": "Acme",
+        "job_title": f"Engineer {i} - resume.pdf",
+        "job_link": "https://example.com/job",
+        "resume_label": None,
+        "bender_score": 80 + i % 20,
+        "bender_score_data": {"output_json": {"final_bender_score": 80, "notes": words(200)}},
+        "resume_bullets": bullets,
+        "interview_points": None,
+        "cover_letter": cover,
+        "ats_alignment": alignment,
+        "first_impression": {"verdict": words(60)},
+    }
+
+
+def _summary(d: dict) -> dict:
+    tasks = [t for t, present in (
+        ("bullets", d["resume_bullets"] or "bullets" in d["outputs_json"]),
+        ("cover_letter", d["cover_letter"]),
+        ("talking_points", d["interview_points"]),
+        ("alignment", d["ats_alignment"]),
+        ("first_impression", d["first_impression"]),
+        ("bender_score", d["bender_score_data"]),
+    ) if present]
+    return {**{k: d.get(k) for k in SUMMARY_KEYS if k != "tasks"}, "tasks": tasks}
+
+
+def _time(fn, reps: int = 30) -> float:
+    samples = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def bench_payload() -> dict:
+    rng = random.Random(3)
+    drafts = [_fake_draft(rng, i, "u") for i in range(PAGE)]
+    full_body = json.dumps(drafts)
+    slim_body = json.dumps([_summary(d) for d in drafts])
+
+    def full():
+        rows = json.loads(full_body)
+        out = [parse_draft_data(r) for r in rows]  # legacy rows: normalized on read
+        json.dumps(out)
+
+    def slim():
+        json.dumps(json.loads(slim_body))
+
+    return {
+        "rows": PAGE,
+        "full_bytes": len(full_body),
+        "slim_bytes": len(slim_body),
+        "bytes_ratio": round(len(full_body) / len(slim_body), 1),
+        "full_cpu_ms": round(_time(full), 2),
+        "slim_cpu_ms": round(_time(slim), 3),
+    }
+
+
+# minimal drafts table for a bare Postgres (no-op on a real Supabase schema)
+_DRAFTS_DDL = """
+create table if not exists public.drafts (
+    id uuid primary key default gen_random_uuid(), user_id uuid not null, client_ref_id text,
+    resume_text text, job_description_text text, job_description_context text, outputs_json jsonb,
+    model_version text, company_name text, job_title text, job_link text, resume_label text,
+    bender_score numeric, bender_score_data jsonb, resume_bullets jsonb, interview_points jsonb,
+    cover_letter jsonb, ats_alignment jsonb, first_impression jsonb, created_at timestamptz default now()
+)
+"""
+
+
+def bench_db(n_drafts: int = 2000) -> dict | None:
+    dsn = os.getenv("TEST_DATABASE_URL")
+    if not dsn:
+        return None
+    import psycopg  # optional; only for this part
+
+    migrations = Path(__file__).resolve().parents[3] / "supabase" / "migrations"
+    rng = random.Random(5)
+    user_id = str(uuid.uuid4())
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        conn.execute(_DRAFTS_DDL)
+        for name in ("*_upsert_draft.sql", "*_draft_summaries.sql"):
+            conn.execute(next(migrations.glob(name)).read_text())
+        cols = ["id", "client_ref_id", "user_id", "created_at", "resume_text", "job_description_text",
+                "job_description_context", "outputs_json", "model_version", "company_name", "job_title", "job_link",
+                "bender_score", "bender_score_data", "resume_bullets", "cover_letter", "ats_alignment", "first_impression"]
+        with conn.cursor().copy(f"copy public.drafts ({','.join(cols)}) from stdin") as cp:
+            for i in range(n_drafts):
+                d = _fake_draft(rng, i, user_id)
+                cp.write_row([json.dumps(d[c]) if isinstance(d[c], dict) else d[c] for c in cols])
+        conn.execute("analyze public.drafts")
+        try:
+            mid = conn.execute(
+                "select created_at, id from public.drafts where user_id = %s order by created_at desc, id desc offset %s limit 1",
+                (user_id, n_drafts // 2),
+            ).fetchone()
+
+            def q(sql, args):
+                return lambda: conn.execute(sql, args).fetchall()
+
+            full = q("select * from public.drafts where user_id = %s order by created_at desc limit %s", (user_id, PAGE))
+            slim = q("select id,client_ref_id,created_at,job_title,company_name,job_link,resume_label,bender_score,"
+                     "model_version,tasks from public.draft_summaries where user_id = %s "
+                     "order by created_at desc, id desc limit %s", (user_id, PAGE))
+            deep = q("select id,client_ref_id,created_at,job_title,tasks from public.draft_summaries where user_id = %s "
+                     "and (created_at < %s or (created_at = %s and id < %s)) order by created_at desc, id desc limit %s",
+                     (user_id, mid[0], mid[0], mid[1], PAGE))
+            return {
+                "drafts": n_drafts,
+                "full_page_ms": round(_time(full), 2),
+                "slim_page_ms": round(_time(slim), 2),
+                "slim_keyset_mid_page_ms": round(_time(deep), 2),
+            }
+        finally:
+            conn.execute("delete from public.drafts where user_id = %s", (user_id,))
+
+
+if __name__ == "__main__":
+    print(json.dumps({"payload": bench_payload(), "postgres": bench_db()}, indent=2))
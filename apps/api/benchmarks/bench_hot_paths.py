@@ -0,0 +1,319 @@
+# benchmarks/bench_hot_paths.py
+"""
+Per-call timings of the API's CPU-bound hot paths, saved as JSON so two
+commits can be compared:
+
+  - chunk_text, rank_chunks_by_keywords, build_context (ingest/retrieval)
+  - _extract_text_robust on the saved job pages in benchmarks/fixtures/pages
+    (plain body text, JSON-LD JobPosting, Next.js __NEXT_DATA__)
+  - extract_resume on a generated two-page PDF and a DOCX
+  - ats_match_domain, risk_adjust_domain
+  - _soft_validate_bullets, parse_draft_data (legacy and normalized rows)
+
+Inputs are fixed (seeded or checked in), so results differ between commits
+only by code and machine. Each case runs enough loops per sample to take
+~MIN_SAMPLE_SEC, and reports the median/p90/min of REPS samples in µs per call.
+
+Run from apps/api:
+    python -m benchmarks.bench_hot_paths                     # writes benchmarks/results/<commit>.json
+    python -m benchmarks.bench_hot_paths --only chunk_text --out /tmp/new.json
+    python -m benchmarks.bench_hot_paths --compare benchmarks/results/OLD.json /tmp/new.json
+
+--compare prints the change in median per case and exits 1 when any case is
+slower by more than --threshold (default 0.15 = 15%).
+"""
+import argparse
+import asyncio
+import io
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, UploadFile
+
+from app.agents.domain.ats_match import ats_match_domain
+from app.agents.domain.bullets import _soft_validate_bullets
+from app.agents.domain.risk_adjust import risk_adjust_domain
+from app.agents.schemas.ats_schema import AtsMatchInput
+from app.agents.schemas.bullets_schema import BulletItem, BulletsDraftResult
+from app.agents.schemas.resume_scan_schema import JobScanResult, ResumeScanResult
+from app.agents.schemas.risk_schema import RiskAdjustInput
+from app.routers.history import parse_draft_data
+from app.routers.ingest import _extract_text_robust
+from app.routers.resume import extract_resume
+from app.utils.chunk import chunk_text
+from app.utils.context import build_context
+from app.utils.draft_outputs import normalize_draft_outputs
+from app.utils.retrieve import rank_chunks_by_keywords
+
+HERE = Path(__file__).resolve().parent
+PAGES = HERE / "fixtures" / "pages"
+RESULTS = HERE / "results"
+REPS = 15
+MIN_SAMPLE_SEC = 0.02
+
+_WORDS = ("python", "led", "built", "scaled", "api", "team", "data", "cloud", "reduced", "latency", "by",
+          "30%", "customers", "pipeline", "postgres", "kubernetes", "migrated", "owned", "on-call", "design")
+
+
+def _words(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+
+# ---- fixtures ---------------------------------------------------------------------
+
+def _pdf_bytes(pages: List[List[str]]) -> bytes:
+    """A minimal text PDF (Helvetica, one line per string); no PDF writer dependency needed."""
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        ops = ["BT", "/F1 10 Tf", "12 TL", "50 760 Td"]
+        for line in lines:
+            esc = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"({esc}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops)
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                    f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objs)} 0 R >>")
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for i, body in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def _docx_bytes(sections: List[Tuple[str, List[str]]]) -> bytes:
+    import docx  # python-docx; only the benchmark writes DOCX
+
+    doc = docx.Document()
+    doc.add_heading("Jane Doe", level=0)
+    for heading, items in sections:
+        doc.add_heading(heading, level=1)
+        for item in items:
+            doc.add_paragraph(item, style="List Bullet")
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def _resume_sections(rng: random.Random) -> List[Tuple[str, List[str]]]:
+    jobs = [(f"Senior Engineer, Company {i}", [_words(rng, 18) for _ in range(6)]) for i in range(4)]
+    return [("Summary", [_words(rng, 40)]), *jobs, ("Skills", [_words(rng, 25), _words(rng, 25)])]
+
+
+def _upload(blob: bytes, filename: str, content_type: str) -> UploadFile:
+    return UploadFile(io.BytesIO(blob), filename=filename, headers=Headers({"content-type": content_type}))
+
+
+def _scans() -> Tuple[JobScanResult, ResumeScanResult]:
+    job = JobScanResult(
+        raw_title="Senior Backend Engineer",
+        company_name="Acme Cloud",
+        location="Remote",
+        must_have_skills=["Python", "SQL", "PostgreSQL", "FastAPI", "Docker", "Kubernetes", "CI/CD", "AWS"],
+        nice_to_have_skills=["Kafka", "Redis", "LLM APIs", "Stripe", "Terraform"],
+        tools_and_tech=["BigQuery", "Terraform", "Grafana", "GitHub Actions"],
+        keywords=["python", "apis", "latency", "on-call"],
+        summary_for_candidate="Backend role owning Python services and data pipelines.",
+    )
+    resume = ResumeScanResult(
+        candidate_name="Jane Doe",
+        total_years_experience=7,
+        work_experience_summary="Backend engineer at two SaaS companies.",
+        global_skills=["Python", "Postgres", "Django", "REST APIs", "Docker", "k8s", "GitHub Actions", "Redis"],
+        tools_and_tech=["AWS", "Terraform", "Datadog", "Celery", "PostgreSQL"],
+        keywords=["python", "django", "aws"],
+        summary_for_matching="Backend engineer focused on Python APIs.",
+    )
+    return job, resume
+
+
+def _bullets(rng: random.Random) -> BulletsDraftResult:
+    items = []
+    for i in range(6):
+        gap = i == 5
+        text = ("GAP: " if gap else "Built ") + _words(rng, 16)
+        items.append(BulletItem(text=text, evidence="JD: kafka" if gap else "Resume: built pipeline",
+                                keywords=["python", "aws"][: 1 + i % 2], rationale=_words(rng, 10),
+                                transferable=i == 0))
+    return BulletsDraftResult(bullets=items)
+
+
+def _legacy_draft(rng: random.Random) -> dict:
+    bullets = {"bullets": [{"text": _words(rng, 22), "keywords": ["python", "aws"]} for _ in range(6)]}
+    cover = {"subject": "Application", "greeting": "Hi", "body_paragraphs": [_words(rng, 80) for _ in range(4)],
+             "valediction": "Best", "signature": "Jane"}
+    alignment = {"summary": _words(rng, 40), "coverage": [{"keyword": f"k{j}", "present": j % 2 == 0} for j in range(30)]}
+    return {
+        "id": "d1", "user_id": "u", "created_at": "2026-01-01T00:00:00+00:00",
+        "resume_text": _words(rng, 1200), "job_description_text": _words(rng, 900),
+        "outputs_json": {"bullets": "```json\n" + json.dumps(bullets) + "\n```", "cover_letter": cover,
+                         "alignment": alignment, "talking_points": {"points": [_words(rng, 20) for _ in range(5)]}},
+        "bender_score_data": {"output_json": {"final_bender_score": 80, "notes": _words(rng, 200)}},
+        "model_version": "gemini-2.5-flash",
+    }
+
+
+# ---- cases --------------------------------------------------------------------------
+
+def cases() -> Dict[str, Callable[[], object]]:
+    """name -> zero-arg callable; inputs are built once here, outside the timed region."""
+    rng = random.Random(48)
+    pages = {p.stem: p.read_text() for p in sorted(PAGES.glob("*.html"))}
+    _, page_text = _extract_text_robust(pages["greenhouse_plain"])
+    jd = " ".join([page_text] + [_words(rng, 400) for _ in range(4)])  # ~ a long posting
+    chunks = chunk_text(jd)
+    query = "python postgres kubernetes latency on-call api design"
+    ranked = [chunks[i] for i in rank_chunks_by_keywords(query, chunks, top_k=8)]
+
+    sections = _resume_sections(rng)
+    pdf = _pdf_bytes([[line for _, items in sections[:3] for line in items],
+                      [line for _, items in sections[3:] for line in items]])
+    docx_blob = _docx_bytes(sections)
+    loop = asyncio.new_event_loop()
+
+    job, resume = _scans()
+    ats_in = AtsMatchInput(job=job, resume=resume)
+    risk_in = RiskAdjustInput(job=job, resume=resume, ats=ats_match_domain(ats_in))
+    draft = _bullets(rng)
+    legacy = _legacy_draft(rng)
+    normalized = {**legacy, **normalize_draft_outputs(legacy)}
+
+    out: Dict[str, Callable[[], object]] = {
+        "chunk_text": lambda: chunk_text(jd),
+        "rank_chunks_by_keywords": lambda: rank_chunks_by_keywords(query, chunks, top_k=8),
+        "build_context": lambda: build_context(ranked, max_chars=6000, max_chunks=8),
+    }
+    for stem, html in pages.items():
+        out[f"extract_text_robust[{stem}]"] = lambda html=html: _extract_text_robust(html)
+    out.update({
+        "extract_resume[pdf]": lambda: loop.run_until_complete(extract_resume(_upload(pdf, "resume.pdf", "application/pdf"))),
+        "extract_resume[docx]": lambda: loop.run_until_complete(extract_resume(_upload(
+            docx_blob, "resume.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"))),
+        "ats_match_domain": lambda: ats_match_domain(ats_in),
+        "risk_adjust_domain": lambda: risk_adjust_domain(risk_in),
+        "soft_validate_bullets": lambda: _soft_validate_bullets(draft, resume_scan=resume),
+        "parse_draft_data[legacy]": lambda: parse_draft_data(legacy),
+        "parse_draft_data[normalized]": lambda: parse_draft_data(normalized),
+    })
+    return out
+
+
+def _check(fns: Dict[str, Callable[[], object]]) -> None:
+    """Cheap sanity checks so a broken fixture can't produce a fast, meaningless number."""
+    for name, fn in fns.items():
+        res = fn()
+        if name.startswith("extract_resume"):
+            assert res["text_length"] > 500, f"{name}: extracted {res['text_length']} chars"
+        elif name.startswith("extract_text_robust"):
+            assert len(res[1]) > 1000, f"{name}: extracted {len(res[1])} chars"
+
+
+def measure(fn: Callable[[], object], *, reps: int = REPS, min_sample_sec: float = MIN_SAMPLE_SEC) -> dict:
+    loops = 1
+    while True:  # calibrate like timeit.autorange
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - t0 >= min_sample_sec or loops >= 1_000_000:
+            break
+        loops *= 2
+    samples = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - t0) / loops * 1e6)
+    samples.sort()
+    return {
+        "median_us": round(statistics.median(samples), 2),
+        "p90_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.9))], 2),
+        "min_us": round(samples[0], 2),
+        "loops": loops,
+        "reps": reps,
+    }
+
+
+def _commit() -> str:
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--", str(HERE.parent / "app")], cwd=HERE,
+                               capture_output=True, text=True).stdout.strip()
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def bench(*, only: Optional[List[str]] = None, reps: int = REPS, min_sample_sec: float = MIN_SAMPLE_SEC) -> dict:
+    fns = cases()
+    if only:
+        fns = {k: v for k, v in fns.items() if any(k.startswith(o) for o in only)}
+    _check(fns)
+    return {
+        "commit": _commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "results": {name: measure(fn, reps=reps, min_sample_sec=min_sample_sec) for name, fn in fns.items()},
+    }
+
+
+def compare(old: dict, new: dict, *, threshold: float = 0.15) -> Tuple[List[dict], List[str]]:
+    """Rows of median changes for cases in both runs, and the names that regressed past `threshold`."""
+    rows, regressed = [], []
+    for name, n in new["results"].items():
+        o = old["results"].get(name)
+        if o is None or not o["median_us"]:
+            continue
+        change = n["median_us"] / o["median_us"] - 1
+        rows.append({"case": name, "old_us": o["median_us"], "new_us": n["median_us"], "change": round(change, 3)})
+        if change > threshold:
+            regressed.append(name)
+    return rows, regressed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--only", nargs="*", help="case name prefixes to run")
+    ap.add_argument("--reps", type=int, default=REPS)
+    ap.add_argument("--out", help="results file (default benchmarks/results/<commit>.json)")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two results files")
+    ap.add_argument("--threshold", type=float, default=0.15)
+    args = ap.parse_args(argv)
+
+    if args.compare:
+        old, new = (json.loads(Path(p).read_text()) for p in args.compare)
+        rows, regressed = compare(old, new, threshold=args.threshold)
+        print(f"{'case':<40} {'old µs':>12} {'new µs':>12} {'change':>8}")
+        for r in rows:
+            flag = "  <-- slower" if r["case"] in regressed else ""
+            print(f"{r['case']:<40} {r['old_us']:>12.2f} {r['new_us']:>12.2f} {r['change']:>+8.1%}{flag}")
+        return 1 if regressed else 0
+
+    result = bench(only=args.only, reps=args.reps)
+    out = Path(args.out) if args.out else RESULTS / f"{result['commit']}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2) + "\n")
+    print(json.dumps(result["results"], indent=2))
+    print(f"wrote {out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
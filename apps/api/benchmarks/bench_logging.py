@@ -0,0 +1,136 @@
+# benchmarks/bench_logging.py
+"""
+Event-loop time spent logging under load: print(json.dumps(...)) to stdout
+(what the request middleware did) vs core/log.py (queue + orjson writer thread).
+
+stdout is a pipe drained by a deliberately slow reader (a log collector that
+can't keep up, LOG_SINK_BYTES_PER_SEC), so blocking writes show up. Each of
+CONCURRENCY tasks handles REQUESTS/CONCURRENCY "requests" that log LINES
+records, while a ticker task measures how late the loop wakes it (loop lag).
+
+Run from apps/api:
+    python -m benchmarks.bench_logging
+"""
+import asyncio
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+
+from app.core import log as rblog
+
+REQUESTS = 2000
+CONCURRENCY = 50
+LINES = 4
+SINK_BYTES_PER_SEC = int(os.getenv("LOG_SINK_BYTES_PER_SEC", str(2 * 1024 * 1024)))
+
+
+def _record(i: int) -> dict:
+    return {
+        "request_id": f"req-{i:08d}", "method": "POST",
+        "path": "/draft/run-form", "status": 200, "latency_ms": 1234.5, "ip": "203.0.113.9",
+        "ua": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko)",
+        "origin": "https://www.resumebender.com",
+    }
+
+
+class _SlowSink:
+    """A pipe whose reader drains at most `rate` bytes/sec."""
+
+    def __init__(self, rate: int):
+        r, w = os.pipe()
+        self.write_file = os.fdopen(w, "w", buffering=1)  # line-buffered, like a container's stdout
+        self._r, self.rate, self.bytes = r, rate, 0
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def _drain(self) -> None:
+        while True:
+            chunk = os.read(self._r, 16384)
+            if not chunk:
+                return
+            self.bytes += len(chunk)
+            time.sleep(len(chunk) / self.rate)
+
+    def close(self) -> None:
+        self.write_file.close()
+        self._thread.join()
+        os.close(self._r)
+
+
+async def _load(log_one) -> dict:
+    spent: list[float] = []
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            t = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - t - 0.001)
+
+    async def worker(w: int):
+        for n in range(REQUESTS // CONCURRENCY):
+            await asyncio.sleep(0)  # the request's own awaits
+            t = time.perf_counter()
+            for _ in range(LINES):
+                log_one(_record(w * 100_000 + n))
+            spent.append(time.perf_counter() - t)
+
+    tick = asyncio.create_task(ticker())
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(CONCURRENCY)))
+    wall = time.perf_counter() - t0
+    done.set()
+    await tick
+    lags.sort()
+    return {
+        "loop_ms_in_logging": round(sum(spent) * 1000, 1),
+        "per_request_us_p50": round(statistics.median(spent) * 1e6, 1),
+        "per_request_us_max": round(max(spent) * 1e6, 1),
+        "loop_lag_ms_p99": round(lags[int(len(lags) * 0.99)] * 1000, 2) if lags else None,
+        "wall_ms": round(wall * 1000, 1),
+    }
+
+
+def bench_print() -> dict:
+    sink = _SlowSink(SINK_BYTES_PER_SEC)
+
+    def log_one(rec):
+        print(json.dumps({"level": "info", "msg": "request", **rec}), file=sink.write_file)
+
+    try:
+        return asyncio.run(_load(log_one))
+    finally:
+        sink.close()
+
+
+def bench_queue() -> dict:
+    sink = _SlowSink(SINK_BYTES_PER_SEC)
+    rblog.setup_logging("INFO", stream=sink.write_file, queue_max=REQUESTS * LINES)
+    logger = logging.getLogger("bench")
+
+    def log_one(rec):
+        logger.info("request", extra=rec)
+
+    try:
+        return asyncio.run(_load(log_one))
+    finally:
+        rblog.stop_logging()
+        sink.close()
+
+
+def bench() -> dict:
+    return {
+        "requests": REQUESTS,
+        "lines_per_request": LINES,
+        "sink_bytes_per_sec": SINK_BYTES_PER_SEC,
+        "print_json": bench_print(),
+        "queue_orjson": bench_queue(),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(bench(), indent=2))
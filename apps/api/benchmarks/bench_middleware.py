@@ -0,0 +1,138 @@
+# benchmarks/bench_middleware.py
+"""
+Requests/sec through the previous middleware stack (three @app.middleware("http")
+functions + BaseHTTPMiddleware security headers) vs core.middleware.RequestMiddleware,
+on a trivial JSON endpoint, driven in-process over ASGI (no sockets), with the
+access log written to /dev/null.
+
+Run from apps/api:
+    python -m benchmarks.bench_middleware
+"""
+import asyncio
+import contextlib
+import json
+import os
+import time
+import uuid
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.middleware import RequestMiddleware
+from app.utils.security_headers import build_csp
+
+REQUESTS = 5000
+CONCURRENCY = 50
+
+
+def _endpoint(api: FastAPI) -> FastAPI:
+    @api.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return api
+
+
+def legacy_app() -> FastAPI:
+    """The stack main.py had before RequestMiddleware (same order and work)."""
+    api = _endpoint(FastAPI())
+
+    class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+        def __init__(self, app):
+            super().__init__(app)
+            self.csp = build_csp()
+
+        async def dispatch(self, request, call_next):
+            response = await call_next(request)
+            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"
+            response.headers["X-Content-Type-Options"] = "nosniff"
+            response.headers["X-Frame-Options"] = "DENY"
+            response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+            response.headers["Permissions-Policy"] = (
+                "camera=(), microphone=(), geolocation=(), payment=(), usb=(), xr-spatial-tracking=()"
+            )
+            response.headers["Content-Security-Policy"] = self.csp
+            return response
+
+    api.add_middleware(SecurityHeadersMiddleware)
+
+    @api.middleware("http")
+    async def add_request_id_and_log(request: Request, call_next):
+        rid = request.headers.get("x-request-id") or str(uuid.uuid4())
+        request.state.request_id = rid
+        start = time.time()
+        response: Response = await call_next(request)
+        response.headers["x-request-id"] = rid
+        print(json.dumps({
+            "level": "info", "msg": "request", "request_id": rid, "method": request.method,
+            "path": request.url.path, "status": response.status_code,
+            "latency_ms": round((time.time() - start) * 1000, 1),
+            "ip": request.client.host if request.client else None, "ua": request.headers.get("user-agent"),
+        }))
+        return response
+
+    @api.middleware("http")
+    async def _log_req_res(request, call_next):
+        print("REQ", request.method, request.url.path, "Origin:", request.headers.get("origin"))
+        resp = await call_next(request)
+        print("RES", request.method, request.url.path, resp.status_code,
+              "ACAO:", resp.headers.get("access-control-allow-origin"))
+        return resp
+
+    @api.middleware("http")
+    async def _limit_body_size(request, call_next):
+        if request.url.path.startswith(("/resume/extract",)):
+            cl = request.headers.get("content-length")
+            if cl and cl.isdigit() and int(cl) > 5_242_880:
+                return JSONResponse({"detail": "File too large"}, status_code=413)
+        return await call_next(request)
+
+    return api
+
+
+def current_app() -> FastAPI:
+    api = _endpoint(FastAPI())
+    api.add_middleware(RequestMiddleware)
+    return api
+
+
+async def _drive(app, n: int, concurrency: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "path": "/ping",
+        "raw_path": b"/ping", "root_path": "", "scheme": "http", "query_string": b"",
+        "client": ("127.0.0.1", 5000), "server": ("bench", 80),
+        "headers": [(b"host", b"bench"), (b"user-agent", b"bench/1.0"), (b"origin", b"http://localhost:3000")],
+    }
+
+    async def one():
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            pass
+
+        await app(dict(scope), receive, send)
+
+    async def worker(count):
+        for _ in range(count):
+            await one()
+
+    await worker(50)  # warm up
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(n // concurrency) for _ in range(concurrency)))
+    return time.perf_counter() - t0
+
+
+def bench(n: int = REQUESTS, concurrency: int = CONCURRENCY) -> dict:
+    out = {"requests": n, "concurrency": concurrency}
+    with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+        for name, make in (("legacy_stack", legacy_app), ("request_middleware", current_app)):
+            sec = asyncio.run(_drive(make(), n, concurrency))
+            out[name] = {"req_per_sec": round(n / sec), "us_per_req": round(sec / n * 1e6, 1)}
+    out["speedup"] = round(out["request_middleware"]["req_per_sec"] / out["legacy_stack"]["req_per_sec"], 2)
+    return out
+
+
+if __name__ == "__main__":
+    print(json.dumps(bench(), indent=2))
@@ -0,0 +1,77 @@
+# benchmarks/bench_security_headers.py
+"""
+Per-response cost of adding x-request-id + the security headers to a typical
+JSON response's http.response.start message:
+
+- response_headers: the old BaseHTTPMiddleware way, Response.headers[...] = str
+- mutable_headers:  MutableHeaders over the message, decoding each pair
+- prebuilt_append:  RequestMiddleware._add_headers (pre-encoded pairs appended)
+
+plus build_csp() itself, which now only runs at startup / reload.
+
+Run from apps/api:
+    python -m benchmarks.bench_security_headers
+"""
+import json
+import timeit
+
+from starlette.datastructures import MutableHeaders
+
+from app.core.middleware import RequestMiddleware
+from app.utils.security_headers import build_csp, security_headers
+
+N = 100_000
+RID = "3f8a1c52-9a4e-4b61-8f57-0c2d7e5b9a10"
+
+
+def _message() -> dict:
+    return {
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-length", b"512"), (b"content-type", b"application/json")],
+    }
+
+
+def response_headers():
+    headers = MutableHeaders(scope=_message())
+    headers["x-request-id"] = RID
+    headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"
+    headers["X-Content-Type-Options"] = "nosniff"
+    headers["X-Frame-Options"] = "DENY"
+    headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+    headers["Permissions-Policy"] = "camera=(), microphone=(), geolocation=(), payment=(), usb=(), xr-spatial-tracking=()"
+    headers["Content-Security-Policy"] = CSP
+
+
+def mutable_headers():
+    headers = MutableHeaders(scope=_message())
+    headers["x-request-id"] = RID
+    for k, v in SECURITY:
+        headers[k.decode("latin-1")] = v.decode("latin-1")
+
+
+def prebuilt_append():
+    MIDDLEWARE._add_headers(_message(), RID)
+
+
+def baseline():
+    _message()
+
+
+CSP = build_csp()
+SECURITY = security_headers()
+MIDDLEWARE = RequestMiddleware(app=None)
+
+
+def bench(n: int = N) -> dict:
+    base = min(timeit.repeat(baseline, number=n, repeat=5))
+    out = {"iterations": n}
+    for fn in (response_headers, mutable_headers, prebuilt_append):
+        sec = min(timeit.repeat(fn, number=n, repeat=5)) - base
+        out[f"{fn.__name__}_ns"] = round(sec / n * 1e9)
+    out["build_csp_ns"] = round(min(timeit.repeat(build_csp, number=n // 10, repeat=3)) / (n // 10) * 1e9)
+    return out
+
+
+if __name__ == "__main__":
+    print(json.dumps(bench(), indent=2))
@@ -0,0 +1,79 @@
+# benchmarks/bench_skill_aliases.py
+"""
+Load time, memory and lookup cost of the skill alias store at realistic and
+synthetic (tens of thousands of skills) sizes.
+
+Run from apps/api:
+    python -m benchmarks.bench_skill_aliases
+"""
+import random
+import string
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from app.agents.domain.skill_aliases import DEFAULT_ALIAS_PATH, load_alias_file
+
+
+def _synthetic_file(n_skills: int, aliases_per_skill: int = 3, seed: int = 11) -> Path:
+    rng = random.Random(seed)
+    word = lambda: "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+    lines = []
+    for i in range(n_skills):
+        canon = f"{word()} {word()} {i}"
+        aliases = [f"{word()}{i}" for _ in range(aliases_per_skill - 1)] + [canon]
+        lines.append(f"{canon} | skill | {', '.join(aliases)}")
+    f = tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8")
+    f.write("\n".join(lines))
+    f.close()
+    return Path(f.name)
+
+
+def _bench(path: Path, label: str) -> dict:
+    t0 = time.perf_counter()
+    store = load_alias_file(path)
+    load_s = time.perf_counter() - t0
+
+    # second load under tracemalloc (it slows allocation down, so not timed)
+    del store
+    tracemalloc.start()
+    store = load_alias_file(path)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    probes = [c for c in list(store.alt_tokens)[:2000]] + ["definitely not a skill"] * 200
+    t0 = time.perf_counter()
+    for p in probes:
+        store.lookup(p)
+    lookup_us = (time.perf_counter() - t0) / len(probes) * 1e6
+
+    store.canonical.cache_clear()
+    t0 = time.perf_counter()
+    for p in probes:
+        store.canonical(p + " engineer")
+    canonical_us = (time.perf_counter() - t0) / len(probes) * 1e6
+
+    return {
+        "file": label,
+        "skills": len(store),
+        "load_ms": round(load_s * 1000, 1),
+        "retained_mb": round(current / 1e6, 2),
+        "peak_mb": round(peak / 1e6, 2),
+        "lookup_us": round(lookup_us, 2),
+        "canonical_uncached_us": round(canonical_us, 2),
+    }
+
+
+def main() -> None:
+    print(_bench(DEFAULT_ALIAS_PATH, "skill_aliases.txt"))
+    for n in (10_000, 50_000):
+        path = _synthetic_file(n)
+        try:
+            print(_bench(path, f"synthetic_{n}"))
+        finally:
+            path.unlink()
+
+
+if __name__ == "__main__":
+    main()
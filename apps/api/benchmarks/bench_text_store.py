@@ -0,0 +1,61 @@
+# benchmarks/bench_text_store.py
+"""
+Bytes sent to upsert_draft for one run of all six tasks on the same resume/JD,
+with text inline vs content-addressed zstd blobs (app/utils/text_store.py).
+
+Run from apps/api:
+    python -m benchmarks.bench_text_store
+"""
+import json
+import random
+import time
+
+from app import supabase_db
+from app.utils import text_store
+
+TASKS = ("bullets", "talking_points", "cover_letter", "alignment", "first_impression", "bender_score")
+_WORDS = ("python", "led", "built", "scaled", "api", "team", "data", "cloud", "reduced", "latency",
+          "customers", "pipeline", "postgres", "kubernetes", "migrated", "owned", "on-call", "design")
+
+
+def _text(rng: random.Random, n_words: int) -> str:
+    lines, words = [], [rng.choice(_WORDS) for _ in range(n_words)]
+    for i in range(0, n_words, 14):
+        lines.append(" ".join(words[i:i + 14]))
+    return "\n".join(lines)
+
+
+def _payloads(resume: str, jd: str) -> list[dict]:
+    return [{"user_id": "u", "client_ref_id": "r", "resume_text": resume, "job_description_text": jd,
+             "outputs_json": {t: {"ok": True}}, "model_version": "m"} for t in TASKS]
+
+
+def bench() -> dict:
+    rng = random.Random(11)
+    resume, jd = _text(rng, 1200), _text(rng, 900)
+    inline = sum(len(json.dumps({"p": p})) for p in _payloads(resume, jd))
+
+    supabase_db._text_blobs_deployed = True
+    text_store.forget_stored()
+    t0 = time.perf_counter()
+    hashed = 0
+    for p in _payloads(resume, jd):
+        body, sent = supabase_db._with_text_refs(p)
+        text_store.mark_stored(sent)
+        hashed += len(json.dumps({"p": body}))
+    ms = (time.perf_counter() - t0) * 1000
+
+    raw = len(resume.encode()) + len(jd.encode())
+    stored = len(text_store.compress(resume)) + len(text_store.compress(jd))
+    return {
+        "tasks": len(TASKS),
+        "inline_bytes_sent": inline,
+        "hashed_bytes_sent": hashed,
+        "text_bytes_stored_inline": raw * len(TASKS),
+        "text_bytes_stored_blobs": stored,
+        "prepare_ms_total": round(ms, 2),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(bench(), indent=2))
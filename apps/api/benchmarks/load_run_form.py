@@ -0,0 +1,197 @@
+# benchmarks/load_run_form.py
+"""
+Closed-loop load test of POST /draft/run-form: --concurrency clients send
+--requests requests in total (each from its own user, so per-user rate limits
+don't kick in) and the script reports throughput and latency percentiles.
+
+Offline, with --spawn: starts benchmarks/supabase_standin.py and the API
+(LLM_PROVIDER=fake, app/services/fake_llm.py) as uvicorn subprocesses on
+free ports, runs the load, then stops them. FAKE_LLM_* / STANDIN_* variables
+in the environment are passed through.
+
+Run from apps/api:
+    python -m benchmarks.load_run_form --spawn --requests 300 --concurrency 16 --task bullets
+    FAKE_LLM_LATENCY_MS=1500 FAKE_LLM_ERROR_RATE=0.02 python -m benchmarks.load_run_form --spawn --out /tmp/load.json
+    python -m benchmarks.load_run_form --url http://127.0.0.1:8000   # an API you started yourself
+
+The job posting is benchmarks/fixtures/pages/greenhouse_plain.html's text
+(pasted, so nothing is fetched); the resume is generated.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+HERE = Path(__file__).resolve().parent
+API_DIR = HERE.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _job_text() -> str:
+    from app.routers.ingest import _extract_text_robust
+
+    _, text = _extract_text_robust((HERE / "fixtures" / "pages" / "greenhouse_plain.html").read_text())
+    return text
+
+
+def _resume_text(seed: int = 49) -> str:
+    rng = random.Random(seed)
+    words = ("python", "built", "scaled", "api", "postgres", "kubernetes", "aws", "docker", "led", "team",
+             "reduced", "latency", "pipeline", "customers", "migrated", "django", "redis", "on-call")
+    lines = ["Jane Doe - Backend Engineer"]
+    for _ in range(30):
+        lines.append("- " + " ".join(rng.choice(words) for _ in range(18)))
+    return "\n".join(lines)
+
+
+def percentile(sorted_ms: List[float], q: float) -> Optional[float]:
+    if not sorted_ms:
+        return None
+    i = min(len(sorted_ms) - 1, max(0, int(round(q * len(sorted_ms) + 0.5)) - 1))
+    return round(sorted_ms[i], 1)
+
+
+async def run_load(base_url: str, *, requests: int, concurrency: int, tasks: List[str], timeout: float) -> Dict:
+    job, resume = _job_text(), _resume_text()
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    counter = iter(range(requests))
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        for i in counter:
+            form = {"task": tasks[i % len(tasks)], "job_text": job, "resume": resume, "job_title": "Backend Engineer"}
+            t0 = time.perf_counter()
+            try:
+                r = await client.post("/draft/run-form", data=form, headers={"Authorization": f"Bearer load-{i}"})
+                statuses[str(r.status_code)] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    ok = statuses.get("200", 0)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "tasks": tasks,
+        "elapsed_sec": round(elapsed, 2),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else None,
+        "ok_rps": round(ok / elapsed, 2) if elapsed else None,
+        "statuses": dict(statuses),
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50),
+            "p90": percentile(latencies, 0.90),
+            "p99": percentile(latencies, 0.99),
+            "max": round(latencies[-1], 1) if latencies else None,
+        },
+    }
+
+
+def _wait_healthy(url: str, proc: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with {proc.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not healthy after {timeout}s")
+
+
+def _uvicorn(target: str, port: int, env: Dict[str, str], log) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", target, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=API_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+def spawn() -> tuple:
+    """Start the stand-in and the API on the fake provider; returns (api url, processes)."""
+    sb_port, api_port = _free_port(), _free_port()
+    log = open(os.devnull, "w") if not os.getenv("LOAD_VERBOSE") else None
+    base = {**os.environ}
+    sb = _uvicorn("benchmarks.supabase_standin:app", sb_port, base, log)
+    sb_url = f"http://127.0.0.1:{sb_port}"
+    env = {
+        **base,
+        "LLM_PROVIDER": "fake",
+        "GEMINI_API_KEY": base.get("GEMINI_API_KEY") or "unused",
+        "SUPABASE_URL": sb_url,
+        "SUPABASE_SERVICE_ROLE_KEY": "standin",
+        "SUPABASE_ANON_KEY": "standin",
+        "PERSIST_SPOOL_PATH": base.get("PERSIST_SPOOL_PATH") or os.path.join(
+            os.environ.get("TMPDIR", "/tmp"), f"rb-load-spool-{api_port}.jsonl"),
+    }
+    api = _uvicorn("app.main:app", api_port, env, log)
+    procs = [api, sb]
+    try:
+        _wait_healthy(sb_url, sb)
+        _wait_healthy(f"http://127.0.0.1:{api_port}", api)
+    except Exception:
+        stop(procs)
+        raise
+    return f"http://127.0.0.1:{api_port}", procs
+
+
+def stop(procs: List[subprocess.Popen]) -> None:
+    for p in procs:
+        p.terminate()
+    for p in procs:
+        try:
+            p.wait(10)
+        except subprocess.TimeoutExpired:
+            p.kill()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Load test POST /draft/run-form")
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--spawn", action="store_true", help="start the Supabase stand-in and the API (fake LLM)")
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--task", nargs="+", default=["bullets"], help="tasks to cycle through")
+    ap.add_argument("--timeout", type=float, default=120)
+    ap.add_argument("--out", help="also write the report here (JSON)")
+    args = ap.parse_args(argv)
+
+    procs: List[subprocess.Popen] = []
+    url = args.url
+    if args.spawn:
+        url, procs = spawn()
+    try:
+        report = asyncio.run(run_load(url, requests=args.requests, concurrency=args.concurrency,
+                                      tasks=args.task, timeout=args.timeout))
+    finally:
+        stop(procs)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
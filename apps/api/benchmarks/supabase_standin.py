@@ -0,0 +1,235 @@
+# benchmarks/supabase_standin.py
+"""
+In-memory stand-in for Supabase Auth + PostgREST, for load tests on a laptop.
+
+Covers what the API calls, not PostgREST in general:
+
+- GET /auth/v1/user: any bearer token is a valid session; the user id is
+  derived from the token (uuid5), so "load-1", "load-2", ... are distinct users
+- /rest/v1/<table>: GET/POST/PATCH/DELETE with eq./neq./in./is. filters,
+  `limit`, upserts (Prefer: resolution=merge-duplicates + on_conflict) and
+  the single-object Accept header. users rows are created on first read with
+  plenty of credits; embedded entitlements(...) come back empty
+- /rest/v1/rpc/<fn>: upsert_draft, refill_and_consume, consume_free_use,
+  add_llm_usage and release_text_blobs behave like the migrations; any other
+  function returns null
+
+STANDIN_LATENCY_MS adds a fixed delay to every response (a database
+round-trip). Nothing is persisted.
+
+Run from apps/api:
+    uvicorn benchmarks.supabase_standin:app --port 54321
+and point the API at it with SUPABASE_URL=http://127.0.0.1:54321 (see
+benchmarks/load_run_form.py, which can start both).
+"""
+import asyncio
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+STANDIN_LATENCY_MS = float(os.getenv("STANDIN_LATENCY_MS", "2"))
+STANDIN_CREDITS = int(os.getenv("STANDIN_CREDITS", "1000000"))
+
+app = FastAPI(title="supabase stand-in")
+tables: Dict[str, List[dict]] = {}
+_seq = {"n": 0}
+
+_RESERVED = {"select", "order", "limit", "offset", "on_conflict", "apikey", "columns"}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _cast(v: str) -> Any:
+    if v == "null":
+        return None
+    if v in ("true", "false"):
+        return v == "true"
+    return v
+
+
+def _matches(row: dict, filters: List[tuple]) -> bool:
+    for col, op, val in filters:
+        cur = row.get(col)
+        cur_s = None if cur is None else (str(cur).lower() if isinstance(cur, bool) else str(cur))
+        if op == "eq" and cur_s != val:
+            return False
+        if op == "neq" and cur_s == val:
+            return False
+        if op == "in" and cur_s not in val.strip("()").split(","):
+            return False
+        if op == "is" and cur is not _cast(val):
+            return False
+    return True
+
+
+def _filters(request: Request) -> List[tuple]:
+    out = []
+    for k, v in request.query_params.multi_items():
+        if k in _RESERVED or "." in k:  # "entitlements.kind" etc. filter the embed, which is always empty
+            continue
+        op, _, val = v.partition(".")
+        out.append((k, op, val))
+    return out
+
+
+def _user_row(user_id: str) -> dict:
+    return {
+        "id": user_id, "email": f"{user_id[:8]}@load.test", "plan": "free", "full_name": None,
+        "free_uses_remaining": STANDIN_CREDITS, "unlimited": False, "created_at": _now(),
+        "last_free_refill_at": _now(),
+    }
+
+
+def _rows(table: str, request: Request) -> List[dict]:
+    filters = _filters(request)
+    rows = tables.setdefault(table, [])
+    if table == "users":
+        for col, op, val in filters:
+            if col == "id" and op == "eq" and not any(r["id"] == val for r in rows):
+                rows.append(_user_row(val))
+    return [r for r in rows if _matches(r, filters)]
+
+
+def _respond(request: Request, rows: List[dict], status: int = 200) -> Response:
+    select = request.query_params.get("select") or ""
+    if "entitlements(" in select:
+        rows = [{**r, "entitlements": []} for r in rows]
+    if "vnd.pgrst.object" in request.headers.get("accept", ""):
+        if len(rows) != 1:
+            return JSONResponse({"code": "PGRST116", "message": "JSON object requested, multiple (or no) rows returned"},
+                                status_code=406)
+        return JSONResponse(rows[0], status_code=status)
+    limit = request.query_params.get("limit")
+    return JSONResponse(rows[: int(limit)] if limit else rows, status_code=status)
+
+
+@app.middleware("http")
+async def _latency(request: Request, call_next):
+    if STANDIN_LATENCY_MS > 0:
+        await asyncio.sleep(STANDIN_LATENCY_MS / 1000)
+    return await call_next(request)
+
+
+@app.get("/health")
+async def health():
+    return {"ok": True, "tables": {k: len(v) for k, v in tables.items()}}
+
+
+@app.get("/auth/v1/user")
+async def auth_user(request: Request):
+    auth = request.headers.get("authorization", "")
+    if not auth.startswith("Bearer ") or not auth[7:].strip():
+        return JSONResponse({"msg": "missing token"}, status_code=401)
+    token = auth[7:].strip()
+    uid = str(uuid.uuid5(uuid.NAMESPACE_URL, token))
+    return {"id": uid, "email": f"{uid[:8]}@load.test", "aud": "authenticated", "role": "authenticated"}
+
+
+# ---- rpc ------------------------------------------------------------------------
+
+def _upsert_draft(p: dict) -> dict:
+    drafts = tables.setdefault("drafts", [])
+    for row in drafts:
+        if row["user_id"] == p.get("user_id") and row.get("client_ref_id") == p.get("client_ref_id"):
+            outputs = {**(row.get("outputs_json") or {}), **(p.get("outputs_json") or {})}
+            row.update({k: v for k, v in p.items() if v is not None})
+            row["outputs_json"] = outputs
+            return row
+    row = {"id": str(uuid.uuid4()), "created_at": _now(), **p}
+    drafts.append(row)
+    return row
+
+
+def _refill_and_consume(body: dict) -> Optional[dict]:
+    user = next((u for u in tables.setdefault("users", []) if u["id"] == body.get("uid")), None)
+    if user is None:
+        return None
+    consumed = bool(body.get("p_consume")) and user["free_uses_remaining"] > 0
+    if consumed:
+        user["free_uses_remaining"] -= 1
+    return {"remaining": user["free_uses_remaining"], "consumed": consumed, "refilled": False,
+            "unlimited": bool(user.get("unlimited"))}
+
+
+def _consume_free_use(body: dict) -> int:
+    res = _refill_and_consume({**body, "p_consume": True})
+    return res["remaining"] if res and res["consumed"] else -1
+
+
+@app.post("/rest/v1/rpc/{fn}")
+async def rpc(fn: str, request: Request):
+    body = json.loads(await request.body() or b"{}")
+    if fn == "upsert_draft":
+        return _upsert_draft(body.get("p") or {})
+    if fn == "refill_and_consume":
+        return _refill_and_consume(body)
+    if fn == "consume_free_use":
+        return _consume_free_use(body)
+    if fn == "add_llm_usage":
+        tables.setdefault("llm_usage_daily", []).extend(body.get("p_rows") or [])
+        return len(body.get("p_rows") or [])
+    if fn == "release_text_blobs":
+        return 0
+    if fn == "claim_webhook_events":
+        return []
+    return None
+
+
+# ---- tables ---------------------------------------------------------------------
+
+@app.get("/rest/v1/{table}")
+async def select_rows(table: str, request: Request):
+    return _respond(request, _rows(table, request))
+
+
+@app.post("/rest/v1/{table}")
+async def insert_rows(table: str, request: Request):
+    body = json.loads(await request.body() or b"[]")
+    items = body if isinstance(body, list) else [body]
+    rows = tables.setdefault(table, [])
+    prefer = request.headers.get("prefer", "")
+    keys = (request.query_params.get("on_conflict") or "id").split(",")
+    out = []
+    for item in items:
+        existing = None
+        if "merge-duplicates" in prefer or "ignore-duplicates" in prefer:
+            existing = next((r for r in rows if all(r.get(k) == item.get(k) for k in keys)), None)
+        if existing is not None:
+            if "merge-duplicates" in prefer:
+                existing.update(item)
+            out.append(existing)
+            continue
+        _seq["n"] += 1
+        row = {"id": item.get("id") or _seq["n"], "created_at": _now(), **item}
+        rows.append(row)
+        out.append(row)
+    if "return=representation" in prefer:
+        return _respond(request, out, status=201)
+    return Response(status_code=201)
+
+
+@app.patch("/rest/v1/{table}")
+async def update_rows(table: str, request: Request):
+    patch = json.loads(await request.body() or b"{}")
+    rows = _rows(table, request)
+    for r in rows:
+        r.update(patch)
+    if "return=representation" in request.headers.get("prefer", ""):
+        return _respond(request, rows)
+    return Response(status_code=204)
+
+
+@app.delete("/rest/v1/{table}")
+async def delete_rows(table: str, request: Request):
+    gone = _rows(table, request)
+    tables[table] = [r for r in tables.get(table, []) if r not in gone]
+    if "return=representation" in request.headers.get("prefer", ""):
+        return _respond(request, gone)
+    return Response(status_code=204)
@@ -0,0 +1,6 @@
+import os
+
+# The agent modules build their chat models at import time; without this the
+# suite needs Gemini credentials just to be collected. LLM_PROVIDER=gemini
+# (with a key) still runs it against the real provider.
+os.environ.setdefault("LLM_PROVIDER", "fake")
@@ -0,0 +1,98 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import analytics as analytics_router
+from app.utils import analytics_buffer as ab
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    batches = []
+
+    def fake_submit(kind, payload, *, droppable=False):
+        assert kind == "analytics_batch" and droppable
+        batches.append(payload["rows"])
+        return True
+
+    monkeypatch.setattr(ab.pq.persist_queue, "submit", fake_submit)
+    return batches
+
+
+def test_flushes_every_n_events(submitted):
+    buf = ab.AnalyticsBuffer(batch_size=3, flush_ms=60_000)
+
+    async def run():
+        for n in range(7):
+            buf.add(ab.analytics_row(f"e{n}"))
+
+    asyncio.run(run())
+    assert [len(b) for b in submitted] == [3, 3]
+    assert len(buf) == 1
+    assert set(submitted[0][0]) == set(ab._ROW_KEYS)  # bulk insert needs uniform keys
+
+
+def test_flushes_after_interval(submitted):
+    buf = ab.AnalyticsBuffer(batch_size=100, flush_ms=20)
+
+    async def run():
+        buf.add(ab.analytics_row("a"))
+        buf.add(ab.analytics_row("b"))
+        assert submitted == []
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert [[r["name"] for r in b] for b in submitted] == [["a", "b"]]
+
+
+def test_dedupe_and_backpressure(submitted):
+    buf = ab.AnalyticsBuffer(batch_size=100, flush_ms=60_000, max_buffered=2)
+    cid = str(uuid.uuid4())
+    assert buf.add(ab.analytics_row("a", client_event_id=cid)) == ab.QUEUED
+    assert buf.add(ab.analytics_row("a", client_event_id=cid)) == ab.DUPLICATE
+    assert buf.add(ab.analytics_row("b")) == ab.QUEUED
+    assert buf.add(ab.analytics_row("c")) == ab.DROPPED
+    assert buf.flush() == 2
+    # still deduped after the flush
+    assert buf.add(ab.analytics_row("a", client_event_id=cid)) == ab.DUPLICATE
+
+
+def test_capture_batch_endpoint(monkeypatch, submitted):
+    buf = ab.AnalyticsBuffer(batch_size=100, flush_ms=60_000, max_buffered=5)
+    monkeypatch.setattr(analytics_router, "analytics_buffer", buf)
+    app = FastAPI()
+    app.include_router(analytics_router.router)
+    client = TestClient(app)
+
+    cid = str(uuid.uuid4())
+    events = [{"name": "page_view", "client_event_id": cid}, {"name": "page_view", "client_event_id": cid}, {"name": "click"}]
+    r = client.post("/analytics/capture-batch", json={"events": events})
+    assert r.status_code == 200
+    assert r.json() == {"ok": True, "accepted": 2, "duplicates": 1, "dropped": 0}
+
+    r = client.post("/analytics/capture-batch", json={"events": [{"name": "x"}] * 4})
+    assert r.status_code == 429 and r.headers["retry-after"] == "1"
+
+    r = client.post("/analytics/capture", json={"name": "single", "client_event_id": cid})
+    assert r.status_code == 200 and r.json() == {"ok": False}  # already accepted
+
+    buf.flush()
+    rows = [row for batch in submitted for row in batch]
+    assert [row["name"] for row in rows] == ["page_view", "click"]
+    assert all(row["anon_id"].startswith("server-") for row in rows)
+
+
+def test_dropped_batch_forgets_ids_and_full_queue_pushes_back(monkeypatch):
+    monkeypatch.setattr(ab.pq.persist_queue, "submit", lambda kind, payload, *, droppable=False: False)
+    buf = ab.AnalyticsBuffer(batch_size=100, flush_ms=60_000)
+    cid = str(uuid.uuid4())
+    assert buf.add(ab.analytics_row("a", client_event_id=cid)) == ab.QUEUED
+    buf.flush()  # the persistence queue drops the batch
+    assert buf.add(ab.analytics_row("a", client_event_id=cid)) == ab.QUEUED  # the retry isn't a duplicate
+
+    monkeypatch.setattr(ab.pq.persist_queue, "has_room", lambda n=1: False)
+    assert not buf.has_room()
+    assert buf.add(ab.analytics_row("b")) == ab.DROPPED
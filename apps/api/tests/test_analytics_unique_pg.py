@@ -0,0 +1,53 @@
+"""
+The analytics_events client_event_id migration against a real Postgres.
+
+Same setup as test_refill_and_consume_pg.py: needs psycopg and
+TEST_DATABASE_URL pointing at a THROWAWAY database. analytics_events is
+dropped and recreated here.
+"""
+import os
+from pathlib import Path
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+
+DSN = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DSN, reason="TEST_DATABASE_URL not set")
+
+MIGRATION = next((Path(__file__).resolve().parents[3] / "supabase" / "migrations")
+                 .glob("*_analytics_client_event_id_unique.sql"))
+
+
+def test_existing_duplicates_are_removed_before_the_index():
+    with psycopg.connect(DSN, autocommit=True) as conn:
+        conn.execute("drop table if exists public.analytics_events")
+        conn.execute(
+            """
+            create table public.analytics_events (
+                id bigserial primary key,
+                name text not null,
+                client_event_id text,
+                created_at timestamptz default now()
+            )
+            """
+        )
+        conn.execute(
+            """
+            insert into public.analytics_events (name, client_event_id, created_at) values
+                ('first', 'dup', now() - interval '2 minutes'),
+                ('retry', 'dup', now() - interval '1 minute'),
+                ('solo', 'one', now()),
+                ('backend', null, now()),
+                ('backend', null, now())
+            """
+        )
+        with conn.transaction():
+            conn.execute(MIGRATION.read_text())
+
+        rows = conn.execute(
+            "select name, client_event_id from public.analytics_events order by id"
+        ).fetchall()
+        assert rows == [("first", "dup"), ("solo", "one"), ("backend", None), ("backend", None)]
+        with pytest.raises(psycopg.errors.UniqueViolation):
+            conn.execute("insert into public.analytics_events (name, client_event_id) values ('again', 'dup')")
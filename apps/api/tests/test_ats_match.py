@@ -0,0 +1,126 @@
+import random
+import re
+from typing import Iterable, Set
+
+from app.agents.domain.ats_match import SkillMatchIndex, ats_match_domain, _canonical
+from app.agents.domain.skill_aliases import get_alias_store
+from app.agents.schemas.ats_schema import AtsMatchInput
+from app.agents.schemas.resume_scan_schema import JobScanResult, ResumeScanResult
+
+
+# --- reference: the original O(J·R·A) matcher, kept verbatim for comparison ---
+
+def _ref_norm(s: str) -> str:
+    s = s.strip().lower()
+    s = re.sub(r"[\(\)\[\]\{\},:;]", " ", s)
+    s = s.replace("&", " and ")
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+def _ref_tokens(s: str) -> Set[str]:
+    # "+" splits only between word characters, so "c++" stays one token
+    return {t for t in re.split(r"[\s\/\-]+|(?<=\w)\+(?=\w)", _ref_norm(s)) if t}
+
+_ALT_TOKENS = get_alias_store().alt_tokens
+
+def _ref_canonical(s: str) -> str:
+    n = _ref_norm(s)
+    nt = _ref_tokens(n)
+    for canon, alt_token_sets in _ALT_TOKENS.items():
+        if n == canon:
+            return canon
+        if any(at.issubset(nt) for at in alt_token_sets):
+            return canon
+    return n
+
+def _ref_is_degree_req(s: str) -> bool:
+    n = _ref_norm(s)
+    return any(k in n for k in ["bachelor", "bs", "b.s", "bsc", "master", "ms", "m.s", "msc", "phd", "doctorate"])
+
+def _ref_match_one(job_item: str, resume_items: Iterable[str]) -> bool:
+    # the canonical form first, then the item as written (see SkillMatchIndex.matches)
+    if _ref_match_form(_ref_canonical(job_item), resume_items):
+        return True
+    raw = _ref_norm(job_item)
+    return raw != _ref_canonical(job_item) and _ref_match_form(raw, resume_items, degrees=False)
+
+def _ref_match_form(j: str, resume_items: Iterable[str], degrees: bool = True) -> bool:
+    if degrees and _ref_is_degree_req(j):
+        jt = _ref_tokens(j)
+        for r in resume_items:
+            rt = _ref_tokens(_ref_canonical(r))
+            if ({"bs", "b.s", "b.s.", "bsc", "bachelor", "bachelors", "bachelor’s"} & rt) and \
+               ({"bachelor", "bs", "b.s", "bsc"} & jt or "bachelor" in jt):
+                return True
+    j_tokens = _ref_tokens(j)
+    for r in resume_items:
+        rr = _ref_canonical(r)
+        if j == rr:
+            return True
+        if j in rr or rr in j:
+            return True
+        r_tokens = _ref_tokens(rr)
+        if not j_tokens or not r_tokens:
+            continue
+        inter = len(j_tokens & r_tokens)
+        union = len(j_tokens | r_tokens)
+        if union and (inter / union) >= 0.5:
+            return True
+    return False
+
+
+_VOCAB = [
+    "python", "java", "javascript", "js", "typescript", "ts", "react", "node", "aws", "amazon web services",
+    "machine learning", "ml", "sql", "postgres", "b.s.", "bachelor's degree", "master's degree", "ms", "bsc",
+    "computer science", "data", "systems", "c++", "ci/cd", "docker", "kubernetes", "go", "rust", "(api)",
+    "rest apis", "distributed systems", "ecmascript", "phd", "undergraduate degree", "spark", "data pipelines",
+]
+
+
+def _random_skill(rng: random.Random) -> str:
+    return " ".join(rng.sample(_VOCAB, rng.randint(1, 3)))
+
+
+def test_canonical_matches_reference():
+    for s in _VOCAB + ["JS & TS", "B.S. in Computer Science", "  AWS (Lambda)  ", "()", "Masters"]:
+        assert _canonical(s) == _ref_canonical(s)
+
+
+def test_index_matches_reference_matcher():
+    rng = random.Random(1234)
+    for _ in range(300):
+        resume = [_random_skill(rng) for _ in range(rng.randint(0, 12))]
+        index = SkillMatchIndex(resume)
+        for _ in range(10):
+            job_item = _random_skill(rng)
+            assert index.matches(job_item) == _ref_match_one(job_item, resume), (job_item, resume)
+
+
+def test_index_handles_empty_canonical_form():
+    # "()" normalizes to "" which is a substring of everything
+    assert SkillMatchIndex(["()"]).matches("rust") == _ref_match_one("rust", ["()"]) is True
+    assert SkillMatchIndex([]).matches("rust") is False
+
+
+def test_ats_match_domain_output():
+    job = JobScanResult(
+        must_have_skills=["Python", "AWS", "Bachelor's degree", "Kubernetes"],
+        nice_to_have_skills=["TypeScript", "Spark"],
+        summary_for_candidate="Backend role.",
+    )
+    resume = ResumeScanResult(
+        global_skills=["python", "B.S. Computer Science"],
+        tools_and_tech=["Amazon Web Services", "TS", "Docker"],
+    )
+    res = ats_match_domain(AtsMatchInput(job=job, resume=resume))
+    assert res.matched_skills == ["amazon web services", "bachelor's degree", "python"]
+    assert res.missing_must_have_skills == ["kubernetes"]
+    assert res.missing_nice_to_have_skills == ["apache spark"]
+    assert res.ats_score == 0.7 * 0.75 + 0.3 * 0.5
+
+
+def test_c_requirements_are_not_folded_into_cpp():
+    job = JobScanResult(must_have_skills=["C", "Objective-C", "Embedded C", "Python"], summary_for_candidate="")
+    res = ats_match_domain(AtsMatchInput(job=job, resume=ResumeScanResult(global_skills=["Python"])))
+    assert res.missing_must_have_skills == ["c", "embedded systems", "objective-c"]
+    assert "1/4" in res.explanation
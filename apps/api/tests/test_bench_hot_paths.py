@@ -0,0 +1,18 @@
+from benchmarks import bench_hot_paths as bh
+
+
+def test_fixtures_extract_and_results_shape():
+    res = bh.bench(only=["extract_text_robust", "extract_resume[pdf]", "chunk_text"], reps=1, min_sample_sec=0)
+    assert set(res["results"]) == {
+        "chunk_text", "extract_resume[pdf]", "extract_text_robust[ashby_jsonld]",
+        "extract_text_robust[greenhouse_plain]", "extract_text_robust[nextjs_next_data]",
+    }
+    assert all(r["median_us"] > 0 for r in res["results"].values())
+
+
+def test_compare_flags_regressions_past_threshold():
+    old = {"results": {"a": {"median_us": 100.0}, "b": {"median_us": 100.0}, "gone": {"median_us": 1.0}}}
+    new = {"results": {"a": {"median_us": 110.0}, "b": {"median_us": 130.0}, "added": {"median_us": 5.0}}}
+    rows, regressed = bh.compare(old, new, threshold=0.15)
+    assert [r["case"] for r in rows] == ["a", "b"]
+    assert regressed == ["b"]
@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import stripe
+from fastapi.testclient import TestClient
+
+from app import main
+from app.auth import verify_supabase_session
+
+
+@pytest.fixture
+def fake_stripe(monkeypatch):
+    calls = {"retrieve": [], "create_customer": [], "session": []}
+    state = {"stored": "cus_old", "missing": set()}
+
+    async def retrieve(cid):
+        await asyncio.sleep(0)
+        calls["retrieve"].append(cid)
+        if cid in state["missing"]:
+            raise stripe.error.InvalidRequestError(f"No such customer: '{cid}'", "id")
+        return {"id": cid}
+
+    async def create_customer(**kw):
+        calls["create_customer"].append(kw)
+        return {"id": "cus_new"}
+
+    async def create_session(**kw):
+        calls["session"].append(kw["customer"])
+        if kw["customer"] in state["missing"]:
+            raise stripe.error.InvalidRequestError(f"No such customer: '{kw['customer']}'", "customer")
+        return SimpleNamespace(url=f"https://checkout.test/{kw['customer']}")
+
+    async def get_customer(user_id):
+        return state["stored"]
+
+    async def upsert(user_id, cid):
+        state["stored"] = cid
+
+    monkeypatch.setattr(stripe.Customer, "retrieve_async", retrieve)
+    monkeypatch.setattr(stripe.Customer, "create_async", create_customer)
+    monkeypatch.setattr(stripe.checkout.Session, "create_async", create_session)
+    monkeypatch.setattr(main, "get_stripe_customer_id", get_customer)
+    monkeypatch.setattr(main, "upsert_customer", upsert)
+    monkeypatch.setattr(main, "_valid_customers", main.TTLCache(maxsize=100, ttl=60))
+    monkeypatch.setitem(main.PRICE_CATALOG, "pack_test", {"kind": "pack", "stripe_price": "price_1", "grant": 10})
+    main.app.dependency_overrides[verify_supabase_session] = lambda: {"user_id": "u1", "email": "a@b.c"}
+    yield calls, state
+    main.app.dependency_overrides.clear()
+
+
+def _checkout(client):
+    r = client.post("/billing/checkout", json={"price_key": "pack_test"})
+    assert r.status_code == 200
+    return r.json()["url"]
+
+
+def test_customer_mode_check_is_cached(fake_stripe):
+    calls, _ = fake_stripe
+    client = TestClient(main.app)
+    assert _checkout(client) == _checkout(client) == "https://checkout.test/cus_old"
+    assert calls["retrieve"] == ["cus_old"]  # checked once, not per checkout
+    assert calls["create_customer"] == []
+
+
+def test_wrong_mode_customer_is_replaced(fake_stripe):
+    calls, state = fake_stripe
+    state["missing"].add("cus_old")
+    assert _checkout(TestClient(main.app)) == "https://checkout.test/cus_new"
+    assert state["stored"] == "cus_new" and len(calls["create_customer"]) == 1
+
+
+def test_cached_customer_deleted_in_stripe_is_rechecked(fake_stripe):
+    calls, state = fake_stripe
+    client = TestClient(main.app)
+    _checkout(client)
+    state["missing"].add("cus_old")  # deleted after it was cached
+    assert _checkout(client) == "https://checkout.test/cus_new"
+    assert calls["session"] == ["cus_old", "cus_old", "cus_new"]
@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+from app.routers.history import parse_draft_data
+from app.utils import draft_outputs as do
+
+PLAYBOOK = {"strengths": ["python"], "gaps": [], "interview_questions": ["why?"]}
+COVER = {"subject": "Hi", "greeting": "Hello", "body_paragraphs": ["p1"], "valediction": "Best", "signature": "J"}
+ALIGNMENT = {"summary": "ok", "coverage": [{"keyword": "python", "present": True}]}
+
+
+def _fenced(obj):
+    return "```json\n" + json.dumps(obj) + "\n```"
+
+
+def _legacy_row():
+    return {
+        "id": "d1",
+        "outputs_json": {"bullets": _fenced(COVER), "alignment": {"bullets": _fenced(ALIGNMENT)}},
+        "interview_points": {"bullets": _fenced(PLAYBOOK), "meta": {}},
+        "resume_bullets": None,
+        "first_impression": '{"verdict": "strong"}',
+        "bender_score_data": {"output_json": {"final_bender_score": 80}},
+    }
+
+
+def test_legacy_row_is_normalized_into_typed_columns():
+    out = do.normalize_draft_outputs(_legacy_row())
+    assert out["interview_points"] == PLAYBOOK
+    assert out["cover_letter"] == COVER
+    assert out["ats_alignment"] == ALIGNMENT
+    assert "resume_bullets" not in out  # outputs_json.bullets was the cover letter
+    assert out["first_impression"] == {"verdict": "strong"}
+    assert out["bender_score_data"] == {"output_json": {"final_bender_score": 80}}
+    assert do.is_normalized(out)
+
+
+def test_write_payload_uses_task_column_only():
+    payload = {"outputs_json": {"bullets": _fenced({"bullets": ["a"]})}, "resume_bullets": _fenced({"bullets": ["a"]})}
+    assert do.normalize_draft_outputs(payload, from_outputs=False) == {"resume_bullets": {"bullets": ["a"]}, "outputs_version": 1}
+    # unrecognized shapes are kept as stored
+    assert do.normalize_draft_outputs({"cover_letter": "plain text"})["cover_letter"] == "plain text"
+
+
+def test_reads_pass_normalized_rows_through():
+    row = {**_legacy_row(), **do.normalize_draft_outputs(_legacy_row())}
+    assert parse_draft_data(row) is row
+    assert parse_draft_data(_legacy_row()) == row  # not yet migrated: normalized on read
+
+
+def test_migrate_patches_changed_columns_page_by_page(monkeypatch):
+    rows = [{**_legacy_row(), "id": f"d{i}", "outputs_version": 0} for i in range(5)]
+    # already normalized (e.g. rewritten since the page was read): nothing to patch
+    rows.append(do.normalize_draft_outputs({**_legacy_row(), "id": "d5"}) | {"id": "d5"})
+    patched = {}
+
+    async def fake_get(version, limit=200, after_id=None):
+        return [r for r in rows if after_id is None or r["id"] > after_id][:limit]
+
+    async def fake_patch(draft_id, fields):
+        patched[draft_id] = fields
+
+    monkeypatch.setattr(do.supabase_db, "get_unnormalized_drafts", fake_get)
+    monkeypatch.setattr(do.supabase_db, "patch_draft", fake_patch)
+
+    assert asyncio.run(do.migrate_drafts(batch=2, dry_run=True)) == {"scanned": 6, "would_patch": 5}
+    assert patched == {}
+    assert asyncio.run(do.migrate_drafts(batch=2)) == {"scanned": 6, "normalized": 5}
+    assert sorted(patched) == [f"d{i}" for i in range(5)]
+    # bender_score_data was already a parsed object: not rewritten
+    assert set(patched["d0"]) == {"interview_points", "cover_letter", "ats_alignment", "first_impression", "outputs_version"}
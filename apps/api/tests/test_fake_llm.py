@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.prompts import ChatPromptTemplate
+
+from app.agents.bender_score import BenderScoreOut
+from app.agents.domain.bullets import _soft_validate_bullets
+from app.agents.schemas.bullets_schema import BulletsDraftResult
+from app.agents.schemas.experience_fit_schema import ExperienceFitResult
+from app.agents.schemas.first_impression_schema import FirstImpressionResult
+from app.agents.schemas.resume_scan_schema import JobScanResult, ResumeScanResult
+from app.core.settings import settings
+from app.services import fake_llm
+from app.services.chat_models import chat_model
+from benchmarks import supabase_standin
+
+_PROMPT = ChatPromptTemplate.from_messages([("human", "{text}")])
+
+
+@pytest.fixture
+def instant(monkeypatch):
+    monkeypatch.setattr(fake_llm, "behavior", fake_llm.Behavior(latency_ms=0, sigma=0))
+
+
+def test_structured_outputs_are_schema_valid_and_deterministic(instant, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "fake")
+    llm = chat_model("gemini-2.5-flash")
+    assert isinstance(llm, fake_llm.FakeChatModel)
+    text = "Senior engineer: Python, Kubernetes and PostgreSQL on AWS."
+    for schema in (JobScanResult, ResumeScanResult, BulletsDraftResult, FirstImpressionResult,
+                   BenderScoreOut, ExperienceFitResult):
+        chain = _PROMPT | llm.with_structured_output(schema)
+        first = chain.invoke({"text": text})
+        assert isinstance(first, schema)
+        assert chain.invoke({"text": text}) == first
+    job = (_PROMPT | llm.with_structured_output(JobScanResult)).invoke({"text": text})
+    assert {"Python", "Kubernetes", "PostgreSQL", "AWS"} <= set(job.must_have_skills + job.nice_to_have_skills)
+    bullets = (_PROMPT | llm.with_structured_output(BulletsDraftResult)).invoke({"text": text})
+    assert _soft_validate_bullets(bullets) == []
+
+
+def test_error_distribution_and_generate_text(monkeypatch):
+    monkeypatch.setattr(fake_llm, "behavior", fake_llm.Behavior(
+        seed=1, latency_ms=0, sigma=0, error_rate=0.5, errors="429=1,503=1"))
+    outcomes = []
+    for _ in range(200):
+        try:
+            asyncio.run(fake_llm.generate_text("python"))
+            outcomes.append(200)
+        except fake_llm.FakeLLMError as e:
+            outcomes.append(e.status_code)
+    assert set(outcomes) == {200, 429, 503}
+    assert 70 < outcomes.count(200) < 130
+
+
+def test_supabase_standin_auth_users_and_upsert_draft():
+    client = TestClient(supabase_standin.app)
+    me = client.get("/auth/v1/user", headers={"Authorization": "Bearer load-1"}).json()
+    assert me["id"] == client.get("/auth/v1/user", headers={"Authorization": "Bearer load-1"}).json()["id"]
+    assert client.get("/auth/v1/user").status_code == 401
+
+    row = client.get("/rest/v1/users", params={"id": f"eq.{me['id']}", "select": "id,entitlements(kind)"},
+                     headers={"Accept": "application/vnd.pgrst.object+json"}).json()
+    assert row["entitlements"] == [] and row["free_uses_remaining"] > 0
+
+    p = {"user_id": me["id"], "client_ref_id": "r1", "outputs_json": {"bullets": {"a": 1}}}
+    first = client.post("/rest/v1/rpc/upsert_draft", json={"p": p}).json()
+    second = client.post("/rest/v1/rpc/upsert_draft", json={"p": {**p, "outputs_json": {"alignment": {}}}}).json()
+    assert second["id"] == first["id"]
+    assert set(second["outputs_json"]) == {"bullets", "alignment"}
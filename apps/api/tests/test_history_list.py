@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth import verify_supabase_session
+from app.routers import history
+
+
+def _rows(n):
+    t0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    # two rows share each timestamp so the id tie-breaker matters
+    return [
+        {
+            "id": f"{i:04d}",
+            "client_ref_id": f"ref-{i}",
+            "created_at": (t0 + timedelta(minutes=i // 2)).isoformat(),
+            "job_title": f"Job {i}",
+            "tasks": ["bullets"],
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    table = _rows(7)
+    calls = []
+
+    async def fake_summaries(user_id, limit=50, after=None):
+        calls.append((user_id, limit, after))
+        rows = sorted(table, key=lambda r: (r["created_at"], r["id"]), reverse=True)
+        if after:
+            rows = [r for r in rows if (r["created_at"], r["id"]) < after]
+        return rows[:limit]
+
+    monkeypatch.setattr(history, "get_draft_summaries", fake_summaries)
+    app = FastAPI()
+    app.include_router(history.router)
+    app.dependency_overrides[verify_supabase_session] = lambda: {"user_id": "u1", "email": None}
+    c = TestClient(app)
+    c.calls = calls
+    return c
+
+
+def test_keyset_pages_cover_every_row_once(client):
+    seen, cursor = [], None
+    for _ in range(10):
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        r = client.get("/history", params=params)
+        assert r.status_code == 200
+        seen += [row["id"] for row in r.json()]
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    assert seen == sorted(seen, reverse=True) and sorted(seen) == [f"{i:04d}" for i in range(7)]
+    assert [c[1] for c in client.calls] == [4, 4, 4]  # limit + 1 to detect the next page
+
+
+def test_last_page_has_no_cursor_and_limit_is_clamped(client):
+    r = client.get("/history", params={"limit": 1000})
+    assert len(r.json()) == 7 and "x-next-cursor" not in r.headers
+    assert client.calls[-1][1] == history.MAX_PAGE_SIZE + 1
+
+
+def test_bad_cursor_is_400(client):
+    assert client.get("/history", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_cursor_roundtrip():
+    row = {"created_at": "2026-01-01T00:00:00.123456+00:00", "id": "abc"}
+    assert history.decode_cursor(history.encode_cursor(row)) == (row["created_at"], row["id"])
@@ -0,0 +1,86 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.utils import llm
+from app.utils.llm_router import ROUTER_EVENTS, LLMRouter, Provider, ProviderError, served_by
+
+
+def _standin(name, *, delay=0.0, fail=None, calls=None):
+    """A local provider: answers f"{name}: {prompt}" after `delay`, or raises `fail`."""
+    async def gen(prompt):
+        if calls is not None:
+            calls.append(name)
+        await asyncio.sleep(delay)
+        if fail is not None:
+            raise fail
+        return f"{name}: {prompt}"
+    return Provider(name, f"{name}-model", gen)
+
+
+def _warm(p, seconds, n=20):
+    for _ in range(n):
+        p.stats.ok(seconds)
+
+
+def test_hedges_to_secondary_after_primary_p95():
+    slow, fast = _standin("slow-a", delay=1.0), _standin("fast-b", delay=0.01)
+    _warm(slow, 0.02)
+    router = LLMRouter([slow, fast], hedge=True, hedge_min_ms=20, min_samples=20)
+    hedges = ROUTER_EVENTS.value(provider="fast-b", event="hedge")
+
+    async def run():
+        text = await router.generate("hi")
+        return text, served_by.get()
+
+    text, served = asyncio.run(run())
+    assert text == "fast-b: hi"
+    assert served == ("fast-b", "fast-b-model")
+    assert ROUTER_EVENTS.value(provider="fast-b", event="hedge") == hedges + 1
+    assert len(slow.stats.latencies) == 20  # the cancelled loser isn't counted against it
+
+
+def test_fails_over_on_429_and_cools_the_provider_down():
+    calls = []
+    limited = _standin("limited-a", fail=ProviderError("rate limited", status_code=429, retry_after=60), calls=calls)
+    backup = _standin("backup-b", calls=calls)
+    router = LLMRouter([limited, backup], hedge=False)
+
+    assert asyncio.run(router.generate("x")) == "backup-b: x"
+    assert asyncio.run(router.generate("y")) == "backup-b: y"
+    assert calls == ["limited-a", "backup-b", "backup-b"]
+    assert router.stats()["providers"]["limited-a"]["cooling_down_sec"] > 50
+
+
+def test_non_retryable_errors_are_raised_without_failover():
+    calls = []
+    bad = _standin("bad-a", fail=ProviderError("bad request", status_code=400), calls=calls)
+    router = LLMRouter([bad, _standin("other-b", calls=calls)], hedge=False)
+    with pytest.raises(ProviderError, match="bad request"):
+        asyncio.run(router.generate("x"))
+    assert calls == ["bad-a"]
+
+
+def test_openai_compat_adapter_maps_5xx_to_retryable_error(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        if len(seen) == 1:
+            return httpx.Response(503, text="overloaded")
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": " ok "}}], "usage": {"prompt_tokens": 3, "completion_tokens": 1},
+        })
+
+    monkeypatch.setenv("GROQ_API_KEY", "k")
+    monkeypatch.setattr(llm, "_http_client", lambda timeout: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    model, gen = llm._openai_compat("groq")
+
+    with pytest.raises(ProviderError) as err:
+        asyncio.run(gen("hi"))
+    assert err.value.status_code == 503
+    assert asyncio.run(gen("hi")) == "ok"
+    assert seen[1].url.path == "/openai/v1/chat/completions"
+    assert seen[1].headers["authorization"] == "Bearer k"
+    assert model == "llama-3.1-8b-instant"
@@ -0,0 +1,43 @@
+from app.core.metrics import llm_stage
+from app.utils import llm_usage
+from app.utils.llm_metrics import record_llm_call
+
+
+def test_cost_uses_longest_prefix():
+    assert llm_usage.cost_usd("gemini-2.5-flash", 1_000_000, 0) == 0.30
+    assert llm_usage.cost_usd("gemini-2.5-flash-lite-preview", 0, 1_000_000) == 0.40
+    assert llm_usage.cost_usd("some-local-model", 1000, 1000) == 0.0
+
+
+def test_request_usage_by_stage_and_rollup(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(llm_usage.pq.persist_queue, "submit", lambda kind, payload, **kw: submitted.append((kind, payload)))
+    rollup = llm_usage.UsageRollup()
+    monkeypatch.setattr(llm_usage, "usage_rollup", rollup)
+
+    record_llm_call("gemini-2.5-flash", 0.1, input_tokens=5, output_tokens=5)  # outside a request: not tracked
+    with llm_usage.track(user_id="u1", task="bullets") as usage:
+        with llm_stage("generate"):
+            record_llm_call("gemini-2.5-flash", 0.1, input_tokens=1000, output_tokens=200)
+        for _ in range(2):
+            with llm_stage("repair"):
+                record_llm_call("gemini-2.5-flash", 0.1, input_tokens=500, output_tokens=100)
+        with llm_stage("repair"):
+            record_llm_call("gemini-2.5-flash", 0.1, ok=False)
+
+    s = usage.summary()
+    assert (s["calls"], s["input_tokens"], s["output_tokens"]) == (3, 2000, 400)
+    assert s["by_stage"]["repair"]["calls"] == 2 and s["by_stage"]["generate"]["input_tokens"] == 1000
+    assert s["cost_usd"] == round((2000 * 0.30 + 400 * 2.50) / 1e6, 6)
+
+    with llm_usage.track(user_id="u1", task="bullets"):
+        with llm_stage("generate"):
+            record_llm_call("gemini-2.5-flash", 0.1, input_tokens=1, output_tokens=1)
+    rows = {r["stage"]: r for r in rollup.rows()}
+    assert rows["generate"]["calls"] == 2 and rows["generate"]["input_tokens"] == 1001
+    assert rows["repair"]["user_id"] == "u1" and rows["repair"]["task"] == "bullets"
+
+    assert rollup.flush() == 2 and len(rollup) == 0
+    (kind, payload), = submitted
+    assert kind == "llm_usage" and payload["batch_id"] and len(payload["rows"]) == 2
+    assert rollup.flush() == 0
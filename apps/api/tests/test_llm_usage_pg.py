@@ -0,0 +1,78 @@
+"""
+add_llm_usage() from the llm_usage_daily migration, against a real Postgres.
+
+Same setup as test_refill_and_consume_pg.py: needs psycopg and
+TEST_DATABASE_URL pointing at a THROWAWAY database. The rows this test
+inserts are deleted afterwards.
+"""
+import json
+import os
+import uuid
+from pathlib import Path
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+
+DSN = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DSN, reason="TEST_DATABASE_URL not set")
+
+MIGRATION = next(
+    (Path(__file__).resolve().parents[3] / "supabase" / "migrations").glob("*_llm_usage_daily.sql")
+)
+
+
+@pytest.fixture(scope="module")
+def db():
+    with psycopg.connect(DSN, autocommit=True) as conn:
+        conn.execute(MIGRATION.read_text())
+        batches, users = [], []
+        yield conn, batches, users
+        conn.execute("delete from public.llm_usage_batches where id = any(%s)", (batches,))
+        conn.execute(
+            "delete from public.llm_usage_daily where user_id = any(%s::uuid[]) or (user_id is null and task = 'test')",
+            (users,),
+        )
+
+
+def _add(db, rows):
+    conn, batches, _ = db
+    bid = uuid.uuid4().hex
+    batches.append(bid)
+    return bid, conn.execute("select public.add_llm_usage(%s, %s::jsonb)", (bid, json.dumps(rows))).fetchone()[0]
+
+
+def _row(user_id, stage="generate", n=1):
+    return {
+        "day": "2026-10-19", "user_id": user_id, "task": "test", "stage": stage, "model": "gemini-2.5-flash",
+        "calls": n, "input_tokens": 100 * n, "output_tokens": 10 * n, "cost_usd": 0.001 * n,
+    }
+
+
+def test_batches_add_up_including_guests(db):
+    conn, _, users = db
+    uid = str(uuid.uuid4())
+    users.append(uid)
+    _add(db, [_row(uid), _row(uid, "repair"), _row(None)])
+    _add(db, [_row(uid, n=2), _row(None, n=3)])
+
+    got = conn.execute(
+        "select stage, calls, input_tokens, cost_usd from public.llm_usage_daily where user_id = %s order by stage",
+        (uid,),
+    ).fetchall()
+    assert [(s, c, t, float(x)) for s, c, t, x in got] == [("generate", 3, 300, 0.003), ("repair", 1, 100, 0.001)]
+    guest = conn.execute(
+        "select calls from public.llm_usage_daily where user_id is null and task = 'test'"
+    ).fetchone()
+    assert guest[0] == 4
+
+
+def test_replayed_batch_is_ignored(db):
+    conn, batches, users = db
+    uid = str(uuid.uuid4())
+    users.append(uid)
+    bid, applied = _add(db, [_row(uid)])
+    assert applied == 1
+    again = conn.execute("select public.add_llm_usage(%s, %s::jsonb)", (bid, json.dumps([_row(uid)]))).fetchone()[0]
+    assert again == 0
+    assert conn.execute("select calls from public.llm_usage_daily where user_id = %s", (uid,)).fetchone()[0] == 1
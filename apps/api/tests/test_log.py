@@ -0,0 +1,85 @@
+import asyncio
+import io
+import json
+import logging
+
+from app.core import log as rblog
+from app.core.metrics import counters
+
+
+def _lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_lines_with_request_id_and_redaction():
+    out = io.StringIO()
+    rblog.setup_logging("INFO", stream=out)
+    try:
+        async def handle():
+            rblog.request_id_var.set("rid-1")
+            logging.getLogger("t").info(
+                "scanned %s", "resume",
+                extra={"resume_text": "Jane Doe, 10 years Python", "payload": {"job_description_text": "x" * 40, "n": 2}},
+            )
+
+        asyncio.run(handle())
+        logging.getLogger("t").info("outside")
+    finally:
+        rblog.stop_logging()
+    first, second = _lines(out)
+    assert first["msg"] == "scanned resume" and first["request_id"] == "rid-1" and first["level"] == "info"
+    assert first["resume_text"] == "<redacted 25 chars>"
+    assert first["payload"] == {"job_description_text": "<redacted 40 chars>", "n": 2}
+    assert "request_id" not in second
+
+
+def test_debug_is_sampled_and_full_queue_drops():
+    out = io.StringIO()
+    rblog.setup_logging("DEBUG", stream=out, debug_sample=0.0)
+    try:
+        logging.getLogger("t").debug("noisy")
+        logging.getLogger("t").warning("kept")
+    finally:
+        rblog.stop_logging()
+    assert [r["msg"] for r in _lines(out)] == ["kept"]
+
+    # no listener draining: the bounded queue fills and the rest are dropped
+    handler = rblog._QueueHandler(rblog.queue.Queue(maxsize=2))
+    before = counters().get("log_dropped", 0)
+    for i in range(5):
+        handler.handle(logging.LogRecord("t", logging.INFO, __file__, 1, "m", (), None))
+    assert counters()["log_dropped"] - before == 3
+
+
+def test_draft_run_422_log_redacts_resume_and_jd():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.auth import verify_supabase_session
+    from app.core.errors import install_error_handlers
+    from app.routers import draft
+
+    app = FastAPI()
+    install_error_handlers(app)
+    app.include_router(draft.router)
+    app.dependency_overrides[verify_supabase_session] = lambda: {"user_id": "u1", "email": None}
+
+    out = io.StringIO()
+    rblog.setup_logging("INFO", stream=out)
+    try:
+        client = TestClient(app)
+        auth = {"Authorization": "Bearer t"}
+        secret = {"resume": "SECRET RESUME TEXT", "job_text": "SECRET JD TEXT"}
+        statuses = [
+            # not an object: the issue's input is the whole body
+            client.post("/draft/run", headers=auth, json=[secret]).status_code,
+            # a bad field: the issue's input is that field's value
+            client.post("/draft/run", headers=auth, json={**secret, "task": 7}).status_code,
+            client.post("/draft/run", headers=auth, json={"resume": ["SECRET RESUME TEXT"]}).status_code,
+        ]
+    finally:
+        rblog.stop_logging()
+    assert statuses == [422, 422, 422]
+    logged = [r for r in _lines(out) if r["msg"] == "request validation failed"]
+    assert len(logged) == 3
+    assert "SECRET" not in json.dumps(logged)
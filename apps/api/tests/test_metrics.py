@@ -0,0 +1,71 @@
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import supabase_db
+from app.core import metrics
+from app.core.middleware import RequestMiddleware
+from app.utils.rate_limit import REJECTIONS, throttle
+
+
+def test_histogram_render_and_timed():
+    h = metrics.histogram("rb_test_seconds", "Test.", ("step",), buckets=(0.1, 1.0))
+    h.observe(0.05, step="a")
+    h.observe(0.5, step="a")
+    h.observe(5, step="a")
+    with metrics.timed("b", metric=h):
+        pass
+    text = metrics.render_prometheus()
+    assert "# TYPE rb_test_seconds histogram" in text
+    assert 'rb_test_seconds_bucket{step="a",le="0.1"} 1' in text
+    assert 'rb_test_seconds_bucket{step="a",le="1"} 2' in text
+    assert 'rb_test_seconds_bucket{step="a",le="+Inf"} 3' in text
+    assert 'rb_test_seconds_count{step="a"} 3' in text
+    assert h.count(step="b") == 1
+
+
+def test_route_template_and_supabase_calls_per_request(monkeypatch):
+    monkeypatch.setattr(supabase_db, "REST", "http://db.test/rest/v1")
+    transport = httpx.MockTransport(lambda req: httpx.Response(200, json=[]))
+    api = FastAPI()
+
+    @api.get("/items/{item_id}")
+    async def item(item_id: str):
+        async with supabase_db.rest_client(transport=transport) as client:
+            await client.get(f"{supabase_db.REST}/drafts", params={"id": f"eq.{item_id}"})
+            await client.post(f"{supabase_db.REST}/rpc/upsert_draft", json={})
+        return {"ok": True}
+
+    api.add_middleware(RequestMiddleware)
+    client = TestClient(api)
+    before = metrics.HTTP_SECONDS.count(route="/items/{item_id}", method="GET")
+    assert client.get("/items/1").status_code == 200
+    assert client.get("/items/2").status_code == 200
+    client.get("/nope")
+
+    assert metrics.HTTP_SECONDS.count(route="/items/{item_id}", method="GET") == before + 2
+    assert metrics.HTTP_REQUESTS.value(route="unmatched", method="GET", status=404) >= 1
+    assert supabase_db.SUPABASE_REQUESTS.value(op="rpc/upsert_draft", method="POST", status=200) >= 2
+    text = metrics.render_prometheus()
+    assert 'rb_supabase_calls_per_request_bucket{route="/items/{item_id}",le="2"} 2' in text
+
+
+def test_rate_limit_rejections_counted():
+    before = REJECTIONS.value(window="60s")
+    assert throttle("test-metrics", limit=1, window_sec=60)[0]
+    assert not throttle("test-metrics", limit=1, window_sec=60)[0]
+    assert REJECTIONS.value(window="60s") == before + 1
+
+
+def test_metrics_endpoint_requires_token(monkeypatch):
+    from app import main
+
+    client = TestClient(main.app)
+    monkeypatch.setattr(main, "METRICS_TOKEN", "")
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setattr(main, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer nope"}).status_code == 401
+    r = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert r.status_code == 200 and "rb_http_requests_total" in r.text
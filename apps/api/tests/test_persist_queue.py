@@ -0,0 +1,183 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+
+from app.utils import persist_queue as pq
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    monkeypatch.setattr(pq, "_HANDLERS", {})
+    return pq._HANDLERS
+
+
+def _queue(tmp_path, **kw):
+    kw.setdefault("retry_base", 0.001)
+    kw.setdefault("retry_max", 0.002)
+    return pq.PersistQueue(str(tmp_path / "spool.jsonl"), **kw)
+
+
+def _journal(q):
+    try:
+        with open(q.spool_path) as f:
+            return [json.loads(line) for line in f]
+    except FileNotFoundError:
+        return []
+
+
+def test_jobs_run_and_journal_compacts(tmp_path, handlers):
+    seen = []
+
+    async def handle(p):
+        seen.append(p["n"])
+
+    pq.register("t", handle)
+    q = _queue(tmp_path)
+
+    async def run():
+        await q.start()
+        for n in range(20):
+            q.submit("t", {"n": n})
+        assert await q.drain(2)
+        await q.stop()
+
+    asyncio.run(run())
+    assert sorted(seen) == list(range(20))
+    assert _journal(q) == []
+    assert q.stats()["pending"] == 0
+
+
+def test_retry_then_dead(tmp_path, handlers):
+    attempts = {"flaky": 0, "bad": 0}
+
+    async def flaky(p):
+        attempts["flaky"] += 1
+        if attempts["flaky"] < 3:
+            raise httpx.ConnectError("down")
+
+    async def bad(p):
+        attempts["bad"] += 1
+        req = httpx.Request("POST", "http://x")
+        raise httpx.HTTPStatusError("forbidden", request=req, response=httpx.Response(403, request=req))
+
+    pq.register("flaky", flaky)
+    pq.register("bad", bad)
+    q = _queue(tmp_path, max_attempts=5)
+
+    async def run():
+        await q.start()
+        q.submit("flaky", {})
+        q.submit("bad", {})
+        assert await q.drain(2)
+        await q.stop()
+
+    asyncio.run(run())
+    assert attempts == {"flaky": 3, "bad": 1}  # 4xx is not retried
+    dead = [r for r in _journal(q) if r["op"] == "dead"]
+    assert len(dead) == 1 and dead[0]["kind"] == "bad"
+
+
+def test_unfinished_jobs_replay_after_crash(tmp_path, handlers):
+    seen = []
+
+    async def hang(p):
+        await asyncio.sleep(3600)
+
+    async def handle(p):
+        seen.append(p["n"])
+
+    pq.register("t", hang)
+    q1 = _queue(tmp_path)
+
+    async def crash():
+        await q1.start()
+        for n in range(3):
+            q1.submit("t", {"n": n})
+        await asyncio.sleep(0.01)
+        for t in q1._workers:  # process dies mid-write: no "done" records
+            t.cancel()
+
+    asyncio.run(crash())
+    assert [r["payload"]["n"] for r in _journal(q1) if r["op"] == "add"] == [0, 1, 2]
+
+    pq.register("t", handle)
+    q2 = _queue(tmp_path)
+
+    async def restart():
+        assert await q2.start() == 3
+        assert await q2.drain(2)
+        await q2.stop()
+
+    asyncio.run(restart())
+    assert sorted(seen) == [0, 1, 2]
+    assert _journal(q2) == []
+
+
+def test_bounded_buffer_drops_droppable_and_spills_the_rest(tmp_path, handlers):
+    seen = []
+    gate = asyncio.Event()
+
+    async def handle(p):
+        await gate.wait()
+        seen.append(p["n"])
+
+    pq.register("t", handle)
+    q = _queue(tmp_path, max_pending=2, workers=1)
+
+    async def run():
+        await q.start()
+        results = [q.submit("t", {"n": n}) for n in range(2)]
+        results.append(q.submit("t", {"n": 99}, droppable=True))  # buffer full -> dropped
+        results += [q.submit("t", {"n": n}) for n in range(2, 5)]  # buffer full -> spilled to journal
+        assert q.stats()["spilled"] == 3
+        gate.set()
+        assert await q.drain(2)
+        await q.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert results == [True, True, False, True, True, True]
+    assert sorted(seen) == [0, 1, 2, 3, 4]
+
+
+def test_per_process_journal_adopts_only_orphans(tmp_path, handlers):
+    fcntl = pytest.importorskip("fcntl")
+    seen = []
+
+    async def handle(p):
+        seen.append(p["n"])
+
+    pq.register("t", handle)
+    base = str(tmp_path / "spool.jsonl")
+
+    def journal(pid, ns):
+        path = pq.process_spool_path(base, pid)
+        with open(path, "w") as f:
+            for n in ns:
+                f.write(json.dumps({"op": "add", "id": f"{pid}-{n}", "kind": "t", "payload": {"n": n}, "ts": 0}) + "\n")
+        return path
+
+    orphan = journal(4242, [1, 2])  # its process is gone: nobody holds the lock
+    live = journal(4343, [3])       # a sibling worker that is still running
+    lock = open(f"{live}.lock", "a")
+    fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+
+    q = _queue(tmp_path, per_process=True)
+    assert q.spool_path == pq.process_spool_path(base, os.getpid())
+
+    async def run():
+        assert await q.start() == 2
+        assert await q.drain(2)
+        await q.stop()
+
+    try:
+        asyncio.run(run())
+    finally:
+        lock.close()
+        q._owner_lock.close()
+    assert sorted(seen) == [1, 2]
+    assert not (tmp_path / "spool.4242.jsonl").exists()
+    assert [r["payload"]["n"] for r in _journal(pq.PersistQueue(live))] == [3]
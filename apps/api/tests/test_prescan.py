@@ -0,0 +1,88 @@
+from app.agents.domain.prescan import prescan_job, prescan_resume, record_prescan, _years_from_ranges
+
+JD = """Senior Backend Engineer
+Location: Remote (US)
+
+About the role
+You will build the APIs that power our hiring platform. You will work with product and data teams.
+
+Responsibilities
+- Design and ship services
+- Own on-call for your services
+
+Requirements
+- 5+ years of experience with Python or Go (golang)
+- Strong SQL and PostgreSQL skills
+- Experience with AWS, Docker and Kubernetes
+- CI/CD pipelines and REST APIs
+
+Nice to have
+- Kafka, Terraform
+- Experience with React
+"""
+
+RESUME = """Jane Q Doe jane@example.com (555) 555-5555
+Summary Backend engineer focused on data-heavy APIs. Loves reliable systems.
+Experience
+Acme Corp, Software Engineer, Jan 2019 - Present. Built Python services on AWS.
+Beta LLC, Junior Developer, 06/2016 - 12/2018. Maintained Django apps.
+Education B.S. Computer Science, 2012 - 2016
+Skills Python, Django, PostgreSQL, Docker, Kubernetes, AWS, Terraform, Git, REST APIs
+"""
+
+
+def test_prescan_job_structured_posting():
+    res = prescan_job(JD)
+    assert res is not None
+    assert res.raw_title == "Senior Backend Engineer"
+    assert res.location.startswith("Remote")
+    assert {"Python", "golang", "PostgreSQL", "AWS", "Docker", "Kubernetes", "CI/CD", "REST APIs"} <= set(res.must_have_skills)
+    assert set(res.nice_to_have_skills) == {"Kafka", "Terraform", "React"}
+    assert "Docker" in res.tools_and_tech and "Python" not in res.tools_and_tech
+    assert res.summary_for_candidate.startswith("You will build the APIs")
+
+
+def test_prescan_job_flattened_text():
+    res = prescan_job(" ".join(JD.split()))
+    assert res is not None
+    assert "Kubernetes" in res.must_have_skills
+    assert "Kafka" in res.nice_to_have_skills
+
+
+def test_prescan_job_falls_back_without_sections():
+    assert prescan_job("We want someone great at Python and SQL to join our team.") is None
+
+
+def test_prescan_resume_structured():
+    res = prescan_resume(" ".join(RESUME.split()))
+    assert res is not None
+    assert res.candidate_name == "Jane Q Doe"
+    # 2016-06..2018-12 plus 2019-01..now, education excluded
+    assert res.total_years_experience >= 9.0
+    assert "Terraform" in res.tools_and_tech
+    assert "Python" in res.global_skills
+    # experience_fit only reads this field
+    assert res.work_experience_summary.startswith("Acme Corp, Software Engineer")
+    assert "Maintained Django apps." in res.work_experience_summary
+
+
+def test_prescan_resume_needs_dated_experience():
+    undated = RESUME.replace("Jan 2019 - Present", "").replace("06/2016 - 12/2018", "")
+    assert prescan_resume(undated) is None
+
+
+def test_years_merge_overlaps():
+    assert _years_from_ranges("Jan 2020 - Dec 2020, Jun 2020 - Dec 2021") == 2.0
+
+
+def test_prescan_stats_served_on_health_cache():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    before = TestClient(app).get("/health/cache").json()["prescan"]["job"]
+    record_prescan("job", hit=True, local_ms=2.0)
+    record_prescan("job", hit=False, local_ms=2.0, llm_ms=800.0)
+    after = TestClient(app).get("/health/cache").json()["prescan"]["job"]
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"] + 1
+    assert 0.0 < after["hit_rate"] <= 1.0 and after["avg_llm_ms"] > 0
@@ -0,0 +1,75 @@
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.middleware import RequestMiddleware
+from app.core.profiling import ProfileMiddleware, SlowRequestProfiler
+from app.routers import admin
+
+
+def _busy_parse(ms: float) -> int:
+    n, end = 0, time.perf_counter() + ms / 1000
+    while time.perf_counter() < end:
+        n += 1
+    return n
+
+
+def _client(prof: SlowRequestProfiler) -> TestClient:
+    api = FastAPI()
+
+    @api.post("/draft/run-form")
+    async def run_form(ms: float = 0):
+        _busy_parse(ms)
+        return {"ok": True}
+
+    @api.get("/health")
+    async def health():
+        return {"ok": True}
+
+    api.include_router(admin.router)
+    api.add_middleware(ProfileMiddleware, profiler=prof)
+    api.add_middleware(RequestMiddleware)
+    return TestClient(api)
+
+
+def _wait_for(prof: SlowRequestProfiler, n: int) -> list:
+    deadline = time.monotonic() + 5
+    while len(prof.recent()) < n and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return prof.recent()
+
+
+def test_slow_request_profile_written_and_listed(tmp_path, monkeypatch):
+    prof = SlowRequestProfiler(slow_ms=150, out_dir=str(tmp_path), interval_ms=2)
+    client = _client(prof)
+    client.post("/draft/run-form?ms=1")
+    client.get("/health")
+    client.post("/draft/run-form?ms=300", headers={"x-request-id": "slow-1"})
+
+    (meta,) = _wait_for(prof, 1)
+    assert meta["request_id"] == "slow-1" and meta["reason"] == "slow" and meta["duration_ms"] >= 300
+    folded = prof.read(meta["file"])
+    top = folded.splitlines()[0]
+    assert "_busy_parse (test_profiling.py:" in top and int(top.rsplit(" ", 1)[1]) > 10
+
+    assert client.get("/admin/profiles").status_code == 404  # no ADMIN_TOKEN: disabled
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "t")
+    monkeypatch.setattr(admin, "profiler", prof)
+    assert client.get("/admin/profiles", headers={"Authorization": "Bearer x"}).status_code == 401
+    listed = client.get("/admin/profiles", headers={"Authorization": "Bearer t"}).json()
+    assert [p["request_id"] for p in listed["profiles"]] == ["slow-1"]
+    r = client.get(f"/admin/profiles/{meta['file']}", headers={"Authorization": "Bearer t"})
+    assert r.text == folded
+    assert client.get("/admin/profiles/..%2F..%2Fetc%2Fpasswd", headers={"Authorization": "Bearer t"}).status_code == 404
+
+
+def test_every_nth_request_and_keep(tmp_path):
+    prof = SlowRequestProfiler(every_n=2, out_dir=str(tmp_path), interval_ms=1, keep=2)
+    client = _client(prof)
+    for i in range(8):
+        client.post("/draft/run-form?ms=20", headers={"x-request-id": f"r{i}"})
+    time.sleep(0.3)
+    recent = _wait_for(prof, 2)
+    assert [p["request_id"] for p in recent] == ["r7", "r5"]
+    assert all(p["reason"] == "every_n" for p in recent)
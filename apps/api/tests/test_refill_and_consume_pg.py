@@ -0,0 +1,122 @@
+"""
+Concurrency test for public.refill_and_consume against a real Postgres.
+
+Needs psycopg (v3) and TEST_DATABASE_URL pointing at a THROWAWAY database,
+e.g. a local `supabase start` or `docker run -e POSTGRES_PASSWORD=pg -p 5432:5432 postgres`:
+
+    TEST_DATABASE_URL=postgresql://postgres:pg@localhost:5432/postgres pytest tests/test_refill_and_consume_pg.py
+
+The migration is applied as-is; a minimal users table is created if missing
+and the rows this test inserts are deleted afterwards.
+"""
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+
+DSN = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DSN, reason="TEST_DATABASE_URL not set")
+
+MIGRATION = next(
+    (Path(__file__).resolve().parents[3] / "supabase" / "migrations").glob("*_refill_and_consume.sql")
+)
+DAILY, CAP = 3, 20
+
+
+@pytest.fixture(scope="module")
+def db():
+    with psycopg.connect(DSN, autocommit=True) as conn:
+        conn.execute(
+            """
+            create table if not exists public.users (
+                id uuid primary key,
+                email text,
+                full_name text,
+                plan text default 'free',
+                unlimited boolean default false,
+                free_uses_remaining integer default 0,
+                last_free_refill_at timestamptz,
+                created_at timestamptz default now()
+            )
+            """
+        )
+        conn.execute(MIGRATION.read_text())
+        created = []
+        yield conn, created
+        if created:
+            conn.execute("delete from public.users where id = any(%s)", (created,))
+
+
+def _user(db, *, remaining, last_refill, plan="free", unlimited=False):
+    conn, created = db
+    uid = uuid.uuid4()
+    conn.execute(
+        "insert into public.users (id, plan, unlimited, free_uses_remaining, last_free_refill_at) values (%s, %s, %s, %s, %s)",
+        (uid, plan, unlimited, remaining, last_refill),
+    )
+    created.append(uid)
+    return uid
+
+
+def _call(uid, consume):
+    with psycopg.connect(DSN, autocommit=True) as conn:
+        row = conn.execute("select public.refill_and_consume(%s, %s, %s, %s)", (uid, DAILY, CAP, consume)).fetchone()
+        return row[0]
+
+
+def _balance(db, uid):
+    return db[0].execute(
+        "select free_uses_remaining, last_free_refill_at from public.users where id = %s", (uid,)
+    ).fetchone()
+
+
+def _parallel(uid, n, consume):
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        return list(pool.map(lambda _: _call(uid, consume), range(n)))
+
+
+def test_parallel_spends_refill_once_and_never_overspend(db):
+    yesterday = datetime.now(timezone.utc) - timedelta(days=1)
+    uid = _user(db, remaining=2, last_refill=yesterday)
+
+    results = _parallel(uid, 16, consume=True)
+
+    # 2 + one daily refill of 3 = 5 spendable credits
+    assert sum(r["refilled"] for r in results) == 1
+    assert sum(r["consumed"] for r in results) == 5
+    assert sorted(r["remaining"] for r in results if r["consumed"]) == [0, 1, 2, 3, 4]
+    remaining, stamped = _balance(db, uid)
+    assert remaining == 0
+    assert stamped.date() == datetime.now(timezone.utc).date()
+
+
+def test_parallel_topups_apply_once(db):
+    uid = _user(db, remaining=19, last_refill=None)
+
+    results = _parallel(uid, 10, consume=False)
+
+    assert sum(r["refilled"] for r in results) == 1
+    assert _balance(db, uid)[0] == CAP  # capped, not 19 + 3
+
+
+def test_unlimited_and_paid_plans(db):
+    unlimited = _user(db, remaining=4, last_refill=None, plan="unlimited", unlimited=True)
+    starter = _user(db, remaining=2, last_refill=None, plan="starter")
+
+    res = _parallel(unlimited, 5, consume=True)
+    assert all(r["unlimited"] and not r["consumed"] for r in res)
+    assert _balance(db, unlimited)[0] == 4
+
+    res = _parallel(starter, 4, consume=True)
+    assert not any(r["refilled"] for r in res)
+    assert sum(r["consumed"] for r in res) == 2
+    assert _balance(db, starter) == (0, None)
+
+
+def test_missing_user_returns_null(db):
+    assert _call(uuid.uuid4(), True) is None
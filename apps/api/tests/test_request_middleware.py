@@ -0,0 +1,90 @@
+import asyncio
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.middleware import RequestMiddleware
+
+
+def _app(max_body=100):
+    api = FastAPI()
+
+    @api.get("/ping")
+    async def ping(request: Request):
+        return {"rid": request.state.request_id}
+
+    @api.post("/resume/extract")
+    async def extract(request: Request):
+        return {"size": len(await request.body())}
+
+    api.add_middleware(RequestMiddleware, max_body=max_body)
+    return api
+
+
+def test_request_id_and_security_headers(caplog):
+    caplog.set_level("INFO", logger="rb.access")
+    client = TestClient(_app())
+    r = client.get("/ping", headers={"x-request-id": "abc"})
+    assert r.json() == {"rid": "abc"} and r.headers["x-request-id"] == "abc"
+    assert r.headers["x-frame-options"] == "DENY"
+    assert "frame-ancestors 'none'" in r.headers["content-security-policy"]
+    generated = client.get("/ping")
+    assert generated.headers["x-request-id"] == generated.json()["rid"]
+    access = [r for r in caplog.records if r.name == "rb.access"][-1]
+    assert access.status == 200 and access.path == "/ping"
+
+
+def test_declared_body_over_limit():
+    client = TestClient(_app())
+    assert client.post("/resume/extract", content=b"x" * 50).json() == {"size": 50}
+    r = client.post("/resume/extract", content=b"x" * 101)
+    assert r.status_code == 413 and r.headers["x-request-id"]
+
+
+def test_streamed_body_over_limit():
+    app = _app()
+    chunks = [b"x" * 60, b"x" * 60, b"x" * 60]
+    sent, read = [], []
+
+    async def receive():
+        body = chunks.pop(0)
+        read.append(body)
+        return {"type": "http.request", "body": body, "more_body": bool(chunks)}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "POST", "path": "/resume/extract", "raw_path": b"/resume/extract",
+        "root_path": "", "scheme": "http", "query_string": b"", "client": ("127.0.0.1", 1), "server": ("t", 80),
+        "headers": [(b"transfer-encoding", b"chunked")],
+    }
+    asyncio.run(app(scope, receive, send))
+    assert sent[0]["status"] == 413
+    assert len(read) == 2  # stopped reading once over the limit
+    assert [m["type"] for m in sent] == ["http.response.start", "http.response.body"]
+
+
+def test_security_headers_reload_and_app_overrides(monkeypatch):
+    from fastapi.responses import JSONResponse
+
+    from app.utils import security_headers as sh
+
+    api = _app()
+
+    @api.get("/framed")
+    async def framed():
+        return JSONResponse({}, headers={"x-frame-options": "SAMEORIGIN", "x-request-id": "app"})
+
+    client = TestClient(api)
+    monkeypatch.setenv("SUPABASE_URL", "https://reloaded.supabase.test/path")
+    try:
+        sh.reload_security_headers()
+        assert "https://reloaded.supabase.test" in client.get("/ping").headers["content-security-policy"]
+    finally:
+        monkeypatch.undo()
+        sh.reload_security_headers()
+    r = client.get("/framed", headers={"x-request-id": "abc"})
+    assert r.headers.get_list("x-frame-options") == ["DENY"]
+    assert r.headers.get_list("x-request-id") == ["abc"]
+    assert "reloaded" not in r.headers["content-security-policy"]
@@ -0,0 +1,81 @@
+import os
+import time
+
+import pytest
+
+from app.agents.domain import skill_aliases
+from app.agents.domain.skill_aliases import AliasStore, load_alias_file, parse_alias_lines, DEFAULT_ALIAS_PATH
+
+
+def test_default_file_loads():
+    store = load_alias_file(DEFAULT_ALIAS_PATH)
+    assert len(store) > 200
+    assert store.lookup("AWS") == "amazon web services"
+    assert store.lookup("PostgreSQL") == "postgresql"
+    assert store.category("postgresql") == "database"
+    assert store.lookup("not a skill at all") is None
+
+
+def test_first_entry_wins_and_subset_rule():
+    store = AliasStore(parse_alias_lines([
+        "# comment",
+        "react native | framework | react native",
+        "react | framework | react, reactjs",
+    ]))
+    assert store.canonical("React Native (iOS)") == "react native"
+    assert store.canonical("ReactJS") == "react"
+    assert store.canonical("Svelte") == "svelte"
+
+
+def test_malformed_line_raises():
+    with pytest.raises(ValueError):
+        parse_alias_lines(["only | two"])
+
+
+def test_hot_reload_picks_up_edits(tmp_path, monkeypatch):
+    path = tmp_path / "aliases.txt"
+    path.write_text("golang | language | golang\n", encoding="utf-8")
+    monkeypatch.setattr(skill_aliases, "RELOAD_SEC", 0.0001)
+    monkeypatch.setattr(skill_aliases, "_store", None)
+    skill_aliases.reload_alias_store(path)
+    assert skill_aliases.get_alias_store().lookup("go lang") is None
+
+    path.write_text("golang | language | golang, go lang\n", encoding="utf-8")
+    os.utime(path, (time.time() + 5, time.time() + 5))
+    time.sleep(0.001)
+    assert skill_aliases.get_alias_store().lookup("go lang") == "golang"
+
+    # a broken edit keeps the previous store
+    path.write_text("broken line\n", encoding="utf-8")
+    os.utime(path, (time.time() + 10, time.time() + 10))
+    time.sleep(0.001)
+    assert skill_aliases.get_alias_store().lookup("go lang") == "golang"
+
+
+def test_c_family_keeps_its_own_names():
+    store = load_alias_file(DEFAULT_ALIAS_PATH)
+    assert store.canonical("C++") == "c++"
+    assert store.canonical("C/C++") == "c++"
+    assert store.canonical("C#") == "c#"
+    assert store.canonical("C") == "c"
+    assert store.canonical("Objective-C") == "objective-c"
+    assert store.canonical("Embedded C") == "embedded systems"
+    assert store.canonical("ANSI C") == "ansi c"
+
+
+
+def test_compound_job_items_still_match_each_skill():
+    from app.agents.domain.ats_match import _match_one
+
+    assert _match_one("Python or Java", ["Java"])
+    assert _match_one("Docker and Kubernetes", ["Kubernetes"])
+    assert _match_one("React/Node.js", ["React"])
+    assert _match_one("SQL and Python", ["SQL"])
+
+
+def test_ordinary_words_are_not_skill_aliases():
+    store = load_alias_file(DEFAULT_ALIAS_PATH)
+    for word in ("ms", "lean", "dns", "cdn"):
+        assert store.lookup(word) is None, word
+    assert store.canonical("GitHub") != "git"
+    assert store.canonical("MS degree in CS") == "master's degree"
@@ -0,0 +1,74 @@
+"""
+Ordering rules of public.upsert_subscription_summary against a real Postgres.
+
+Same setup as test_refill_and_consume_pg.py: needs psycopg and
+TEST_DATABASE_URL pointing at a THROWAWAY database. The rows this test
+inserts are deleted afterwards.
+"""
+import json
+import os
+import uuid
+from pathlib import Path
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+
+DSN = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DSN, reason="TEST_DATABASE_URL not set")
+
+MIGRATION = next(
+    (Path(__file__).resolve().parents[3] / "supabase" / "migrations").glob("*_subscription_summaries.sql")
+)
+
+
+@pytest.fixture(scope="module")
+def db():
+    with psycopg.connect(DSN, autocommit=True) as conn:
+        conn.execute(MIGRATION.read_text())
+        users = []
+        yield conn, users
+        if users:
+            conn.execute("delete from public.subscription_summaries where user_id = any(%s::uuid[])", (users,))
+
+
+def _put(conn, user_id, created, sub_id="sub_1", status="active", **kw):
+    row = {"user_id": user_id, "has_subscription": True, "subscription_id": sub_id, "status": status,
+           "source_created": created, **kw}
+    return conn.execute("select public.upsert_subscription_summary(%s::jsonb)", (json.dumps(row),)).fetchone()[0]
+
+
+def _status(conn, user_id):
+    return conn.execute(
+        "select subscription_id, status from public.subscription_summaries where user_id = %s", (user_id,)
+    ).fetchone()
+
+
+def test_newest_event_wins(db):
+    conn, users = db
+    uid = str(uuid.uuid4())
+    users.append(uid)
+    assert _put(conn, uid, 200, status="past_due")
+    assert not _put(conn, uid, 100, status="active")  # delivered late, older
+    assert _status(conn, uid) == ("sub_1", "past_due")
+    assert _put(conn, uid, 300, status="canceled")
+    assert _status(conn, uid) == ("sub_1", "canceled")
+
+
+def test_lookup_row_yields_to_events(db):
+    conn, users = db
+    uid = str(uuid.uuid4())
+    users.append(uid)
+    row = {"user_id": uid, "has_subscription": False, "source_created": 0}
+    conn.execute("select public.upsert_subscription_summary(%s::jsonb)", (json.dumps(row),))
+    assert _put(conn, uid, 1, status="active")
+    assert _status(conn, uid) == ("sub_1", "active")
+
+
+def test_old_subscription_does_not_hide_live_one(db):
+    conn, users = db
+    uid = str(uuid.uuid4())
+    users.append(uid)
+    assert _put(conn, uid, 100, sub_id="sub_new", status="active")
+    assert not _put(conn, uid, 150, sub_id="sub_old", status="canceled")
+    assert _status(conn, uid) == ("sub_new", "active")
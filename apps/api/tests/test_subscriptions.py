@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import pricing
+from app.utils import subscriptions as subs
+from app.utils import user_cache
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    monkeypatch.setitem(pricing.PRICE_CATALOG, "sub_test", {
+        "kind": "subscription", "plan": "plus", "monthly_allowance": 250, "stripe_price": "price_sub",
+    })
+    monkeypatch.setitem(pricing.PRICE_CATALOG, "pack_test", {"kind": "pack", "grant": 5, "stripe_price": "price_pack"})
+    pricing.rebuild_price_index()
+    yield
+    monkeypatch.undo()
+    pricing.rebuild_price_index()
+
+
+def _sub(price="price_sub", **kw):
+    return {"id": "sub_1", "status": "active", "items": {"data": [{"price": {"id": price}, **kw}]}}
+
+
+def test_price_index(catalog):
+    assert pricing.catalog_key_for_price("price_sub") == "sub_test"
+    assert pricing.resolve_subscription_by_price_id("price_sub")["plan"] == "plus"
+    assert pricing.resolve_subscription_by_price_id("price_pack") is None  # packs aren't plans
+    assert pricing.catalog_key_for_price(None) is None
+
+
+def test_summary_reads_period_from_item(catalog):
+    s = subs.summary_from_subscription(_sub(current_period_end=1700000000))
+    assert s["plan_key"] == "sub_test" and s["plan"] == "plus" and s["current_period_end"] == 1700000000
+    assert subs.summary_from_subscription(_sub("price_unknown"))["plan_key"] is None
+
+
+def test_served_from_store_and_looked_up_once(catalog, monkeypatch):
+    monkeypatch.setattr(user_cache, "_backend", user_cache._LocalBackend(ttl=60, maxsize=100))
+    monkeypatch.setattr(user_cache, "USER_CACHE_TTL_SEC", 60)
+    table, lookups = {}, []
+
+    async def get_row(user_id):
+        return table.get(user_id)
+
+    async def put_row(row):
+        if row["source_created"] >= table.get(row["user_id"], {}).get("source_created", -1):
+            table[row["user_id"]] = row
+        await user_cache.invalidate_user(row["user_id"])
+        return True
+
+    async def customer(user_id):
+        return "cus_1"
+
+    async def list_async(**kw):
+        lookups.append(kw["customer"])
+        return SimpleNamespace(data=[_sub(current_period_end=1)])
+
+    monkeypatch.setattr(subs, "get_subscription_summary_row", get_row)
+    monkeypatch.setattr(subs, "upsert_subscription_summary", put_row)
+    monkeypatch.setattr(subs, "get_stripe_customer_id", customer)
+    monkeypatch.setattr(subs.stripe.Subscription, "list_async", list_async)
+
+    async def run():
+        first = await subs.get_subscription_summary("u1")
+        await user_cache.clear_user_cache()
+        second = await subs.get_subscription_summary("u1")  # from the stored row
+        await subs.record_subscription("u1", {**_sub(), "status": "canceled"}, created=50)
+        third = await subs.get_subscription_summary("u1")
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert lookups == ["cus_1"]
+    assert first == second and first["status"] == "active" and first["plan"] == "plus"
+    assert table["u1"]["source_created"] == 50 and third["status"] == "canceled"
@@ -0,0 +1,96 @@
+import asyncio
+import base64
+import json
+
+import httpx
+import pytest
+
+from app import supabase_db
+from app.utils import text_store
+
+RESUME = "Jane Doe\nSenior engineer. Python, AWS, Postgres.\n" * 100
+JD = "We are hiring a backend engineer with Python and AWS.\n" * 60
+
+
+@pytest.fixture
+def rest(monkeypatch):
+    """Fake PostgREST: upsert_draft stores blobs/rows, text_blobs serves bytea as hex."""
+    state = {"blobs": {}, "bodies": [], "fail_fk_once": False, "deployed": True}
+    real_client = httpx.AsyncClient
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/rpc/upsert_draft"):
+            p = json.loads(request.content)["p"]
+            state["bodies"].append(p)
+            if state["fail_fk_once"]:
+                state["fail_fk_once"] = False
+                return httpx.Response(409, json={"code": "23503", "message": "fk"})
+            for b in p.get("blobs", []):
+                state["blobs"][b["hash"]] = text_store.decompress(base64.b64decode(b["zstd"]))
+            row = {k: v for k, v in p.items() if k != "blobs"}
+            if not state["deployed"]:
+                row = {k: v for k, v in row.items() if not k.endswith("_hash")}
+            return httpx.Response(200, json=row)
+        if request.url.path.endswith("/text_blobs"):
+            wanted = request.url.params["hash"][4:-1].split(",")
+            rows = [
+                {"hash": h, "zstd": "\\x" + text_store.compress(state["blobs"][h]).hex()}
+                for h in wanted if h in state["blobs"]
+            ]
+            return httpx.Response(200, json=rows)
+        return httpx.Response(404)
+
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kw: real_client(transport=httpx.MockTransport(handler), **kw))
+    monkeypatch.setattr(supabase_db, "REST", "http://supabase.test/rest/v1")
+    monkeypatch.setattr(supabase_db, "_text_blobs_deployed", None)
+    monkeypatch.setattr(text_store, "_known", text_store.LRUCache(maxsize=100))
+    monkeypatch.setattr(text_store, "_texts", text_store.LRUCache(maxsize=100))
+    return state
+
+
+def _draft(task):
+    return {"user_id": "u1", "client_ref_id": "ref1", "resume_text": RESUME, "job_description_text": JD,
+            "outputs_json": {task: {}}, "model_version": "m"}
+
+
+def test_text_is_sent_once_then_by_hash(rest):
+    async def run():
+        for task in ("bullets", "alignment", "cover_letter"):
+            await supabase_db.continue_draft(_draft(task))
+
+    asyncio.run(run())
+    first, second, third = rest["bodies"]
+    # first write: inline text too, until the response shows the migration is deployed
+    assert first["resume_text"] == RESUME and len(first["blobs"]) == 2
+    assert second["resume_text"] is None and second["job_description_text"] is None and "blobs" not in second
+    assert second["resume_hash"] == text_store.text_hash(RESUME) == third["resume_hash"]
+    assert len(json.dumps(second)) < len(RESUME) / 4
+
+
+def test_missing_blob_is_resent(rest):
+    async def run():
+        await supabase_db.continue_draft(_draft("bullets"))
+        rest["fail_fk_once"] = True
+        await supabase_db.continue_draft(_draft("alignment"))
+
+    asyncio.run(run())
+    assert "blobs" not in rest["bodies"][1] and len(rest["bodies"][2]["blobs"]) == 2
+
+
+def test_old_schema_keeps_text_inline(rest):
+    rest["deployed"] = False
+
+    async def run():
+        for task in ("bullets", "alignment"):
+            await supabase_db.continue_draft(_draft(task))
+
+    asyncio.run(run())
+    assert rest["bodies"][1]["resume_text"] == RESUME and "resume_hash" not in rest["bodies"][1]
+
+
+def test_hydrate_reads_blobs(rest):
+    h = text_store.text_hash(RESUME)
+    rest["blobs"][h] = RESUME
+    row = {"id": "d1", "resume_text": None, "resume_hash": h, "job_description_text": "inline", "jd_hash": None}
+    out = asyncio.run(supabase_db.hydrate_draft_texts(row))
+    assert out["resume_text"] == RESUME and out["job_description_text"] == "inline"
@@ -0,0 +1,81 @@
+import json
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import supabase_db
+from app.core import tracing
+from app.core.metrics import llm_stage
+from app.core.middleware import RequestMiddleware
+
+RID = "3f8a1c52-9a4e-4b61-8f57-0c2d7e5b9a10"
+
+
+def _spans(path):
+    out = []
+    for line in path.read_text().splitlines():
+        for rs in json.loads(line)["resourceSpans"]:
+            for ss in rs["scopeSpans"]:
+                out.extend(ss["spans"])
+    return {s["name"]: s for s in out}
+
+
+def test_off_by_default_is_noop():
+    assert not tracing.enabled()
+    with tracing.span("x") as s:
+        assert s is tracing.NOOP and tracing.current_span() is None
+
+
+def test_request_spans_exported_as_otlp_json(tmp_path, monkeypatch):
+    out = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(supabase_db, "REST", "http://db.test/rest/v1")
+    transport = httpx.MockTransport(lambda req: httpx.Response(200, json=[]))
+    api = FastAPI()
+
+    @api.get("/items/{item_id}")
+    async def item(item_id: str):
+        with llm_stage("generate"):
+            pass
+        async with supabase_db.rest_client(transport=transport) as client:
+            await client.get(f"{supabase_db.REST}/drafts")
+        return {"ok": True}
+
+    @api.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    api.add_middleware(RequestMiddleware)
+    tracing.setup_tracing("file", path=str(out))
+    try:
+        client = TestClient(api, raise_server_exceptions=False)
+        assert client.get("/items/7", headers={"x-request-id": RID}).status_code == 200
+        assert client.get("/boom").status_code == 500
+    finally:
+        tracing.stop_tracing()
+
+    spans = _spans(out)
+    root = spans["GET /items/{item_id}"]
+    assert root["traceId"] == RID.replace("-", "") and "parentSpanId" not in root
+    assert root["kind"] == tracing.KIND_SERVER
+    attrs = {a["key"]: a["value"] for a in root["attributes"]}
+    assert attrs["http.response.status_code"] == {"intValue": "200"}
+    assert attrs["rb.request_id"] == {"stringValue": RID}
+    for name in ("llm_stage generate", "supabase GET drafts"):
+        assert spans[name]["traceId"] == root["traceId"] and spans[name]["parentSpanId"] == root["spanId"]
+    assert int(root["endTimeUnixNano"]) >= int(spans["supabase GET drafts"]["endTimeUnixNano"])
+    assert spans["GET /boom"]["status"]["code"] == tracing.STATUS_ERROR
+
+
+def test_explicit_parent_context(tmp_path):
+    out = tmp_path / "traces.jsonl"
+    tracing.setup_tracing("file", path=str(out))
+    try:
+        with tracing.span("submit") as s:
+            ctx = list(s.context)  # as read back from the persist-queue journal
+        with tracing.span("persist draft", parent=ctx):
+            pass
+    finally:
+        tracing.stop_tracing()
+    spans = _spans(out)
+    assert spans["persist draft"]["parentSpanId"] == spans["submit"]["spanId"]
@@ -0,0 +1,167 @@
+"""
+Concurrency test for public.upsert_draft against a real Postgres.
+
+Same setup as test_refill_and_consume_pg.py: needs psycopg and
+TEST_DATABASE_URL pointing at a THROWAWAY database. A minimal drafts table is
+created if missing and the rows this test inserts are deleted afterwards.
+"""
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+
+DSN = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DSN, reason="TEST_DATABASE_URL not set")
+
+_MIGRATIONS = Path(__file__).resolve().parents[3] / "supabase" / "migrations"
+# upsert_draft as created, then as redefined by later migrations
+MIGRATIONS = [
+    next(_MIGRATIONS.glob(p)) for p in ("*_upsert_draft.sql", "*_draft_outputs_version.sql", "*_text_blobs.sql")
+]
+
+
+@pytest.fixture(scope="module")
+def db():
+    with psycopg.connect(DSN, autocommit=True) as conn:
+        conn.execute(
+            """
+            create table if not exists public.drafts (
+                id uuid primary key default gen_random_uuid(),
+                user_id uuid not null,
+                client_ref_id text,
+                resume_text text,
+                job_description_text text,
+                job_description_context text,
+                outputs_json jsonb,
+                model_version text,
+                company_name text,
+                job_title text,
+                job_link text,
+                resume_label text,
+                bender_score numeric,
+                bender_score_data jsonb,
+                resume_bullets jsonb,
+                interview_points jsonb,
+                cover_letter jsonb,
+                ats_alignment jsonb,
+                first_impression jsonb,
+                created_at timestamptz default now()
+            )
+            """
+        )
+        for m in MIGRATIONS:
+            conn.execute(m.read_text())
+        refs = []
+        yield conn, refs
+        if refs:
+            conn.execute("delete from public.drafts where client_ref_id = any(%s)", (refs,))
+            conn.execute("select public.release_text_blobs(array(select hash from public.text_blobs))")
+
+
+def _upsert(payload):
+    with psycopg.connect(DSN, autocommit=True) as conn:
+        return conn.execute("select to_jsonb(public.upsert_draft(%s::jsonb))", (json.dumps(payload),)).fetchone()[0]
+
+
+def _payload(user_id, ref, task, **cols):
+    return {
+        "user_id": user_id,
+        "client_ref_id": ref,
+        "resume_text": "resume",
+        "job_description_text": "jd",
+        "outputs_json": {task: {"task": task}},
+        "model_version": "test",
+        "job_title": f"title from {task}",
+        **cols,
+    }
+
+
+def test_parallel_tasks_keep_every_output(db):
+    user_id, ref = str(uuid.uuid4()), f"ref-{uuid.uuid4()}"
+    db[1].append(ref)
+    tasks = ["bullets", "talking_points", "cover_letter", "alignment", "bender_score_data", "first_impression"]
+    payloads = [_payload(user_id, ref, t) for t in tasks]
+    payloads[0]["resume_bullets"] = ["b1"]
+    payloads[2]["cover_letter"] = {"body": "hi"}
+    payloads[4]["bender_score"] = "87"
+
+    for _ in range(3):  # rerun the race on the same row
+        with ThreadPoolExecutor(max_workers=len(payloads)) as pool:
+            list(pool.map(_upsert, payloads))
+
+    rows = db[0].execute(
+        "select outputs_json, resume_bullets, cover_letter, bender_score from public.drafts where client_ref_id = %s",
+        (ref,),
+    ).fetchall()
+    assert len(rows) == 1
+    outputs, bullets, cover, score = rows[0]
+    assert set(outputs) == set(tasks)
+    assert bullets == ["b1"] and cover == {"body": "hi"} and float(score) == 87.0
+
+
+def test_later_task_keeps_first_columns(db):
+    user_id, ref = str(uuid.uuid4()), f"ref-{uuid.uuid4()}"
+    db[1].append(ref)
+    _upsert(_payload(user_id, ref, "bullets", resume_bullets=["b1"]))
+    row = _upsert(_payload(user_id, ref, "alignment", ats_alignment={"score": 1}))
+
+    assert row["job_title"] == "title from bullets"
+    assert row["resume_bullets"] == ["b1"] and row["ats_alignment"] == {"score": 1}
+    assert set(row["outputs_json"]) == {"bullets", "alignment"}
+
+
+def test_other_users_ref_is_rejected(db):
+    ref = f"ref-{uuid.uuid4()}"
+    db[1].append(ref)
+    _upsert(_payload(str(uuid.uuid4()), ref, "bullets"))
+    with pytest.raises(psycopg.errors.InsufficientPrivilege):
+        _upsert(_payload(str(uuid.uuid4()), ref, "alignment"))
+
+
+def test_merged_row_keeps_lowest_outputs_version(db):
+    user_id = str(uuid.uuid4())
+    legacy, fresh = f"ref-{uuid.uuid4()}", f"ref-{uuid.uuid4()}"
+    db[1].extend([legacy, fresh])
+
+    _upsert(_payload(user_id, legacy, "bullets"))  # written before normalization: no version
+    assert _upsert(_payload(user_id, legacy, "alignment", outputs_version=1))["outputs_version"] == 0
+
+    _upsert(_payload(user_id, fresh, "bullets", outputs_version=1))
+    assert _upsert(_payload(user_id, fresh, "alignment", outputs_version=1))["outputs_version"] == 1
+
+
+def test_text_blobs_are_stored_once_and_released(db):
+    import base64
+    import hashlib
+
+    import zstandard
+
+    user_id = str(uuid.uuid4())
+    refs = [f"ref-{uuid.uuid4()}" for _ in range(2)]
+    db[1].extend(refs)
+    text = f"resume {uuid.uuid4()} " * 200
+    h = hashlib.sha256(text.encode()).hexdigest()
+    blob = {"hash": h, "zstd": base64.b64encode(zstandard.ZstdCompressor().compress(text.encode())).decode(), "size": len(text)}
+
+    _upsert(_payload(user_id, refs[0], "bullets", resume_text=None, resume_hash=h, blobs=[blob]))
+    _upsert(_payload(user_id, refs[0], "alignment", resume_text=None, resume_hash=h, blobs=[blob]))  # resent: no-op
+    row = _upsert(_payload(user_id, refs[1], "bullets", resume_text=None, resume_hash=h))  # hash only
+
+    conn = db[0]
+    stored = conn.execute("select zstd from public.text_blobs where hash = %s", (h,)).fetchall()
+    assert len(stored) == 1 and zstandard.ZstdDecompressor().decompress(stored[0][0]).decode() == text
+    assert row["resume_hash"] == h and row["resume_text"] is None
+
+    release = "select public.release_text_blobs(array[%s])"
+    conn.execute("delete from public.drafts where client_ref_id = %s", (refs[0],))
+    assert conn.execute(release, (h,)).fetchone()[0] == 0  # still used by refs[1]
+    conn.execute("delete from public.drafts where client_ref_id = %s", (refs[1],))
+    assert conn.execute(release, (h,)).fetchone()[0] == 1
+
+    with pytest.raises(psycopg.errors.ForeignKeyViolation):
+        _upsert(_payload(user_id, f"ref-{uuid.uuid4()}", "bullets", resume_hash=h))  # blob gone, not resent
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from app.utils import user_cache
+
+
+@pytest.fixture
+def local_cache(monkeypatch):
+    monkeypatch.setattr(user_cache, "_backend", user_cache._LocalBackend(ttl=60, maxsize=100))
+    monkeypatch.setattr(user_cache, "USER_CACHE_TTL_SEC", 60)
+    return user_cache
+
+
+def _loader(calls, value):
+    async def load():
+        calls.append(1)
+        return value
+    return load
+
+
+def test_hit_after_miss_returns_copies(local_cache):
+    calls = []
+    before = local_cache.user_cache_stats()
+
+    async def run():
+        a = await local_cache.cached("summary", "u1", _loader(calls, {"plan": "free", "free_uses_remaining": 3}))
+        a["free_uses_remaining"] = 0  # caller mutation must not leak into the cache
+        b = await local_cache.cached("summary", "u1", _loader(calls, {"plan": "never"}))
+        return b
+
+    b = asyncio.run(run())
+    after = local_cache.user_cache_stats()
+    assert b == {"plan": "free", "free_uses_remaining": 3}
+    assert len(calls) == 1
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] - before["misses"] == 1
+    assert after["hit_rate"] is not None
+
+
+def test_none_is_cached(local_cache):
+    calls = []
+
+    async def run():
+        await local_cache.cached("premium", "u2", _loader(calls, None))
+        return await local_cache.cached("premium", "u2", _loader(calls, None))
+
+    assert asyncio.run(run()) is None
+    assert len(calls) == 1
+
+
+def test_invalidate_drops_all_kinds(local_cache):
+    calls = []
+
+    async def run():
+        for kind in local_cache.KINDS:
+            await local_cache.cached(kind, "u3", _loader(calls, {"k": kind}))
+        await local_cache.invalidate_user("u3")
+        for kind in local_cache.KINDS:
+            await local_cache.cached(kind, "u3", _loader(calls, {"k": kind}))
+
+    asyncio.run(run())
+    assert len(calls) == 2 * len(local_cache.KINDS)
+
+
+def test_ttl_expiry(monkeypatch):
+    clock = [0.0]
+    backend = user_cache._LocalBackend(ttl=5, maxsize=10)
+    backend._data = user_cache.TTLCache(maxsize=10, ttl=5, timer=lambda: clock[0])
+    monkeypatch.setattr(user_cache, "_backend", backend)
+    monkeypatch.setattr(user_cache, "USER_CACHE_TTL_SEC", 5)
+    calls = []
+
+    async def get():
+        return await user_cache.cached("summary", "u4", _loader(calls, {"plan": "free"}))
+
+    asyncio.run(get())
+    clock[0] = 4.0
+    asyncio.run(get())
+    clock[0] = 6.0
+    asyncio.run(get())
+    assert len(calls) == 2
+
+
+def test_backend_errors_fall_through(monkeypatch):
+    class Broken:
+        async def get(self, key):
+            raise ConnectionError("down")
+
+        async def set(self, key, value):
+            raise ConnectionError("down")
+
+    monkeypatch.setattr(user_cache, "_backend", Broken())
+    monkeypatch.setattr(user_cache, "USER_CACHE_TTL_SEC", 60)
+    calls = []
+    out = asyncio.run(user_cache.cached("summary", "u5", _loader(calls, {"plan": "pro"})))
+    assert out == {"plan": "pro"} and len(calls) == 1
+
+
+def test_balance_rows_bypass_local_cache_with_several_workers(local_cache, monkeypatch):
+    monkeypatch.setattr(local_cache, "WEB_CONCURRENCY", 4)
+    calls = {"context": [], "premium": []}
+
+    async def run():
+        for _ in range(2):
+            await local_cache.cached("context", "u1", _loader(calls["context"], {"free_uses_remaining": 3}))
+            await local_cache.cached("premium", "u1", _loader(calls["premium"], True))
+
+    asyncio.run(run())
+    assert len(calls["context"]) == 2  # always read fresh: another worker may have spent a credit
+    assert len(calls["premium"]) == 1
+    assert local_cache.user_cache_stats()["uncached_kinds"] == ["context", "summary"]
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from starlette.requests import Request
+
+from app.utils import credits as credits_mod
+from app.utils import user_context as uc
+
+
+def _request() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+
+
+def _patch_row(monkeypatch, row):
+    calls = []
+
+    async def fake_row(user_id):
+        calls.append(user_id)
+        await asyncio.sleep(0)
+        return dict(row)
+
+    monkeypatch.setattr(uc, "get_user_context_row", fake_row)
+    return calls
+
+
+def test_user_context_memoized_per_request(monkeypatch):
+    exp = (datetime.now(timezone.utc) + timedelta(days=3)).isoformat()
+    calls = _patch_row(monkeypatch, {
+        "id": "u1", "plan": "free", "unlimited": False, "free_uses_remaining": 2, "premium_expires_at": exp,
+    })
+
+    async def run():
+        req = _request()
+        a, b = await asyncio.gather(uc.load_user_context(req, "u1"), uc.load_user_context(req, "u1"))
+        c = await uc.load_user_context(req, "u1")
+        d = await uc.load_user_context(_request(), "u1")
+        return a, b, c, d
+
+    a, b, c, d = asyncio.run(run())
+    assert a is b is c
+    assert d is not a
+    assert calls == ["u1", "u1"]  # one fetch per request
+    assert a.premium["active"] and a.unlimited and not a.db_unlimited
+    assert a.remaining == 2 and "premium_expires_at" not in a.user
+
+
+def test_user_context_failure_not_memoized(monkeypatch):
+    attempts = []
+
+    async def flaky(user_id):
+        attempts.append(user_id)
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+        return {"id": user_id, "plan": "starter"}
+
+    monkeypatch.setattr(uc, "get_user_context_row", flaky)
+
+    async def run():
+        req = _request()
+        try:
+            await uc.load_user_context(req, "u2")
+        except RuntimeError:
+            pass
+        return await uc.load_user_context(req, "u2")
+
+    ctx = asyncio.run(run())
+    assert ctx.plan == "starter" and not ctx.unlimited
+    assert len(attempts) == 2
+
+
+def test_topup_uses_snapshot_without_refetch(monkeypatch):
+    async def no_fetch(user_id):
+        raise AssertionError("get_user_summary should not be called when a snapshot is passed")
+
+    rpc_calls = []
+
+    async def fake_rpc(user_id, *, daily, cap, consume=True):
+        rpc_calls.append(consume)
+        return {"remaining": min(1 + daily, cap), "consumed": False, "refilled": True, "unlimited": False}
+
+    monkeypatch.setattr(credits_mod, "get_user_summary", no_fetch)
+    monkeypatch.setattr(credits_mod, "refill_and_consume", fake_rpc)
+    monkeypatch.setattr(credits_mod, "_rpc_available", True)
+
+    yesterday = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+    snap = {"plan": "free", "unlimited": False, "free_uses_remaining": 1, "last_free_refill_at": yesterday}
+
+    first = asyncio.run(credits_mod.ensure_daily_free_topup("u3", snap=snap))
+    second = asyncio.run(credits_mod.ensure_daily_free_topup("u3", snap=snap))
+
+    assert first == second == min(1 + credits_mod.DAILY_FREE_CREDITS, credits_mod.FREE_ROLLOVER_CAP)
+    assert rpc_calls == [False]  # refilled once; the snapshot now carries today's stamp
@@ -0,0 +1,155 @@
+import asyncio
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+
+from app import supabase_db
+from app.utils import stripe_events
+from app.utils import webhook_queue as wq
+
+FIXTURES = Path(__file__).parent / "fixtures" / "stripe"
+
+
+class FakeStore:
+    """webhook_events in memory, with the claim ordering of the migration (retries are due at once)."""
+
+    def __init__(self):
+        self.rows = {}
+
+    async def claim(self, limit=1, lease_sec=60):
+        open_ = [r for r in self.rows.values() if r["status"] in ("pending", "processing")]
+        for r in sorted(open_, key=lambda r: r["event_created"]):
+            if r["status"] != "pending":
+                continue
+            if any(o["customer_id"] == r["customer_id"] and o["event_created"] < r["event_created"] for o in open_):
+                continue
+            r.update(status="processing", attempts=r["attempts"] + 1)
+            return [dict(r)]
+        return []
+
+    async def finish(self, event_id, status, *, error=None, retry_in=0):
+        self.rows[event_id].update(status=status, last_error=error, retry_in=retry_in)
+
+    def add(self, event):
+        self.rows[event["id"]] = {
+            "id": event["id"], "type": event["type"], "payload": event, "status": "pending", "attempts": 0,
+            "customer_id": supabase_db._event_customer(event), "event_created": event["created"],
+        }
+
+
+@pytest.fixture
+def store(monkeypatch):
+    s = FakeStore()
+    monkeypatch.setattr(supabase_db, "claim_webhook_events", s.claim)
+    monkeypatch.setattr(supabase_db, "finish_webhook_event", s.finish)
+    return s
+
+
+def _events():
+    return json.loads((FIXTURES / "subscription_lifecycle.json").read_text())
+
+
+def test_customer_events_apply_in_order_with_retries(store, monkeypatch):
+    seen, failures = [], {"evt_fixture_sub_created": 1}
+
+    async def handle(event):
+        if failures.get(event["id"]):
+            failures[event["id"]] -= 1
+            raise httpx.ConnectError("supabase down")
+        seen.append(event["id"])
+
+    monkeypatch.setattr(wq, "handle_stripe_event", handle)
+    for ev in reversed(_events()):  # delivered out of order
+        store.add(ev)
+
+    async def main():
+        q = wq.WebhookQueue(workers=3, retry_base=0.01, poll_sec=0.01)
+        await q.start()
+        for _ in range(300):
+            if all(r["status"] == "done" for r in store.rows.values()):
+                break
+            await asyncio.sleep(0.01)
+        await q.stop()
+
+    asyncio.run(main())
+    assert seen == [e["id"] for e in _events()]
+    assert store.rows["evt_fixture_sub_created"]["attempts"] == 2
+
+
+def test_permanent_failure_and_exhausted_retries_go_dead(store, monkeypatch):
+    async def handle(event):
+        if event["type"] == "customer.subscription.deleted":
+            raise KeyError("items")
+        raise httpx.ConnectError("down")
+
+    monkeypatch.setattr(wq, "handle_stripe_event", handle)
+    for ev in _events():
+        ev["data"]["object"]["customer"] = ev["id"]  # independent customers
+        store.add(ev)
+
+    async def main():
+        q = wq.WebhookQueue(workers=1, max_attempts=1, poll_sec=0.01)
+        await q.start()
+        for _ in range(100):
+            if all(r["status"] == "dead" for r in store.rows.values()):
+                break
+            await asyncio.sleep(0.01)
+        await q.stop()
+
+    asyncio.run(main())
+    assert {r["status"] for r in store.rows.values()} == {"dead"}
+    assert "KeyError" in store.rows["evt_fixture_sub_deleted"]["last_error"]
+
+
+def test_pack_grant_goes_through_event_ledger(monkeypatch):
+    event = json.loads((FIXTURES / "pack_checkout.json").read_text())
+    granted = {}
+
+    async def grant_once(event_id, user_id, delta):
+        if event_id in granted:
+            return None
+        granted[event_id] = delta
+        return delta
+
+    async def noop(*a, **kw):
+        return None
+
+    monkeypatch.setattr(stripe_events, "grant_credits_once", grant_once)
+    monkeypatch.setattr(stripe_events, "invalidate_user", noop)
+    monkeypatch.setattr(stripe_events, "capture_event", lambda *a, **kw: None)
+
+    async def main():
+        await stripe_events.handle_stripe_event(event)
+        await stripe_events.handle_stripe_event(event)  # redelivered / retried
+
+    asyncio.run(main())
+    assert granted == {"evt_fixture_pack_checkout": 20}
+
+
+def test_endpoint_verifies_stores_and_acks(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app import main
+
+    stored = []
+
+    async def enqueue(event):
+        if event["id"] in stored:
+            return False
+        stored.append(event["id"])
+        return True
+
+    monkeypatch.setattr(main, "enqueue_webhook_event", enqueue)
+    monkeypatch.setenv("STRIPE_WEBHOOK_SECRET", "whsec_test")
+    client = TestClient(main.app)
+    body = (FIXTURES / "pack_checkout.json").read_bytes()
+
+    def post(sig):
+        return client.post("/stripe/webhook", content=body, headers={"Stripe-Signature": sig})
+
+    assert post("t=1,v1=bad").status_code == 400
+    assert post(stripe_events._signature(body, "whsec_test")).json() == {"received": True, "queued": True}
+    assert post(stripe_events._signature(body, "whsec_test")).json() == {"received": True, "duplicate": True}
+    assert stored == ["evt_fixture_pack_checkout"]
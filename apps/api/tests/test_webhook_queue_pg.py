@@ -0,0 +1,107 @@
+"""
+Claim ordering and grant_credits_once from the webhook_queue migration,
+against a real Postgres.
+
+Same setup as test_refill_and_consume_pg.py: needs psycopg and
+TEST_DATABASE_URL pointing at a THROWAWAY database. A minimal users table is
+created if missing; the rows this test inserts are deleted afterwards.
+"""
+import json
+import os
+import uuid
+from pathlib import Path
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+
+DSN = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DSN, reason="TEST_DATABASE_URL not set")
+
+MIGRATION = next(
+    (Path(__file__).resolve().parents[3] / "supabase" / "migrations").glob("*_webhook_queue.sql")
+)
+
+
+@pytest.fixture(scope="module")
+def db():
+    with psycopg.connect(DSN, autocommit=True) as conn:
+        conn.execute(
+            """
+            create table if not exists public.users (
+                id uuid primary key,
+                email text,
+                full_name text,
+                plan text default 'free',
+                unlimited boolean default false,
+                free_uses_remaining integer default 0,
+                last_free_refill_at timestamptz,
+                created_at timestamptz default now()
+            )
+            """
+        )
+        conn.execute(MIGRATION.read_text())
+        users, events = [], []
+        yield conn, users, events
+        conn.execute("delete from public.webhook_events where id = any(%s)", (events,))
+        conn.execute("delete from public.credit_grants where user_id = any(%s::uuid[])", (users,))
+        conn.execute("delete from public.users where id = any(%s::uuid[])", (users,))
+
+
+def _add(db, customer, created):
+    conn, _, events = db
+    eid = f"evt_{uuid.uuid4().hex}"
+    events.append(eid)
+    conn.execute(
+        "insert into public.webhook_events (id, type, payload, customer_id, event_created) values (%s, 't', %s, %s, %s)",
+        (eid, json.dumps({"id": eid}), customer, created),
+    )
+    return eid
+
+
+def _claim(conn, limit=10):
+    rows = conn.execute("select id, attempts from public.claim_webhook_events(%s, 60)", (limit,)).fetchall()
+    return [r[0] for r in rows]
+
+
+def _finish(conn, eid, status, retry_in=0):
+    conn.execute("select public.finish_webhook_event(%s, %s, null, %s)", (eid, status, retry_in))
+
+
+def test_one_open_event_per_customer_oldest_first(db):
+    conn = db[0]
+    cus_a, cus_b = uuid.uuid4().hex, uuid.uuid4().hex
+    a2 = _add(db, cus_a, 200)
+    a1 = _add(db, cus_a, 100)
+    b1 = _add(db, cus_b, 150)
+
+    first = [e for e in _claim(conn) if e in (a1, a2, b1)]
+    assert sorted(first) == sorted([a1, b1])  # a2 waits behind a1
+    assert a2 not in [e for e in _claim(conn)]  # a1 still leased
+
+    _finish(conn, a1, "pending", retry_in=3600)  # failed: a2 still waits for its retry
+    assert a2 not in _claim(conn)
+    _finish(conn, a1, "done")
+    assert a2 in _claim(conn)
+
+
+def test_expired_lease_is_claimed_again(db):
+    conn = db[0]
+    eid = _add(db, uuid.uuid4().hex, 1)
+    assert eid in _claim(conn)
+    conn.execute("update public.webhook_events set lease_until = now() - interval '1 second' where id = %s", (eid,))
+    assert eid in _claim(conn)
+    assert conn.execute("select attempts from public.webhook_events where id = %s", (eid,)).fetchone()[0] == 2
+
+
+def test_grant_credits_once_per_event(db):
+    conn, users, _ = db
+    uid = str(uuid.uuid4())
+    users.append(uid)
+    conn.execute("insert into public.users (id, free_uses_remaining) values (%s, 3)", (uid,))
+    grant = "select public.grant_credits_once(%s, %s, 20)"
+    assert conn.execute(grant, ("evt_pack_1", uid)).fetchone()[0] == 23
+    assert conn.execute(grant, ("evt_pack_1", uid)).fetchone()[0] is None
+    with pytest.raises(psycopg.errors.NoDataFound):
+        conn.execute(grant, ("evt_pack_2", str(uuid.uuid4())))
+    assert conn.execute("select count(*) from public.credit_grants where event_id = 'evt_pack_2'").fetchone()[0] == 0
@@ -3,7 +3,7 @@
 import { useEffect, useState } from "react";
 import { useRouter } from "next/navigation";
 import Link from "next/link";
-import { getHistoryList, deleteHistoryDraft } from "../../lib/api";
+import { getHistoryPage, deleteHistoryDraft } from "../../lib/api";
 import { Draft } from "../../lib/types";
 import ConfirmDialog from "components/ConfirmDialog";
 
@@ -26,14 +26,17 @@ export default function DraftHistoryListPage() {
     const [loading, setLoading] = useState(true);
     const [deleting, setDeleting] = useState<string | null>(null);
     const [confirmDelete, setConfirmDelete] = useState<{ draftId: string } | null>(null);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         async function load() {
             try {
-                const list = await getHistoryList();
+                const { items: list, nextCursor } = await getHistoryPage();
                 console.log('[DraftHistoryList] Loaded drafts:', list);
                 console.log('[DraftHistoryList] Draft client_ref_ids:', list.map(d => ({ client_ref_id: d.client_ref_id, hasClientRefId: !!d.client_ref_id })));
                 setDrafts(list);
+                setNextCursor(nextCursor);
             } catch (e) {
                 console.error("Failed to load history", e);
             } finally {
@@ -43,6 +46,20 @@ export default function DraftHistoryListPage() {
         load();
     }, []);
 
+    const handleLoadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const page = await getHistoryPage(50, nextCursor);
+            setDrafts(prev => [...prev, ...page.items]);
+            setNextCursor(page.nextCursor);
+        } catch (e) {
+            console.error("Failed to load more history", e);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const handleDeleteClick = (draftId: string, e: React.MouseEvent) => {
         e.preventDefault();
         e.stopPropagation();
@@ -141,10 +158,10 @@ export default function DraftHistoryListPage() {
 
                                     <div className="mt-4 flex flex-wrap gap-1">
                                         {/* Show badges for what's inside */}
-                                        {draft.resume_bullets && <Badge>Bullets</Badge>}
-                                        {draft.cover_letter && <Badge>Cover Letter</Badge>}
-                                        {draft.interview_points && <Badge>Interview</Badge>}
-                                        {draft.ats_alignment && <Badge>ATS</Badge>}
+                                        {(draft.tasks?.includes("bullets") || draft.resume_bullets) && <Badge>Bullets</Badge>}
+                                        {(draft.tasks?.includes("cover_letter") || draft.cover_letter) && <Badge>Cover Letter</Badge>}
+                                        {(draft.tasks?.includes("talking_points") || draft.interview_points) && <Badge>Interview</Badge>}
+                                        {(draft.tasks?.includes("alignment") || draft.ats_alignment) && <Badge>ATS</Badge>}
                                     </div>
                                 </div>
                             </div>
@@ -180,6 +197,19 @@ export default function DraftHistoryListPage() {
                     })}
                 </div>
             )}
+
+            {!loading && nextCursor && (
+                <div className="mt-6 text-center">
+                    <button
+                        type="button"
+                        onClick={handleLoadMore}
+                        disabled={loadingMore}
+                        className="rounded-lg border border-border px-4 py-2 text-sm font-medium text-foreground hover:bg-muted disabled:opacity-50"
+                    >
+                        {loadingMore ? "Loading..." : "Load more"}
+                    </button>
+                </div>
+            )}
             
             <ConfirmDialog
                 open={confirmDelete !== null}
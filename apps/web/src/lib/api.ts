@@ -121,9 +121,18 @@ export async function apiFetch<T = unknown>(path: string, init: RequestInit = {}
   return augmented;
 }
 
+export async function getHistoryPage(
+  limit = 50,
+  cursor?: string | null,
+): Promise<{ items: Draft[]; nextCursor: string | null }> {
+  const qs = new URLSearchParams({ limit: String(limit) });
+  if (cursor) qs.set('cursor', cursor);
+  const res = await apiFetch<Draft[]>(`/history?${qs.toString()}`);
+  return { items: res.data || [], nextCursor: res.headers.get('x-next-cursor') };
+}
+
 export async function getHistoryList(limit = 50): Promise<Draft[]> {
-  const res = await apiFetch<Draft[]>(`/history?limit=${limit}`);
-  return res.data || [];
+  return (await getHistoryPage(limit)).items;
 }
 
 export async function getHistoryDetail(draftId: string): Promise<Draft | null> {
@@ -65,6 +65,10 @@ export interface Draft {
     bender_score?: number;
     bender_score_data?: unknown;
 
+    // History list rows carry only summary columns plus the tasks present
+    // (bullets, cover_letter, talking_points, alignment, first_impression, bender_score)
+    tasks?: string[];
+
     // Raw inputs/outputs
     resume_text?: string;
     job_description_text?: string;
@@ -0,0 +1,89 @@
+-- Atomic "daily free top-up if due, then (optionally) consume one credit".
+--
+-- Replaces the read -> compute in Python -> PATCH -> consume_free_use sequence
+-- used by the API. The users row is locked for the duration of the call, so
+-- concurrent requests can neither double-refill nor overspend.
+--
+-- Refill rule (same as app/utils/credits.py):
+--   free, non-unlimited users only; once per UTC day; additive; capped at p_cap;
+--   last_free_refill_at is stamped only when credits are actually added.
+-- Consume rule: unlimited users are never decremented; otherwise decrement by 1
+--   when the (post-refill) balance is > 0.
+--
+-- Returns jsonb: {"remaining": int, "consumed": bool, "refilled": bool, "unlimited": bool}
+-- or null if the user row does not exist.
+
+create or replace function public.refill_and_consume(
+    uid uuid,
+    p_daily integer,
+    p_cap integer,
+    p_consume boolean default true
+) returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    u record;
+    v_remaining integer;
+    v_refilled boolean := false;
+    v_consumed boolean := false;
+    v_today date := (now() at time zone 'utc')::date;
+begin
+    select plan, unlimited, free_uses_remaining, last_free_refill_at
+      into u
+      from users
+     where id = uid
+       for update;
+
+    if not found then
+        return null;
+    end if;
+
+    v_remaining := coalesce(u.free_uses_remaining, 0);
+
+    if not coalesce(u.unlimited, false)
+       and lower(coalesce(u.plan, 'free')) = 'free'
+       and v_remaining < p_cap
+       and p_daily > 0
+       and (u.last_free_refill_at is null
+            or (u.last_free_refill_at at time zone 'utc')::date < v_today)
+    then
+        v_remaining := least(v_remaining + p_daily, p_cap);
+        v_refilled := true;
+    end if;
+
+    if p_consume and not coalesce(u.unlimited, false) and v_remaining > 0 then
+        v_remaining := v_remaining - 1;
+        v_consumed := true;
+    end if;
+
+    if v_refilled or v_consumed then
+        update users
+           set free_uses_remaining = v_remaining,
+               last_free_refill_at = case when v_refilled then now() else last_free_refill_at end
+         where id = uid;
+    end if;
+
+    return jsonb_build_object(
+        'remaining', v_remaining,
+        'consumed', v_consumed,
+        'refilled', v_refilled,
+        'unlimited', coalesce(u.unlimited, false)
+    );
+end;
+$$;
+
+-- service role only (the API calls it with the service key); guarded so the
+-- migration also applies to a plain Postgres used for tests
+revoke all on function public.refill_and_consume(uuid, integer, integer, boolean) from public;
+do $$
+begin
+    if exists (select 1 from pg_roles where rolname = 'anon') then
+        revoke all on function public.refill_and_consume(uuid, integer, integer, boolean) from anon, authenticated;
+    end if;
+    if exists (select 1 from pg_roles where rolname = 'service_role') then
+        grant execute on function public.refill_and_consume(uuid, integer, integer, boolean) to service_role;
+    end if;
+end
+$$;
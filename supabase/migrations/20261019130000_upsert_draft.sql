@@ -0,0 +1,85 @@
+-- Single-call draft persistence for /draft/run-form.
+--
+-- Inserts the draft on the first task for a client_ref_id; later tasks merge
+-- their outputs into outputs_json with `||` and overwrite only the structured
+-- columns they carry. The merge happens in the INSERT ... ON CONFLICT row
+-- lock, so tasks finishing at the same time can't drop each other's outputs.
+--
+-- p: a drafts row as jsonb (user_id and client_ref_id required). Returns the
+-- stored row; raises insufficient_privilege if the ref belongs to another user.
+
+do $$
+begin
+    -- ON CONFLICT (client_ref_id) needs a unique index; client_ref_id may already be the PK
+    if not exists (
+        select 1
+          from pg_index i
+          join pg_attribute a on a.attrelid = i.indrelid and a.attnum = any(i.indkey)
+         where i.indrelid = 'public.drafts'::regclass
+           and i.indisunique
+           and i.indnatts = 1
+           and i.indpred is null
+           and a.attname = 'client_ref_id'
+    ) then
+        create unique index drafts_client_ref_id_key on public.drafts (client_ref_id);
+    end if;
+end
+$$;
+
+create or replace function public.upsert_draft(p jsonb)
+returns public.drafts
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    r public.drafts;
+    v_row public.drafts;
+begin
+    r := jsonb_populate_record(null::public.drafts, p);
+    if r.user_id is null or r.client_ref_id is null then
+        raise exception 'upsert_draft requires user_id and client_ref_id' using errcode = '22023';
+    end if;
+
+    insert into drafts as d (
+        user_id, client_ref_id, resume_text, job_description_text, job_description_context,
+        outputs_json, model_version, company_name, job_title, job_link, resume_label,
+        bender_score, bender_score_data, resume_bullets, interview_points, cover_letter,
+        ats_alignment, first_impression
+    ) values (
+        r.user_id, r.client_ref_id, r.resume_text, r.job_description_text, coalesce(r.job_description_context, ''),
+        coalesce(r.outputs_json, '{}'::jsonb), r.model_version, r.company_name, r.job_title, r.job_link, r.resume_label,
+        r.bender_score, r.bender_score_data, r.resume_bullets, r.interview_points, r.cover_letter,
+        r.ats_alignment, r.first_impression
+    )
+    on conflict (client_ref_id) do update set
+        outputs_json      = coalesce(d.outputs_json, '{}'::jsonb) || coalesce(excluded.outputs_json, '{}'::jsonb),
+        resume_bullets    = coalesce(excluded.resume_bullets, d.resume_bullets),
+        interview_points  = coalesce(excluded.interview_points, d.interview_points),
+        cover_letter      = coalesce(excluded.cover_letter, d.cover_letter),
+        ats_alignment     = coalesce(excluded.ats_alignment, d.ats_alignment),
+        first_impression  = coalesce(excluded.first_impression, d.first_impression),
+        bender_score_data = coalesce(excluded.bender_score_data, d.bender_score_data),
+        bender_score      = coalesce(excluded.bender_score, d.bender_score)
+    where d.user_id = excluded.user_id
+    returning d.* into v_row;
+
+    if not found then
+        raise exception 'client_ref_id % belongs to another user', r.client_ref_id using errcode = '42501';
+    end if;
+    return v_row;
+end;
+$$;
+
+-- service role only; guarded so the migration also applies to a plain Postgres used for tests
+revoke all on function public.upsert_draft(jsonb) from public;
+do $$
+begin
+    if exists (select 1 from pg_roles where rolname = 'anon') then
+        revoke all on function public.upsert_draft(jsonb) from anon, authenticated;
+    end if;
+    if exists (select 1 from pg_roles where rolname = 'service_role') then
+        grant execute on function public.upsert_draft(jsonb) to service_role;
+    end if;
+end
+$$;
@@ -0,0 +1,23 @@
+-- Bulk analytics inserts use on_conflict=client_event_id with ignore-duplicates,
+-- which needs a unique index on that column. Backend events leave it null
+-- (nulls never conflict).
+--
+-- Client retries before this index could have stored the same client_event_id
+-- more than once: keep the earliest row per id so the index can be built.
+delete from public.analytics_events e
+using (
+    select ctid,
+           row_number() over (partition by client_event_id order by created_at, ctid) as rn
+    from public.analytics_events
+    where client_event_id is not null
+) d
+where e.ctid = d.ctid
+  and d.rn > 1;
+
+-- The migration runner wraps each file in a transaction, so this can't be
+-- CONCURRENTLY; it blocks writes to analytics_events while it builds. Give up
+-- instead of queueing behind a long-running writer (re-run off-peak).
+set local lock_timeout = '5s';
+
+create unique index if not exists analytics_events_client_event_id_key
+    on public.analytics_events (client_event_id);
@@ -0,0 +1,46 @@
+-- Slim projection for the /history list.
+--
+-- The list only needs titles/dates/score and which tasks a draft has, not the
+-- resume/JD text or task outputs; `tasks` is computed here so the API never
+-- downloads outputs_json just to render badges. Full rows still come from
+-- public.drafts via /history/{client_ref_id}.
+
+create or replace view public.draft_summaries
+with (security_invoker = true)
+as
+select
+    id,
+    client_ref_id,
+    user_id,
+    created_at,
+    job_title,
+    company_name,
+    job_link,
+    resume_label,
+    bender_score,
+    model_version,
+    array_remove(array[
+        case when resume_bullets is not null or outputs_json ? 'bullets' then 'bullets' end,
+        case when cover_letter is not null or outputs_json ? 'cover_letter' then 'cover_letter' end,
+        case when interview_points is not null or outputs_json ? 'talking_points' then 'talking_points' end,
+        case when ats_alignment is not null or outputs_json ? 'alignment' or outputs_json ? 'ats_alignment' then 'alignment' end,
+        case when first_impression is not null or outputs_json ? 'first_impression' then 'first_impression' end,
+        case when bender_score_data is not null or outputs_json ? 'bender_score_data' then 'bender_score' end
+    ], null) as tasks
+from public.drafts;
+
+-- keyset pagination: where user_id = $1 and (created_at, id) < ($2, $3) order by created_at desc, id desc
+create index if not exists drafts_user_created_id_idx
+    on public.drafts (user_id, created_at desc, id desc);
+
+revoke all on public.draft_summaries from public;
+do $$
+begin
+    if exists (select 1 from pg_roles where rolname = 'anon') then
+        revoke all on public.draft_summaries from anon, authenticated;
+    end if;
+    if exists (select 1 from pg_roles where rolname = 'service_role') then
+        grant select on public.draft_summaries to service_role;
+    end if;
+end
+$$;
@@ -0,0 +1,58 @@
+-- Schema version of the typed output columns on public.drafts.
+--
+-- 0 = written before write-time normalization (columns may hold markdown-fenced
+-- JSON or {"bullets": "<json>"} wrappers); >= 1 = already parsed, see
+-- apps/api/app/utils/draft_outputs.py. Existing rows are converted by
+-- `python -m app.utils.draft_outputs`.
+
+alter table public.drafts add column if not exists outputs_version smallint not null default 0;
+
+-- upsert_draft: as in 20261019130000_upsert_draft.sql, plus outputs_version.
+-- A merged row keeps the lower version, so a legacy draft that gets a new
+-- task stays marked for the migration command.
+create or replace function public.upsert_draft(p jsonb)
+returns public.drafts
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    r public.drafts;
+    v_row public.drafts;
+begin
+    r := jsonb_populate_record(null::public.drafts, p);
+    if r.user_id is null or r.client_ref_id is null then
+        raise exception 'upsert_draft requires user_id and client_ref_id' using errcode = '22023';
+    end if;
+
+    insert into drafts as d (
+        user_id, client_ref_id, resume_text, job_description_text, job_description_context,
+        outputs_json, model_version, company_name, job_title, job_link, resume_label,
+        bender_score, bender_score_data, resume_bullets, interview_points, cover_letter,
+        ats_alignment, first_impression, outputs_version
+    ) values (
+        r.user_id, r.client_ref_id, r.resume_text, r.job_description_text, coalesce(r.job_description_context, ''),
+        coalesce(r.outputs_json, '{}'::jsonb), r.model_version, r.company_name, r.job_title, r.job_link, r.resume_label,
+        r.bender_score, r.bender_score_data, r.resume_bullets, r.interview_points, r.cover_letter,
+        r.ats_alignment, r.first_impression, coalesce(r.outputs_version, 0)
+    )
+    on conflict (client_ref_id) do update set
+        outputs_json      = coalesce(d.outputs_json, '{}'::jsonb) || coalesce(excluded.outputs_json, '{}'::jsonb),
+        resume_bullets    = coalesce(excluded.resume_bullets, d.resume_bullets),
+        interview_points  = coalesce(excluded.interview_points, d.interview_points),
+        cover_letter      = coalesce(excluded.cover_letter, d.cover_letter),
+        ats_alignment     = coalesce(excluded.ats_alignment, d.ats_alignment),
+        first_impression  = coalesce(excluded.first_impression, d.first_impression),
+        bender_score_data = coalesce(excluded.bender_score_data, d.bender_score_data),
+        bender_score      = coalesce(excluded.bender_score, d.bender_score),
+        outputs_version   = least(d.outputs_version, excluded.outputs_version)
+    where d.user_id = excluded.user_id
+    returning d.* into v_row;
+
+    if not found then
+        raise exception 'client_ref_id % belongs to another user', r.client_ref_id using errcode = '42501';
+    end if;
+    return v_row;
+end;
+$$;
+
@@ -0,0 +1,107 @@
+-- Content-addressed resume / job description text.
+--
+-- Each distinct text is stored once, zstd-compressed, keyed by the sha256 of
+-- its UTF-8 bytes (computed by the API, see apps/api/app/utils/text_store.py).
+-- New drafts reference it through resume_hash / jd_hash and leave
+-- resume_text / job_description_text null; older rows keep their inline text.
+
+create table if not exists public.text_blobs (
+    hash       text primary key,
+    zstd       bytea not null,
+    size       integer not null,          -- characters before compression
+    created_at timestamptz not null default now()
+);
+
+alter table public.text_blobs enable row level security;  -- service role only
+
+alter table public.drafts add column if not exists resume_hash text references public.text_blobs (hash);
+alter table public.drafts add column if not exists jd_hash text references public.text_blobs (hash);
+create index if not exists drafts_resume_hash_idx on public.drafts (resume_hash) where resume_hash is not null;
+create index if not exists drafts_jd_hash_idx on public.drafts (jd_hash) where jd_hash is not null;
+
+-- upsert_draft: as in 20261019160000_draft_outputs_version.sql, plus
+-- p.blobs = [{hash, zstd (base64), size}], stored (once) before the draft that
+-- references them. Texts the API already stored are sent as hashes only.
+create or replace function public.upsert_draft(p jsonb)
+returns public.drafts
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    r public.drafts;
+    v_row public.drafts;
+begin
+    r := jsonb_populate_record(null::public.drafts, p);
+    if r.user_id is null or r.client_ref_id is null then
+        raise exception 'upsert_draft requires user_id and client_ref_id' using errcode = '22023';
+    end if;
+
+    insert into text_blobs (hash, zstd, size)
+    select b->>'hash', decode(b->>'zstd', 'base64'), (b->>'size')::int
+      from jsonb_array_elements(coalesce(p->'blobs', '[]'::jsonb)) b
+    on conflict (hash) do nothing;
+
+    insert into drafts as d (
+        user_id, client_ref_id, resume_text, job_description_text, job_description_context,
+        outputs_json, model_version, company_name, job_title, job_link, resume_label,
+        bender_score, bender_score_data, resume_bullets, interview_points, cover_letter,
+        ats_alignment, first_impression, outputs_version, resume_hash, jd_hash
+    ) values (
+        r.user_id, r.client_ref_id, r.resume_text, r.job_description_text, coalesce(r.job_description_context, ''),
+        coalesce(r.outputs_json, '{}'::jsonb), r.model_version, r.company_name, r.job_title, r.job_link, r.resume_label,
+        r.bender_score, r.bender_score_data, r.resume_bullets, r.interview_points, r.cover_letter,
+        r.ats_alignment, r.first_impression, coalesce(r.outputs_version, 0), r.resume_hash, r.jd_hash
+    )
+    on conflict (client_ref_id) do update set
+        outputs_json      = coalesce(d.outputs_json, '{}'::jsonb) || coalesce(excluded.outputs_json, '{}'::jsonb),
+        resume_bullets    = coalesce(excluded.resume_bullets, d.resume_bullets),
+        interview_points  = coalesce(excluded.interview_points, d.interview_points),
+        cover_letter      = coalesce(excluded.cover_letter, d.cover_letter),
+        ats_alignment     = coalesce(excluded.ats_alignment, d.ats_alignment),
+        first_impression  = coalesce(excluded.first_impression, d.first_impression),
+        bender_score_data = coalesce(excluded.bender_score_data, d.bender_score_data),
+        bender_score      = coalesce(excluded.bender_score, d.bender_score),
+        outputs_version   = least(d.outputs_version, excluded.outputs_version)
+    where d.user_id = excluded.user_id
+    returning d.* into v_row;
+
+    if not found then
+        raise exception 'client_ref_id % belongs to another user', r.client_ref_id using errcode = '42501';
+    end if;
+    return v_row;
+end;
+$$;
+
+-- Deletes the given blobs when no draft references them any more (called
+-- after a draft is deleted). Returns how many were removed.
+create or replace function public.release_text_blobs(p_hashes text[])
+returns integer
+language sql
+security definer
+set search_path = public
+as $$
+    with gone as (
+        delete from text_blobs b
+         where b.hash = any(p_hashes)
+           and not exists (select 1 from drafts d where d.resume_hash = b.hash)
+           and not exists (select 1 from drafts d where d.jd_hash = b.hash)
+        returning 1
+    )
+    select count(*)::int from gone;
+$$;
+
+revoke all on public.text_blobs from public;
+revoke all on function public.release_text_blobs(text[]) from public;
+do $$
+begin
+    if exists (select 1 from pg_roles where rolname = 'anon') then
+        revoke all on public.text_blobs from anon, authenticated;
+        revoke all on function public.release_text_blobs(text[]) from anon, authenticated;
+    end if;
+    if exists (select 1 from pg_roles where rolname = 'service_role') then
+        grant select, insert, delete on public.text_blobs to service_role;
+        grant execute on function public.release_text_blobs(text[]) to service_role;
+    end if;
+end
+$$;
@@ -0,0 +1,84 @@
+-- Materialized /billing/subscription-summary.
+--
+-- Written by the Stripe webhooks (customer.subscription.*,
+-- invoice.payment_succeeded) and, for users with no row yet, once from a live
+-- Stripe lookup. The endpoint reads this instead of listing subscriptions
+-- from Stripe on every page view.
+
+create table if not exists public.subscription_summaries (
+    user_id              uuid primary key,
+    has_subscription     boolean not null default false,
+    subscription_id      text,
+    status               text,
+    price_id             text,
+    plan_key             text,
+    plan                 text,
+    cancel_at_period_end boolean not null default false,
+    current_period_end   bigint,            -- unix seconds, as Stripe sends it
+    source_created       bigint not null,   -- Stripe event.created (or lookup time) of the data
+    updated_at           timestamptz not null default now()
+);
+
+alter table public.subscription_summaries enable row level security;  -- service role only
+
+-- Stores p (a subscription_summaries row as jsonb) unless what's stored is
+-- newer, or describes a different subscription that is still live while p's
+-- is not (an old subscription's events must not hide the current one).
+-- Returns true when the row was written.
+create or replace function public.upsert_subscription_summary(p jsonb)
+returns boolean
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    r public.subscription_summaries;
+    live constant text[] := array['active', 'trialing', 'past_due', 'incomplete', 'unpaid'];
+begin
+    r := jsonb_populate_record(null::public.subscription_summaries, p);
+    if r.user_id is null or r.source_created is null then
+        raise exception 'upsert_subscription_summary requires user_id and source_created' using errcode = '22023';
+    end if;
+
+    insert into subscription_summaries as s (
+        user_id, has_subscription, subscription_id, status, price_id, plan_key, plan,
+        cancel_at_period_end, current_period_end, source_created, updated_at
+    ) values (
+        r.user_id, coalesce(r.has_subscription, false), r.subscription_id, r.status, r.price_id, r.plan_key, r.plan,
+        coalesce(r.cancel_at_period_end, false), r.current_period_end, r.source_created, now()
+    )
+    on conflict (user_id) do update set
+        has_subscription     = excluded.has_subscription,
+        subscription_id      = excluded.subscription_id,
+        status               = excluded.status,
+        price_id             = excluded.price_id,
+        plan_key             = excluded.plan_key,
+        plan                 = excluded.plan,
+        cancel_at_period_end = excluded.cancel_at_period_end,
+        current_period_end   = excluded.current_period_end,
+        source_created       = excluded.source_created,
+        updated_at           = now()
+    where excluded.source_created >= s.source_created
+      and not (
+          s.subscription_id is distinct from excluded.subscription_id
+          and coalesce(s.status = any(live), false)
+          and not coalesce(excluded.status = any(live), false)
+      );
+    return found;
+end;
+$$;
+
+revoke all on public.subscription_summaries from public;
+revoke all on function public.upsert_subscription_summary(jsonb) from public;
+do $$
+begin
+    if exists (select 1 from pg_roles where rolname = 'anon') then
+        revoke all on public.subscription_summaries from anon, authenticated;
+        revoke all on function public.upsert_subscription_summary(jsonb) from anon, authenticated;
+    end if;
+    if exists (select 1 from pg_roles where rolname = 'service_role') then
+        grant select on public.subscription_summaries to service_role;
+        grant execute on function public.upsert_subscription_summary(jsonb) to service_role;
+    end if;
+end
+$$;
@@ -0,0 +1,146 @@
+-- Persist-then-ack Stripe webhooks.
+--
+-- /stripe/webhook verifies the signature, stores the event here and returns
+-- 200 right away; API workers (apps/api/app/utils/webhook_queue.py) claim and
+-- process stored events with retries. Events of one Stripe customer are
+-- processed one at a time, oldest first.
+--
+-- Rows recorded before this migration were processed inline: they become
+-- status 'done'.
+
+create table if not exists public.webhook_events (
+    id   text primary key,
+    type text
+);
+
+alter table public.webhook_events
+    add column if not exists payload         jsonb,
+    add column if not exists customer_id     text,
+    add column if not exists event_created   bigint,
+    add column if not exists status          text not null default 'done',
+    add column if not exists attempts        integer not null default 0,
+    add column if not exists next_attempt_at timestamptz not null default now(),
+    add column if not exists lease_until     timestamptz,
+    add column if not exists last_error      text,
+    add column if not exists received_at     timestamptz not null default now(),
+    add column if not exists processed_at    timestamptz;
+alter table public.webhook_events alter column status set default 'pending';
+
+create index if not exists webhook_events_due_idx
+    on public.webhook_events (next_attempt_at) where status in ('pending', 'processing');
+create index if not exists webhook_events_customer_open_idx
+    on public.webhook_events (customer_id, event_created, received_at) where status in ('pending', 'processing');
+
+-- Claims up to p_limit due events, leasing them for p_lease_sec. An event is
+-- due when it is pending and its retry time has passed, or its lease has
+-- expired (the worker died). An event is skipped while an older open event of
+-- the same customer exists.
+create or replace function public.claim_webhook_events(p_limit integer default 1, p_lease_sec integer default 60)
+returns setof public.webhook_events
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    return query
+    update webhook_events w
+       set status = 'processing',
+           attempts = w.attempts + 1,
+           lease_until = now() + make_interval(secs => p_lease_sec)
+     where w.id in (
+        select e.id
+          from webhook_events e
+         where ((e.status = 'pending' and e.next_attempt_at <= now())
+                or (e.status = 'processing' and e.lease_until < now()))
+           and not exists (
+                select 1
+                  from webhook_events o
+                 where o.customer_id = e.customer_id
+                   and o.status in ('pending', 'processing')
+                   and (o.event_created, o.received_at, o.id) < (e.event_created, e.received_at, e.id)
+           )
+         order by e.event_created nulls first, e.received_at
+         limit p_limit
+           for update skip locked
+     )
+    returning w.*;
+end;
+$$;
+
+-- p_status: 'done', 'dead', or 'pending' (retry after p_retry_in_sec).
+create or replace function public.finish_webhook_event(
+    p_id text,
+    p_status text,
+    p_error text default null,
+    p_retry_in_sec double precision default 0
+) returns void
+language sql
+security definer
+set search_path = public
+as $$
+    update webhook_events
+       set status = p_status,
+           last_error = p_error,
+           lease_until = null,
+           next_attempt_at = case when p_status = 'pending'
+                                  then now() + make_interval(secs => p_retry_in_sec)
+                                  else next_attempt_at end,
+           processed_at = case when p_status = 'done' then now() else processed_at end
+     where id = p_id;
+$$;
+
+-- Credit grants keyed by the Stripe event that paid for them, so a retried
+-- event can't grant twice. Returns the new balance, or null if this event
+-- already granted (or the user doesn't exist).
+create table if not exists public.credit_grants (
+    event_id   text primary key,
+    user_id    uuid not null,
+    delta      integer not null,
+    created_at timestamptz not null default now()
+);
+alter table public.credit_grants enable row level security;  -- service role only
+
+create or replace function public.grant_credits_once(p_event_id text, p_user_id uuid, p_delta integer)
+returns integer
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_total integer;
+begin
+    insert into credit_grants (event_id, user_id, delta) values (p_event_id, p_user_id, p_delta)
+    on conflict (event_id) do nothing;
+    if not found then
+        return null;
+    end if;
+    update users
+       set free_uses_remaining = coalesce(free_uses_remaining, 0) + p_delta
+     where id = p_user_id
+    returning free_uses_remaining into v_total;
+    if not found then
+        raise exception 'user % not found', p_user_id using errcode = 'P0002';  -- rolls back the grant row
+    end if;
+    return v_total;
+end;
+$$;
+
+revoke all on function public.claim_webhook_events(integer, integer) from public;
+revoke all on function public.finish_webhook_event(text, text, text, double precision) from public;
+revoke all on function public.grant_credits_once(text, uuid, integer) from public;
+revoke all on public.credit_grants from public;
+do $$
+begin
+    if exists (select 1 from pg_roles where rolname = 'anon') then
+        revoke all on function public.claim_webhook_events(integer, integer) from anon, authenticated;
+        revoke all on function public.finish_webhook_event(text, text, text, double precision) from anon, authenticated;
+        revoke all on function public.grant_credits_once(text, uuid, integer) from anon, authenticated;
+        revoke all on public.credit_grants from anon, authenticated;
+    end if;
+    if exists (select 1 from pg_roles where rolname = 'service_role') then
+        grant execute on function public.claim_webhook_events(integer, integer) to service_role;
+        grant execute on function public.finish_webhook_event(text, text, text, double precision) to service_role;
+        grant execute on function public.grant_credits_once(text, uuid, integer) to service_role;
+    end if;
+end
+$$;
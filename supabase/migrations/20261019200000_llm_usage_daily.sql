@@ -0,0 +1,79 @@
+-- Daily LLM token/cost rollups.
+--
+-- The API sums token usage in memory per (day, user, draft task, LLM stage,
+-- model) and flushes the sums every LLM_USAGE_FLUSH_SEC through the persist
+-- queue (apps/api/app/utils/llm_usage.py). One flush is one add_llm_usage()
+-- call that adds its rows onto these counters. user_id is null for guests.
+
+create table if not exists public.llm_usage_daily (
+    day           date not null,
+    user_id       uuid,
+    task          text not null,
+    stage         text not null,
+    model         text not null,
+    calls         bigint not null default 0,
+    input_tokens  bigint not null default 0,
+    output_tokens bigint not null default 0,
+    cost_usd      numeric(14, 6) not null default 0,
+    updated_at    timestamptz not null default now(),
+    constraint llm_usage_daily_key unique nulls not distinct (day, user_id, task, stage, model)
+);
+create index if not exists llm_usage_daily_user_day_idx on public.llm_usage_daily (user_id, day desc);
+alter table public.llm_usage_daily enable row level security;  -- service role only
+
+-- Flushes already applied, so a retried flush (response lost after commit)
+-- doesn't count twice. Old ids can be pruned freely after a day.
+create table if not exists public.llm_usage_batches (
+    id         text primary key,
+    applied_at timestamptz not null default now()
+);
+alter table public.llm_usage_batches enable row level security;
+
+-- p_rows: [{day, user_id, task, stage, model, calls, input_tokens, output_tokens, cost_usd}, ...]
+-- Returns the number of rows applied (0 if this batch was applied before).
+create or replace function public.add_llm_usage(p_batch_id text, p_rows jsonb)
+returns integer
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_n integer;
+begin
+    insert into llm_usage_batches (id) values (p_batch_id) on conflict (id) do nothing;
+    if not found then
+        return 0;
+    end if;
+    insert into llm_usage_daily as u
+           (day, user_id, task, stage, model, calls, input_tokens, output_tokens, cost_usd)
+    select r.day, r.user_id, r.task, r.stage, r.model, r.calls, r.input_tokens, r.output_tokens, r.cost_usd
+      from jsonb_to_recordset(p_rows) as r(
+           day date, user_id uuid, task text, stage text, model text,
+           calls bigint, input_tokens bigint, output_tokens bigint, cost_usd numeric)
+    on conflict on constraint llm_usage_daily_key do update
+       set calls         = u.calls + excluded.calls,
+           input_tokens  = u.input_tokens + excluded.input_tokens,
+           output_tokens = u.output_tokens + excluded.output_tokens,
+           cost_usd      = u.cost_usd + excluded.cost_usd,
+           updated_at    = now();
+    get diagnostics v_n = row_count;
+    return v_n;
+end;
+$$;
+
+revoke all on function public.add_llm_usage(text, jsonb) from public;
+revoke all on public.llm_usage_daily from public;
+revoke all on public.llm_usage_batches from public;
+do $$
+begin
+    if exists (select 1 from pg_roles where rolname = 'anon') then
+        revoke all on function public.add_llm_usage(text, jsonb) from anon, authenticated;
+        revoke all on public.llm_usage_daily from anon, authenticated;
+        revoke all on public.llm_usage_batches from anon, authenticated;
+    end if;
+    if exists (select 1 from pg_roles where rolname = 'service_role') then
+        grant execute on function public.add_llm_usage(text, jsonb) to service_role;
+        grant select on public.llm_usage_daily to service_role;
+    end if;
+end
+$$;